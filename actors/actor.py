@@ -1,15 +1,26 @@
 # actors/actor.py
 
 from __future__ import annotations
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
+import os
 
 import streamlit as st
 
 # from personas.persona_floria_ja import Persona
 from actors.answer_talker import AnswerTalker
+from components.multi_ai_display_config import MultiAIDisplayConfig
+from components.multi_ai_model_viewer import MultiAIModelViewer
+
+LYRA_DEBUG = os.getenv("LYRA_DEBUG", "0") == "1"
 
 
 class Actor:
+    # フェイルセーフ用の暫定セリフ（会話が完全に死ぬのを防ぐ）
+    FALLBACK_REPLY = (
+        "あっ……ごめんなさい、ちょっと考え込んじゃってました。"
+        "もう一度だけ、ゆっくり聞かせていただけますか？"
+    )
+
     def __init__(self, name: str, persona: Persona) -> None:
         self.name = name
         self.persona = persona
@@ -17,14 +28,10 @@ class Actor:
         # LLMRouterはもう使わない。AnswerTalker内部で自動的にLLMManager/Routerへ接続する
         self.answer_talker = AnswerTalker(persona=self.persona)
 
-    def speak(self, conversation_log: List[Dict[str, str]]) -> str:
-        """
-        - conversation_log から最新の player 発言を取り出し
-        - Persona に messages を作らせ
-        - AnswerTalker で LLM パイプラインを回す
-        - もし最終返答が空だった場合は、フェイルセーフで「とりあえず何かしゃべる」
-        """
+        # speak_stream の最終返答（ストリーム終了後に確定）
+        self.last_reply: str = ""
 
+    def _build_messages(self, conversation_log: List[Dict[str, str]]) -> Tuple[str, List[Dict[str, str]]]:
         # プレイヤーの最新発言を取得
         user_text = ""
         for entry in reversed(conversation_log):
@@ -48,21 +55,62 @@ class Actor:
             messages = self.persona.build_messages(conversation_log)
 
         st.write(f"{debug_prefix}messages built. len={len(messages)}")
+        return user_text, messages
 
-        # AnswerTalker によるLLMパイプライン処理
-        final_reply = self.answer_talker.speak(messages, user_text=user_text)
-        st.write(f"{debug_prefix}AnswerTalker.speak() returned. final_reply.len={len(final_reply)}")
-
+    def _safe_reply(self, final_reply: str) -> str:
         # ===== フェイルセーフ =====
         safe_reply = (final_reply or "").strip()
         if not safe_reply:
             st.warning(
-                f"{debug_prefix}final_reply is empty. Fallback message will be used."
+                f"[DEBUG:Actor] {getattr(self, 'name', 'Actor')} "
+                "final_reply is empty. Fallback message will be used."
             )
-            # 会話が完全に死ぬのを防ぐための暫定セリフ
-            safe_reply = (
-                "あっ……ごめんなさい、ちょっと考え込んじゃってました。"
-                "もう一度だけ、ゆっくり聞かせていただけますか？"
-            )
-
+            safe_reply = self.FALLBACK_REPLY
         return safe_reply
+
+    def speak(self, conversation_log: List[Dict[str, str]]) -> str:
+        """
+        - conversation_log から最新の player 発言を取り出し
+        - Persona に messages を作らせ
+        - AnswerTalker で LLM パイプラインを回す
+        - もし最終返答が空だった場合は、フェイルセーフで「とりあえず何かしゃべる」
+        """
+        user_text, messages = self._build_messages(conversation_log)
+
+        # AnswerTalker によるLLMパイプライン処理
+        # （モデルの回答が届くたびに placeholder を描き直し、終わったら消す。
+        #   通常は応答済みの数だけ。Judge 前の候補本文は LYRA_DEBUG=1 のときだけ出す）
+        progress = st.empty()
+        viewer = MultiAIModelViewer(MultiAIDisplayConfig())
+        self.answer_talker.on_progress = lambda meta: viewer.render_progress(
+            progress,
+            meta.get("models") or {},
+            meta.get("judge_provisional"),
+            show_candidates=LYRA_DEBUG,
+        )
+        try:
+            final_reply = self.answer_talker.speak(messages, user_text=user_text)
+        finally:
+            self.answer_talker.on_progress = None
+            progress.empty()
+        st.write(
+            f"[DEBUG:Actor] {getattr(self, 'name', 'Actor')} "
+            f"AnswerTalker.speak() returned. final_reply.len={len(final_reply)}"
+        )
+
+        return self._safe_reply(final_reply)
+
+    def speak_stream(self, conversation_log: List[Dict[str, str]]) -> Iterator[str]:
+        """
+        speak() のストリーミング版（st.write_stream に渡す）。
+
+        表示用のテキスト差分を yield し、最終返答（Composer 後・フェイルセーフ込み）は
+        ストリーム終了後に self.last_reply に入る。
+        """
+        user_text, messages = self._build_messages(conversation_log)
+
+        self.last_reply = ""
+        yield from self.answer_talker.speak_stream(messages, user_text=user_text)
+
+        final_reply = self.answer_talker.last_reply
+        self.last_reply = self._safe_reply(final_reply)
@@ -1,13 +1,15 @@
 # actors/answer_talker.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Mapping, Tuple
 import os
 import traceback
 
 import streamlit as st
 
 from actors.models_ai2 import ModelsAI2
+from actors.length_budget import get_length_budget, length_budget_enabled
+from actors.model_win_stats import get_model_win_stats
 from actors.judge_ai3 import JudgeAI3
 from actors.composer_ai import ComposerAI
 from actors.memory_ai import MemoryAI
@@ -17,6 +19,7 @@ from actors.persona_ai import PersonaAI
 from actors.scene_ai import SceneAI
 from actors.mixer_ai import MixerAI
 from actors.init_ai import InitAI
+from llm.llm_ai.llm_deadline import Deadline
 from llm.llm_manager import LLMManager
 
 LYRA_DEBUG = os.getenv("LYRA_DEBUG", "0") == "1"
@@ -66,11 +69,20 @@ class AnswerTalker:
         if "round_id" not in self.state:
             self.state["round_id"] = 0
 
+        # speak_stream の最終テキスト（ストリーム終了後に確定）
+        self.last_reply: str = ""
+
+        # Models の結果が 1 つ届くたびに llm_meta を渡して呼ぶ（画面を少しずつ埋める用。任意）
+        self.on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+
         # AIs
         # PersonaAI はキャラIDで良い（プロンプト置換など）
         persona_id_for_prompt = getattr(persona, "char_id", "default")
         self.persona_ai = PersonaAI(persona_id=persona_id_for_prompt)
 
+        # 勝率（model_win_stats）はキャラごとに数える
+        self.win_stats_persona_id = str(persona_id_for_prompt)
+
         # ModelsAI2（enabled は内部で available_models.enabled を尊重）
         self.models_ai = ModelsAI2(self.llm_manager, persona=self.persona)
 
@@ -154,6 +166,10 @@ class AnswerTalker:
         out: Dict[str, Any] = {}
         if isinstance(priority, list):
             out["priority"] = [str(x) for x in priority if str(x).strip()]
+            try:
+                self.llm_manager.set_failover_order(out["priority"])
+            except Exception:
+                pass
         return out
 
     # =========================================================
@@ -175,17 +191,9 @@ class AnswerTalker:
         return out
 
     # =========================================================
-    # speak
+    # 内部：ターン開始（設定同期 / round_id 確定）
     # =========================================================
-    def speak(
-        self,
-        messages: List[Dict[str, str]],
-        user_text: str = "",
-        judge_mode: Optional[str] = None,
-    ) -> str:
-        if not messages:
-            return ""
-
+    def _start_round(self) -> Tuple[Optional[List[str]], int]:
         # ★毎ターン同期（UIで殺した設定を確実に効かせる）
         sync = self._sync_ai_manager_settings()
         priority = sync.get("priority")
@@ -199,133 +207,425 @@ class AnswerTalker:
 
         self.llm_meta["stage"] = "start"
         self.llm_meta["round_id"] = round_id
+        return priority, round_id
 
+    # =========================================================
+    # 内部：Models 呼び出し前の準備（memory context / emotion override）
+    # =========================================================
+    def _prepare_context(self, user_text: str) -> Tuple[str, Any]:
+        InitAI.ensure_minimum(state=self.state, persona=self.persona)
+
+        # -----------------------------------------
+        # Memory context（可能なら）事前構築
+        # -----------------------------------------
+        self.llm_meta["stage"] = "memory_context"
+        memory_context = ""
         try:
-            InitAI.ensure_minimum(state=self.state, persona=self.persona)
-
-            # -----------------------------------------
-            # Memory context（可能なら）事前構築
-            # -----------------------------------------
-            self.llm_meta["stage"] = "memory_context"
+            if self.memory_ai is not None and hasattr(self.memory_ai, "build_memory_context"):
+                memory_context = str(
+                    self.memory_ai.build_memory_context(
+                        user_query=user_text or "",
+                        max_items=5,
+                    )
+                    or ""
+                )
+        except Exception as e:
+            self.llm_meta["memory_context_error"] = str(e)
             memory_context = ""
+
+        self.llm_meta["memory_context"] = memory_context
+
+        # -----------------------------------------
+        # Emotion override
+        # -----------------------------------------
+        self.llm_meta["stage"] = "mixer"
+        emotion_override = self.mixer_ai.build_emotion_override()
+        self.llm_meta["emotion_override"] = emotion_override
+
+        return memory_context, emotion_override
+
+    # =========================================================
+    # 内部：勝率の記録 / Adaptive
+    # =========================================================
+    @staticmethod
+    def _length_mode() -> str:
+        return str(st.session_state.get("reply_length_mode", "auto") or "auto")
+
+    def _adaptive_key(self) -> Optional[Tuple[str, str]]:
+        """
+        AI Manager が select_mode="Adaptive" なら (persona_id, reply_length_mode)。
+        """
+        ai_state = st.session_state.get("ai_manager")
+        if not isinstance(ai_state, dict) or ai_state.get("select_mode") != "Adaptive":
+            return None
+        return self.win_stats_persona_id, self._length_mode()
+
+    def _record_win(self, results: Dict[str, Any], judge: Dict[str, Any]) -> None:
+        """
+        今回呼んだモデルと Judge の採用を model_win_stats に数える（select_mode に関係なく毎ターン）。
+        """
+        try:
+            get_model_win_stats().record_turn(
+                self.win_stats_persona_id,
+                self._length_mode(),
+                results,
+                str(judge.get("chosen_model") or ""),
+            )
+        except Exception as e:
+            self.llm_meta["win_stats_error"] = str(e)
+
+    # =========================================================
+    # 内部：目標の長さと max_tokens の予算（呼ぶ前に決める）
+    # =========================================================
+    def _plan_length(self, user_text: str) -> Tuple[int, Optional[Dict[str, int]]]:
+        """
+        (目標の長さ, モデル名 -> max_tokens)。目標の長さは Judge にも同じ値を渡す。
+        予算が決められなければ None（各モデルの TARGET_TOKENS / verbosity のまま）。
+        """
+        target_length = self.judge_ai.preferred_length(user_text, self._length_mode())
+        budgets: Optional[Dict[str, int]] = None
+        if length_budget_enabled():
             try:
-                if self.memory_ai is not None and hasattr(self.memory_ai, "build_memory_context"):
-                    memory_context = str(
-                        self.memory_ai.build_memory_context(
-                            user_query=user_text or "",
-                            max_items=5,
-                        )
-                        or ""
-                    )
+                models = list((self.llm_manager.get_available_models() or {}).keys())
+                budgets = get_length_budget().budgets(target_length, models)
             except Exception as e:
-                self.llm_meta["memory_context_error"] = str(e)
-                memory_context = ""
+                self.llm_meta["length_budget_error"] = str(e)
+        self.llm_meta["length_budget"] = {"target_length": target_length, "max_tokens": budgets}
+        return target_length, budgets
 
-            self.llm_meta["memory_context"] = memory_context
+    # =========================================================
+    # 内部：Models collect（届いた順に llm_meta を更新しながら）
+    # =========================================================
+    def _collect_progressive(
+        self,
+        messages: List[Dict[str, str]],
+        user_text: str,
+        *,
+        mode_current: str,
+        emotion_override: Any,
+        reply_length_mode: str,
+        priority: Optional[List[str]],
+        deadline: Deadline,
+        target_length: int,
+        max_tokens: Optional[Dict[str, int]],
+    ) -> Dict[str, Any]:
+        """
+        ModelsAI2.collect_iter で集める。1 モデル届くたびに
+        llm_meta["models"]（途中経過）/ ["judge_provisional"]（暫定の採用候補）/
+        ["collect_progress"]（届いた順とレイテンシ）を更新して on_progress を呼ぶ。
+        戻り値は ModelsAI2.collect と同じ。
+        """
+        progress: List[Dict[str, Any]] = []
+        self.llm_meta["collect_progress"] = progress
+        self.llm_meta.pop("judge_provisional", None)
+        length_mode = self._length_mode()
+
+        it = self.models_ai.collect_iter(
+            messages,
+            mode_current=mode_current,
+            emotion_override=emotion_override,
+            reply_length_mode=reply_length_mode,
+            priority=priority,
+            deadline=deadline,
+            adaptive=self._adaptive_key(),
+            max_tokens=max_tokens,
+        )
+        while True:
+            try:
+                model_name, result, partial = next(it)
+            except StopIteration as stop:
+                return stop.value or {}
 
-            # -----------------------------------------
-            # Emotion override
-            # -----------------------------------------
-            self.llm_meta["stage"] = "mixer"
-            emotion_override = self.mixer_ai.build_emotion_override()
-            self.llm_meta["emotion_override"] = emotion_override
+            self.llm_meta["models"] = partial
+            provisional = self.judge_ai.run_provisional(
+                self._extract_judge_candidates(partial),
+                user_text=user_text,
+                preferred_length_mode=length_mode,
+                priority=priority,
+                collect_policy=(partial.get("_meta") or {}).get("collect_policy"),
+                target_length=target_length,
+            )
+            self.llm_meta["judge_provisional"] = provisional
+            progress.append(
+                {
+                    "model": model_name,
+                    "status": result.get("status"),
+                    "elapsed_sec": result.get("elapsed_sec"),
+                    "pick": provisional.get("chosen_model"),
+                    "provisional": provisional.get("provisional"),
+                }
+            )
+
+            if self.on_progress is not None:
+                try:
+                    self.on_progress(self.llm_meta)
+                except Exception as e:
+                    # 表示の失敗で会話を止めない
+                    self.llm_meta["progress_error"] = str(e)
+
+    # =========================================================
+    # 内部：Models 結果から最終テキストまで（Judge → Composer → Emotion → Memory）
+    # =========================================================
+    def _finish_turn(
+        self,
+        messages: List[Dict[str, str]],
+        user_text: str,
+        results: Dict[str, Any],
+        *,
+        priority: Optional[List[str]],
+        memory_context: str,
+        round_id: int,
+        target_length: int,
+    ) -> str:
+        self.llm_meta["models"] = results
+
+        if not results:
+            raise RuntimeError("ModelsAI2.collect returned empty dict")
+
+        # -----------------------------------------
+        # Judge（_meta/_systemを除外して渡す）
+        # -----------------------------------------
+        self.llm_meta["stage"] = "judge"
+        judge_candidates = self._extract_judge_candidates(results)
+        # どのポリシーで集めた候補か（priority_first / quorum なら待たなかったモデルは pending）
+        collect_policy = (results.get("_meta") or {}).get("collect_policy") or "all"
+        self.llm_meta["collect_policy"] = collect_policy
+        judge = self.judge_ai.run(
+            judge_candidates,
+            user_text=user_text,
+            preferred_length_mode=self._length_mode(),
+            priority=priority,
+            collect_policy=collect_policy,
+            target_length=target_length,
+        )
+        self.llm_meta["judge"] = judge
+        self._record_win(results, judge)
+
+        # -----------------------------------------
+        # Composer
+        # -----------------------------------------
+        self.llm_meta["stage"] = "composer"
+        composed = self.composer_ai.compose(self.llm_meta)
+        self.llm_meta["composer"] = composed
+
+        final_text = (composed.get("text") or judge.get("chosen_text") or "").strip()
+
+        # -----------------------------------------
+        # Emotion analyze（失敗しても会話は継続）
+        # -----------------------------------------
+        self.llm_meta["stage"] = "emotion"
+        try:
+            emotion_res: EmotionResult = self.emotion_ai.analyze(
+                composer=composed,
+                memory_context=memory_context,
+                user_text=user_text,
+            )
+            self.llm_meta["emotion"] = emotion_res.to_dict()
+            EmotionModel(result=emotion_res).sync_relationship_fields()
+        except Exception as e:
+            self.llm_meta["emotion_error"] = str(e)
+
+        # -----------------------------------------
+        # Memory update（必ず走らせて meta に残す）
+        # -----------------------------------------
+        self.llm_meta["stage"] = "memory_update"
+        try:
+            if self.memory_ai is None:
+                self.llm_meta["memory_update"] = {
+                    "status": "skip",
+                    "reason": "memory_ai_not_initialized",
+                    "added": 0,
+                }
+            else:
+                try:
+                    mu = self.memory_ai.update_from_turn(
+                        messages=messages,
+                        final_reply=final_text,
+                        round_id=round_id,
+                    )
+                except TypeError:
+                    mu = self.memory_ai.update_from_turn(
+                        messages,
+                        final_text,
+                        round_id,
+                    )
+
+                self.llm_meta["memory_update"] = mu if isinstance(mu, dict) else {"status": "ok", "raw": str(mu)}
+        except Exception as e:
+            self.llm_meta["memory_update_error"] = str(e)
+
+        self.llm_meta["stage"] = "done"
+        return final_text or "……"
+
+    # =========================================================
+    # 内部：ターンの締切の記録
+    # =========================================================
+    def _record_deadline(self, deadline: Deadline) -> None:
+        """
+        Models 段階の締切の消化状況を llm_meta["deadline"] に残す。
+        予算切れなのに下流（ModelsAI2 / LLMAI）が段階を記録していなければ、今の stage を記録する。
+        """
+        if deadline.expired() and deadline.expired_stage is None:
+            deadline.note_expired(str(self.llm_meta.get("stage") or ""))
+        self.llm_meta["deadline"] = deadline.to_meta()
+
+    # =========================================================
+    # 内部：致命的エラーの記録
+    # =========================================================
+    def _handle_fatal(self, e: Exception, round_id: int) -> str:
+        self.llm_meta["stage"] = "fatal"
+        err = {
+            "error": str(e),
+            "traceback": traceback.format_exc(limit=10),
+            "round_id": round_id,
+            "stage": self.llm_meta.get("stage"),
+        }
+        self.llm_meta.setdefault("errors", []).append(err)
+
+        if LYRA_DEBUG:
+            st.error("AnswerTalker.speak fatal error")
+            st.exception(e)
+
+        return "……（思考が途切れてしまったみたい）"
+
+    # =========================================================
+    # speak
+    # =========================================================
+    def speak(
+        self,
+        messages: List[Dict[str, str]],
+        user_text: str = "",
+        judge_mode: Optional[str] = None,
+    ) -> str:
+        if not messages:
+            return ""
+
+        priority, round_id = self._start_round()
+        # ターンの予算（ModelsAI2 → LLMAI → Adapter の timeout まで同じものを渡す）
+        deadline = Deadline.for_turn("answer_talker")
+
+        try:
+            memory_context, emotion_override = self._prepare_context(user_text)
+            target_length, max_tokens = self._plan_length(user_text)
 
             # -----------------------------------------
             # Models collect
             # -----------------------------------------
             self.llm_meta["stage"] = "models_collect"
-            results = self.models_ai.collect(
+            results = self._collect_progressive(
                 messages,
+                user_text,
                 mode_current=judge_mode or "normal",
                 emotion_override=emotion_override,
                 reply_length_mode=self.llm_meta.get("reply_length_mode", "auto"),
+                priority=priority,
+                deadline=deadline,
+                target_length=target_length,
+                max_tokens=max_tokens,
             )
-            self.llm_meta["models"] = results
+            self._record_deadline(deadline)
 
-            if not results:
-                raise RuntimeError("ModelsAI2.collect returned empty dict")
-
-            # -----------------------------------------
-            # Judge（_meta/_systemを除外して渡す）
-            # -----------------------------------------
-            self.llm_meta["stage"] = "judge"
-            judge_candidates = self._extract_judge_candidates(results)
-            judge = self.judge_ai.run(
-                judge_candidates,
-                user_text=user_text,
-                preferred_length_mode=str(st.session_state.get("reply_length_mode", "auto") or "auto"),
+            return self._finish_turn(
+                messages,
+                user_text,
+                results,
                 priority=priority,
+                memory_context=memory_context,
+                round_id=round_id,
+                target_length=target_length,
             )
-            self.llm_meta["judge"] = judge
 
-            # -----------------------------------------
-            # Composer
-            # -----------------------------------------
-            self.llm_meta["stage"] = "composer"
-            composed = self.composer_ai.compose(self.llm_meta)
-            self.llm_meta["composer"] = composed
+        except Exception as e:
+            return self._handle_fatal(e, round_id)
 
-            final_text = (composed.get("text") or judge.get("chosen_text") or "").strip()
+    # =========================================================
+    # speak_stream（priority 先頭モデルの返答を逐次表示する版）
+    # =========================================================
+    def speak_stream(
+        self,
+        messages: List[Dict[str, str]],
+        user_text: str = "",
+        judge_mode: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        speak() のストリーミング版。st.write_stream にそのまま渡せる。
+
+        - 多AI合議の代わりに priority 先頭の 1 モデルだけをストリーミングで呼ぶ
+        - ストリームが失敗した（何も届かなかった）場合は通常の collect にフォールバック
+        - Judge / Composer / Emotion / Memory はストリーム終了後に speak() と同様に走る
+        - 最終テキスト（Composer 後）は self.last_reply に入る
+        """
+        self.last_reply = ""
+        if not messages:
+            return
 
-            # -----------------------------------------
-            # Emotion analyze（失敗しても会話は継続）
-            # -----------------------------------------
-            self.llm_meta["stage"] = "emotion"
-            try:
-                emotion_res: EmotionResult = self.emotion_ai.analyze(
-                    composer=composed,
-                    memory_context=memory_context,
-                    user_text=user_text,
-                )
-                self.llm_meta["emotion"] = emotion_res.to_dict()
-                EmotionModel(result=emotion_res).sync_relationship_fields()
-            except Exception as e:
-                self.llm_meta["emotion_error"] = str(e)
+        priority, round_id = self._start_round()
+        deadline = Deadline.for_turn("answer_talker")
+        yielded = False
+
+        try:
+            memory_context, emotion_override = self._prepare_context(user_text)
+            target_length, max_tokens = self._plan_length(user_text)
 
             # -----------------------------------------
-            # Memory update（必ず走らせて meta に残す）
+            # Models stream
             # -----------------------------------------
-            self.llm_meta["stage"] = "memory_update"
-            try:
-                if self.memory_ai is None:
-                    self.llm_meta["memory_update"] = {
-                        "status": "skip",
-                        "reason": "memory_ai_not_initialized",
-                        "added": 0,
-                    }
-                else:
-                    try:
-                        mu = self.memory_ai.update_from_turn(
-                            messages=messages,
-                            final_reply=final_text,
-                            round_id=round_id,
-                        )
-                    except TypeError:
-                        mu = self.memory_ai.update_from_turn(
-                            messages,
-                            final_text,
-                            round_id,
-                        )
-
-                    self.llm_meta["memory_update"] = mu if isinstance(mu, dict) else {"status": "ok", "raw": str(mu)}
-            except Exception as e:
-                self.llm_meta["memory_update_error"] = str(e)
+            self.llm_meta["stage"] = "models_stream"
+            reply_length_mode = self.llm_meta.get("reply_length_mode", "auto")
+            stream = self.models_ai.collect_stream(
+                messages,
+                priority=priority,
+                mode_current=judge_mode or "normal",
+                emotion_override=emotion_override,
+                reply_length_mode=reply_length_mode,
+                deadline=deadline,
+                max_tokens=max_tokens,
+            )
+            while True:
+                try:
+                    delta = next(stream)
+                except StopIteration as stop:
+                    results = stop.value or {}
+                    break
+                yielded = True
+                yield delta
+
+            stream_model = (results.get("_meta") or {}).get("stream_model") or ""
+            stream_ok = (results.get(stream_model) or {}).get("status") == "ok"
+
+            if not stream_ok and not yielded:
+                # 何も表示できていない → 通常の多AI収集でやり直す
+                self.llm_meta["stream_fallback"] = {
+                    "stream_model": stream_model,
+                    "error": (results.get(stream_model) or results.get("_system") or {}).get("error"),
+                }
+                self.llm_meta["stage"] = "models_collect"
+                results = self._collect_progressive(
+                    messages,
+                    user_text,
+                    mode_current=judge_mode or "normal",
+                    emotion_override=emotion_override,
+                    reply_length_mode=reply_length_mode,
+                    priority=priority,
+                    deadline=deadline,
+                    target_length=target_length,
+                    max_tokens=max_tokens,
+                )
+            self._record_deadline(deadline)
 
-            self.llm_meta["stage"] = "done"
-            return final_text or "……"
+            final_text = self._finish_turn(
+                messages,
+                user_text,
+                results,
+                priority=priority,
+                memory_context=memory_context,
+                round_id=round_id,
+                target_length=target_length,
+            )
 
         except Exception as e:
-            self.llm_meta["stage"] = "fatal"
-            err = {
-                "error": str(e),
-                "traceback": traceback.format_exc(limit=10),
-                "round_id": round_id,
-                "stage": self.llm_meta.get("stage"),
-            }
-            self.llm_meta.setdefault("errors", []).append(err)
-
-            if LYRA_DEBUG:
-                st.error("AnswerTalker.speak fatal error")
-                st.exception(e)
+            final_text = self._handle_fatal(e, round_id)
 
-            return "……（思考が途切れてしまったみたい）"
+        self.last_reply = final_text
+        if not yielded:
+            yield final_text
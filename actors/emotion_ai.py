@@ -6,6 +6,7 @@ from typing import Any, Dict, List, Optional
 import json
 
 from llm.llm_manager import LLMManager
+from llm.llm_ai.llm_json import JSONOutputError
 from actors.emotion.emotion_modes.context import JudgeSignal, get_default_selectors
 
 
@@ -144,6 +145,47 @@ class LongTermEmotion:
         return lt
 
 
+# ==============================
+# 出力 JSON の schema（LLMManager.call_json 用）
+# ==============================
+
+_UNIT = {"type": "number", "minimum": 0.0, "maximum": 1.0}
+
+SHORT_TERM_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "mode": {"type": "string", "enum": ["normal", "erotic", "debate"]},
+        "affection": _UNIT,
+        "arousal": _UNIT,
+        "tension": _UNIT,
+        "anger": _UNIT,
+        "sadness": _UNIT,
+        "excitement": _UNIT,
+    },
+    "required": ["mode", "affection", "arousal", "tension", "anger", "sadness", "excitement"],
+    "additionalProperties": False,
+}
+
+_RELATION_KEYS = ["affection", "trust", "anger", "fear", "sadness", "jealousy", "attraction"]
+
+LONG_TERM_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "global_mood": {"type": "object", "additionalProperties": _UNIT},
+        "relations": {
+            "type": "object",
+            "additionalProperties": {
+                "type": "object",
+                "properties": {k: _UNIT for k in _RELATION_KEYS},
+                "required": _RELATION_KEYS,
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["global_mood", "relations"],
+}
+
+
 # ==============================
 # EmotionAI 本体
 # ==============================
@@ -239,22 +281,17 @@ JSON 形式は以下です：
         )
 
         try:
-            raw = self.llm_manager.call_model(
-                model_name=self.model_name,
-                messages=messages,
+            # schema に合う dict が返る（合わなければ 1 回だけ直させ、それでもだめなら JSONOutputError）
+            data = self.llm_manager.call_json(
+                self.model_name,
+                messages,
+                SHORT_TERM_SCHEMA,
+                name="emotion_short_term",
                 temperature=0.1,
                 max_completion_tokens=320,  # gpt-5.1 用
+                cache=True,  # 同じ入力なら同じ解析結果で良い（rerun 対策）
             )
-
-            if isinstance(raw, tuple):
-                text = raw[0]
-            else:
-                text = raw
-
-            if not isinstance(text, str):
-                text = "" if text is None else str(text)
-
-            data = json.loads(text)
+            text = json.dumps(data, ensure_ascii=False)
 
             res = EmotionResult(
                 mode=str(data.get("mode", "normal")),
@@ -278,9 +315,10 @@ JSON 形式は以下です：
             return res
 
         except Exception as e:
+            raw = f"\n{e.raw_text}" if isinstance(e, JSONOutputError) and e.raw_text else ""
             err = EmotionResult(
                 mode="normal",
-                raw_text=f"[EmotionAI short-term error] {e}",
+                raw_text=f"[EmotionAI short-term error] {e}{raw}",
             )
             self.last_short_result = err
             return err
@@ -380,22 +418,14 @@ JSON 形式は以下です：
         messages = self._build_long_term_messages(memory_records)
 
         try:
-            raw = self.llm_manager.call_model(
-                model_name=self.model_name,
-                messages=messages,
+            data = self.llm_manager.call_json(
+                self.model_name,
+                messages,
+                LONG_TERM_SCHEMA,
+                name="emotion_long_term",
                 temperature=0.1,
                 max_completion_tokens=512,
             )
-
-            if isinstance(raw, tuple):
-                text = raw[0]
-            else:
-                text = raw
-
-            if not isinstance(text, str):
-                text = "" if text is None else str(text)
-
-            data = json.loads(text)
             parsed = LongTermEmotion.from_dict(data)
 
             merged = LongTermEmotion()
@@ -33,7 +33,17 @@ class JudgeAI3:
         user_text: str = "",
         preferred_length_mode: Optional[str] = None,
         priority: Optional[List[str]] = None,
+        collect_policy: Optional[str] = None,
+        target_length: Optional[int] = None,
     ) -> Dict[str, Any]:
+        """
+        collect_policy: ModelsAI2 がどのポリシーで候補を集めたか（_meta["collect_policy"]）。
+                        "all" 以外では待たなかったモデルが status="pending" / "skipped" で混ざる
+                        （status が ok でないので候補にはならない）。結果と reason にそのまま残す。
+        target_length : 呼ぶ前に preferred_length() で決めた目標の長さ（max_tokens の予算と同じ値）。
+                        None ならここで決める。
+        """
+        policy = str(collect_policy or "all")
         try:
             if not isinstance(models, dict) or not models:
                 return {
@@ -44,13 +54,15 @@ class JudgeAI3:
                     "reason": "models is empty or not a dict",
                     "candidates": [],
                     "judge_version": self.VERSION,
+                    "collect_policy": policy,
                 }
 
             length_mode = (preferred_length_mode or "auto").lower()
             user_len = len(user_text or "")
-            target_len = self._calc_preferred_length(
-                user_len=user_len,
-                length_mode=length_mode,
+            target_len = (
+                int(target_length)
+                if target_length is not None
+                else self._calc_preferred_length(user_len=user_len, length_mode=length_mode)
             )
 
             prio: List[str] = [str(x) for x in (priority or []) if str(x).strip()]
@@ -102,6 +114,7 @@ class JudgeAI3:
                     "reason": "no candidates could be constructed from models",
                     "candidates": [],
                     "judge_version": self.VERSION,
+                    "collect_policy": policy,
                 }
 
             usable: List[Dict[str, Any]] = [
@@ -117,6 +130,7 @@ class JudgeAI3:
                     "reason": "no candidates had status=ok and non-empty text",
                     "candidates": candidates,
                     "judge_version": self.VERSION,
+                    "collect_policy": policy,
                 }
 
             # ------------------------------------------------------
@@ -139,6 +153,7 @@ class JudgeAI3:
 
                     reason = (
                         f"selection={selection_strategy}, "
+                        f"collect_policy={policy}, "
                         f"priority={prio}, "
                         f"preferred_length={target_len}, "
                         f"length_mode={length_mode}, "
@@ -155,6 +170,7 @@ class JudgeAI3:
                         "reason": reason,
                         "candidates": candidates,
                         "judge_version": self.VERSION,
+                        "collect_policy": policy,
                     }
 
             # ------------------------------------------------------
@@ -173,6 +189,7 @@ class JudgeAI3:
 
             reason = (
                 f"selection={selection_strategy}, "
+                f"collect_policy={policy}, "
                 f"priority={prio if prio else 'none'}, "
                 f"preferred_length={target_len}, "
                 f"length_mode={length_mode}, "
@@ -189,6 +206,7 @@ class JudgeAI3:
                 "reason": reason,
                 "candidates": candidates,
                 "judge_version": self.VERSION,
+                "collect_policy": policy,
             }
 
         except Exception as e:
@@ -201,11 +219,76 @@ class JudgeAI3:
                 "reason": "exception_in_judge_run",
                 "candidates": [],
                 "judge_version": self.VERSION,
+                "collect_policy": policy,
             }
 
+    # ==========================================================
+    # 暫定判定（ModelsAI2.collect_iter の途中経過用）
+    # ==========================================================
+    def run_provisional(
+        self,
+        models: Dict[str, Any],
+        user_text: str = "",
+        preferred_length_mode: Optional[str] = None,
+        priority: Optional[List[str]] = None,
+        collect_policy: Optional[str] = None,
+        target_length: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        まだ返っていないモデル（status="pending"）が混ざった途中経過で run() する。
+
+        - provisional   : 残りのモデルが返ると結果が変わりうるなら True
+                          （priority で選べていて、それより上位が全部終わっていれば確定 = False）
+        - pending_models: まだ返っていないモデル
+        """
+        result = self.run(
+            models,
+            user_text=user_text,
+            preferred_length_mode=preferred_length_mode,
+            priority=priority,
+            collect_policy=collect_policy,
+            target_length=target_length,
+        )
+
+        pending = [
+            str(name)
+            for name, info in (models or {}).items()
+            if not str(name).startswith("_")
+            and isinstance(info, dict)
+            and info.get("status") == "pending"
+        ]
+        result["pending_models"] = pending
+        result["provisional"] = bool(pending) and not self._settled(result, priority, pending)
+        return result
+
+    @staticmethod
+    def _settled(result: Dict[str, Any], priority: Optional[List[str]], pending: List[str]) -> bool:
+        """
+        priority_first で選べていて、pending に選ばれたモデルより上位が居なければ確定。
+        （priority に居るモデルが選ばれた = priority_first で選ばれた）
+        """
+        if result.get("status") != "ok":
+            return False
+        prio = [str(x) for x in (priority or []) if str(x).strip()]
+        chosen = str(result.get("chosen_model") or "")
+        if chosen not in prio:
+            return False
+        higher = set(prio[: prio.index(chosen)])
+        return not any(m in higher for m in pending)
+
     # ==========================================================
     # ターゲット長計算
     # ==========================================================
+    def preferred_length(self, user_text: str = "", preferred_length_mode: Optional[str] = None) -> int:
+        """
+        目標の長さ（文字数）を決める。モデルを呼ぶ前に決めて max_tokens の予算にし、
+        同じ値を run(target_length=...) に渡す（乱数で揺れるので 1 ターン 1 回だけ呼ぶ）。
+        """
+        return self._calc_preferred_length(
+            user_len=len(user_text or ""),
+            length_mode=(preferred_length_mode or "auto").lower(),
+        )
+
     def _calc_preferred_length(self, *, user_len: int, length_mode: str) -> int:
         m = (length_mode or "auto").lower()
 
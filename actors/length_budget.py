@@ -0,0 +1,200 @@
+# actors/length_budget.py
+"""
+目標の長さ（文字数）から、モデルごとの max_tokens の予算を決める（AnswerTalker / NarratorManager から利用）。
+
+- JudgeAI3.preferred_length() で呼ぶ前に決めた目標の長さを、モデルごとの「1 トークンあたりの文字数」で
+  トークン数に直し、余裕（LYRA_LENGTH_BUDGET_HEADROOM 倍）を足して ModelsAI2.collect(max_tokens=...) に渡す
+  （short のターンで 900 トークン書かせて捨てる、をやめる）
+- 1 トークンあたりの文字数は、実際の応答（本文の文字数 / usage.completion_tokens）から
+  モデルごとに学習する（指数移動平均。ModelsAI2 が成功した呼び出しごとに observe する）
+    reasoning トークンを completion_tokens に含めるモデルは、そのぶん文字数 / トークンが小さく出るので
+    予算も自然に大きくなる
+- まだ観測が無いモデルは LYRA_LENGTH_BUDGET_CHARS_PER_TOKEN（既定 1.0。日本語のおおよその値）
+- 予算は 64 トークン単位に切り上げる（目標の長さの乱数で毎ターン値が変わり、応答キャッシュが外れるのを防ぐ）
+- 予算を付けた呼び出しは length 打ち切りの continuation（LYRA_LLM_CONTINUATIONS）をしない
+  （ModelsAI2 が continuations=0 を渡す。続きを取ると予算を超えて書かせ、往復の分だけ遅くなる）
+- 学習した値は JSON に保存する（再起動をまたいで使う。呼び出しごとには書かず、まとめて保存する）
+
+設定（環境変数）:
+  LYRA_LENGTH_BUDGET                  : "0" で無効（max_tokens を渡さない = 従来通り TARGET_TOKENS / verbosity）
+  LYRA_LENGTH_BUDGET_PATH             : 保存先 JSON（既定 .lyra_cache/length_budget.json。空文字ならメモリのみ）
+  LYRA_LENGTH_BUDGET_HEADROOM         : 目標に対する余裕の倍率（既定 1.6）
+  LYRA_LENGTH_BUDGET_MIN_TOKENS       : 予算の下限（既定 128）
+  LYRA_LENGTH_BUDGET_MAX_TOKENS       : 予算の上限（既定 2048）
+  LYRA_LENGTH_BUDGET_CHARS_PER_TOKEN  : 観測が無いモデルの 1 トークンあたりの文字数（既定 1.0）
+  LYRA_LENGTH_BUDGET_SAVE_EVERY       : この回数の observe ごとに保存（既定 20）
+  LYRA_LENGTH_BUDGET_SAVE_SEC         : 前回の保存からこの秒数が過ぎていたら回数に関係なく保存（既定 30）
+                                        終了時（atexit）にも未保存の分を書く
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import logging
+import math
+import os
+import threading
+import time
+
+from llm.llm_ai.llm_json_store import JsonStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(".lyra_cache", "length_budget.json")
+
+# 指数移動平均の重み（新しい観測）
+_ALPHA = 0.2
+# これより短い応答は比率がぶれるので学習に使わない
+_MIN_OBSERVED_TOKENS = 16
+# 予算の刻み（トークン）
+_QUANTUM = 64
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, "") or default)
+    except ValueError:
+        return default
+
+
+def length_budget_enabled() -> bool:
+    return os.getenv("LYRA_LENGTH_BUDGET", "1").strip().lower() not in ("0", "false", "off")
+
+
+class LengthBudget:
+    """
+    model -> {"chars_per_token", "n", "updated_at"}。スレッドセーフ。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        save_every: Optional[int] = None,
+        save_interval_sec: Optional[float] = None,
+    ) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+
+        # observe はモデル呼び出しごとに来るので、保存はまとめて行う
+        self._store = JsonStore(
+            path,
+            lock=self._lock,
+            dump=lambda: self._rows,
+            label="LengthBudget",
+            save_every=save_every,
+            save_interval_sec=save_interval_sec,
+            env_prefix="LYRA_LENGTH_BUDGET",
+            default_every=20,
+            default_interval_sec=30.0,
+        )
+
+    # ------------------------------------------------------------
+    # 永続化
+    # ------------------------------------------------------------
+    def _ensure_loaded(self) -> None:
+        # ロックを持った状態で呼ぶ
+        if self._loaded:
+            return
+        self._loaded = True
+        data = self._store.load()
+        try:
+            for model_name, row in (data or {}).items():
+                if isinstance(row, dict) and float(row.get("chars_per_token") or 0) > 0:
+                    self._rows[str(model_name)] = dict(row)
+        except Exception:
+            logger.exception("LengthBudget: load failed (ignored): %s", self.path)
+
+    def flush(self) -> None:
+        """
+        未保存の学習結果があれば保存する（終了時など）。
+        """
+        self._store.flush()
+
+    # ------------------------------------------------------------
+    # 学習
+    # ------------------------------------------------------------
+    def observe(self, model_name: str, text: str, usage: Any) -> None:
+        """
+        成功した応答 1 件から 1 トークンあたりの文字数を学習する。
+        usage に completion_tokens が無い / 短すぎる / 相乗り（coalesced）の応答は数えない。
+        """
+        if not isinstance(usage, dict) or usage.get("coalesced"):
+            return
+        tokens = int(usage.get("completion_tokens") or 0)
+        chars = len((text or "").strip())
+        if tokens < _MIN_OBSERVED_TOKENS or chars <= 0:
+            return
+
+        ratio = chars / tokens
+        with self._lock:
+            self._ensure_loaded()
+            row = self._rows.get(model_name)
+            if row is None:
+                row = self._rows[model_name] = {"chars_per_token": ratio, "n": 0}
+            else:
+                row["chars_per_token"] = (1.0 - _ALPHA) * float(row["chars_per_token"]) + _ALPHA * ratio
+            row["n"] = int(row.get("n") or 0) + 1
+            row["updated_at"] = time.time()
+            snap = self._store.changed()
+        self._store.save(snap)
+
+    # ------------------------------------------------------------
+    # 予算
+    # ------------------------------------------------------------
+    def chars_per_token(self, model_name: str) -> float:
+        with self._lock:
+            self._ensure_loaded()
+            row = self._rows.get(model_name)
+        if row is None:
+            return max(0.1, _env_float("LYRA_LENGTH_BUDGET_CHARS_PER_TOKEN", 1.0))
+        return max(0.1, float(row["chars_per_token"]))
+
+    def max_tokens(self, model_name: str, target_chars: int) -> int:
+        """
+        目標 target_chars 文字を書き切れるトークン数（余裕込み・64 単位に切り上げ・上下限あり）。
+        """
+        headroom = _env_float("LYRA_LENGTH_BUDGET_HEADROOM", 1.6)
+        lo = int(_env_float("LYRA_LENGTH_BUDGET_MIN_TOKENS", 128))
+        hi = int(_env_float("LYRA_LENGTH_BUDGET_MAX_TOKENS", 2048))
+
+        tokens = max(0, int(target_chars)) * headroom / self.chars_per_token(model_name)
+        tokens = int(math.ceil(tokens / _QUANTUM)) * _QUANTUM
+        return max(lo, min(hi, tokens))
+
+    def budgets(self, target_chars: int, models: List[str]) -> Dict[str, int]:
+        """
+        models それぞれの max_tokens（ModelsAI2.collect(max_tokens=...) にそのまま渡せる形）。
+        """
+        return {str(m): self.max_tokens(str(m), target_chars) for m in models}
+
+    # ------------------------------------------------------------
+    # 表示
+    # ------------------------------------------------------------
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_loaded()
+            return [
+                {
+                    "model": model_name,
+                    "chars_per_token": round(float(row["chars_per_token"]), 3),
+                    "n": int(row.get("n") or 0),
+                }
+                for model_name, row in sorted(self._rows.items())
+            ]
+
+
+# ============================================================
+# プロセス共有
+# ============================================================
+_LOCK = threading.Lock()
+_BUDGET: Optional[LengthBudget] = None
+
+
+def get_length_budget() -> LengthBudget:
+    global _BUDGET
+    with _LOCK:
+        if _BUDGET is None:
+            _BUDGET = LengthBudget(path=os.getenv("LYRA_LENGTH_BUDGET_PATH", DEFAULT_PATH))
+        return _BUDGET
@@ -2,12 +2,28 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional
 
+from llm.llm_ai.llm_json import JSONOutputError
 from llm.llm_manager import LLMManager
 
 
-ChatReturn = Union[str, Dict[str, Any], Tuple[Any, ...]]
+# LLMManager.call_json に渡す出力 schema
+IMPORTANCE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "importance": {"type": "integer", "minimum": 1, "maximum": 4},
+        "summary": {"type": "string"},
+        "tags": {
+            "type": "array",
+            "items": {"type": "string"},
+            "minItems": 1,
+            "maxItems": 5,
+        },
+    },
+    "required": ["importance", "summary", "tags"],
+    "additionalProperties": False,
+}
 
 
 class MemoryImportanceClassifier:
@@ -73,17 +89,20 @@ class MemoryImportanceClassifier:
         user_prompt = self._build_prompt(messages, final_reply, event_keywords_hit or [])
 
         try:
-            completion: ChatReturn = self._llm.chat(
-                model=model,
-                messages=[
+            # schema 検証済みの dict（合わなければ 1 回だけ直させ、それでもだめなら JSONOutputError）
+            parsed = self._llm.call_json(
+                model,
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
                 ],
+                IMPORTANCE_SCHEMA,
+                name="memory_importance",
                 temperature=0.2,
                 max_tokens=220,
+                cache=True,
             )
-            raw_text = self._normalize_text(completion)
-            parsed = self._safe_parse_json(raw_text)
+            raw_text = json.dumps(parsed, ensure_ascii=False)
 
             importance = self._clamp_importance(parsed.get("importance"))
             summary = str(parsed.get("summary") or "").strip()
@@ -112,7 +131,7 @@ class MemoryImportanceClassifier:
                 "summary": self._fallback_summary(messages, final_reply),
                 "tags": self._fallback_tags(event_keywords_hit or []),
                 "model": model,
-                "raw_text": "",
+                "raw_text": e.raw_text if isinstance(e, JSONOutputError) else "",
                 "error": str(e),
             }
 
@@ -149,32 +168,6 @@ class MemoryImportanceClassifier:
         # どうしても見つからない場合は preferred_model を返す（呼び出し側で例外→フォールバックされる）
         return self.preferred_model
 
-    @staticmethod
-    def _normalize_text(completion: ChatReturn) -> str:
-        if isinstance(completion, dict):
-            return str(completion.get("text") or completion.get("content") or completion.get("message") or "")
-        if isinstance(completion, (tuple, list)):
-            return "" if not completion else str(completion[0] or "")
-        return "" if completion is None else str(completion)
-
-    @staticmethod
-    def _safe_parse_json(text: str) -> Dict[str, Any]:
-        s = (text or "").strip()
-        if not s:
-            return {}
-
-        # 余計な前後テキストが混ざった場合、最初の { から最後の } までを切る
-        if "{" in s and "}" in s:
-            s2 = s[s.find("{") : s.rfind("}") + 1]
-        else:
-            s2 = s
-
-        try:
-            obj = json.loads(s2)
-            return obj if isinstance(obj, dict) else {}
-        except Exception:
-            return {}
-
     @staticmethod
     def _clamp_importance(v: Any) -> int:
         try:
@@ -1,12 +1,21 @@
 # actors/memory/world_change_reason_classifier.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional
 
+from llm.llm_ai.llm_json import JSONOutputError
 from llm.llm_manager import LLMManager
 
 
-ChatReturn = Union[str, Dict[str, Any], Tuple[Any, ...]]
+REASONS = ["interpersonal_complexity", "external_event"]
+
+# LLMManager.call_json に渡す出力 schema
+REASON_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {"reason": {"type": "string", "enum": REASONS}},
+    "required": ["reason"],
+    "additionalProperties": False,
+}
 
 
 class WorldChangeReasonClassifier:
@@ -39,33 +48,32 @@ class WorldChangeReasonClassifier:
 
         system_prompt = (
             "You are a strict classifier.\n"
-            "Return ONLY one of the following strings:\n"
+            'Return ONLY a JSON object: {"reason": "<label>"}\n'
+            "where <label> is one of:\n"
             "- interpersonal_complexity\n"
             "- external_event\n"
         )
 
         user_prompt = self._build_prompt(messages, final_reply)
 
-        completion: ChatReturn = self._llm.chat(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.0,
-            max_tokens=16,
-        )
-
-        text = self._normalize_text(completion)
-        s = (text or "").strip().lower()
-
-        if "interpersonal" in s:
-            return "interpersonal_complexity"
-        if "external" in s:
+        try:
+            data = self._llm.call_json(
+                model,
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                REASON_SCHEMA,
+                name="world_change_reason",
+                temperature=0.0,
+                max_tokens=32,
+                cache=True,
+            )
+        except JSONOutputError:
+            # 判定不能時の安全側フォールバック
             return "external_event"
 
-        # 判定不能時の安全側フォールバック
-        return "external_event"
+        return str(data["reason"])
 
     def _pick_model(self) -> str:
         props = self._llm.get_available_models() or {}
@@ -82,14 +90,6 @@ class WorldChangeReasonClassifier:
                 return m
         return self.preferred_model
 
-    @staticmethod
-    def _normalize_text(completion: ChatReturn) -> str:
-        if isinstance(completion, dict):
-            return str(completion.get("text") or completion.get("content") or "")
-        if isinstance(completion, (tuple, list)):
-            return "" if not completion else str(completion[0] or "")
-        return "" if completion is None else str(completion)
-
     @staticmethod
     def _build_prompt(
         messages: List[Dict[str, str]],
@@ -0,0 +1,319 @@
+# actors/model_win_stats.py
+"""
+モデル別の勝率（JudgeAI3 に採用された回数 / 呼んだ回数）の記録と、勝率による間引き（AnswerTalker / ModelsAI2 から利用）。
+
+- (persona, reply_length_mode, model) ごとに
+    called（Judge の候補になった回数）/ chosen（採用された回数）/ ok / レイテンシ / トークン / 推定コスト
+  を数え、JSON に保存する（セッション・再起動をまたいで貯まる）
+- pending（priority_first / quorum で待たなかった）と hedged_out（hedge で相手が先に返った）は
+  Judge に比べられていないので勝率の分母（called）に入れない。unjudged に数え、トークン / コストだけ足す
+  （入れると待たれなかっただけのモデルの勝率が下がり続け、Adaptive に間引かれる）
+- AI Manager の select_mode="Adaptive" のとき、ModelsAI2 が呼ぶ前に select() で間引く
+    勝率（(chosen + 1) / (called + 2)）が LYRA_ADAPTIVE_MIN_WIN_RATE 未満で、
+    呼んだ回数が LYRA_ADAPTIVE_MIN_CALLS 以上のモデルは外す
+    ただし LYRA_ADAPTIVE_EXPLORE の確率で呼ぶ（探索。外しっぱなしだと勝率が更新されない）
+    いちばん勝率の高いモデル（同率なら priority 順）は必ず残す
+- 記録は select_mode に関係なく毎ターン行う（Manual のうちに貯めておける）
+- n>1 のサンプル（"model#1" など。sample_of=model）は元のモデルの 1 回として数える
+  （サンプルが採用されたらそのモデルの勝ち。トークン / コストは元のモデルに足す）
+
+設定（環境変数）:
+  LYRA_MODEL_WIN_STATS_PATH   : 保存先 JSON（既定 .lyra_cache/model_win_stats.json。空文字ならメモリのみ）
+  LYRA_MODEL_WIN_STATS_SAVE_EVERY : この回数のターンごとに保存（既定 10。返答の経路で毎ターン書かない）
+  LYRA_MODEL_WIN_STATS_SAVE_SEC   : 前回の保存からこの秒数が過ぎていたら回数に関係なく保存（既定 30）
+                                    終了時（atexit）にも未保存の分を書く
+  LYRA_ADAPTIVE_MIN_CALLS     : これ未満しか呼んでいないモデルは間引かない（既定 10）
+  LYRA_ADAPTIVE_MIN_WIN_RATE  : これ未満の勝率のモデルを間引く（既定 0.1）
+  LYRA_ADAPTIVE_EXPLORE       : 間引き対象をそれでも呼ぶ確率（既定 0.1）
+  LYRA_MODEL_PRICES           : 推定コスト用の単価（JSON。USD / 1M トークン）
+                                例) {"gpt51": {"prompt": 1.25, "completion": 10.0}}
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from llm.llm_ai.llm_json_store import JsonStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(".lyra_cache", "model_win_stats.json")
+
+# 勝率の分母（called）に数える status（Judge の候補として比べられた / 失敗した）
+_CALLED_STATUSES = frozenset({"ok", "error", "timeout"})
+# 呼んではいる（費用はかかる）が Judge に比べられていない status。unjudged とコストだけ数える
+_UNJUDGED_STATUSES = frozenset({"pending", "hedged_out"})
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, "") or default)
+    except ValueError:
+        return default
+
+
+def _load_prices() -> Dict[str, Dict[str, float]]:
+    raw = os.getenv("LYRA_MODEL_PRICES", "").strip()
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+        return {
+            str(model): {k: float(v) for k, v in price.items() if k in ("prompt", "completion")}
+            for model, price in data.items()
+            if isinstance(price, dict)
+        }
+    except Exception:
+        logger.exception("LYRA_MODEL_PRICES parse failed (ignored)")
+        return {}
+
+
+def _new_row() -> Dict[str, Any]:
+    return {
+        "called": 0,
+        "chosen": 0,
+        "unjudged": 0,
+        "ok": 0,
+        "latency_sum_sec": 0.0,
+        "latency_n": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cost_usd": 0.0,
+        "updated_at": 0.0,
+    }
+
+
+class ModelWinStats:
+    """
+    persona -> reply_length_mode -> model -> 集計行。スレッドセーフ。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        save_every: Optional[int] = None,
+        save_interval_sec: Optional[float] = None,
+    ) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._rows: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        self._loaded = False
+        self._prices = _load_prices()
+
+        # 保存はまとめて行う（record_turn は返答の経路なので毎回ディスクに書かない）
+        self._store = JsonStore(
+            path,
+            lock=self._lock,
+            dump=lambda: self._rows,
+            label="ModelWinStats",
+            save_every=save_every,
+            save_interval_sec=save_interval_sec,
+            env_prefix="LYRA_MODEL_WIN_STATS",
+            default_every=10,
+            default_interval_sec=30.0,
+        )
+
+    # ------------------------------------------------------------
+    # 永続化
+    # ------------------------------------------------------------
+    def _ensure_loaded(self) -> None:
+        # ロックを持った状態で呼ぶ
+        if self._loaded:
+            return
+        self._loaded = True
+        data = self._store.load()
+        try:
+            for persona_id, by_mode in (data or {}).items():
+                for length_mode, by_model in (by_mode or {}).items():
+                    for model_name, row in (by_model or {}).items():
+                        if isinstance(row, dict):
+                            self._row(persona_id, length_mode, model_name).update(row)
+        except Exception:
+            logger.exception("ModelWinStats: load failed (ignored): %s", self.path)
+
+    def flush(self) -> None:
+        """
+        未保存の集計があれば保存する（終了時 / 表示前など）。
+        """
+        self._store.flush()
+
+    def _row(self, persona_id: str, length_mode: str, model_name: str) -> Dict[str, Any]:
+        # ロックを持った状態で呼ぶ
+        by_model = self._rows.setdefault(persona_id, {}).setdefault(length_mode, {})
+        row = by_model.get(model_name)
+        if row is None:
+            row = by_model[model_name] = _new_row()
+        return row
+
+    # ------------------------------------------------------------
+    # 記録
+    # ------------------------------------------------------------
+    def _cost(self, model_name: str, usage: Dict[str, Any]) -> float:
+        price = self._prices.get(model_name)
+        if not price:
+            return 0.0
+        return (
+            int(usage.get("prompt_tokens") or 0) * price.get("prompt", 0.0)
+            + int(usage.get("completion_tokens") or 0) * price.get("completion", 0.0)
+        ) / 1_000_000
+
+    def record_turn(
+        self,
+        persona_id: str,
+        length_mode: str,
+        results: Dict[str, Any],
+        chosen_model: str,
+    ) -> None:
+        """
+        ModelsAI2.collect の結果と JudgeAI3 が採用したモデルを 1 ターン分として数える。
+        """
+        now = time.time()
+        chosen_info = (results or {}).get(chosen_model)
+        if isinstance(chosen_info, dict) and chosen_info.get("sample_of"):
+            chosen_model = str(chosen_info["sample_of"])
+
+        with self._lock:
+            self._ensure_loaded()
+            for model_name, info in (results or {}).items():
+                if str(model_name).startswith("_") or not isinstance(info, dict):
+                    continue
+                status = str(info.get("status") or "")
+                if status not in _CALLED_STATUSES and status not in _UNJUDGED_STATUSES:
+                    continue
+
+                sample_of = info.get("sample_of")
+                row = self._row(persona_id, length_mode, str(sample_of or model_name))
+                if not sample_of and status in _UNJUDGED_STATUSES:
+                    row["unjudged"] += 1
+                elif not sample_of:
+                    row["called"] += 1
+                    row["chosen"] += int(model_name == chosen_model)
+                    row["ok"] += int(status == "ok")
+                    if info.get("elapsed_sec") is not None:
+                        row["latency_sum_sec"] += float(info["elapsed_sec"])
+                        row["latency_n"] += 1
+                usage = info.get("usage")
+                if isinstance(usage, dict):
+                    row["prompt_tokens"] += int(usage.get("prompt_tokens") or 0)
+                    row["completion_tokens"] += int(usage.get("completion_tokens") or 0)
+                    row["cost_usd"] += self._cost(str(sample_of or model_name), usage)
+                row["updated_at"] = now
+            snap = self._store.changed()
+        self._store.save(snap)
+
+    # ------------------------------------------------------------
+    # 参照 / 間引き
+    # ------------------------------------------------------------
+    @staticmethod
+    def _win_rate(row: Dict[str, Any]) -> float:
+        # 呼んだ回数が少ないうちは 0.5 寄り（ラプラス平滑化）
+        return (int(row.get("chosen") or 0) + 1) / (int(row.get("called") or 0) + 2)
+
+    def win_rate(self, persona_id: str, length_mode: str, model_name: str) -> float:
+        with self._lock:
+            self._ensure_loaded()
+            row = (self._rows.get(persona_id) or {}).get(length_mode, {}).get(model_name) or _new_row()
+            return self._win_rate(row)
+
+    def select(
+        self,
+        persona_id: str,
+        length_mode: str,
+        models: List[str],
+        *,
+        priority: Optional[List[str]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        models から今回呼ぶモデルを選ぶ（並びは models のまま）。(呼ぶモデル, 判断の記録)。
+        """
+        min_calls = int(_env_float("LYRA_ADAPTIVE_MIN_CALLS", 10))
+        min_rate = _env_float("LYRA_ADAPTIVE_MIN_WIN_RATE", 0.1)
+        explore = _env_float("LYRA_ADAPTIVE_EXPLORE", 0.1)
+        rng = rng or random
+
+        with self._lock:
+            self._ensure_loaded()
+            by_model = (self._rows.get(persona_id) or {}).get(length_mode, {})
+            rows = {m: dict(by_model.get(m) or _new_row()) for m in models}
+
+        rates = {m: self._win_rate(r) for m, r in rows.items()}
+        prio = [str(x) for x in (priority or []) if str(x) in rows]
+        order = prio + [m for m in models if m not in prio]
+        best = max(order, key=lambda m: rates[m]) if order else ""
+
+        kept: List[str] = []
+        dropped: List[str] = []
+        explored: List[str] = []
+        for m in models:
+            if m == best or int(rows[m]["called"]) < min_calls or rates[m] >= min_rate:
+                kept.append(m)
+            elif rng.random() < explore:
+                kept.append(m)
+                explored.append(m)
+            else:
+                dropped.append(m)
+
+        return kept, {
+            "persona_id": persona_id,
+            "length_mode": length_mode,
+            "win_rates": {m: round(r, 3) for m, r in rates.items()},
+            "dropped": dropped,
+            "explored": explored,
+            "min_calls": min_calls,
+            "min_win_rate": min_rate,
+            "explore_rate": explore,
+        }
+
+    # ------------------------------------------------------------
+    # 表示
+    # ------------------------------------------------------------
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        1 行 = (persona, reply_length_mode, model)。表示用に勝率と平均レイテンシを足す。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            out: List[Dict[str, Any]] = []
+            for persona_id, by_mode in sorted(self._rows.items()):
+                for length_mode, by_model in sorted(by_mode.items()):
+                    for model_name, row in sorted(by_model.items()):
+                        n = int(row.get("latency_n") or 0)
+                        out.append(
+                            {
+                                "persona": persona_id,
+                                "reply_length_mode": length_mode,
+                                "model": model_name,
+                                "called": row["called"],
+                                "chosen": row["chosen"],
+                                "unjudged": row["unjudged"],
+                                "win_rate": round(self._win_rate(row), 3),
+                                "ok": row["ok"],
+                                "avg_latency_sec": round(row["latency_sum_sec"] / n, 3) if n else None,
+                                "prompt_tokens": row["prompt_tokens"],
+                                "completion_tokens": row["completion_tokens"],
+                                "cost_usd": round(row["cost_usd"], 6),
+                            }
+                        )
+            return out
+
+
+# ============================================================
+# プロセス共有
+# ============================================================
+_LOCK = threading.Lock()
+_STATS: Optional[ModelWinStats] = None
+
+
+def get_model_win_stats() -> ModelWinStats:
+    global _STATS
+    with _LOCK:
+        if _STATS is None:
+            _STATS = ModelWinStats(path=os.getenv("LYRA_MODEL_WIN_STATS_PATH", DEFAULT_PATH))
+        return _STATS
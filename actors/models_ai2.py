@@ -1,14 +1,24 @@
 # actors/models_ai2.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import os
+import time
 import traceback
 
+from actors.length_budget import get_length_budget
+from actors.model_win_stats import get_model_win_stats
+from llm.llm_ai.llm_deadline import Deadline
+from llm.llm_ai.llm_errors import HedgeFailedError
 from llm.llm_manager import LLMManager
 
 
 CompletionType = Union[Dict[str, Any], Tuple[Any, ...], str]
 
+# 収集ポリシー（どこまで待ってから返すか）
+COLLECT_POLICIES = ("all", "priority_first", "quorum")
+
 
 class ModelsAI2:
     """
@@ -18,18 +28,105 @@ class ModelsAI2:
     - AI Manager の enabled を必ず尊重して「呼ぶモデル」を決める
     - has_key（APIキー有無）が取れる場合も尊重
     - _meta に resolved 情報を必ず残す
+
+    収集モード:
+    - parallel=True（既定）: 全ターゲットモデルをスレッドプールで同時に呼ぶ。
+      モデルごとの timeout を過ぎたものは status="timeout" として結果に残し、
+      間に合ったものだけで返す（遅いモデルにターン全体を引きずられない）。
+    - parallel=False: 従来通り for ループで順番に呼ぶ。
+      ターゲットが 1 モデルだけのときもこちら。どちらでもモデルごとの timeout は効く
+      （1 ワーカーの executor を使い回して 1 モデルずつ wait し、締切を過ぎたら status="timeout"）。
+    - hedge=True かつ collect(priority=...) 指定時: priority 先頭のモデルだけを呼び、
+      それが直近 p90 までに返らなければ次のモデル（backup）にも同じ prompt を投げ、
+      先に返った方だけを結果に残す（JudgeAI3 の priority_first に合わせたモード）。
+      負けた側は status="hedged_out"、競争の前に失敗していた側は status="error" になる。
+      env LYRA_HEDGE=1 で既定オン。
+
+    収集ポリシー（policy。env LYRA_COLLECT_POLICY、既定 "all"）:
+    - "all"            : 全モデルを待つ（従来通り）
+    - "priority_first" : priority の上位から見て、先頭の「まだ終わっていない / 成功した」モデルが
+      成功した時点で返す（JudgeAI3 の priority_first が選ぶ答えが確定した時点）。
+      priority の全モデルが失敗したら残りを待つ（Judge が長さで選ぶため）
+    - "quorum"         : k 個（quorum_k / "quorum:k"。env LYRA_COLLECT_QUORUM、既定 2）成功した時点で返す
+    待たなかったモデルは status="pending" のまま結果に残す。裏で走り終えた結果は
+    results["_late"][model] に入る（background=True。デバッグビュー用。"_" 始まりのキーなので
+    Judge の候補にも勝率の記録にも入らず、pending の枠は書き換えない）。
+    順番に呼ぶモードでは、条件を満たした時点で残りを呼ばない（status="skipped"）。
+    どのポリシーで集めたかは _meta["collect_policy"] に残る。
+
+    collect_iter() は同じ収集を、モデルが 1 つ返るたびに yield するジェネレータ版
+    （返ってきた順に画面を埋める / JudgeAI3.run_provisional で暫定の採用候補を出す用）。
+    collect() は collect_iter() を最後まで回したもの。
+
+    adaptive=(persona_id, reply_length_mode) を渡すと、model_win_stats の勝率が低いモデルを
+    呼ぶ前に間引く（探索率ぶんは呼ぶ）。判断は _meta["adaptive"] に残る。
+
+    max_tokens={model: n}（length_budget が目標の長さから決めた予算）を渡すと、そのモデルの
+    max_tokens として送る（Persona defaults の max_tokens より優先、call_options よりは後）。
+    成功した応答の文字数 / completion_tokens は length_budget に学習させる。
+
+    複数サンプル（samples={model: n}。env LYRA_MODEL_SAMPLES="gpt52:3,gemini:2"）:
+    そのモデルには n を付けて 1 リクエストで n 件書かせる（OpenAI n / Gemini candidateCount。
+    対応しない Adapter / モデルでは 1 件のまま）。届いた 2 件目以降は "model#1", "model#2", ... として
+    結果に足し（sample_of=model）、Judge の候補を増やす。usage は全サンプルで按分する
+    （prompt は均等、completion は文字数比）。1 件目は元のモデル名のまま（priority / 勝率はモデル単位）。
+
+    deadline（ターンの締切）を渡すと、各モデルの待ち時間は min(モデルの timeout, 残り予算) になり、
+    同じ Deadline が LLMAI → Adapter まで渡って 1 リクエストの timeout にも効く。
+    予算切れで待つのをやめたモデルは Deadline に "models_collect:<model>" として記録する。
     """
 
+    # モデルごとの既定タイムアウト（秒）。env LYRA_MODEL_TIMEOUT_SEC で上書き可。
+    DEFAULT_TIMEOUT_SEC: float = float(os.getenv("LYRA_MODEL_TIMEOUT_SEC", "45") or 45)
+
     def __init__(
         self,
         llm_manager: LLMManager,
         *,
         enabled_models: Optional[List[str]] = None,
         persona: Any = None,
+        parallel: bool = True,
+        timeout_sec: Optional[float] = None,
+        model_timeouts: Optional[Dict[str, float]] = None,
+        hedge: Optional[bool] = None,
+        policy: Optional[str] = None,
+        quorum_k: Optional[int] = None,
+        samples: Optional[Dict[str, int]] = None,
     ) -> None:
         self.llm_manager = llm_manager
         self.persona = persona
 
+        # モデルごとの 1 リクエストあたりのサンプル数（None なら env に従う）
+        self.samples: Dict[str, int] = (
+            {str(k): int(v) for k, v in samples.items() if v is not None}
+            if samples is not None
+            else self._parse_samples(os.getenv("LYRA_MODEL_SAMPLES", ""))
+        )
+
+        # 収集ポリシー（None なら env に従う）
+        self.policy, parsed_k = self._parse_policy(
+            policy if policy is not None else os.getenv("LYRA_COLLECT_POLICY", "all")
+        )
+        self.quorum_k: int = int(
+            quorum_k
+            if quorum_k is not None
+            else parsed_k or int(os.getenv("LYRA_COLLECT_QUORUM", "2") or 2)
+        )
+
+        # ヘッジモード（None なら env に従う）
+        self.hedge: bool = (
+            bool(hedge) if hedge is not None else os.getenv("LYRA_HEDGE", "0") == "1"
+        )
+
+        # 並列収集の設定
+        self.parallel = bool(parallel)
+        self.timeout_sec: float = (
+            float(timeout_sec) if timeout_sec is not None else self.DEFAULT_TIMEOUT_SEC
+        )
+        self._model_timeouts: Dict[str, float] = {
+            str(k): float(v) for k, v in (model_timeouts or {}).items() if v is not None
+        }
+
         # enabled_models を「固定したい場合のみ」保持
         # None の場合は collect() の度に最新の available_models を見て追従する
         self._enabled_models_override: Optional[List[str]] = (
@@ -109,18 +206,129 @@ class ModelsAI2:
     # ---------------------------------------
     # 内部ヘルパ：None 値は落とす（安全）
     # ---------------------------------------
+    @staticmethod
+    def _parse_samples(raw: str) -> Dict[str, int]:
+        """
+        "gpt52:3,gemini:2" を {"gpt52": 3, "gemini": 2} にする（読めない項目は無視）。
+        """
+        out: Dict[str, int] = {}
+        for item in str(raw or "").split(","):
+            name, _, n = item.strip().partition(":")
+            try:
+                if name and int(n) > 1:
+                    out[name] = int(n)
+            except ValueError:
+                continue
+        return out
+
     @staticmethod
     def _drop_none_kwargs(d: Dict[str, Any]) -> Dict[str, Any]:
         return {k: v for k, v in (d or {}).items() if v is not None}
 
     # ---------------------------------------
-    # 内部ヘルパ：今回「呼ぶモデル」を解決（enabled/has_key尊重）
+    # 内部ヘルパ：モデルごとの呼び出しオプション
+    # ---------------------------------------
+    def _build_call_kwargs(
+        self,
+        model_name: str,
+        call_options: Optional[Dict[str, Any]],
+        max_tokens: Optional[Dict[str, int]],
+    ) -> Dict[str, Any]:
+        """
+        優先順: call_options > max_tokens（長さの予算）/ n（サンプル数）> Persona defaults。
+
+        予算を付けた呼び出しは continuations=0（length 打ち切りの続きを取りに行かない）。
+        続きを取ると予算を超えて書かせることになり、全文のプロンプトを送り直す往復の分だけ遅くなる。
+        """
+        persona_defaults = self._get_persona_call_defaults(model_name)
+        budget: Dict[str, Any] = {}
+        if max_tokens and max_tokens.get(model_name) is not None:
+            # Persona 側の上限は予算で置き換える（max_completion_tokens が残ると OpenAI ではそちらが勝つ）
+            persona_defaults.pop("max_tokens", None)
+            persona_defaults.pop("max_completion_tokens", None)
+            budget["max_tokens"] = int(max_tokens[model_name])
+            budget["continuations"] = 0
+        if self.samples.get(model_name, 1) > 1:
+            budget["n"] = int(self.samples[model_name])
+        return self._drop_none_kwargs({**persona_defaults, **budget, **(call_options or {})})
+
+    # ---------------------------------------
+    # 内部ヘルパ：n>1 のサンプルを候補に展開
     # ---------------------------------------
+    @staticmethod
+    def _split_usage(usage: Dict[str, Any], texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        全サンプル合計の usage を 1 件ずつに按分する（prompt 系は均等、completion は文字数比）。
+        """
+        n = len(texts)
+        chars = [len(t) for t in texts]
+        total = sum(chars)
+        weights = [c / total for c in chars] if total else [1.0 / n] * n
+
+        shares: List[Dict[str, Any]] = []
+        for i in range(n):
+            share = {k: v for k, v in usage.items() if k != "samples"}
+            for key in ("prompt_tokens", "cached_tokens"):
+                if isinstance(usage.get(key), (int, float)):
+                    share[key] = int(usage[key]) // n + (int(usage[key]) % n if i == 0 else 0)
+            if isinstance(usage.get("completion_tokens"), (int, float)):
+                share["completion_tokens"] = int(round(int(usage["completion_tokens"]) * weights[i]))
+            if "total_tokens" in usage:
+                share["total_tokens"] = int(share.get("prompt_tokens") or 0) + int(
+                    share.get("completion_tokens") or 0
+                )
+            share["sample_index"] = i
+            share["samples_n"] = n
+            shares.append(share)
+        return shares
+
+    def _expand_samples(self, results: Dict[str, Any], model_name: str) -> List[str]:
+        """
+        results[model_name] の usage["samples"]（n>1 で届いた全サンプル）を
+        "model#1", "model#2", ... の結果として results に足す。足した名前を返す。
+        """
+        result = results.get(model_name)
+        if not isinstance(result, dict) or result.get("status") != "ok":
+            return []
+        usage = result.get("usage")
+        texts = usage.get("samples") if isinstance(usage, dict) else None
+        if not isinstance(texts, list) or len(texts) < 2:
+            return []
+
+        texts = [str(t or "") for t in texts]
+        shares = self._split_usage(usage, texts)
+        result["usage"] = shares[0]
+        result["samples_n"] = len(texts)
+
+        added: List[str] = []
+        for i in range(1, len(texts)):
+            name = f"{model_name}#{i}"
+            results[name] = {
+                **result,
+                "text": texts[i],
+                "raw": None,
+                "usage": shares[i],
+                "sample_of": model_name,
+            }
+            added.append(name)
+        return added
+
+    # ---------------------------------------
+    # 内部ヘルパ：今回「呼ぶモデル」を解決（enabled/has_key/ブレーカー尊重）
+    # ---------------------------------------
+    @staticmethod
+    def _circuit_open(props: Any) -> bool:
+        return isinstance(props, dict) and props.get("circuit") == "open"
+
     def _resolve_target_models(self, available: Dict[str, Dict[str, Any]]) -> List[str]:
         # override 指定があるなら最優先（ただし存在するものだけ）
         if self._enabled_models_override is not None:
             exist = set((available or {}).keys())
-            return [m for m in self._enabled_models_override if m in exist]
+            return [
+                m
+                for m in self._enabled_models_override
+                if m in exist and not self._circuit_open(available.get(m))
+            ]
 
         targets: List[str] = []
         for name, props in (available or {}).items():
@@ -136,6 +344,10 @@ class ModelsAI2:
                 if "has_key" in props and props.get("has_key", True) is False:
                     continue
 
+                # サーキットブレーカーが open のモデルは呼ばずに外す（どうせ即失敗する）
+                if self._circuit_open(props):
+                    continue
+
                 targets.append(str(name))
             except Exception:
                 # 異常値でも安全側：呼ぶ（落とすと原因追いにくい）
@@ -143,6 +355,499 @@ class ModelsAI2:
 
         return targets
 
+    # ---------------------------------------
+    # 内部ヘルパ：モデルごとのタイムアウト（秒）を解決
+    # ---------------------------------------
+    def _resolve_timeout(self, model_name: str, budget: Optional[float] = None) -> float:
+        """
+        優先順:
+        1) コンストラクタの model_timeouts[model_name]
+        2) available_models の extra["timeout_sec"]（register 側で指定可能）
+        3) self.timeout_sec
+        budget（ターンの残り秒数）があれば、それを超えない。
+        """
+        timeout = self.timeout_sec
+        if model_name in self._model_timeouts:
+            timeout = self._model_timeouts[model_name]
+        else:
+            try:
+                extra = (self._available_props.get(model_name) or {}).get("extra") or {}
+                t = extra.get("timeout_sec")
+                if t is not None:
+                    timeout = float(t)
+            except Exception:
+                pass
+
+        if budget is not None:
+            timeout = min(timeout, budget)
+        return max(0.1, timeout)
+
+    # ---------------------------------------
+    # 内部ヘルパ：収集ポリシー
+    # ---------------------------------------
+    @staticmethod
+    def _parse_policy(raw: Optional[str]) -> Tuple[str, Optional[int]]:
+        """
+        "all" / "priority_first" / "quorum" / "quorum:2" を (policy, k) にする。未知の値は "all"。
+        """
+        name, _, k = str(raw or "all").strip().lower().partition(":")
+        if name not in COLLECT_POLICIES:
+            return "all", None
+        try:
+            return name, int(k) if k else None
+        except ValueError:
+            return name, None
+
+    def _resolve_policy(
+        self,
+        policy: Optional[str],
+        target_models: List[str],
+        priority: Optional[List[str]],
+    ) -> Tuple[str, int, List[str]]:
+        """
+        (実際に使うポリシー, quorum の k, 呼ぶ順番)。
+
+        priority_first なのに priority が target に居ない、quorum の k が全モデル数以上、
+        なら待ち方は結局 "all" と同じなので "all" にする。
+        """
+        name, k = self._parse_policy(policy) if policy is not None else (self.policy, None)
+        k = int(k or self.quorum_k)
+
+        prio = [str(x) for x in (priority or []) if str(x) in target_models]
+        order = prio + [m for m in target_models if m not in prio]
+
+        if name == "priority_first" and not prio:
+            name = "all"
+        if name == "quorum" and not (1 <= k < len(target_models)):
+            name = "all"
+        return name, max(1, k), order
+
+    @staticmethod
+    def _usable(result: Optional[Dict[str, Any]]) -> bool:
+        return (
+            isinstance(result, dict)
+            and result.get("status") == "ok"
+            and bool((result.get("text") or "").strip())
+        )
+
+    def _stop_condition(
+        self,
+        policy: str,
+        quorum_k: int,
+        prio: List[str],
+    ) -> Optional[Callable[[Dict[str, Dict[str, Any]]], bool]]:
+        """
+        ここまでの結果（モデル名 -> 結果）で待つのをやめてよいかの判定。"all" なら None。
+
+        prio は今回呼ぶモデルだけに絞った priority（呼ばないモデルが混ざると、
+        そのモデルの結果を永遠に待つことになり、結局全部待ってしまう）。
+        """
+        if policy == "priority_first":
+
+            def priority_first_done(out: Dict[str, Dict[str, Any]]) -> bool:
+                for m in prio:
+                    if m not in out:
+                        # 上位がまだ終わっていない（成功すればそれが採用される）
+                        return False
+                    if self._usable(out[m]):
+                        return True
+                # priority 全滅 → Judge は長さで選ぶので全部待つ
+                return False
+
+            return priority_first_done
+
+        if policy == "quorum":
+            return lambda out: sum(1 for r in out.values() if self._usable(r)) >= quorum_k
+
+        return None
+
+    @staticmethod
+    def _unfinished_result(
+        status: str,
+        error: str,
+        *,
+        mode_current: str,
+        emotion_override: Optional[Dict[str, Any]],
+        reply_length_mode: str,
+        call_kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        ポリシーで待たなかった（pending）/ 呼ばなかった（skipped）モデルの結果。
+        """
+        return {
+            "status": status,
+            "text": "",
+            "raw": None,
+            "usage": None,
+            "error": error,
+            "traceback": None,
+            "mode_current": mode_current,
+            "emotion_override": emotion_override,
+            "reply_length_mode": reply_length_mode,
+            "call_kwargs": call_kwargs,
+            "elapsed_sec": None,
+        }
+
+    @staticmethod
+    def _store_late(sink: Dict[str, Any], model_name: str, fut: Future) -> None:
+        """
+        ポリシー成立後に裏で終わったモデルの結果を sink（results["_late"]）に入れる（ワーカースレッドから呼ばれる）。
+        """
+        if fut.cancelled():
+            return
+        try:
+            result = dict(fut.result())
+        except Exception:
+            return
+        result["background"] = True
+        sink[model_name] = result
+
+    # ---------------------------------------
+    # 内部ヘルパ：1モデル分を呼んで結果 dict を作る（例外は外に出さない）
+    # ---------------------------------------
+    def _call_one(
+        self,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        call_kwargs: Dict[str, Any],
+        *,
+        mode_current: str,
+        emotion_override: Optional[Dict[str, Any]],
+        reply_length_mode: str,
+        backup: Optional[Tuple[str, Dict[str, Any]]] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        t0 = time.monotonic()
+        try:
+            if backup is not None:
+                # ヘッジ：遅ければ backup にも投げ、先着を採用
+                completion: CompletionType = self.llm_manager.chat_hedged(
+                    model_name,
+                    messages,
+                    backup=backup[0],
+                    backup_kwargs=backup[1],
+                    deadline=deadline,
+                    **call_kwargs,
+                )
+            else:
+                # 各モデルの回答を並べて比べるので、別モデルへの failover はしない
+                completion = self.llm_manager.chat(
+                    model=model_name,
+                    messages=messages,
+                    failover=False,
+                    deadline=deadline,
+                    **call_kwargs,
+                )
+
+            norm = self._normalize_completion(completion)
+            usage = norm["usage"] if isinstance(norm["usage"], dict) else {}
+            served_by = str(usage.get("served_by") or model_name)
+            # n>1 なら completion_tokens は全サンプルの合計
+            samples = usage.get("samples")
+            observed = "".join(str(t or "") for t in samples) if isinstance(samples, list) else norm["text"]
+            get_length_budget().observe(served_by, observed, usage)
+
+            return {
+                "status": "ok",
+                "text": norm["text"],
+                "raw": norm["raw"],
+                "usage": norm["usage"],
+                "error": None,
+                "traceback": None,
+                "mode_current": mode_current,
+                "emotion_override": emotion_override,
+                "reply_length_mode": reply_length_mode,
+                "call_kwargs": call_kwargs,
+                "elapsed_sec": round(time.monotonic() - t0, 3),
+                "served_by": served_by,
+            }
+
+        except Exception as e:
+            out = {
+                "status": "error",
+                "text": "",
+                "raw": None,
+                "usage": None,
+                "error": str(e),
+                "traceback": traceback.format_exc(limit=8),
+                "mode_current": mode_current,
+                "emotion_override": emotion_override,
+                "reply_length_mode": reply_length_mode,
+                "call_kwargs": call_kwargs,
+                "elapsed_sec": round(time.monotonic() - t0, 3),
+            }
+            if isinstance(e, HedgeFailedError):
+                out["hedge_errors"] = dict(e.errors)
+            return out
+
+    @staticmethod
+    def _timeout_result(
+        *,
+        timeout_sec: float,
+        mode_current: str,
+        emotion_override: Optional[Dict[str, Any]],
+        reply_length_mode: str,
+        call_kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        return {
+            "status": "timeout",
+            "text": "",
+            "raw": None,
+            "usage": None,
+            "error": f"timeout after {timeout_sec:.1f}s",
+            "traceback": None,
+            "mode_current": mode_current,
+            "emotion_override": emotion_override,
+            "reply_length_mode": reply_length_mode,
+            "call_kwargs": call_kwargs,
+            "elapsed_sec": round(float(timeout_sec), 3),
+        }
+
+    # ---------------------------------------
+    # 内部ヘルパ：並列収集（締切までに返ったものだけ採用）
+    # ---------------------------------------
+    def _iter_parallel(
+        self,
+        target_models: List[str],
+        messages: List[Dict[str, str]],
+        kwargs_by_model: Dict[str, Dict[str, Any]],
+        *,
+        mode_current: str,
+        emotion_override: Optional[Dict[str, Any]],
+        reply_length_mode: str,
+        backups: Optional[Dict[str, Tuple[str, Dict[str, Any]]]] = None,
+        deadline: Optional[Deadline] = None,
+        stop_when: Optional[Callable[[Dict[str, Dict[str, Any]]], bool]] = None,
+        late_sink: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        全モデルを同時に呼び、終わった順（timeout 含む）に (model_name, result) を yield する。
+
+        stop_when(ここまでの結果) が True になったら残りを待たずに終わる（残りは yield しない）。
+        残りが後で終わったら late_sink[model] に入れる（呼び出し側の results とは別の dict を渡すこと）。
+        """
+        out: Dict[str, Dict[str, Any]] = {}
+
+        t0 = time.monotonic()
+        budget = deadline.remaining() if deadline is not None else None
+        deadlines: Dict[str, float] = {
+            m: t0 + self._resolve_timeout(m, budget) for m in target_models
+        }
+
+        # timeout したスレッドは待たずに捨てる（shutdown(wait=False)）
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, len(target_models)),
+            thread_name_prefix="models_ai2",
+        )
+        try:
+            futures: Dict[Future, str] = {}
+            for model_name in target_models:
+                fut = executor.submit(
+                    self._call_one,
+                    model_name,
+                    messages,
+                    kwargs_by_model[model_name],
+                    mode_current=mode_current,
+                    emotion_override=emotion_override,
+                    reply_length_mode=reply_length_mode,
+                    backup=(backups or {}).get(model_name),
+                    deadline=deadline,
+                )
+                futures[fut] = model_name
+
+            pending = set(futures.keys())
+            while pending:
+                now = time.monotonic()
+
+                # 締切を過ぎたモデルは timeout 扱いにして待つのをやめる
+                for fut in list(pending):
+                    model_name = futures[fut]
+                    if not fut.done() and now >= deadlines[model_name]:
+                        fut.cancel()
+                        pending.discard(fut)
+                        if deadline is not None and deadline.expired():
+                            deadline.note_expired(f"models_collect:{model_name}")
+                        out[model_name] = self._timeout_result(
+                            timeout_sec=deadlines[model_name] - t0,
+                            mode_current=mode_current,
+                            emotion_override=emotion_override,
+                            reply_length_mode=reply_length_mode,
+                            call_kwargs=kwargs_by_model[model_name],
+                        )
+                        yield model_name, out[model_name]
+
+                if not pending:
+                    break
+
+                next_deadline = min(deadlines[futures[f]] for f in pending)
+                done, pending = wait(
+                    pending,
+                    timeout=max(0.0, next_deadline - time.monotonic()),
+                    return_when=FIRST_COMPLETED,
+                )
+                for fut in done:
+                    out[futures[fut]] = fut.result()
+                    yield futures[fut], out[futures[fut]]
+
+                if pending and stop_when is not None and stop_when(out):
+                    # ポリシー成立：残りは裏で走らせたまま、終わったら late_sink に入れる
+                    if late_sink is not None:
+                        for fut in pending:
+                            fut.add_done_callback(
+                                lambda f, m=futures[fut]: self._store_late(late_sink, m, f)
+                            )
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _call_with_timeout(
+        self,
+        executor: ThreadPoolExecutor,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        call_kwargs: Dict[str, Any],
+        *,
+        mode_current: str,
+        emotion_override: Optional[Dict[str, Any]],
+        reply_length_mode: str,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        """
+        executor で 1 モデルだけ呼び、そのモデルの timeout まで待つ（順番に呼ぶとき用）。
+        間に合わなければ status="timeout"（スレッドは止められないので待たずに捨てる）。
+        """
+        budget = deadline.remaining() if deadline is not None else None
+        timeout_sec = self._resolve_timeout(model_name, budget)
+        fut = executor.submit(
+            self._call_one,
+            model_name,
+            messages,
+            call_kwargs,
+            mode_current=mode_current,
+            emotion_override=emotion_override,
+            reply_length_mode=reply_length_mode,
+            deadline=deadline,
+        )
+        done, _ = wait([fut], timeout=timeout_sec)
+        if done:
+            return fut.result()
+
+        fut.cancel()
+        if deadline is not None and deadline.expired():
+            deadline.note_expired(f"models_collect:{model_name}")
+        return self._timeout_result(
+            timeout_sec=timeout_sec,
+            mode_current=mode_current,
+            emotion_override=emotion_override,
+            reply_length_mode=reply_length_mode,
+            call_kwargs=call_kwargs,
+        )
+
+    def _collect_parallel(
+        self,
+        target_models: List[str],
+        messages: List[Dict[str, str]],
+        kwargs_by_model: Dict[str, Dict[str, Any]],
+        **kwargs: Any,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        _iter_parallel を最後まで回して dict にする（引数は _iter_parallel と同じ）。
+        """
+        return dict(self._iter_parallel(target_models, messages, kwargs_by_model, **kwargs))
+
+    # ---------------------------------------
+    # 内部ヘルパ：ヘッジ収集（priority 先頭 + backup の先着 1 件）
+    # ---------------------------------------
+    @staticmethod
+    def _resolve_hedge_pair(
+        target_models: List[str],
+        priority: Optional[List[str]],
+    ) -> Optional[Tuple[str, str]]:
+        """
+        (primary, backup) を返す。priority が無い / 候補が 2 つ未満なら None（通常収集）。
+        """
+        prio = [str(x) for x in (priority or []) if str(x) in target_models]
+        if not prio or len(target_models) < 2:
+            return None
+
+        primary = prio[0]
+        rest = prio[1:] + [m for m in target_models if m not in prio]
+        return primary, rest[0]
+
+    def _collect_hedged(
+        self,
+        results: Dict[str, Any],
+        hedge_pair: Tuple[str, str],
+        messages: List[Dict[str, str]],
+        kwargs_by_model: Dict[str, Dict[str, Any]],
+        *,
+        mode_current: str,
+        emotion_override: Optional[Dict[str, Any]],
+        reply_length_mode: str,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        primary, backup = hedge_pair
+        budget = deadline.remaining() if deadline is not None else None
+        results["_meta"]["collect_mode"] = "hedged"
+        results["_meta"]["target_models"] = [primary, backup]
+        results["_meta"]["timeouts"] = {primary: self._resolve_timeout(primary, budget)}
+
+        t0 = time.monotonic()
+        collected = self._collect_parallel(
+            [primary],
+            messages,
+            kwargs_by_model,
+            mode_current=mode_current,
+            emotion_override=emotion_override,
+            reply_length_mode=reply_length_mode,
+            backups={primary: (backup, kwargs_by_model[backup])},
+            deadline=deadline,
+        )
+        results["_meta"]["elapsed_sec"] = round(time.monotonic() - t0, 3)
+
+        result = collected[primary]
+        usage = result.get("usage") if isinstance(result.get("usage"), dict) else {}
+        # モデル名 -> 失敗理由（負けたのではなく失敗した側）
+        hedge_errors: Dict[str, str] = result.pop("hedge_errors", None) or usage.get("hedge_errors") or {}
+        winner = str(result.get("served_by") or primary)
+        loser = primary if winner == backup else backup
+        results["_meta"]["hedge"] = {
+            "primary": primary,
+            "backup": backup,
+            "winner": winner if result.get("status") == "ok" else None,
+        }
+
+        if winner in hedge_errors:
+            # 両方失敗：結合したメッセージではなく各モデル自身の理由を残す
+            result["error"] = hedge_errors[winner]
+        results[winner] = result
+
+        if loser in hedge_errors:
+            # 競争に負けたのではなく失敗した側は、その失敗をそのまま残す（勝率 / 失敗率に数える）
+            status, error = "error", hedge_errors[loser]
+        else:
+            # 採用しなかった側は「呼ばなかった / 負けた」として空で残す（Judge の候補からは外れる）
+            status = "hedged_out"
+            error = (
+                f"hedge: {winner} answered first"
+                if result.get("status") == "ok"
+                else f"hedge: no reply from {winner} ({result.get('status')})"
+            )
+        results[loser] = {
+            "status": status,
+            "text": "",
+            "raw": None,
+            "usage": None,
+            "error": error,
+            "traceback": None,
+            "mode_current": mode_current,
+            "emotion_override": emotion_override,
+            "reply_length_mode": reply_length_mode,
+            "call_kwargs": kwargs_by_model[loser],
+            "elapsed_sec": result.get("elapsed_sec"),
+        }
+        return results
+
     # ---------------------------------------
     # メイン
     # ---------------------------------------
@@ -153,7 +858,67 @@ class ModelsAI2:
         mode_current: str = "normal",
         emotion_override: Optional[Dict[str, Any]] = None,
         reply_length_mode: str = "auto",
+        call_options: Optional[Dict[str, Any]] = None,
+        priority: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None,
+        policy: Optional[str] = None,
+        adaptive: Optional[Tuple[str, str]] = None,
+        max_tokens: Optional[Dict[str, int]] = None,
     ) -> Dict[str, Any]:
+        """
+        call_options: 全モデル共通で LLM 呼び出しに足すオプション（例: {"cache": True}）。
+                      Persona defaults より優先する。
+        priority    : AI Manager の優先順位。hedge=True なら先頭 = primary、
+                      policy="priority_first" ならこの順で「どこまで待つか」を決める。
+        deadline    : ターンの締切（llm_deadline.Deadline）。各モデルの待ち時間と timeout を残り予算で縛る。
+        policy      : 収集ポリシー（"all" / "priority_first" / "quorum" / "quorum:k"）。None なら self.policy。
+        adaptive    : (persona_id, reply_length_mode)。渡すと model_win_stats の勝率で
+                      採用されそうにないモデルを呼ぶ前に間引く（AI Manager の select_mode="Adaptive"）。
+        max_tokens  : モデル名 -> max_tokens（length_budget.budgets() の戻り値）。無いモデルは従来通り。
+        """
+        it = self.collect_iter(
+            messages,
+            mode_current=mode_current,
+            emotion_override=emotion_override,
+            reply_length_mode=reply_length_mode,
+            call_options=call_options,
+            priority=priority,
+            deadline=deadline,
+            policy=policy,
+            adaptive=adaptive,
+            max_tokens=max_tokens,
+        )
+        while True:
+            try:
+                next(it)
+            except StopIteration as stop:
+                return stop.value or {}
+
+    def collect_iter(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        mode_current: str = "normal",
+        emotion_override: Optional[Dict[str, Any]] = None,
+        reply_length_mode: str = "auto",
+        call_options: Optional[Dict[str, Any]] = None,
+        priority: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None,
+        policy: Optional[str] = None,
+        adaptive: Optional[Tuple[str, str]] = None,
+        max_tokens: Optional[Dict[str, int]] = None,
+    ) -> Generator[Tuple[str, Dict[str, Any], Dict[str, Any]], None, Dict[str, Any]]:
+        """
+        collect() の逐次版。モデルの結果が 1 つ返るたびに (model_name, result, results) を yield する。
+
+        - result  : そのモデルの正規化済み結果（elapsed_sec = そのモデルのレイテンシ。timeout 含む）
+        - results : collect() と同じ形の途中経過（まだ返っていないモデルは status="pending"）。
+                    その時点のスナップショット（浅いコピー）なので、次の yield までに中身は変わらない。
+                    そのまま llm_meta["models"] に置いて再描画できる
+        - 終了時の return 値は collect() の戻り値と同じ
+          （`results = yield from models_ai.collect_iter(...)` で受け取る）
+        引数は collect() と同じ。
+        """
         results: Dict[str, Any] = {}
 
         if not messages:
@@ -188,56 +953,247 @@ class ModelsAI2:
             "enabled_models_override": list(self._enabled_models_override) if self._enabled_models_override is not None else None,
             "available_models": list((self._available_props or {}).keys()),
             "target_models": list(target_models),
+            "circuit_open": [
+                m for m, p in (self._available_props or {}).items() if self._circuit_open(p)
+            ],
         }
 
         if not target_models:
             results["_system"] = {
                 "status": "error",
                 "text": "",
-                "error": "target_models is empty (all disabled or missing keys)",
+                "error": "target_models is empty (all disabled, missing keys or circuit open)",
                 "traceback": None,
             }
             return results
 
+        # 3.5) Adaptive：勝率の低いモデルは呼ばない（探索で時々呼ぶ）
+        if adaptive is not None and len(target_models) > 1:
+            target_models, adaptive_meta = get_model_win_stats().select(
+                adaptive[0], adaptive[1], target_models, priority=priority
+            )
+            results["_meta"]["adaptive"] = adaptive_meta
+            results["_meta"]["target_models"] = list(target_models)
+
         # 4) 収集
+        kwargs_by_model: Dict[str, Dict[str, Any]] = {}
+        for model_name in target_models:
+            kwargs_by_model[model_name] = self._build_call_kwargs(model_name, call_options, max_tokens)
+
+        hedge_pair = self._resolve_hedge_pair(target_models, priority) if self.hedge else None
+        if hedge_pair is not None:
+            # 返すのは priority 先頭（か backup）の 1 件だけなので priority_first と同じ扱い
+            results["_meta"]["collect_policy"] = "priority_first"
+            self._collect_hedged(
+                results,
+                hedge_pair,
+                messages,
+                kwargs_by_model,
+                mode_current=mode_current,
+                emotion_override=emotion_override,
+                reply_length_mode=reply_length_mode,
+                deadline=deadline,
+            )
+            winner = (results["_meta"].get("hedge") or {}).get("winner") or hedge_pair[0]
+            self._expand_samples(results, winner)
+            yield winner, results[winner], dict(results)
+            return results
+
+        use_parallel = self.parallel and len(target_models) > 1
+        results["_meta"]["collect_mode"] = "parallel" if use_parallel else "sequential"
+        budget = deadline.remaining() if deadline is not None else None
+        results["_meta"]["timeouts"] = {m: self._resolve_timeout(m, budget) for m in target_models}
+
+        policy_name, quorum_k, order = self._resolve_policy(policy, target_models, priority)
+        # priority のうち今回呼ぶモデルだけ（order の先頭側。無効 / キー無し / Adaptive で外れたものは除く）
+        prio_targets = [m for m in order if m in {str(x) for x in (priority or [])}]
+        stop_when = self._stop_condition(policy_name, quorum_k, prio_targets)
+        results["_meta"]["collect_policy"] = policy_name
+        if policy_name == "quorum":
+            results["_meta"]["quorum_k"] = quorum_k
+
+        # target_models の順序で先に枠を作っておく（デバッグビューの並びを安定させる。
+        # ポリシーで待たなかったモデルは pending のまま返す。裏で終わった結果は _late に入る）
         for model_name in target_models:
-            persona_defaults = self._get_persona_call_defaults(model_name)
-            call_kwargs: Dict[str, Any] = self._drop_none_kwargs(dict(persona_defaults))
+            results[model_name] = self._unfinished_result(
+                "pending",
+                f"collect_policy={policy_name}: answered after the turn was decided",
+                mode_current=mode_current,
+                emotion_override=emotion_override,
+                reply_length_mode=reply_length_mode,
+                call_kwargs=kwargs_by_model[model_name],
+            )
+
+        # 裏で終わった結果の置き場（Judge / 勝率の記録が見る枠とは分ける）
+        late: Dict[str, Dict[str, Any]] = {}
+        if use_parallel and stop_when is not None:
+            results["_late"] = late
 
+        t0 = time.monotonic()
+        collected: Dict[str, Dict[str, Any]] = {}
+        # 順番に呼ぶときの 1 ワーカー executor（timeout するまで全モデルで使い回す）
+        seq_executor: Optional[ThreadPoolExecutor] = None
+        if use_parallel:
+            for model_name, result in self._iter_parallel(
+                target_models,
+                messages,
+                kwargs_by_model,
+                mode_current=mode_current,
+                emotion_override=emotion_override,
+                reply_length_mode=reply_length_mode,
+                deadline=deadline,
+                stop_when=stop_when,
+                late_sink=late,
+            ):
+                collected[model_name] = results[model_name] = result
+                self._expand_samples(results, model_name)
+                yield model_name, result, dict(results)
+        else:
             try:
-                completion: CompletionType = self.llm_manager.chat(
-                    model=model_name,
-                    messages=messages,
-                    **call_kwargs,
-                )
+                for model_name in order:
+                    if stop_when is not None and stop_when(collected):
+                        # 順番に呼ぶときは、決まった後のモデルはそもそも呼ばない
+                        results[model_name] = self._unfinished_result(
+                            "skipped",
+                            f"collect_policy={policy_name}: not called",
+                            mode_current=mode_current,
+                            emotion_override=emotion_override,
+                            reply_length_mode=reply_length_mode,
+                            call_kwargs=kwargs_by_model[model_name],
+                        )
+                        continue
+                    if seq_executor is None:
+                        seq_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="models_ai2_seq")
+                    result = self._call_with_timeout(
+                        seq_executor,
+                        model_name,
+                        messages,
+                        kwargs_by_model[model_name],
+                        mode_current=mode_current,
+                        emotion_override=emotion_override,
+                        reply_length_mode=reply_length_mode,
+                        deadline=deadline,
+                    )
+                    if result["status"] == "timeout":
+                        # timeout した呼び出しはワーカーを使ったまま走り続けるので、次のモデルは新しい executor で呼ぶ
+                        seq_executor.shutdown(wait=False, cancel_futures=True)
+                        seq_executor = None
+                    collected[model_name] = results[model_name] = result
+                    self._expand_samples(results, model_name)
+                    yield model_name, result, dict(results)
+            finally:
+                if seq_executor is not None:
+                    seq_executor.shutdown(wait=False)
+        results["_meta"]["elapsed_sec"] = round(time.monotonic() - t0, 3)
+        results["_meta"]["waited_models"] = [m for m in target_models if m in collected]
+
+        return results
+
+    # ---------------------------------------
+    # ストリーミング（単一モデル）
+    # ---------------------------------------
+    def collect_stream(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        priority: Optional[List[str]] = None,
+        mode_current: str = "normal",
+        emotion_override: Optional[Dict[str, Any]] = None,
+        reply_length_mode: str = "auto",
+        deadline: Optional[Deadline] = None,
+        max_tokens: Optional[Dict[str, int]] = None,
+    ) -> Generator[str, None, Dict[str, Any]]:
+        """
+        priority の先頭（無ければ target_models の先頭）の 1 モデルだけをストリーミングで呼ぶ。
+
+        - テキスト差分を yield する（st.write_stream にそのまま渡せる）
+        - 終了時の return 値は collect() と同じ形の結果 dict
+          （`results = yield from models_ai.collect_stream(...)` で受け取る）
+        - 初回トークンまでの時間を ttft_sec に残す
+        - max_tokens は collect() と同じ（モデル名 -> 長さの予算）
+        """
+        results: Dict[str, Any] = {}
+
+        if not messages:
+            results["_system"] = {
+                "status": "error",
+                "text": "",
+                "error": "messages is empty",
+                "traceback": None,
+            }
+            return results
+
+        try:
+            self._available_props = self.llm_manager.get_available_models() or {}
+        except Exception as e:
+            results["_system"] = {
+                "status": "error",
+                "text": "",
+                "error": f"llm_manager.get_available_models() failed: {e}",
+                "traceback": traceback.format_exc(limit=8),
+            }
+            return results
 
-                norm = self._normalize_completion(completion)
-
-                results[model_name] = {
-                    "status": "ok",
-                    "text": norm["text"],
-                    "raw": norm["raw"],
-                    "usage": norm["usage"],
-                    "error": None,
-                    "traceback": None,
-                    "mode_current": mode_current,
-                    "emotion_override": emotion_override,
-                    "reply_length_mode": reply_length_mode,
-                    "call_kwargs": call_kwargs,
-                }
-
-            except Exception as e:
-                results[model_name] = {
-                    "status": "error",
-                    "text": "",
-                    "raw": None,
-                    "usage": None,
-                    "error": str(e),
-                    "traceback": traceback.format_exc(limit=8),
-                    "mode_current": mode_current,
-                    "emotion_override": emotion_override,
-                    "reply_length_mode": reply_length_mode,
-                    "call_kwargs": call_kwargs,
-                }
+        target_models = self._resolve_target_models(self._available_props)
+        prio = [str(x) for x in (priority or []) if str(x) in target_models]
+        stream_model = prio[0] if prio else (target_models[0] if target_models else "")
 
+        results["_meta"] = {
+            "status": "ok",
+            "mode_current": mode_current,
+            "reply_length_mode": reply_length_mode,
+            "enabled_models_override": list(self._enabled_models_override) if self._enabled_models_override is not None else None,
+            "available_models": list((self._available_props or {}).keys()),
+            "target_models": [stream_model] if stream_model else [],
+            "collect_mode": "stream",
+            # priority 先頭の 1 モデルだけ呼ぶので priority_first と同じ扱い
+            "collect_policy": "priority_first",
+            "stream_model": stream_model,
+        }
+
+        if not stream_model:
+            results["_system"] = {
+                "status": "error",
+                "text": "",
+                "error": "target_models is empty (all disabled, missing keys or circuit open)",
+                "traceback": None,
+            }
+            return results
+
+        call_kwargs = self._build_call_kwargs(stream_model, None, max_tokens)
+
+        t0 = time.monotonic()
+        ttft: Optional[float] = None
+        parts: List[str] = []
+        try:
+            for delta in self.llm_manager.stream_chat(
+                stream_model, messages, deadline=deadline, **call_kwargs
+            ):
+                if not delta:
+                    continue
+                if ttft is None:
+                    ttft = time.monotonic() - t0
+                parts.append(delta)
+                yield delta
+
+            status, error, tb = "ok", None, None
+        except Exception as e:
+            status, error, tb = "error", str(e), traceback.format_exc(limit=8)
+
+        elapsed = time.monotonic() - t0
+        results["_meta"]["elapsed_sec"] = round(elapsed, 3)
+        results[stream_model] = {
+            "status": status,
+            "text": "".join(parts),
+            "raw": {"stream": True},
+            "usage": None,
+            "error": error,
+            "traceback": tb,
+            "mode_current": mode_current,
+            "emotion_override": emotion_override,
+            "reply_length_mode": reply_length_mode,
+            "call_kwargs": call_kwargs,
+            "elapsed_sec": round(elapsed, 3),
+            "ttft_sec": round(ttft, 3) if ttft is not None else None,
+        }
         return results
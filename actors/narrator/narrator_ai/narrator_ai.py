@@ -101,6 +101,14 @@ class NarratorAI:
                 except Exception:
                     pass
 
+            # failover（落ちたモデルの代替）の順番にも使う
+            mgr_llm = getattr(self.manager, "llm_manager", None)
+            if mgr_llm is not None and hasattr(mgr_llm, "set_failover_order"):
+                try:
+                    mgr_llm.set_failover_order([str(x) for x in priority])
+                except Exception:
+                    pass
+
             # デバッグ/互換のため、セッションにも置いておく（他の層が参照しやすい）
             st.session_state["narrator_priority"] = [str(x) for x in priority]
 
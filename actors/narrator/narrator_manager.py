@@ -4,9 +4,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Dict, List, Literal, Optional
 
+from llm.llm_ai.llm_deadline import Deadline
 from llm.llm_manager import LLMManager
 from actors.models_ai2 import ModelsAI2
 from actors.judge_ai3 import JudgeAI3
+from actors.length_budget import get_length_budget, length_budget_enabled
 
 NarratorTaskType = Literal["round0", "action"]
 
@@ -224,6 +226,20 @@ class NarratorManager:
             enabled_models=enabled_models if enabled_models else None,
         )
 
+        # タスク 1 回分の予算（各モデルの待ち時間と 1 リクエストの timeout を縛る）
+        deadline = Deadline.for_turn(f"narrator:{task_type}")
+
+        # 目標の長さは呼ぶ前に決め、モデルごとの max_tokens の予算にする（Judge にも同じ値を渡す）
+        length_mode = str(self.state.get("reply_length_mode", "auto") or "auto")
+        target_length = self.judge_ai.preferred_length("", length_mode)
+        max_tokens: Optional[Dict[str, int]] = None
+        if length_budget_enabled():
+            try:
+                models = enabled_models or list((self.llm_manager.get_available_models() or {}).keys())
+                max_tokens = get_length_budget().budgets(target_length, models)
+            except Exception:
+                max_tokens = None
+
         # 複数モデルから案を収集（raw）
         models_result = models_ai.collect(
             messages,
@@ -231,8 +247,21 @@ class NarratorManager:
             emotion_override=None,
             # reply_length_mode は Narrator 側で今すぐ必須ではないが、
             # 将来UI連動する場合に備えて呼び出し口は残しておく
-            reply_length_mode=str(self.state.get("reply_length_mode", "auto") or "auto"),
+            reply_length_mode=length_mode,
+            # Round0 は同じ world snapshot なら同じ messages になるので応答キャッシュに乗せる
+            call_options={"cache": True} if task_type == "round0" else None,
+            deadline=deadline,
+            max_tokens=max_tokens,
         )
+        # どの段階で予算が尽きたかを _meta に残す（デバッグビューの _meta に出る）
+        if isinstance(models_result.get("_meta"), dict):
+            if deadline.expired() and deadline.expired_stage is None:
+                deadline.note_expired("models_collect")
+            models_result["_meta"]["deadline"] = deadline.to_meta()
+            models_result["_meta"]["length_budget"] = {
+                "target_length": target_length,
+                "max_tokens": max_tokens,
+            }
 
         # ✅ Judge に渡す候補を正規化（"_meta" 等を混ぜない）
         judge_candidates = self._extract_judge_candidates(models_result)
@@ -246,8 +275,10 @@ class NarratorManager:
                 # priority を Judge にも渡せる（Judge原本が priority 対応済み）
                 judge_result = self.judge_ai.run(
                     judge_candidates,
-                    preferred_length_mode=str(self.state.get("reply_length_mode", "auto") or "auto"),
+                    preferred_length_mode=length_mode,
                     priority=list(self._priority) if self._priority else None,
+                    collect_policy=(models_result.get("_meta") or {}).get("collect_policy"),
+                    target_length=target_length,
                 )
                 chosen_text = (judge_result.get("chosen_text") or "").strip()
             except Exception as e:
@@ -191,30 +191,29 @@ class PersonaBase:
         Actor → AnswerTalker に渡すための messages を構築する共通実装。
 
         必要に応じてサブクラス側でオーバーライドしてもよい。
+
+        system_prompt_base（毎ターン同じ）を先頭の system に固定し、
+        extra_system_hint / affection_hint（ターンごとに変わる）は別の system として後ろに置く。
+        先頭が毎回同じ文字列になるので、ベンダー側のプレフィックスキャッシュが効く。
         """
-        system_parts: List[str] = [self.system_prompt_base]
+        volatile_parts: List[str] = []
 
         if extra_system_hint:
             extra = extra_system_hint.strip()
             if extra:
-                system_parts.append(extra)
+                volatile_parts.append(extra)
 
         if affection_hint:
             ah = affection_hint.strip()
             if ah:
-                system_parts.append(ah)
-
-        system_text = "\n\n".join(system_parts)
+                volatile_parts.append(ah)
 
-        # ★最小修正：ここで「少なくともこのsystemは使った」を必ず残す
-        # AnswerTalker側が保存し忘れても View で表示できる
-        self._try_set_llm_meta("system_prompt_used", system_text)
-
-        messages: List[Dict[str, str]] = [
-            {"role": "system", "content": system_text},
-            {"role": "user", "content": user_text},
-        ]
-        return messages
+        messages: List[Dict[str, str]] = [{"role": "user", "content": user_text}]
+        return self.replace_system_prompt_split(
+            messages,
+            self.system_prompt_base,
+            "\n\n".join(volatile_parts),
+        )
 
     # --------------------------------------------------
     # LLM request params（モデル別）
@@ -459,6 +458,40 @@ class PersonaBase:
 
         return sp
 
+    def replace_system_prompt_split(
+        self,
+        messages: List[Dict[str, str]],
+        stable_prompt: str,
+        volatile_prompt: str = "",
+    ) -> List[Dict[str, str]]:
+        """
+        messages 内の system をすべて外し、
+        - 先頭に stable_prompt の system
+        - 最後の user の直前に volatile_prompt の system（空なら入れない）
+        を置いた新しい messages を返す。
+
+        先頭から volatile の手前までが毎ターン同じバイト列になり、
+        OpenAI の自動プレフィックスキャッシュや Gemini cachedContents の対象になる。
+        """
+        rest = [m for m in messages if m.get("role") != "system"]
+        new_messages: List[Dict[str, str]] = [{"role": "system", "content": stable_prompt}]
+
+        volatile = (volatile_prompt or "").strip()
+        if volatile:
+            last_user = max(
+                (i for i, m in enumerate(rest) if m.get("role") == "user"),
+                default=len(rest),
+            )
+            rest.insert(last_user, {"role": "system", "content": volatile})
+        new_messages.extend(rest)
+
+        # ★最小修正：最終的に使う system_prompt を必ず残す（View に出すため）
+        self._try_set_llm_meta(
+            "system_prompt_used",
+            "\n\n".join(p for p in (stable_prompt.strip(), volatile) if p),
+        )
+        return new_messages
+
     def replace_system_prompt(
         self,
         messages: List[Dict[str, str]],
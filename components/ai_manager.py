@@ -4,6 +4,7 @@ from __future__ import annotations
 from typing import Any, Dict, List
 import streamlit as st
 
+from actors.model_win_stats import get_model_win_stats
 from llm.llm_manager import LLMManager
 
 
@@ -17,6 +18,9 @@ class AIManager:
     # 初期優先順位（最小構成：gpt52のみ）
     DEFAULT_PRIORITY = ["gpt52"]
 
+    # Adaptive: enabled のうち、Judge にほとんど採用されないモデルを勝率で自動的に間引く
+    SELECT_MODES = ["Auto", "Manual", "Adaptive"]
+
     def __init__(self, persona_id: str = "default") -> None:
         self.persona_id = persona_id
         self.llm_manager = LLMManager.get_or_create(persona_id=persona_id)
@@ -34,7 +38,7 @@ class AIManager:
         self.state.setdefault("suppress_warnings", False)
 
         # ★初期は Manual
-        self.state.setdefault("select_mode", "Manual")  # "Auto" or "Manual"
+        self.state.setdefault("select_mode", "Manual")  # "Auto" / "Manual" / "Adaptive"
 
         st.session_state.setdefault("reply_length_mode", "auto")
 
@@ -100,11 +104,13 @@ class AIManager:
                 st.caption("※ Persona は View 側で player_name を受け取り、{PLAYER_NAME} を置換します。")
 
         with st.expander("⚙️ 動作モード", expanded=True):
+            cur_mode = self.state.get("select_mode", "Manual")
             self.state["select_mode"] = st.radio(
                 "AI 選択モード",
-                options=["Auto", "Manual"],
-                index=0 if self.state.get("select_mode", "Manual") == "Auto" else 1,
+                options=self.SELECT_MODES,
+                index=self.SELECT_MODES.index(cur_mode) if cur_mode in self.SELECT_MODES else 1,
                 horizontal=True,
+                help="Adaptive: Judge に採用される率（勝率）が低いモデルを自動で呼ばなくする（時々は試す）。",
             )
 
             c1, c2, c3 = st.columns(3)
@@ -204,6 +210,13 @@ class AIManager:
             with cols[1]:
                 st.caption("※ UI表示だけでなく、LLMManager 側の enabled にも反映します。")
 
+        with st.expander("🏆 モデル別の勝率（Adaptive の判断材料）", expanded=self.state.get("select_mode") == "Adaptive"):
+            rows = get_model_win_stats().snapshot()
+            if not rows:
+                st.caption("まだ記録がありません（ターンごとに Judge の採用結果が貯まります）。")
+            else:
+                st.dataframe(rows, use_container_width=True)
+
         st.subheader("🧾 現在の設定サマリ")
         st.json(
             {
@@ -17,6 +17,8 @@ class MultiAIJudgeResultView:
             "route": "gpt",
             "pair": {"A": "gpt4o", "B": "hermes"},
         }
+
+    JudgeAI3 の形（chosen_model / reason）と、その暫定判定（provisional=True）も表示できる。
     """
 
     def __init__(self, title: str = "Multi AI Judge") -> None:
@@ -30,9 +32,13 @@ class MultiAIJudgeResultView:
             st.caption("（審議結果はまだありません）")
             return
 
-        winner = judge.get("winner") or "―"
+        winner = judge.get("winner") or judge.get("chosen_model") or "―"
         score_diff = judge.get("score_diff", 0.0)
-        comment = judge.get("comment") or ""
+        comment = judge.get("comment") or judge.get("reason") or ""
+
+        if judge.get("provisional"):
+            pending = ", ".join(judge.get("pending_models") or [])
+            st.caption(f"暫定の判定です（応答待ち: {pending or '―'}）")
 
         # 勝者・スコア差
         cols = st.columns(2)
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import streamlit as st
 
 from components.multi_ai_display_config import MultiAIDisplayConfig
@@ -9,6 +9,9 @@ class MultiAIModelViewer:
     """
     MultiAIDisplayConfig の指示に従って llm_meta['models'] を描画するビュー。
     表示ロジックのみ。models の構造には優しく。
+
+    収集中（ModelsAI2.collect_iter の途中経過）の models も描ける：
+    まだ返っていないモデルは「応答待ち」、返ったモデルはレイテンシ付きで出す。
     """
 
     def __init__(self, config: MultiAIDisplayConfig) -> None:
@@ -21,6 +24,9 @@ class MultiAIModelViewer:
             st.caption("（表示可能なモデルがありません）")
             return
 
+        # _meta / _system はモデルではない
+        models = {k: v for k, v in models.items() if not str(k).startswith("_")}
+
         # 新しいモデルを設定に取り込んでおく（未登録モデル対策）
         self.config.ensure_from_models(models)
 
@@ -37,10 +43,19 @@ class MultiAIModelViewer:
                 st.markdown("---")
                 continue
 
-            reply = info.get("reply") or info.get("text") or "（返信なし）"
             st.markdown(f"**{label}**  (`{key}`)")
+            if info.get("status") == "pending":
+                st.caption("（応答待ち…）")
+                st.markdown("---")
+                continue
+
+            reply = info.get("reply") or info.get("text") or "（返信なし）"
             st.write(reply)
 
+            elapsed = info.get("elapsed_sec")
+            if elapsed is not None:
+                st.caption(f"status={info.get('status', 'unknown')}, latency={elapsed}s")
+
             usage = info.get("usage") or info.get("usage_main")
             if isinstance(usage, dict) and usage:
                 pt = usage.get("prompt_tokens", "？")
@@ -49,3 +64,32 @@ class MultiAIModelViewer:
                 st.caption(f"tokens: total={tt}, prompt={pt}, completion={ct}")
 
             st.markdown("---")
+
+    def render_progress(
+        self,
+        placeholder: Any,
+        models: Dict[str, Any],
+        judge: Optional[Dict[str, Any]] = None,
+        *,
+        show_candidates: bool = False,
+    ) -> None:
+        """
+        st.empty() の placeholder に、収集途中の進み具合を描き直す。
+
+        既定では「何モデル中何モデルが応答済みか」の 1 行だけ。
+        show_candidates=True（デバッグ時）のときだけ、Judge 前の候補本文と暫定の採用候補も出す。
+        """
+        models = {
+            k: v for k, v in (models or {}).items()
+            if not str(k).startswith("_") and isinstance(v, dict)
+        }
+        done = sum(1 for v in models.values() if v.get("status") != "pending")
+
+        with placeholder.container():
+            st.caption(f"⏳ {done}/{len(models)} モデルが応答済み")
+            if not show_candidates:
+                return
+            if isinstance(judge, dict) and judge.get("chosen_model"):
+                label = "暫定" if judge.get("provisional") else "確定"
+                st.caption(f"{label}の採用候補: {judge['chosen_model']}")
+            self.render(models)
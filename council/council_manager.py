@@ -1,6 +1,7 @@
 # actors/council/council_manager.py
 from __future__ import annotations
 from typing import List, Dict, Any
+import os
 
 import streamlit as st
 
@@ -85,6 +86,10 @@ class CouncilManager:
 
         self.session_key = session_key
 
+        # 返答をストリーミング表示するか（LYRA_STREAM_REPLY=1 で有効。既定はスピナー表示）
+        # ストリーミングは priority 先頭の 1 モデルだけを呼ぶので、多AI収集 / Judge / Composer を通らない
+        self.stream_reply: bool = os.getenv("LYRA_STREAM_REPLY", "0") == "1"
+
         # ===== 会話ログ（まずセッションからロード） =====
         raw_log = st.session_state.get(self.session_key, [])
         self.conversation_log: List[Dict[str, str]] = list(raw_log) if isinstance(raw_log, list) else []
@@ -273,10 +278,14 @@ class CouncilManager:
             },
         }
 
-    def proceed(self, user_text: str) -> str:
+    def proceed(self, user_text: str, stream: bool = False) -> str:
         """
         プレイヤー発言 user_text をログに追加し、
         現在の会話相手 Actor に発言させて、その内容を返す。
+
+        stream=True の場合は Actor.speak_stream を st.write_stream で逐次描画する。
+        ログには speak_stream が最後に入れる actor.last_reply（Composer 後の最終テキスト）を残す
+        （stream / 非 stream でログの中身を揃える）。
         """
         st.write(f"[DEBUG:Council] proceed() user_text='{user_text[:40]}'")
         self._append_log("player", user_text)
@@ -288,7 +297,12 @@ class CouncilManager:
                 f"[DEBUG:Council] call Actor.speak() for partner_role={self.partner_role}, "
                 f"partner_name={getattr(self.partner, 'name', self.partner_role)}"
             )
-            reply = actor.speak(self.conversation_log)
+            if stream:
+                st.markdown(f"**{getattr(self.partner, 'name', self.partner_role)}**")
+                st.write_stream(actor.speak_stream(self.conversation_log))
+                reply = actor.last_reply
+            else:
+                reply = actor.speak(self.conversation_log)
             self._append_log(self.partner_role, reply)
 
         return reply
@@ -467,8 +481,12 @@ class CouncilManager:
                     st.info("いま処理中です。少し待ってから再度お試しください。")
                 else:
                     st.session_state["council_sending"] = True
-                    with st.spinner(f"{getattr(self.partner, 'name', '相手')}は少し考えています…"):
-                        self.proceed(cleaned)
+                    if getattr(self, "stream_reply", False):
+                        # 返答はトークン単位で逐次描画する（スピナーで待たせない）
+                        self.proceed(cleaned, stream=True)
+                    else:
+                        with st.spinner(f"{getattr(self.partner, 'name', '相手')}は少し考えています…"):
+                            self.proceed(cleaned)
                     st.session_state["council_sending"] = False
                     st.rerun()
 
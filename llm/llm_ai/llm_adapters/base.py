@@ -1,7 +1,11 @@
 # llm/llm_ai/llm_adapters/base.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import asyncio
+
+# LLMAI からタイムアウトが渡されなかったときの 1 リクエストの秒数
+DEFAULT_TIMEOUT_SEC: float = 60.0
 
 
 class BaseLLMAdapter:
@@ -10,6 +14,15 @@ class BaseLLMAdapter:
 
     - name:  論理モデル名（"gpt51", "grok", "gemini", "hermes", "llama_unc" など）
     - call:  (messages, **kwargs) -> (text, usage_dict or None)
+    - acall: call の非同期版（同じ戻り値）。
+    - stream: (messages, **kwargs) -> Iterator[str]（テキスト差分を順に yield）
+
+    kwargs の "timeout" は LLMAI が渡す 1 リクエストの秒数（ターンの残り予算と学習済み p99 の小さい方）。
+    ベンダーへはパラメータとして送らず、HTTP / SDK のタイムアウトに使うこと（pop_timeout）。
+
+    acall の既定実装は call をワーカースレッドへ逃がすだけなので、
+    ベンダー SDK / 非同期 HTTP クライアントで上書きできる Adapter は上書きすること。
+    stream の既定実装も call の結果を 1 チャンクで返すだけ（ストリーミング非対応扱い）。
     """
 
     name: str = ""
@@ -17,9 +30,36 @@ class BaseLLMAdapter:
     # モデルごとの「推奨トークン長」（未指定なら Adapter 実装に任せる）
     TARGET_TOKENS: Optional[int] = None
 
+    @staticmethod
+    def pop_timeout(kwargs: Dict[str, Any]) -> float:
+        """
+        kwargs から "timeout" を取り除いて返す（無ければ DEFAULT_TIMEOUT_SEC）。
+        """
+        value = kwargs.pop("timeout", None)
+        try:
+            return float(value) if value is not None else DEFAULT_TIMEOUT_SEC
+        except (TypeError, ValueError):
+            return DEFAULT_TIMEOUT_SEC
+
     def call(
         self,
         messages: List[Dict[str, str]],
         **kwargs: Any,
     ) -> Tuple[str, Optional[Dict[str, Any]]]:
         raise NotImplementedError
+
+    async def acall(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        return await asyncio.to_thread(self.call, messages, **kwargs)
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        text, _ = self.call(messages, **kwargs)
+        if text:
+            yield text
@@ -1,12 +1,20 @@
 # llm2/llm_ai/llm_adapters/gemini.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
-import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import logging
-import requests
 
-from llm.llm_ai.llm_adapters.base import BaseLLMAdapter
+from llm.llm_ai.llm_adapters.base import DEFAULT_TIMEOUT_SEC, BaseLLMAdapter
+from llm.llm_ai.llm_adapters.gemini_cache import (
+    DEFAULT_ENDPOINT as CACHE_ENDPOINT,
+    GeminiContextCache,
+    get_gemini_context_cache,
+    is_stale_handle_error,
+)
+from llm.llm_ai.llm_adapters.http_pool import get_async_http_client, get_http_client
+from llm.llm_ai.llm_errors import LLMCallError, LLMRateLimitError, to_llm_error
+from llm.llm_ai.llm_keys import KeyPool, get_key_pool
+from llm.llm_ai.llm_adapters.utils import attach_samples, iter_sse_json
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +25,17 @@ class GeminiAdapter(BaseLLMAdapter):
 
     - OpenAI 互換ではないため REST API を直接呼び出す
     - Flash 系は短文になりがちなので、やや長めの maxOutputTokens を標準にする
+    - call / acall とも http_pool の共有 keep-alive クライアントを使う
+    - API キーはクエリではなく x-goog-api-key ヘッダで送る（エラー文に URL ごと残らないように）
+    - API キーは llm_keys のプール（複数キーならラウンドロビン、429 のキーは飛ばして次のキーで再送）
+    - stream は streamGenerateContent?alt=sse を読む
+    - 先頭の system（persona の人格）が十分長ければ cachedContents に載せ、
+      以降は cachedContent 指定で送る（gemini_cache。期限切れ・削除済みなら通常送信でやり直す）
     """
 
+    # http_pool のプールキー（LLMAI の vendor と揃える）
+    VENDOR = "google"
+
     def __init__(
         self,
         *,
@@ -29,15 +46,51 @@ class GeminiAdapter(BaseLLMAdapter):
         self.name = name
         self.model_id = model_id
 
-        self._api_key = os.getenv(env_key, "")
-        self._endpoint = (
+        self._env_key = env_key
+        model_url = (
             "https://generativelanguage.googleapis.com/v1beta/models/"
-            f"{self.model_id}:generateContent"
+            f"{self.model_id}"
         )
+        self._endpoint = f"{model_url}:generateContent"
+        self._stream_endpoint = f"{model_url}:streamGenerateContent"
+        self._cache_endpoint = CACHE_ENDPOINT
 
         # Flash らしさは保ちつつ、短すぎない程度
         self.TARGET_TOKENS = 400
 
+    @property
+    def _keys(self) -> KeyPool:
+        return get_key_pool(self._env_key)
+
+    @property
+    def _context_cache(self) -> GeminiContextCache:
+        return get_gemini_context_cache()
+
+    def _cacheable_prefix(
+        self,
+        messages: List[Dict[str, str]],
+    ) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        (キャッシュに載せる先頭 system の本文, 残りの messages)。載せないなら ("", messages)。
+        """
+        if len(messages) < 2 or messages[0].get("role") != "system":
+            return "", messages
+        prefix = messages[0].get("content", "") or ""
+        if not self._context_cache.eligible(prefix):
+            return "", messages
+        return prefix, messages[1:]
+
+    def _with_cached_content(
+        self,
+        params: Dict[str, Any],
+        rest: List[Dict[str, str]],
+        handle: str,
+    ) -> Dict[str, Any]:
+        """
+        prefix を cachedContent 参照に置き換えた generateContent ボディ。
+        """
+        return {**params, "contents": self._to_gemini_contents(rest), "cachedContent": handle}
+
     def _to_gemini_contents(
         self,
         messages: List[Dict[str, str]],
@@ -57,51 +110,235 @@ class GeminiAdapter(BaseLLMAdapter):
             )
         return contents
 
-    def call(
+    def _build_payload(
         self,
         messages: List[Dict[str, str]],
-        **kwargs: Any,
-    ) -> Tuple[str, Optional[Dict[str, Any]]]:
-        if not self._api_key:
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        call / acall 共通：generateContent の JSON ボディを組み立てる。
+        """
+        if not len(self._keys):
             raise RuntimeError("GEMINI_API_KEY が設定されていません。")
 
-        # OpenAI / Lyra 内部用パラメータは捨てる
-        for k in ("mode", "judge_mode", "max_tokens", "max_completion_tokens"):
+        # OpenAI 形式の上限（長さの予算など）は maxOutputTokens に読み替える
+        max_tokens = kwargs.pop("max_completion_tokens", None)
+        if max_tokens is None:
+            max_tokens = kwargs.pop("max_tokens", None)
+        kwargs.pop("max_tokens", None)
+
+        # Lyra 内部用パラメータは捨てる
+        for k in ("mode", "judge_mode"):
             kwargs.pop(k, None)
 
         params: Dict[str, Any] = {
             "contents": self._to_gemini_contents(messages),
         }
 
-        # generationConfig 未指定なら TARGET_TOKENS を反映
-        if self.TARGET_TOKENS is not None and "generationConfig" not in kwargs:
+        # maxOutputTokens 未指定なら max_tokens、それも無ければ TARGET_TOKENS を反映
+        # （call_json は responseSchema 入りの generationConfig を渡してくる）
+        gen = kwargs.get("generationConfig")
+        if max_tokens is None:
+            max_tokens = self.TARGET_TOKENS
+        if max_tokens is not None and not (isinstance(gen, dict) and "maxOutputTokens" in gen):
+            gen = kwargs["generationConfig"] = {
+                **(gen if isinstance(gen, dict) else {}),
+                "maxOutputTokens": int(max_tokens),
+            }
+
+        # OpenAI 形式の n（1 リクエストで複数サンプル）は candidateCount に読み替える
+        n = kwargs.pop("n", None)
+        if n is not None and int(n) > 1:
             kwargs["generationConfig"] = {
-                "maxOutputTokens": int(self.TARGET_TOKENS),
+                **(gen if isinstance(gen, dict) else {}),
+                "candidateCount": int(n),
             }
 
         params.update(kwargs)
+        return params
+
+    @staticmethod
+    def _parse_response(data: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        text = ""
+        samples: List[str] = []
+        try:
+            # candidateCount > 1 なら候補が複数届く（先頭が text、全部を samples に）
+            for cand in data.get("candidates") or []:
+                parts = cand.get("content", {}).get("parts", [])
+                samples.append((parts[0].get("text", "") or "") if parts else "")
+            if samples:
+                text = samples[0]
+        except Exception:
+            logger.exception("Gemini response parse error")
+
+        # usageMetadata を OpenAI 形式（prompt/completion/total_tokens）に揃える
+        usage: Optional[Dict[str, Any]] = None
+        meta = data.get("usageMetadata")
+        if isinstance(meta, dict):
+            usage = {
+                "prompt_tokens": int(meta.get("promptTokenCount") or 0),
+                "completion_tokens": int(meta.get("candidatesTokenCount") or 0),
+                "total_tokens": int(meta.get("totalTokenCount") or 0),
+                "cached_tokens": int(meta.get("cachedContentTokenCount") or 0),
+            }
+
+        return attach_samples(text, usage, samples)
 
+    @staticmethod
+    def _parse_stream_chunk(data: Dict[str, Any]) -> str:
+        """
+        ストリームの各チャンク（GenerateContentResponse）は parts が細切れで届くので連結する。
+        """
         try:
-            resp = requests.post(
+            cands = data.get("candidates") or []
+            if cands:
+                parts = cands[0].get("content", {}).get("parts", []) or []
+                return "".join(p.get("text", "") or "" for p in parts)
+        except Exception:
+            logger.exception("Gemini stream chunk parse error")
+        return ""
+
+    def _post(
+        self,
+        key: str,
+        body: Dict[str, Any],
+        timeout: float = DEFAULT_TIMEOUT_SEC,
+    ) -> Dict[str, Any]:
+        try:
+            resp = get_http_client(self.VENDOR).post(
                 self._endpoint,
-                params={"key": self._api_key},
-                json=params,
-                timeout=60,
+                headers={"x-goog-api-key": key},
+                json=body,
+                timeout=timeout,
             )
             resp.raise_for_status()
-            data = resp.json()
+            return resp.json()
         except Exception as e:
             logger.exception("%s: Gemini call failed", self.name)
-            raise RuntimeError(f"{self.name}: Gemini call failed: {e}")
+            raise to_llm_error(f"{self.name}: Gemini call failed: {e}", e)
 
-        text = ""
+    async def _apost(
+        self,
+        key: str,
+        body: Dict[str, Any],
+        timeout: float = DEFAULT_TIMEOUT_SEC,
+    ) -> Dict[str, Any]:
         try:
-            cands = data.get("candidates") or []
-            if cands:
-                parts = cands[0].get("content", {}).get("parts", [])
-                if parts:
-                    text = parts[0].get("text", "") or ""
-        except Exception:
-            logger.exception("Gemini response parse error")
+            resp = await get_async_http_client(self.VENDOR).post(
+                self._endpoint,
+                headers={"x-goog-api-key": key},
+                json=body,
+                timeout=timeout,
+            )
+            resp.raise_for_status()
+            return resp.json()
+        except Exception as e:
+            logger.exception("%s: Gemini async call failed", self.name)
+            raise to_llm_error(f"{self.name}: Gemini call failed: {e}", e)
+
+    def call(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        timeout = self.pop_timeout(kwargs)
+        params = self._build_payload(messages, kwargs)
+        prefix, rest = self._cacheable_prefix(messages)
+
+        def once(key: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+            handle = (
+                self._context_cache.handle_for(
+                    self.model_id, key, prefix, endpoint=self._cache_endpoint, timeout=timeout
+                )
+                if prefix
+                else None
+            )
+            if handle is None:
+                return self._parse_response(self._post(key, params, timeout))
+            try:
+                data = self._post(key, self._with_cached_content(params, rest, handle), timeout)
+            except LLMCallError as e:
+                if not is_stale_handle_error(e):
+                    raise
+                self._context_cache.invalidate(self.model_id, key, prefix)
+                data = self._post(key, params, timeout)
+            return self._parse_response(data)
+
+        return self._keys.run(once, usage_of=lambda result: result[1])
 
-        return text, None
+    async def acall(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        timeout = self.pop_timeout(kwargs)
+        params = self._build_payload(messages, kwargs)
+        prefix, rest = self._cacheable_prefix(messages)
+
+        async def once(key: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+            handle = (
+                await self._context_cache.ahandle_for(
+                    self.model_id, key, prefix, endpoint=self._cache_endpoint, timeout=timeout
+                )
+                if prefix
+                else None
+            )
+            if handle is None:
+                return self._parse_response(await self._apost(key, params, timeout))
+            try:
+                data = await self._apost(key, self._with_cached_content(params, rest, handle), timeout)
+            except LLMCallError as e:
+                if not is_stale_handle_error(e):
+                    raise
+                self._context_cache.invalidate(self.model_id, key, prefix)
+                data = await self._apost(key, params, timeout)
+            return self._parse_response(data)
+
+        return await self._keys.arun(once, usage_of=lambda result: result[1])
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        timeout = self.pop_timeout(kwargs)
+        # ストリームは 1 サンプルだけ
+        kwargs.pop("n", None)
+        params = self._build_payload(messages, kwargs)
+        prefix, rest = self._cacheable_prefix(messages)
+
+        # ストリームは途中でキーを替えられないので 1 本に決める（429 ならそのキーを休ませる）
+        key = self._keys.acquire()
+
+        handle = (
+            self._context_cache.handle_for(
+                self.model_id, key, prefix, endpoint=self._cache_endpoint, timeout=timeout
+            )
+            if prefix
+            else None
+        )
+        body = self._with_cached_content(params, rest, handle) if handle else params
+
+        try:
+            with get_http_client(self.VENDOR).stream(
+                "POST",
+                self._stream_endpoint,
+                params={"alt": "sse"},
+                headers={"x-goog-api-key": key},
+                json=body,
+                timeout=timeout,
+            ) as resp:
+                resp.raise_for_status()
+                for chunk in iter_sse_json(resp.iter_lines()):
+                    text = self._parse_stream_chunk(chunk)
+                    if text:
+                        yield text
+        except Exception as e:
+            logger.exception("%s: Gemini stream failed", self.name)
+            err = to_llm_error(f"{self.name}: Gemini stream failed: {e}", e)
+            if isinstance(err, LLMRateLimitError):
+                self._keys.penalize(key, err.retry_after)
+            if handle and is_stale_handle_error(err):
+                # 次の呼び出しでは作り直す
+                self._context_cache.invalidate(self.model_id, key, prefix)
+            raise err
@@ -0,0 +1,247 @@
+# llm/llm_ai/llm_adapters/gemini_cache.py
+"""
+Gemini の cachedContents（明示的コンテキストキャッシュ）のハンドル管理（GeminiAdapter から利用）。
+
+- messages 先頭の system（persona の人格 = 毎ターン同じ stable prefix）を
+  systemInstruction として cachedContents に 1 度だけ登録し、
+  以降の generateContent は cachedContent: "cachedContents/..." を指定して本文から外す
+- ハンドルは (model_id, API キー, prefix の sha256) ごとにプロセス共有
+  （キャッシュはプロジェクト = キー単位なので、キーが違えば別ハンドル。persona ごとに prefix が違う）
+- TTL の少し手前で作り直す
+- 短すぎる prefix（最小トークン数未満）や非対応モデルで作成が 4xx になったら覚えておき、
+  その組み合わせでは以後作成を試さない（通常送信のまま）
+- 作成が 429 / 5xx / 通信エラーなら今回だけ通常送信
+
+設定（環境変数）:
+  LYRA_GEMINI_CACHE           : "0" で無効（既定 有効）
+  LYRA_GEMINI_CACHE_TTL_SEC   : cachedContents の TTL 秒（既定 3600）
+  LYRA_GEMINI_CACHE_MIN_CHARS : これより短い prefix はキャッシュしない（既定 4096）
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Set, Tuple
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from llm.llm_ai.llm_adapters.base import DEFAULT_TIMEOUT_SEC
+from llm.llm_ai.llm_adapters.http_pool import get_async_http_client, get_http_client
+from llm.llm_ai.llm_errors import LLMCallError, LLMRateLimitError, to_llm_error
+from llm.llm_ai.llm_keys import mask_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/cachedContents"
+
+# (model_id, api_key, prefix_sha256)
+_Ident = Tuple[str, str, str]
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, "") or default)
+    except ValueError:
+        return default
+
+
+def cache_enabled() -> bool:
+    return os.getenv("LYRA_GEMINI_CACHE", "1").strip().lower() not in ("0", "false", "off")
+
+
+def prefix_hash(prefix: str) -> str:
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+
+def is_stale_handle_error(exc: BaseException) -> bool:
+    """
+    generateContent が cachedContent を使えなかった（期限切れ・削除済み）と読める失敗か。
+    """
+    if not isinstance(exc, LLMCallError) or isinstance(exc, LLMRateLimitError):
+        return False
+    if exc.status_code in (403, 404):
+        return True
+    text = f"{exc.body or ''} {exc}".lower()
+    return exc.status_code == 400 and "cachedcontent" in text.replace("_", "")
+
+
+class GeminiContextCache:
+    """
+    cachedContents のハンドル置き場。スレッドセーフ。
+    """
+
+    def __init__(self, *, ttl_sec: int = 3600, min_chars: int = 4096) -> None:
+        self.ttl_sec = max(60, int(ttl_sec))
+        self.min_chars = max(0, int(min_chars))
+
+        self._lock = threading.Lock()
+        # ident -> (cachedContents 名, 作り直す時刻 monotonic, 文字数)
+        self._handles: Dict[_Ident, Tuple[str, float, int]] = {}
+        self._hits: Dict[_Ident, int] = {}
+        self._rejected: Set[_Ident] = set()
+        self._stats: Dict[str, int] = {"created": 0, "hits": 0, "create_failed": 0, "invalidated": 0}
+
+    # ------------------------------------------------------------
+    # 判定 / 参照
+    # ------------------------------------------------------------
+    def eligible(self, prefix: str) -> bool:
+        return bool(prefix) and cache_enabled() and len(prefix) >= self.min_chars
+
+    def _lookup(self, ident: _Ident) -> Optional[str]:
+        with self._lock:
+            entry = self._handles.get(ident)
+            if entry is not None and entry[1] > time.monotonic():
+                self._hits[ident] = self._hits.get(ident, 0) + 1
+                self._stats["hits"] += 1
+                return entry[0]
+            self._handles.pop(ident, None)
+            return None
+
+    def _skip(self, ident: _Ident) -> bool:
+        with self._lock:
+            return ident in self._rejected
+
+    def invalidate(self, model_id: str, api_key: str, prefix: str) -> None:
+        ident = (model_id, api_key, prefix_hash(prefix))
+        with self._lock:
+            if self._handles.pop(ident, None) is not None:
+                self._stats["invalidated"] += 1
+
+    # ------------------------------------------------------------
+    # 作成
+    # ------------------------------------------------------------
+    def _create_body(self, model_id: str, prefix: str, digest: str) -> Dict[str, Any]:
+        return {
+            "model": f"models/{model_id}",
+            "displayName": f"lyra-{digest[:12]}",
+            "systemInstruction": {"parts": [{"text": prefix}]},
+            "ttl": f"{self.ttl_sec}s",
+        }
+
+    def _store(self, ident: _Ident, data: Dict[str, Any], chars: int) -> Optional[str]:
+        name = data.get("name") if isinstance(data, dict) else None
+        if not isinstance(name, str) or not name:
+            return None
+        # 期限ぎりぎりで使うと generateContent 側で切れるので少し手前で作り直す
+        refresh_at = time.monotonic() + self.ttl_sec - min(60.0, self.ttl_sec * 0.1)
+        with self._lock:
+            self._handles[ident] = (name, refresh_at, chars)
+            self._stats["created"] += 1
+        logger.info("gemini cachedContents created: model_id=%s name=%s chars=%s", ident[0], name, chars)
+        return name
+
+    def _on_create_error(self, ident: _Ident, exc: BaseException) -> None:
+        err = exc if isinstance(exc, LLMCallError) else to_llm_error(str(exc), exc)
+        with self._lock:
+            self._stats["create_failed"] += 1
+            # 4xx（429 以外）は「この prefix / モデルでは作れない」ので二度と試さない
+            if err.status_code is not None and 400 <= err.status_code < 500 and err.status_code != 429:
+                self._rejected.add(ident)
+        logger.warning("gemini cachedContents create failed (uncached call): model_id=%s err=%s", ident[0], err)
+
+    def handle_for(
+        self,
+        model_id: str,
+        api_key: str,
+        prefix: str,
+        *,
+        endpoint: str = DEFAULT_ENDPOINT,
+        timeout: float = DEFAULT_TIMEOUT_SEC,
+    ) -> Optional[str]:
+        """
+        prefix 用の cachedContents 名（無ければ作る）。使えなければ None。
+        timeout は作成リクエストの秒数（generateContent と同じ 1 リクエスト分の予算から）。
+        """
+        if not self.eligible(prefix):
+            return None
+        digest = prefix_hash(prefix)
+        ident = (model_id, api_key, digest)
+        name = self._lookup(ident)
+        if name is not None or self._skip(ident):
+            return name
+        try:
+            resp = get_http_client("google").post(
+                endpoint,
+                headers={"x-goog-api-key": api_key},
+                json=self._create_body(model_id, prefix, digest),
+                timeout=timeout,
+            )
+            resp.raise_for_status()
+            return self._store(ident, resp.json(), len(prefix))
+        except Exception as e:
+            self._on_create_error(ident, e)
+            return None
+
+    async def ahandle_for(
+        self,
+        model_id: str,
+        api_key: str,
+        prefix: str,
+        *,
+        endpoint: str = DEFAULT_ENDPOINT,
+        timeout: float = DEFAULT_TIMEOUT_SEC,
+    ) -> Optional[str]:
+        if not self.eligible(prefix):
+            return None
+        digest = prefix_hash(prefix)
+        ident = (model_id, api_key, digest)
+        name = self._lookup(ident)
+        if name is not None or self._skip(ident):
+            return name
+        try:
+            resp = await get_async_http_client("google").post(
+                endpoint,
+                headers={"x-goog-api-key": api_key},
+                json=self._create_body(model_id, prefix, digest),
+                timeout=timeout,
+            )
+            resp.raise_for_status()
+            return self._store(ident, resp.json(), len(prefix))
+        except Exception as e:
+            self._on_create_error(ident, e)
+            return None
+
+    # ------------------------------------------------------------
+    # 表示
+    # ------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                **self._stats,
+                "rejected": len(self._rejected),
+                "handles": [
+                    {
+                        "model_id": model_id,
+                        "key": mask_key(api_key),
+                        "prefix": digest[:12],
+                        "chars": chars,
+                        "hits": self._hits.get((model_id, api_key, digest), 0),
+                        "refresh_in_sec": round(max(0.0, refresh_at - now), 1),
+                    }
+                    for (model_id, api_key, digest), (_, refresh_at, chars) in sorted(self._handles.items())
+                ],
+            }
+
+
+# ============================================================
+# プロセス共有
+# ============================================================
+_LOCK = threading.Lock()
+_CACHE: Optional[GeminiContextCache] = None
+
+
+def get_gemini_context_cache() -> GeminiContextCache:
+    global _CACHE
+    with _LOCK:
+        if _CACHE is None:
+            _CACHE = GeminiContextCache(
+                ttl_sec=_env_int("LYRA_GEMINI_CACHE_TTL_SEC", 3600),
+                min_chars=_env_int("LYRA_GEMINI_CACHE_MIN_CHARS", 4096),
+            )
+        return _CACHE
+
+
+def get_gemini_cache_stats() -> Dict[str, Any]:
+    return get_gemini_context_cache().stats()
@@ -1,17 +1,33 @@
 # llm/llm_ai/llm_adapters/grok.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
-import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import logging
-import requests
 
-from llm.llm_ai.llm_adapters.base import BaseLLMAdapter
-from llm.llm_ai.llm_adapters.utils import split_text_and_usage_from_dict
+from llm.llm_ai.llm_adapters.base import DEFAULT_TIMEOUT_SEC, BaseLLMAdapter
+from llm.llm_ai.llm_adapters.http_pool import get_async_http_client, get_http_client
+from llm.llm_ai.llm_capabilities import MAX_LEARN_RETRIES, get_capability_cache
+from llm.llm_ai.llm_errors import LLMRateLimitError, to_llm_error
+from llm.llm_ai.llm_keys import KeyPool, get_key_pool
+from llm.llm_ai.llm_adapters.utils import (
+    acontinue_truncated,
+    attach_samples,
+    continue_truncated,
+    delta_text_from_chat_chunk,
+    finish_reason_of,
+    iter_sse_json,
+    sample_texts,
+    split_text_and_usage_from_dict,
+    without_samples,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _data_usage(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return split_text_and_usage_from_dict(data)[1]
+
+
 class GrokAdapter(BaseLLMAdapter):
     """
     xAI Grok 用アダプタ。
@@ -20,8 +36,15 @@ class GrokAdapter(BaseLLMAdapter):
       POST https://api.x.ai/v1/chat/completions
       Authorization: Bearer $XAI_API_KEY
       model: grok-4 (など)
+
+    call / acall とも http_pool の共有 keep-alive クライアントで同じリクエストを送る。
+    400 で弾かれたパラメータは llm_capabilities に学習させ、落として再送する。
+    length で打ち切られた返答は、全文を作り直さずに続きだけを取ってつなぐ（continuation）。
     """
 
+    # http_pool のプールキー（LLMAI の vendor と揃える）
+    VENDOR = "xai"
+
     def __init__(
         self,
         *,
@@ -35,20 +58,22 @@ class GrokAdapter(BaseLLMAdapter):
         self.model_id = model_id
 
         self._endpoint = "https://api.x.ai/v1/chat/completions"
-        self._api_key = os.getenv(env_key_primary, "") or os.getenv(env_key_fallback, "")
+        self._env_keys = (env_key_primary, env_key_fallback)
 
         self.TARGET_TOKENS = 480
 
-    def call(
+    def _build_request(
         self,
         messages: List[Dict[str, str]],
-        **kwargs: Any,
-    ) -> Tuple[str, Optional[Dict[str, Any]]]:
-        if not self._api_key:
+        kwargs: Dict[str, Any],
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """
+        call / acall 共通：(headers, payload) を組み立てる。
+        """
+        if not len(self._keys):
             raise RuntimeError("XAI_API_KEY (or GROK_API_KEY) が設定されていません。")
 
         headers = {
-            "Authorization": f"Bearer {self._api_key}",
             "Content-Type": "application/json",
         }
 
@@ -60,19 +85,173 @@ class GrokAdapter(BaseLLMAdapter):
         if self.TARGET_TOKENS is not None and "max_tokens" not in kwargs:
             kwargs["max_tokens"] = int(self.TARGET_TOKENS)
 
-        payload.update(kwargs)
+        # このモデルが 400 で弾いたことのあるパラメータは送らない
+        payload.update(get_capability_cache().sanitize(self.model_id, kwargs))
+        return headers, payload
+
+    @property
+    def _keys(self) -> KeyPool:
+        return get_key_pool(*self._env_keys)
+
+    def _drop_rejected(self, resp: Any, payload: Dict[str, Any]) -> bool:
+        """
+        400 の本文から「受け付けないパラメータ」を学習し、payload から落とす。
+        落としたものがあれば True（再送する価値がある）。
+        """
+        dropped = get_capability_cache().learn_from_response(self.model_id, resp, payload)
+        for key in dropped:
+            payload.pop(key, None)
+        return bool(dropped)
+
+    def _send(
+        self,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        timeout: float = DEFAULT_TIMEOUT_SEC,
+    ) -> Dict[str, Any]:
+        """
+        1 リクエストを送って応答 JSON を返す（弾かれたパラメータの学習・再送込み）。
+        キーはプールから順に使い、429 を受けたキーは休ませて次のキーで再送する。
+        """
+        def once(key: str) -> Dict[str, Any]:
+            try:
+                for attempt in range(MAX_LEARN_RETRIES + 1):
+                    resp = get_http_client(self.VENDOR).post(
+                        self._endpoint,
+                        headers={**headers, "Authorization": f"Bearer {key}"},
+                        json=payload,
+                        timeout=timeout,
+                    )
+                    # 弾かれたパラメータがあれば学習して落とし、再送する
+                    if attempt < MAX_LEARN_RETRIES and self._drop_rejected(resp, payload):
+                        continue
+                    break
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                logger.exception("%s: Grok call failed", self.name)
+                raise to_llm_error(f"{self.name}: Grok call failed: {e}", e)
+
+            return data
+
+        return self._keys.run(once, usage_of=_data_usage)
+
+    def call(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        timeout = self.pop_timeout(kwargs)
+        headers, payload = self._build_request(messages, kwargs)
+        data = self._send(headers, payload, timeout)
+        text, usage = split_text_and_usage_from_dict(data)
+
+        # length で途中まで返ってきたら、作り直さずに続きを頼んでつなぐ
+        def send_more(msgs: List[Dict[str, str]]) -> Tuple[str, Optional[Dict[str, Any]], str]:
+            more = self._send(headers, {**without_samples(payload), "messages": msgs}, timeout)
+            return (*split_text_and_usage_from_dict(more), finish_reason_of(more))
+
+        # n>1 なら 2 件目以降は usage["samples"] へ（continuation は先頭のサンプルだけ）
+        return attach_samples(
+            *continue_truncated(send_more, messages, text, usage, finish_reason_of(data), label=self.name),
+            sample_texts(data),
+        )
+
+    async def _asend(
+        self,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        timeout: float = DEFAULT_TIMEOUT_SEC,
+    ) -> Dict[str, Any]:
+        """
+        1 リクエストを送って応答 JSON を返す（弾かれたパラメータの学習・再送込み）。
+        キーはプールから順に使い、429 を受けたキーは休ませて次のキーで再送する。
+        """
+        async def once(key: str) -> Dict[str, Any]:
+            try:
+                for attempt in range(MAX_LEARN_RETRIES + 1):
+                    resp = await get_async_http_client(self.VENDOR).post(
+                        self._endpoint,
+                        headers={**headers, "Authorization": f"Bearer {key}"},
+                        json=payload,
+                        timeout=timeout,
+                    )
+                    # 弾かれたパラメータがあれば学習して落とし、再送する
+                    if attempt < MAX_LEARN_RETRIES and self._drop_rejected(resp, payload):
+                        continue
+                    break
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                logger.exception("%s: Grok async call failed", self.name)
+                raise to_llm_error(f"{self.name}: Grok call failed: {e}", e)
+
+            return data
+
+        return await self._keys.arun(once, usage_of=_data_usage)
+
+    async def acall(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        timeout = self.pop_timeout(kwargs)
+        headers, payload = self._build_request(messages, kwargs)
+        data = await self._asend(headers, payload, timeout)
+        text, usage = split_text_and_usage_from_dict(data)
+
+        # length で途中まで返ってきたら、作り直さずに続きを頼んでつなぐ
+        async def send_more(msgs: List[Dict[str, str]]) -> Tuple[str, Optional[Dict[str, Any]], str]:
+            more = await self._asend(headers, {**without_samples(payload), "messages": msgs}, timeout)
+            return (*split_text_and_usage_from_dict(more), finish_reason_of(more))
+
+        return attach_samples(
+            *await acontinue_truncated(
+                send_more, messages, text, usage, finish_reason_of(data), label=self.name
+            ),
+            sample_texts(data),
+        )
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """
+        stream=True の SSE を読み、テキスト差分を yield する。
+        """
+        timeout = self.pop_timeout(kwargs)
+        headers, payload = self._build_request(messages, kwargs)
+        payload["stream"] = True
+        # ストリームは 1 サンプルだけ
+        payload.pop("n", None)
+
+        # ストリームは途中でキーを替えられないので 1 本に決める（429 ならそのキーを休ませる）
+        key = self._keys.acquire()
+        headers = {**headers, "Authorization": f"Bearer {key}"}
 
         try:
-            resp = requests.post(
-                self._endpoint,
-                headers=headers,
-                json=payload,
-                timeout=60,
-            )
-            resp.raise_for_status()
-            data = resp.json()
+            for attempt in range(MAX_LEARN_RETRIES + 1):
+                with get_http_client(self.VENDOR).stream(
+                    "POST",
+                    self._endpoint,
+                    headers=headers,
+                    json=payload,
+                    timeout=timeout,
+                ) as resp:
+                    if attempt < MAX_LEARN_RETRIES and resp.status_code in (400, 422):
+                        resp.read()
+                        if self._drop_rejected(resp, payload):
+                            continue
+                    resp.raise_for_status()
+                    for chunk in iter_sse_json(resp.iter_lines()):
+                        text = delta_text_from_chat_chunk(chunk)
+                        if text:
+                            yield text
+                break
         except Exception as e:
-            logger.exception("%s: Grok call failed", self.name)
-            raise RuntimeError(f"{self.name}: Grok call failed: {e}")
-
-        return split_text_and_usage_from_dict(data)
+            logger.exception("%s: Grok stream failed", self.name)
+            err = to_llm_error(f"{self.name}: Grok stream failed: {e}", e)
+            if isinstance(err, LLMRateLimitError):
+                self._keys.penalize(key, err.retry_after)
+            raise err
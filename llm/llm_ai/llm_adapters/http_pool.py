@@ -0,0 +1,300 @@
+# llm/llm_ai/llm_adapters/http_pool.py
+"""
+プロセス共有の HTTP コネクションプール。
+
+- ベンダーごとに keep-alive な httpx.Client を 1 つだけ持ち、全 Adapter で使い回す
+  （毎ターンの DNS / TCP / TLS ハンドシェイクを払わない）
+- 非同期側はイベントループごとに httpx.AsyncClient を 1 つ持つ
+  （AsyncClient はループをまたいで使えないため）
+- OpenAI SDK のクライアントも同じ httpx.Client の上に載せて共有する
+  （SDK 内蔵の自動リトライは切る。再送は LLMAI の RetryPolicy に一本化）
+- 統計（リクエスト数・新規接続数・再利用率・オープン接続数）を get_pool_stats() で返す
+- レスポンスヘッダ受信までの秒数（TTFB）を llm_metrics に渡す
+
+設定（環境変数）:
+  LYRA_HTTP_POOL_SIZE : ベンダーごとの最大接続数（既定 10）
+  LYRA_HTTP2          : "1" で HTTP/2 を有効化（h2 パッケージが必要。無ければ HTTP/1.1）
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+
+import httpx
+
+from llm.llm_ai.llm_adapters.base import DEFAULT_TIMEOUT_SEC
+from llm.llm_ai.llm_metrics import note_ttfb
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(key, "") or default))
+    except ValueError:
+        return default
+
+
+_POOL_SIZE: int = _env_int("LYRA_HTTP_POOL_SIZE", 10)
+_HTTP2: bool = os.getenv("LYRA_HTTP2", "0") == "1"
+_KEEPALIVE_EXPIRY_SEC: float = 30.0
+
+_LOCK = threading.Lock()
+_CLIENTS: Dict[str, httpx.Client] = {}
+_ASYNC_CLIENTS: Dict[str, "weakref.WeakKeyDictionary[Any, httpx.AsyncClient]"] = {}
+_OPENAI_CLIENTS: Dict[Tuple[str, str, str], Any] = {}
+_ASYNC_OPENAI_CLIENTS: Dict[Tuple[str, str, str], "weakref.WeakKeyDictionary[Any, Any]"] = {}
+_STATS: Dict[str, Dict[str, int]] = {}
+
+
+# ============================================================
+# 統計
+# ============================================================
+def _bump(vendor: str, key: str) -> None:
+    with _LOCK:
+        st = _STATS.setdefault(vendor, {"requests": 0, "new_connections": 0})
+        st[key] = st.get(key, 0) + 1
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    """
+    httpcore の trace フックで「新規 TCP 接続」を数える Transport。
+    """
+
+    def __init__(self, vendor: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._vendor = vendor
+
+    def _trace(self, name: str, info: Dict[str, Any]) -> None:
+        if name == "connection.connect_tcp.complete":
+            _bump(self._vendor, "new_connections")
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        _bump(self._vendor, "requests")
+        request.extensions = {**request.extensions, "trace": self._trace}
+        t0 = time.monotonic()
+        response = super().handle_request(request)
+        # ここで返るのはヘッダ受信時点（本文はまだ読んでいない）
+        note_ttfb(time.monotonic() - t0)
+        return response
+
+
+class _AsyncCountingTransport(httpx.AsyncHTTPTransport):
+    """
+    _CountingTransport の非同期版（trace コールバックはコルーチンである必要がある）。
+    """
+
+    def __init__(self, vendor: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._vendor = vendor
+
+    async def _trace(self, name: str, info: Dict[str, Any]) -> None:
+        if name == "connection.connect_tcp.complete":
+            _bump(self._vendor, "new_connections")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        _bump(self._vendor, "requests")
+        request.extensions = {**request.extensions, "trace": self._trace}
+        t0 = time.monotonic()
+        response = await super().handle_async_request(request)
+        note_ttfb(time.monotonic() - t0)
+        return response
+
+
+def _http2_enabled() -> bool:
+    if not _HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except Exception:
+        logger.warning("LYRA_HTTP2=1 but 'h2' is not installed; falling back to HTTP/1.1")
+        return False
+
+
+def _transport_kwargs() -> Dict[str, Any]:
+    return {
+        "http2": _http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=_POOL_SIZE,
+            max_keepalive_connections=_POOL_SIZE,
+            keepalive_expiry=_KEEPALIVE_EXPIRY_SEC,
+        ),
+    }
+
+
+# ============================================================
+# 公開 API
+# ============================================================
+def configure_pool(*, pool_size: Optional[int] = None, http2: Optional[bool] = None) -> None:
+    """
+    プール設定を変更する。既存クライアントは閉じ、次回取得時に新設定で作り直す。
+    """
+    global _POOL_SIZE, _HTTP2
+    with _LOCK:
+        if pool_size is not None:
+            _POOL_SIZE = max(1, int(pool_size))
+        if http2 is not None:
+            _HTTP2 = bool(http2)
+
+        old = list(_CLIENTS.values())
+        _CLIENTS.clear()
+        _ASYNC_CLIENTS.clear()
+        _OPENAI_CLIENTS.clear()
+        _ASYNC_OPENAI_CLIENTS.clear()
+
+    for c in old:
+        try:
+            c.close()
+        except Exception:
+            pass
+
+
+def get_http_client(vendor: str) -> httpx.Client:
+    """
+    ベンダー共有の keep-alive httpx.Client を返す（スレッドセーフ）。
+    """
+    with _LOCK:
+        client = _CLIENTS.get(vendor)
+        if client is None:
+            client = httpx.Client(
+                transport=_CountingTransport(vendor, **_transport_kwargs()),
+                timeout=DEFAULT_TIMEOUT_SEC,
+            )
+            _CLIENTS[vendor] = client
+        return client
+
+
+def get_async_http_client(vendor: str) -> httpx.AsyncClient:
+    """
+    実行中イベントループ × ベンダーごとに共有される httpx.AsyncClient を返す。
+    """
+    loop = asyncio.get_running_loop()
+    with _LOCK:
+        per_loop = _ASYNC_CLIENTS.setdefault(vendor, weakref.WeakKeyDictionary())
+        client = per_loop.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                transport=_AsyncCountingTransport(vendor, **_transport_kwargs()),
+                timeout=DEFAULT_TIMEOUT_SEC,
+            )
+            per_loop[loop] = client
+        return client
+
+
+def get_openai_client(vendor: str, api_key: str, base_url: Optional[str] = None) -> Any:
+    """
+    共有 httpx.Client 上に載せた OpenAI SDK クライアントを返す。
+    （OpenAI 互換エンドポイント：openai / openrouter など）
+    """
+    from openai import OpenAI
+
+    key = (vendor, api_key, base_url or "")
+    with _LOCK:
+        client = _OPENAI_CLIENTS.get(key)
+    if client is not None:
+        return client
+
+    client = OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=get_http_client(vendor),
+        max_retries=0,
+    )
+    with _LOCK:
+        return _OPENAI_CLIENTS.setdefault(key, client)
+
+
+def get_async_openai_client(vendor: str, api_key: str, base_url: Optional[str] = None) -> Any:
+    """
+    get_openai_client の非同期版（実行中イベントループごとに共有）。
+    """
+    from openai import AsyncOpenAI
+
+    loop = asyncio.get_running_loop()
+    key = (vendor, api_key, base_url or "")
+    with _LOCK:
+        per_loop = _ASYNC_OPENAI_CLIENTS.setdefault(key, weakref.WeakKeyDictionary())
+        client = per_loop.get(loop)
+    if client is not None:
+        return client
+
+    client = AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=get_async_http_client(vendor),
+        max_retries=0,
+    )
+    with _LOCK:
+        per_loop[loop] = client
+    return client
+
+
+def _open_connections(transport: Any) -> Tuple[int, int]:
+    """
+    (open, idle) を返す。httpcore の内部構造に依存するので取れなければ (0, 0)。
+    """
+    try:
+        conns = list(transport._pool.connections)
+    except Exception:
+        return 0, 0
+
+    open_n = 0
+    idle_n = 0
+    for c in conns:
+        try:
+            if c.is_closed():
+                continue
+            open_n += 1
+            if c.is_idle():
+                idle_n += 1
+        except Exception:
+            continue
+    return open_n, idle_n
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    デバッグビュー用：ベンダーごとのプール統計。
+
+    {
+      "openai": {
+        "requests": 12, "new_connections": 2, "reuse_ratio": 0.833,
+        "open_connections": 2, "idle_connections": 2,
+        "pool_size": 10, "http2": False,
+      },
+      ...
+    }
+    """
+    with _LOCK:
+        stats = {v: dict(s) for v, s in _STATS.items()}
+        clients = dict(_CLIENTS)
+        pool_size = _POOL_SIZE
+
+    http2 = _http2_enabled()
+    out: Dict[str, Dict[str, Any]] = {}
+    for vendor in sorted(set(stats) | set(clients)):
+        s = stats.get(vendor, {})
+        req = int(s.get("requests", 0))
+        new = int(s.get("new_connections", 0))
+
+        open_n, idle_n = 0, 0
+        client = clients.get(vendor)
+        if client is not None:
+            open_n, idle_n = _open_connections(getattr(client, "_transport", None))
+
+        out[vendor] = {
+            "requests": req,
+            "new_connections": new,
+            "reuse_ratio": round(1.0 - (new / req), 3) if req else 0.0,
+            "open_connections": open_n,
+            "idle_connections": idle_n,
+            "pool_size": pool_size,
+            "http2": http2,
+        }
+    return out
@@ -0,0 +1,121 @@
+# llm/llm_ai/llm_adapters/lazy.py
+"""
+遅延生成 Adapter（LazyAdapter）。
+
+register_* は「どのクラスをどの引数で作るか」というメタデータだけを登録し、
+実際の Adapter（と、その裏のベンダー SDK の import / クライアント生成）は
+最初の call / acall / stream まで行わない。
+
+- 一度も呼ばれないモデルは import もクライアント生成もしない
+- 実体はプロセス共有（同じ target + 引数なら、persona ごとの LLMManager 間でも 1 つ）
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import importlib
+import threading
+
+from llm.llm_ai.llm_adapters.base import BaseLLMAdapter
+
+_LOCK = threading.Lock()
+_INSTANCES: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], BaseLLMAdapter] = {}
+
+
+def _import_target(target: str) -> Any:
+    """
+    "package.module:ClassName" を import して返す。
+    """
+    module_name, _, attr = target.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"LazyAdapter target must be 'module:ClassName': {target!r}")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr)
+
+
+class LazyAdapter(BaseLLMAdapter):
+    """
+    実体 Adapter への代理。LLMAI からは普通の Adapter と同じに見える。
+
+    例:
+        LazyAdapter(
+            name="gpt52",
+            target="llm.llm_ai.llm_adapters.openai_chat:OpenAIChatAdapter",
+            init_kwargs={"name": "gpt52", "model_id": "gpt-5.2-chat-latest"},
+        )
+    """
+
+    # register_adapter が読むメタデータ（ここで定義しておけば実体を作らずに済む）
+    supported_parameters: Optional[List[str]] = None
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        target: str,
+        init_kwargs: Optional[Dict[str, Any]] = None,
+        supported_parameters: Optional[List[str]] = None,
+    ) -> None:
+        self.name = name
+        self.target = target
+        self.init_kwargs: Dict[str, Any] = dict(init_kwargs or {})
+        if supported_parameters is not None:
+            self.supported_parameters = list(supported_parameters)
+        self._adapter: Optional[BaseLLMAdapter] = None
+
+    @property  # type: ignore[override]
+    def TARGET_TOKENS(self) -> Optional[int]:  # noqa: N802
+        # BaseLLMAdapter のクラス属性（None）ではなく実体の値を返す
+        return self.resolve().TARGET_TOKENS
+
+    @property
+    def loaded(self) -> bool:
+        return self._adapter is not None
+
+    def resolve(self) -> BaseLLMAdapter:
+        """
+        実体 Adapter を返す（初回だけ import + 生成）。
+        """
+        adapter = self._adapter
+        if adapter is not None:
+            return adapter
+
+        key = (self.target, tuple(sorted(self.init_kwargs.items())))
+        with _LOCK:
+            adapter = _INSTANCES.get(key)
+            if adapter is None:
+                cls = _import_target(self.target)
+                adapter = cls(**self.init_kwargs)
+                _INSTANCES[key] = adapter
+        self._adapter = adapter
+        return adapter
+
+    def call(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        return self.resolve().call(messages=messages, **kwargs)
+
+    async def acall(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        return await self.resolve().acall(messages=messages, **kwargs)
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        return self.resolve().stream(messages=messages, **kwargs)
+
+    def __getattr__(self, item: str) -> Any:
+        # 代理に無い属性（model_id / TARGET_TOKENS など）は実体に聞く
+        if item.startswith("__") or item in ("_adapter", "target", "init_kwargs"):
+            raise AttributeError(item)
+        return getattr(self.resolve(), item)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "deferred"
+        return f"<LazyAdapter {self.name} -> {self.target} ({state})>"
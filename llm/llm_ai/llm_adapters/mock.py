@@ -0,0 +1,87 @@
+# llm/llm_ai/llm_adapters/mock.py
+"""
+模擬モデル用アダプタ（mock_server の相手。register_mock から登録）。
+
+本物の OpenAIChatAdapter / GeminiAdapter をそのまま使い、接続先だけを模擬サーバに向ける。
+リクエストの組み立て / SSE の読み取り / length の continuation / 400 の学習 / キープール /
+http_pool の keep-alive はすべて本番と同じコードを通る。
+
+- VENDOR = "mock"（http_pool の接続プールとスケジューラは本物のベンダーと分ける）
+- API キーは LYRA_MOCK_API_KEY（カンマ区切りで複数可）。無ければ固定のダミーキー 1 本
+- base_url を渡さなければ mock_server.mock_base_url()（LYRA_MOCK_LLM_URL / 自前のサーバ）
+"""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from llm.llm_ai.llm_adapters.gemini import GeminiAdapter
+from llm.llm_ai.llm_adapters.http_pool import get_async_openai_client, get_openai_client
+from llm.llm_ai.llm_adapters.mock_server import MOCK_API_KEY, mock_base_url
+from llm.llm_ai.llm_adapters.openai_chat import OpenAIChatAdapter
+from llm.llm_ai.llm_keys import KeyPool, get_key_pool
+
+MOCK_ENV_KEY = "LYRA_MOCK_API_KEY"
+
+_DEFAULT_POOL = KeyPool("mock", [MOCK_API_KEY])
+
+
+def _mock_keys() -> KeyPool:
+    pool = get_key_pool(MOCK_ENV_KEY)
+    return pool if len(pool) else _DEFAULT_POOL
+
+
+class MockAdapter(OpenAIChatAdapter):
+    """
+    OpenAI chat.completions プロトコルで模擬サーバを呼ぶ。
+    """
+
+    VENDOR = "mock"
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        model_id: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ) -> None:
+        super().__init__(name=name, model_id=model_id or name, env_key=MOCK_ENV_KEY)
+        self._base_url = base_url
+
+    @property
+    def _keys(self) -> KeyPool:
+        return _mock_keys()
+
+    def _api_base(self) -> str:
+        return f"{(self._base_url or mock_base_url()).rstrip('/')}/v1"
+
+    def _client_for(self, key: str) -> Any:
+        return get_openai_client(self.VENDOR, key, base_url=self._api_base())
+
+    def _async_client_for(self, key: str) -> Any:
+        return get_async_openai_client(self.VENDOR, key, base_url=self._api_base())
+
+
+class MockGeminiAdapter(GeminiAdapter):
+    """
+    Gemini generateContent プロトコルで模擬サーバを呼ぶ。
+    """
+
+    VENDOR = "mock"
+
+    def __init__(
+        self,
+        *,
+        name: str = "mock_gemini",
+        model_id: str = "mock-gemini",
+        base_url: Optional[str] = None,
+    ) -> None:
+        super().__init__(name=name, model_id=model_id, env_key=MOCK_ENV_KEY)
+        base = (base_url or mock_base_url()).rstrip("/")
+        model_url = f"{base}/v1beta/models/{self.model_id}"
+        self._endpoint = f"{model_url}:generateContent"
+        self._stream_endpoint = f"{model_url}:streamGenerateContent"
+        self._cache_endpoint = f"{base}/v1beta/cachedContents"
+
+    @property
+    def _keys(self) -> KeyPool:
+        return _mock_keys()
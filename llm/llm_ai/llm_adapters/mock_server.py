@@ -0,0 +1,716 @@
+# llm/llm_ai/llm_adapters/mock_server.py
+"""
+ローカルの模擬 LLM サーバ（MockAdapter / MockGeminiAdapter の相手。オフライン計測用）。
+
+本物のベンダーを叩かずに、実際の Adapter → http_pool → スケジューラ / リトライ / キャッシュ /
+singleflight / deadline の経路をそのまま通して、レイテンシや失敗時の振る舞いを測るためのもの。
+
+- 話すプロトコル
+    POST /v1/chat/completions                         : OpenAI chat.completions（stream=True は SSE + [DONE]）
+    POST /v1beta/models/{model}:generateContent       : Gemini
+    POST /v1beta/models/{model}:streamGenerateContent : Gemini（alt=sse）
+    POST /v1beta/cachedContents                       : Gemini cachedContents（名前を返すだけ）
+- モデルごとに MockModelSpec（seed 付き）で振る舞いを決める
+    最初のトークンまで : 対数正規分布（中央値 ttfb_ms / 広がり ttfb_sigma）
+    生成速度           : tokens_per_sec（1 単語 = 1 トークンとして数える）
+    失敗の注入         : rate_429（Retry-After 付き）/ rate_500
+    打ち切り           : truncate_rate の確率、または max_tokens が返答長より短いとき
+                         finish_reason="length"（Gemini は finishReason="MAX_TOKENS"）
+    複数サンプル       : n（Gemini は candidateCount）> 1 なら choices / candidates を n 件返す
+                         （stream=False のみ。待ち時間はいちばん長いサンプルぶん、usage は合計）
+    JSON 出力          : response_format（json_schema / json_object）/ responseMimeType=application/json なら
+                         本文の代わりに schema（Gemini は responseSchema）に合う JSON を返す
+                         （値は抽選した単語から決める。LLMAI.call_json もオフラインで計測できる）
+                         schema が送られてこなければ、最後のメッセージに書かれた JSON Schema（修復の指示など）に従う。
+                         それも無ければ {"text": ...}
+                         JSON は打ち切らない（finish_reason="stop"）。待ち時間と usage は通常の抽選どおり
+- 乱数はモデルごとの random.Random(seed)。同じ順に呼べば同じ遅延 / 失敗の並びになる
+- 未登録のモデル名には既定値の spec を名前から決めた seed で作って使う
+- HTTP/1.1 keep-alive（stream は chunked）なので、http_pool の接続の使い回しもそのまま効く
+
+設定（環境変数）:
+  LYRA_MOCK_MODELS_PATH : MockModelSpec の dict のリスト（JSON）。無ければ DEFAULT_SPECS
+  LYRA_MOCK_TIME_SCALE  : 待ち時間に掛ける倍率（既定 1.0。0.1 なら 10 倍速）
+  LYRA_MOCK_LLM_URL     : 既に立っている模擬サーバを使う（"http://127.0.0.1:8765"。無ければ自前で立てる）
+  LYRA_MOCK_PORT        : 自前で立てるときのポート（既定 0 = 空いているポート）
+
+単体で立てる:
+  python -m llm.llm_ai.llm_adapters.mock_server --port 8765
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+MOCK_API_KEY = "mock-key"
+
+_WORDS = (
+    "the", "quiet", "river", "remembers", "every", "lantern", "we", "left", "by", "its",
+    "bank", "and", "I", "still", "hear", "your", "voice", "in", "the", "rain", "tonight",
+    "so", "stay", "a", "little", "longer", "with", "me",
+)
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, "") or default)
+    except ValueError:
+        return default
+
+
+# ============================================================
+# モデルの振る舞い
+# ============================================================
+@dataclass
+class MockModelSpec:
+    """
+    模擬モデル 1 つ分の振る舞い。model_id（リクエストの model / パスのモデル名）で引く。
+    """
+
+    name: str
+    seed: int = 0
+    ttfb_ms: float = 400.0
+    ttfb_sigma: float = 0.35
+    ttfb_max_ms: float = 30000.0
+    tokens_per_sec: float = 60.0
+    reply_tokens: int = 120
+    reply_tokens_jitter: float = 0.3
+    rate_429: float = 0.0
+    retry_after_sec: float = 1.0
+    rate_500: float = 0.0
+    truncate_rate: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MockModelSpec":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    @classmethod
+    def default_for(cls, name: str) -> "MockModelSpec":
+        return cls(name=name, seed=zlib.crc32(name.encode("utf-8")))
+
+
+DEFAULT_SPECS: Tuple[MockModelSpec, ...] = (
+    # 速くて安定（gpt4o / gemini-flash 相当）
+    MockModelSpec(name="mock-fast", seed=1, ttfb_ms=350, ttfb_sigma=0.25, tokens_per_sec=90),
+    # 遅めで裾が重い、たまに 429（gpt51 / grok 相当）
+    MockModelSpec(
+        name="mock-slow", seed=2, ttfb_ms=1400, ttfb_sigma=0.6, tokens_per_sec=35,
+        reply_tokens=200, rate_429=0.05, retry_after_sec=2.0,
+    ),
+    # 5xx と打ち切りが混ざる（OpenRouter 系相当）
+    MockModelSpec(
+        name="mock-flaky", seed=3, ttfb_ms=800, ttfb_sigma=0.5, tokens_per_sec=45,
+        rate_500=0.1, truncate_rate=0.1,
+    ),
+    # Gemini プロトコル用
+    MockModelSpec(name="mock-gemini", seed=4, ttfb_ms=500, ttfb_sigma=0.3, tokens_per_sec=120, reply_tokens=180),
+)
+
+
+def load_specs() -> List[MockModelSpec]:
+    path = os.getenv("LYRA_MOCK_MODELS_PATH", "").strip()
+    if not path:
+        return list(DEFAULT_SPECS)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return [MockModelSpec.from_dict(d) for d in raw if isinstance(d, dict) and d.get("name")]
+    except Exception:
+        logger.exception("mock server: failed to load %s (using defaults)", path)
+        return list(DEFAULT_SPECS)
+
+
+@dataclass
+class _Plan:
+    """
+    1 リクエスト分の抽選結果（乱数はロック内でまとめて引き、待つのはロックの外）。
+    """
+
+    status: int
+    ttfb_sec: float
+    words: List[str]
+    truncated: bool
+    retry_after_sec: float = 0.0
+    # n > 1 のときの 2 件目以降（words と同じ単位。打ち切りは max_tokens だけ）
+    samples: List[List[str]] = field(default_factory=list)
+
+    @property
+    def all_words(self) -> List[List[str]]:
+        return [self.words, *self.samples]
+
+
+class _ModelState:
+    def __init__(self, spec: MockModelSpec) -> None:
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "ok": 0,
+            "rate_limited": 0,
+            "server_error": 0,
+            "truncated": 0,
+            "streamed": 0,
+            "completion_tokens": 0,
+        }
+
+
+# ============================================================
+# サーバ
+# ============================================================
+class MockLLMServer:
+    """
+    模擬 LLM サーバ本体。start() で別スレッドに立ち、url で基点 URL を返す。
+
+        with MockLLMServer() as server:
+            adapter = MockAdapter(name="mock_fast", model_id="mock-fast", base_url=server.url)
+    """
+
+    def __init__(
+        self,
+        specs: Optional[Iterable[MockModelSpec]] = None,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        time_scale: Optional[float] = None,
+    ) -> None:
+        self.host = host
+        self.port = int(port)
+        self.time_scale = max(0.0, _env_float("LYRA_MOCK_TIME_SCALE", 1.0) if time_scale is None else float(time_scale))
+
+        self._lock = threading.Lock()
+        self._models: Dict[str, _ModelState] = {}
+        self._cached: Dict[str, int] = {}
+        for spec in specs if specs is not None else load_specs():
+            self._models[spec.name] = _ModelState(spec)
+
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------
+    # 起動 / 停止
+    # ------------------------------------------------------------
+    @property
+    def url(self) -> str:
+        if self._httpd is None:
+            raise RuntimeError("MockLLMServer is not started")
+        return f"http://{self.host}:{self._httpd.server_address[1]}"
+
+    def start(self) -> "MockLLMServer":
+        if self._httpd is not None:
+            return self
+        handler = type("_BoundMockHandler", (_MockHandler,), {"server_ref": self})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        logger.info("mock LLM server started: %s models=%s", self.url, sorted(self._models))
+        return self
+
+    def stop(self) -> None:
+        httpd, self._httpd = self._httpd, None
+        if httpd is not None:
+            httpd.shutdown()
+            httpd.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------
+    # モデル
+    # ------------------------------------------------------------
+    def add_model(self, spec: MockModelSpec) -> None:
+        """
+        spec を登録 / 差し替える（乱数と統計は作り直す）。
+        """
+        with self._lock:
+            self._models[spec.name] = _ModelState(spec)
+
+    def _state(self, model_id: str) -> _ModelState:
+        # 呼び出し側はロックを持っている
+        state = self._models.get(model_id)
+        if state is None:
+            state = self._models[model_id] = _ModelState(MockModelSpec.default_for(model_id))
+        return state
+
+    def plan(
+        self,
+        model_id: str,
+        max_tokens: Optional[int],
+        *,
+        stream: bool = False,
+        n: int = 1,
+    ) -> _Plan:
+        with self._lock:
+            state = self._state(model_id)
+            spec, rng, st = state.spec, state.rng, state.stats
+            st["requests"] += 1
+            if stream:
+                st["streamed"] += 1
+
+            ttfb = rng.lognormvariate(math.log(max(1.0, spec.ttfb_ms)), max(0.0, spec.ttfb_sigma))
+            ttfb_sec = min(ttfb, spec.ttfb_max_ms) / 1000.0
+
+            r = rng.random()
+            if r < spec.rate_429:
+                st["rate_limited"] += 1
+                return _Plan(429, ttfb_sec * 0.2, [], False, retry_after_sec=spec.retry_after_sec)
+            if r < spec.rate_429 + spec.rate_500:
+                st["server_error"] += 1
+                return _Plan(500, ttfb_sec, [], False)
+
+            def draw() -> List[str]:
+                jitter = 1.0 + rng.uniform(-spec.reply_tokens_jitter, spec.reply_tokens_jitter)
+                count = max(1, int(round(spec.reply_tokens * jitter)))
+                return [rng.choice(_WORDS) for _ in range(count)]
+
+            words = draw()
+            truncated = False
+            if len(words) > 1 and rng.random() < spec.truncate_rate:
+                words = words[: rng.randint(1, len(words) - 1)]
+                truncated = True
+            if max_tokens is not None and 0 < max_tokens < len(words):
+                words = words[:max_tokens]
+                truncated = True
+
+            samples: List[List[str]] = []
+            for _ in range(max(1, int(n)) - 1 if not stream else 0):
+                sample = draw()
+                if max_tokens is not None and 0 < max_tokens < len(sample):
+                    sample = sample[:max_tokens]
+                samples.append(sample)
+
+            st["ok"] += 1
+            st["truncated"] += int(truncated)
+            st["completion_tokens"] += len(words) + sum(len(x) for x in samples)
+            return _Plan(200, ttfb_sec, words, truncated, samples=samples)
+
+    def token_interval(self, model_id: str) -> float:
+        with self._lock:
+            tps = self._state(model_id).spec.tokens_per_sec
+        return 1.0 / tps if tps > 0 else 0.0
+
+    def sleep(self, sec: float) -> None:
+        if sec > 0 and self.time_scale > 0:
+            time.sleep(sec * self.time_scale)
+
+    def cache_content(self, prefix_chars: int) -> str:
+        with self._lock:
+            name = f"cachedContents/mock-{len(self._cached) + 1}"
+            self._cached[name] = prefix_chars
+            return name
+
+    def cached_tokens(self, name: str) -> int:
+        with self._lock:
+            return self._cached.get(name, 0) // 4
+
+    # ------------------------------------------------------------
+    # 表示
+    # ------------------------------------------------------------
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {**st.stats, "spec": asdict(st.spec)}
+                for name, st in sorted(self._models.items())
+            }
+
+
+# ============================================================
+# リクエスト処理
+# ============================================================
+def _text_of(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(str(p.get("text", "")) for p in content if isinstance(p, dict))
+    return ""
+
+
+def _prompt_tokens(texts: Iterable[str]) -> int:
+    # ざっくり 4 文字 = 1 トークン
+    return max(1, sum(len(t) for t in texts) // 4)
+
+
+def _schema_sample(schema: Any, words: List[str]) -> Any:
+    """
+    schema（JSON Schema / Gemini responseSchema。type の大文字小文字は問わない）に合う値を words から作る。
+    """
+    if not isinstance(schema, dict):
+        return " ".join(words[:3]) or "mock"
+    if schema.get("enum"):
+        return schema["enum"][0]
+
+    types = schema.get("type")
+    types = [types] if isinstance(types, str) else list(types or [])
+    types = [str(t).lower() for t in types if str(t).lower() != "null"]
+    kind = types[0] if types else ("object" if "properties" in schema else "string")
+
+    if kind == "object":
+        props = schema.get("properties") or {}
+        out = {
+            str(key): _schema_sample(sub, words[i:] or words)
+            for i, (key, sub) in enumerate(props.items())
+        }
+        extra = schema.get("additionalProperties")
+        if not props and isinstance(extra, dict):
+            out[words[0] if words else "mock"] = _schema_sample(extra, words)
+        return out
+    if kind == "array":
+        count = max(1, int(schema.get("minItems") or 1))
+        if schema.get("maxItems") is not None:
+            count = min(count, int(schema["maxItems"]))
+        return [_schema_sample(schema.get("items"), words[i:] or words) for i in range(count)]
+    if kind in ("number", "integer"):
+        lo, hi = schema.get("minimum"), schema.get("maximum")
+        if lo is not None and hi is not None:
+            value = (float(lo) + float(hi)) / 2
+        else:
+            value = float(lo if lo is not None else hi if hi is not None else 0)
+        return int(round(value)) if kind == "integer" else value
+    if kind == "boolean":
+        return False
+
+    text = " ".join(words[:3]) or "mock"
+    if schema.get("minLength"):
+        text = text.ljust(int(schema["minLength"]), "x")
+    if schema.get("maxLength") is not None:
+        text = text[: int(schema["maxLength"])]
+    return text
+
+
+def _schema_in_prompt(texts: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    最後のメッセージ本文に書かれた JSON Schema（{"type": ... で始まる JSON）。無ければ None。
+    """
+    text = texts[-1] if texts else ""
+    decoder = json.JSONDecoder()
+    start = text.find('{"type"')
+    while start != -1:
+        try:
+            schema, _ = decoder.raw_decode(text, start)
+            if isinstance(schema, dict):
+                return schema
+        except ValueError:
+            pass
+        start = text.find('{"type"', start + 1)
+    return None
+
+
+def _json_texts(schema: Any, plan: "_Plan", prompt: List[str]) -> List[str]:
+    """
+    JSON 出力を頼まれたときの本文（サンプルごと）。
+    schema が無ければプロンプトに書かれた schema、それも無ければ {"text": ...}。
+    """
+    if not isinstance(schema, dict):
+        schema = _schema_in_prompt(prompt)
+    if isinstance(schema, dict):
+        return [json.dumps(_schema_sample(schema, words), ensure_ascii=False) for words in plan.all_words]
+    return [json.dumps({"text": " ".join(words)}, ensure_ascii=False) for words in plan.all_words]
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_ref: MockLLMServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        logger.debug("mock server: " + format, *args)
+
+    # ------------------------------------------------------------
+    # 送信
+    # ------------------------------------------------------------
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _start_sse(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _sse(self, data: str) -> None:
+        raw = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(raw):x}\r\n".encode("ascii") + raw + b"\r\n")
+        self.wfile.flush()
+
+    def _end_sse(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _send_error(self, plan: _Plan, gemini: bool) -> None:
+        self.server_ref.sleep(plan.ttfb_sec)
+        if plan.status == 429:
+            message, status_text, code = "mock rate limit exceeded", "RESOURCE_EXHAUSTED", "rate_limit_exceeded"
+            headers = {"Retry-After": f"{plan.retry_after_sec:g}"}
+        else:
+            message, status_text, code = "mock internal error", "INTERNAL", "server_error"
+            headers = {}
+        if gemini:
+            body = {"error": {"code": plan.status, "message": message, "status": status_text}}
+        else:
+            body = {"error": {"message": message, "type": code, "code": code}}
+        self._send_json(plan.status, body, headers)
+
+    # ------------------------------------------------------------
+    # ルーティング
+    # ------------------------------------------------------------
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+
+        path = urlsplit(self.path).path
+        try:
+            if path.endswith("/chat/completions"):
+                self._openai_chat(body)
+            elif path.endswith("/cachedContents"):
+                chars = len(json.dumps(body.get("systemInstruction") or {}, ensure_ascii=False))
+                self._send_json(200, {"name": self.server_ref.cache_content(chars), "model": body.get("model")})
+            elif ":" in path and "/models/" in path:
+                model_id, _, method = path.rsplit("/", 1)[-1].partition(":")
+                if method in ("generateContent", "streamGenerateContent"):
+                    self._gemini(model_id, body, stream=(method == "streamGenerateContent"))
+                else:
+                    self._send_json(404, {"error": {"code": 404, "message": f"unknown method {method}"}})
+            else:
+                self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+        except (BrokenPipeError, ConnectionResetError):
+            # クライアント側の timeout / 打ち切り
+            pass
+
+    # ------------------------------------------------------------
+    # OpenAI chat.completions
+    # ------------------------------------------------------------
+    def _openai_chat(self, body: Dict[str, Any]) -> None:
+        server = self.server_ref
+        model_id = str(body.get("model") or "mock")
+        messages = body.get("messages") or []
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens")
+        stream = bool(body.get("stream"))
+
+        plan = server.plan(
+            model_id, int(max_tokens) if max_tokens else None, stream=stream, n=int(body.get("n") or 1)
+        )
+        if plan.status != 200:
+            self._send_error(plan, gemini=False)
+            return
+
+        prompt_tokens = _prompt_tokens(_text_of(m.get("content")) for m in messages if isinstance(m, dict))
+        completion_tokens = sum(len(w) for w in plan.all_words)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        finish_reason = "length" if plan.truncated else "stop"
+        texts = [" ".join(words) for words in plan.all_words]
+
+        fmt = body.get("response_format")
+        if isinstance(fmt, dict) and fmt.get("type") in ("json_schema", "json_object"):
+            prompt = [_text_of(m.get("content")) for m in messages if isinstance(m, dict)]
+            texts = _json_texts((fmt.get("json_schema") or {}).get("schema"), plan, prompt)
+            finish_reason = "stop"
+        base = {"id": f"chatcmpl-mock-{time.monotonic_ns()}", "created": int(time.time()), "model": model_id}
+
+        server.sleep(plan.ttfb_sec)
+        interval = server.token_interval(model_id)
+
+        if not stream:
+            server.sleep(interval * max(len(w) for w in plan.all_words))
+            self._send_json(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [
+                    {
+                        "index": i,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": finish_reason if i == 0 else "stop",
+                    }
+                    for i, text in enumerate(texts)
+                ],
+                "usage": usage,
+            })
+            return
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str]) -> str:
+            return json.dumps({
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }, ensure_ascii=False)
+
+        self._start_sse()
+        self._sse(chunk({"role": "assistant", "content": ""}, None))
+        for i, word in enumerate(texts[0].split(" ")):
+            if i:
+                server.sleep(interval)
+            self._sse(chunk({"content": word if i == 0 else " " + word}, None))
+        self._sse(chunk({}, finish_reason))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._sse(json.dumps({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}))
+        self._sse("[DONE]")
+        self._end_sse()
+
+    # ------------------------------------------------------------
+    # Gemini generateContent
+    # ------------------------------------------------------------
+    def _gemini(self, model_id: str, body: Dict[str, Any], *, stream: bool) -> None:
+        server = self.server_ref
+        gen = body.get("generationConfig") or {}
+        max_tokens = gen.get("maxOutputTokens") if isinstance(gen, dict) else None
+        candidate_count = gen.get("candidateCount") if isinstance(gen, dict) else None
+
+        plan = server.plan(
+            model_id,
+            int(max_tokens) if max_tokens else None,
+            stream=stream,
+            n=int(candidate_count or 1),
+        )
+        if plan.status != 200:
+            self._send_error(plan, gemini=True)
+            return
+
+        texts = [
+            _text_of(c.get("parts")) for c in body.get("contents") or [] if isinstance(c, dict)
+        ]
+        system = body.get("systemInstruction")
+        if isinstance(system, dict):
+            texts.append(_text_of(system.get("parts")))
+        cached = server.cached_tokens(str(body.get("cachedContent") or ""))
+        prompt_tokens = _prompt_tokens(texts) + cached
+
+        completion_tokens = sum(len(w) for w in plan.all_words)
+        usage = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": completion_tokens,
+            "totalTokenCount": prompt_tokens + completion_tokens,
+        }
+        if cached:
+            usage["cachedContentTokenCount"] = cached
+        finish_reason = "MAX_TOKENS" if plan.truncated else "STOP"
+        texts = [" ".join(words) for words in plan.all_words]
+        if isinstance(gen, dict) and gen.get("responseMimeType") == "application/json":
+            prompt = [
+                _text_of(c.get("parts")) for c in body.get("contents") or [] if isinstance(c, dict)
+            ]
+            texts = _json_texts(gen.get("responseSchema"), plan, prompt)
+            finish_reason = "STOP"
+
+        def response(text: str, finish: Optional[str], with_usage: bool) -> Dict[str, Any]:
+            cand: Dict[str, Any] = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+            if finish:
+                cand["finishReason"] = finish
+            out: Dict[str, Any] = {"candidates": [cand], "modelVersion": model_id}
+            if with_usage:
+                out["usageMetadata"] = usage
+            return out
+
+        server.sleep(plan.ttfb_sec)
+        interval = server.token_interval(model_id)
+
+        if not stream:
+            server.sleep(interval * max(len(w) for w in plan.all_words))
+            out = response(texts[0], finish_reason, True)
+            for i, text in enumerate(texts[1:], start=1):
+                out["candidates"].append(
+                    {
+                        "content": {"role": "model", "parts": [{"text": text}]},
+                        "index": i,
+                        "finishReason": "STOP",
+                    }
+                )
+            self._send_json(200, out)
+            return
+
+        # Gemini のストリームは数トークンずつまとまって届く
+        self._start_sse()
+        step = 8
+        pieces = texts[0].split(" ")
+        for i in range(0, len(pieces), step):
+            if i:
+                server.sleep(interval * step)
+            piece = " ".join(pieces[i : i + step])
+            last = i + step >= len(pieces)
+            self._sse(json.dumps(
+                response(piece if i == 0 else " " + piece, finish_reason if last else None, last),
+                ensure_ascii=False,
+            ))
+        self._end_sse()
+
+
+# ============================================================
+# プロセス共有
+# ============================================================
+_LOCK = threading.Lock()
+_SERVER: Optional[MockLLMServer] = None
+
+
+def get_mock_server() -> MockLLMServer:
+    """
+    プロセス共有の模擬サーバ（初回に立てる）。
+    """
+    global _SERVER
+    with _LOCK:
+        if _SERVER is None:
+            _SERVER = MockLLMServer(port=int(_env_float("LYRA_MOCK_PORT", 0))).start()
+        return _SERVER
+
+
+def mock_base_url() -> str:
+    """
+    MockAdapter の接続先。LYRA_MOCK_LLM_URL があればそれ、無ければ自前のサーバ。
+    """
+    url = os.getenv("LYRA_MOCK_LLM_URL", "").strip().rstrip("/")
+    return url or get_mock_server().url
+
+
+def get_mock_server_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    自前のサーバのモデル別統計（立てていなければ空）。
+    """
+    with _LOCK:
+        server = _SERVER
+    return server.stats() if server is not None else {}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lyra mock LLM server (OpenAI / Gemini wire protocol)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--time-scale", type=float, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with MockLLMServer(host=args.host, port=args.port, time_scale=args.time_scale) as server:
+        print(f"mock LLM server listening on {server.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
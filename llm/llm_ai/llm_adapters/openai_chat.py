@@ -1,21 +1,35 @@
 # llm/llm_ai/llm_adapters/openai_chat.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
-import os
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 import logging
 
-from openai import OpenAI as OpenAIClient
+if TYPE_CHECKING:
+    from openai import OpenAI as OpenAIClient
 
 from llm.llm_ai.llm_adapters.base import BaseLLMAdapter
+from llm.llm_ai.llm_adapters.http_pool import get_async_openai_client, get_openai_client
+from llm.llm_ai.llm_capabilities import MAX_LEARN_RETRIES, get_capability_cache
+from llm.llm_ai.llm_errors import to_llm_error
+from llm.llm_ai.llm_keys import KeyPool, get_key_pool
 from llm.llm_ai.llm_adapters.utils import (
+    acontinue_truncated,
+    attach_samples,
+    continue_truncated,
+    finish_reason_of,
+    sample_texts,
     split_text_and_usage_from_openai_completion,
     normalize_max_tokens,
+    without_samples,
 )
 
 logger = logging.getLogger(__name__)
 
 
+def _completion_usage(completion: Any) -> Optional[Dict[str, Any]]:
+    return split_text_and_usage_from_openai_completion(completion)[1]
+
+
 class OpenAIChatAdapter(BaseLLMAdapter):
     """
     OpenAI ChatCompletion 系（GPT-4o / GPT-5.1 / GPT-5.2 など）の共通アダプタ。
@@ -23,8 +37,28 @@ class OpenAIChatAdapter(BaseLLMAdapter):
     - OpenAI SDK を直接使用します
     - max_tokens / max_completion_tokens の差異を内部で吸収します
     - Persona由来の拡張パラメータ（verbosity 等）を安全に吸収します
+    - acall は AsyncOpenAI を使った非ブロッキング実装です
+    - SDK クライアントは http_pool 経由で全 Adapter 共有（keep-alive 接続を使い回す）
+    - API キーは llm_keys のプール（複数キーならラウンドロビン、429 のキーは飛ばして次のキーで再送）
+    - SDK の import とクライアント生成は最初の呼び出しまで遅らせる
+    - stream は stream=True の SSE をテキスト差分として yield します
+    - 400 で弾かれたパラメータは llm_capabilities に学習させ、落として再送します
+    - length で途中まで返ってきた返答は、全文を作り直さずに続きだけを取ってつなぎます
+      （空で打ち切られたときだけ max tokens を増やして作り直します）
+      （以降は送信前に落とすので同じ 400 を踏みません）
     """
 
+    # http_pool のプールキー（LLMAI の vendor と揃える）
+    VENDOR = "openai"
+
+    # ★ GPT-5.2 系は、環境/ルーティングによって受理パラメータが厳しく、
+    #   temperature 等が「既定値のみ許可」になることがあります。
+    #   最初の 1 回から 400 を踏まないよう、既知の非対応として capability に入れておきます。
+    #   - penalty 系は非対応
+    #   - temperature は既定値(1)以外が弾かれるケースがある（送らずサーバ側既定に委ねる）
+    #   - top_p も同様に弾かれる可能性があるため、保険として除去
+    _GPT52_UNSUPPORTED = ("presence_penalty", "frequency_penalty", "temperature", "top_p")
+
     def __init__(
         self,
         *,
@@ -35,10 +69,21 @@ class OpenAIChatAdapter(BaseLLMAdapter):
         self.name = name
         self.model_id = model_id
 
-        api_key = os.getenv(env_key, "")
-        self._client: Optional[OpenAIClient] = (
-            OpenAIClient(api_key=api_key) if api_key else None
-        )
+        self._env_key = env_key
+
+        if ("5.2" in (self.model_id or "")) or (self.name == "gpt52"):
+            get_capability_cache().seed(self.model_id, self._GPT52_UNSUPPORTED)
+
+    @property
+    def _keys(self) -> KeyPool:
+        return get_key_pool(self._env_key)
+
+    def _client_for(self, key: str) -> OpenAIClient:
+        return get_openai_client(self.VENDOR, key)
+
+    def _async_client_for(self, key: str) -> Any:
+        # AsyncOpenAI はイベントループごとに共有されるものを使います
+        return get_async_openai_client(self.VENDOR, key)
 
     @staticmethod
     def _apply_verbosity_hint(kwargs: Dict[str, Any]) -> None:
@@ -91,33 +136,15 @@ class OpenAIChatAdapter(BaseLLMAdapter):
 
         return k
 
-    def call(
-        self,
-        messages: List[Dict[str, str]],
-        **kwargs: Any,
-    ) -> Tuple[str, Optional[Dict[str, Any]]]:
-        if self._client is None:
-            raise RuntimeError(f"{self.name}: OpenAI API キーが設定されていません。")
-
+    def _prepare_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        call / acall 共通の送信前処理。
+        """
         # kwargs を安全化（verbosity等を吸収）
         kwargs = self._sanitize_kwargs(kwargs)
 
-        # ★ GPT-5.2 系は、環境/ルーティングによって受理パラメータが厳しく、
-        #   temperature 等が「既定値のみ許可」になることがあります。
-        #   そのため、送信直前で安全側に倒して除去します（400エラー回避）。
-        is_gpt52 = ("5.2" in (self.model_id or "")) or (self.name == "gpt52")
-
-        if is_gpt52:
-            # penalty 系は非対応のため除去します
-            kwargs.pop("presence_penalty", None)
-            kwargs.pop("frequency_penalty", None)
-
-            # temperature は既定値(1)以外が弾かれるケースがあるため除去します
-            # ※「送らない」方が安全です（SDK/サーバ側既定に委ねます）
-            kwargs.pop("temperature", None)
-
-            # top_p も同様に弾かれる可能性があるため、保険として除去します
-            kwargs.pop("top_p", None)
+        # このモデルが受け付けないと分かっているパラメータは送らない（400エラー回避）
+        kwargs = dict(get_capability_cache().sanitize(self.model_id, kwargs))
 
         # TARGET_TOKENS があり、かつ明示指定が無ければ適用
         if (
@@ -127,59 +154,240 @@ class OpenAIChatAdapter(BaseLLMAdapter):
         ):
             kwargs["max_completion_tokens"] = int(self.TARGET_TOKENS)
 
-        last_exc: Optional[Exception] = None
+        # timeout は SDK の 1 リクエスト単位の指定（API パラメータとしては送られない）
+        kwargs["timeout"] = self.pop_timeout(kwargs)
 
-        def _bump_max_tokens() -> None:
-            inc = 160
-            if "max_completion_tokens" in kwargs:
-                cur = int(kwargs["max_completion_tokens"])
-                kwargs["max_completion_tokens"] = min(cur + inc, 2048)
-            elif "max_tokens" in kwargs:
-                cur = int(kwargs["max_tokens"])
-                kwargs["max_tokens"] = min(cur + inc, 2048)
-            else:
-                kwargs["max_completion_tokens"] = 512
+        return kwargs
 
-        for attempt in range(3):
+    @staticmethod
+    def _bump_max_tokens(kwargs: Dict[str, Any]) -> None:
+        inc = 160
+        if "max_completion_tokens" in kwargs:
+            cur = int(kwargs["max_completion_tokens"])
+            kwargs["max_completion_tokens"] = min(cur + inc, 2048)
+        elif "max_tokens" in kwargs:
+            cur = int(kwargs["max_tokens"])
+            kwargs["max_tokens"] = min(cur + inc, 2048)
+        else:
+            kwargs["max_completion_tokens"] = 512
+
+    def _accept_completion(
+        self,
+        completion: Any,
+        kwargs: Dict[str, Any],
+        attempt: int,
+    ) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        completion を採用するなら (text, usage) を返し、
+        length 打ち切りで空なら max tokens を増やして None（再試行）を返します。
+        """
+        text, usage = split_text_and_usage_from_openai_completion(completion)
+
+        finish_reason = finish_reason_of(completion)
+
+        if text.strip():
+            return text, usage
+
+        if finish_reason == "length" and attempt < 2:
+            self._bump_max_tokens(kwargs)
+            return None
+
+        return text, usage
+
+    def _drop_rejected(self, e: Exception, kwargs: Dict[str, Any]) -> bool:
+        """
+        e が「このパラメータは受け付けない」系の 400 なら学習して kwargs から落とす。
+        落としたものがあれば True（再送する価値がある）。
+        """
+        err = to_llm_error(f"{self.name}: OpenAI call failed: {e}", e)
+        dropped = get_capability_cache().learn_from_error(self.model_id, err, kwargs)
+        for key in dropped:
+            kwargs.pop(key, None)
+        return bool(dropped)
+
+    def _create(
+        self,
+        client: Any,
+        messages: List[Dict[str, str]],
+        kwargs: Dict[str, Any],
+        **extra: Any,
+    ) -> Any:
+        """
+        chat.completions.create。弾かれたパラメータがあれば落として再送する。
+        kwargs はその場で更新する（length 再試行でも同じ 400 を踏まない）。
+        """
+        for _ in range(MAX_LEARN_RETRIES):
             try:
-                completion = self._client.chat.completions.create(
-                    model=self.model_id,
-                    messages=messages,
-                    **kwargs,
+                return client.chat.completions.create(
+                    model=self.model_id, messages=messages, **kwargs, **extra
                 )
+            except Exception as e:
+                if not self._drop_rejected(e, kwargs):
+                    raise
+        return client.chat.completions.create(
+            model=self.model_id, messages=messages, **kwargs, **extra
+        )
 
-                text, usage = split_text_and_usage_from_openai_completion(completion)
-
-                choices = getattr(completion, "choices", None) or []
-                finish_reason = (
-                    getattr(choices[0], "finish_reason", "") if choices else ""
+    async def _acreate(
+        self,
+        client: Any,
+        messages: List[Dict[str, str]],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        for _ in range(MAX_LEARN_RETRIES):
+            try:
+                return await client.chat.completions.create(
+                    model=self.model_id, messages=messages, **kwargs
                 )
+            except Exception as e:
+                if not self._drop_rejected(e, kwargs):
+                    raise
+        return await client.chat.completions.create(
+            model=self.model_id, messages=messages, **kwargs
+        )
+
+    def _send(
+        self,
+        messages: List[Dict[str, str]],
+        kwargs: Dict[str, Any],
+        **extra: Any,
+    ) -> Any:
+        """
+        キープールのキーで _create する（429 を受けたキーは休ませて次のキーで再送）。
+        """
+        def once(key: str) -> Any:
+            try:
+                return self._create(self._client_for(key), messages, kwargs, **extra)
+            except Exception as e:
+                raise to_llm_error(f"{self.name}: OpenAI call failed: {e}", e)
 
-                if text.strip():
-                    return text, usage
+        usage_of = None if extra.get("stream") else _completion_usage
+        return self._keys.run(once, usage_of=usage_of)
 
-                if finish_reason == "length" and attempt < 2:
-                    _bump_max_tokens()
-                    continue
+    async def _asend(
+        self,
+        messages: List[Dict[str, str]],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        async def once(key: str) -> Any:
+            client = self._async_client_for(key)
+            try:
+                return await self._acreate(client, messages, kwargs)
+            except Exception as e:
+                raise to_llm_error(f"{self.name}: OpenAI call failed: {e}", e)
+
+        return await self._keys.arun(once, usage_of=_completion_usage)
+
+    def _log_failure(self, e: Exception, attempt: int, kwargs: Dict[str, Any]) -> None:
+        if isinstance(e, TypeError) or isinstance(e.__cause__, TypeError):
+            # ここに来る場合は「SDKが受け付けない引数」が残っている可能性が高いです
+            logger.exception(
+                "%s: OpenAI call TypeError (attempt=%s) kwargs=%s",
+                self.name,
+                attempt + 1,
+                {k: type(v).__name__ for k, v in (kwargs or {}).items()},
+            )
+        else:
+            logger.exception(
+                "%s: OpenAI call failed (attempt=%s)", self.name, attempt + 1
+            )
+
+    def call(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        if not len(self._keys):
+            raise RuntimeError(f"{self.name}: OpenAI API キーが設定されていません。")
+
+        kwargs = self._prepare_kwargs(kwargs)
 
-                return text, usage
+        # ここでの再試行は「length 打ち切りで空」のときだけ（max tokens を増やして再送）。
+        # 途中まで返って打ち切られたときは continuation で続きだけを取る。
+        # 接続エラー / 5xx のバックオフ再送と 429 の待機は LLMAI 側で行う。
+        def send_more(msgs: List[Dict[str, str]]) -> Tuple[str, Optional[Dict[str, Any]], str]:
+            more = self._send(msgs, without_samples(kwargs))
+            return (*split_text_and_usage_from_openai_completion(more), finish_reason_of(more))
 
-            except TypeError as e:
-                # ここに来る場合は「SDKが受け付けない引数」が残っている可能性が高いです
-                last_exc = e
-                logger.exception(
-                    "%s: OpenAI call TypeError (attempt=%s) kwargs=%s",
-                    self.name,
-                    attempt + 1,
-                    {k: type(v).__name__ for k, v in (kwargs or {}).items()},
+        accepted: Optional[Tuple[str, Optional[Dict[str, Any]]]] = None
+        for attempt in range(3):
+            try:
+                completion = self._send(messages, kwargs)
+            except Exception as e:
+                self._log_failure(e, attempt, kwargs)
+                raise to_llm_error(f"{self.name}: OpenAI call failed: {e}", e)
+
+            accepted = self._accept_completion(completion, kwargs, attempt)
+            if accepted is not None:
+                # n>1 なら 2 件目以降は usage["samples"] へ（continuation は先頭のサンプルだけ）
+                return attach_samples(
+                    *continue_truncated(
+                        send_more, messages, *accepted, finish_reason_of(completion), label=self.name
+                    ),
+                    sample_texts(completion),
                 )
 
+        return accepted or ("", None)
+
+    async def acall(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        if not len(self._keys):
+            raise RuntimeError(f"{self.name}: OpenAI API キーが設定されていません。")
+
+        kwargs = self._prepare_kwargs(kwargs)
+
+        # ここでの再試行は「length 打ち切りで空」のときだけ（max tokens を増やして再送）。
+        # 途中まで返って打ち切られたときは continuation で続きだけを取る。
+        # 接続エラー / 5xx のバックオフ再送と 429 の待機は LLMAI 側で行う。
+        async def send_more(msgs: List[Dict[str, str]]) -> Tuple[str, Optional[Dict[str, Any]], str]:
+            more = await self._asend(msgs, without_samples(kwargs))
+            return (*split_text_and_usage_from_openai_completion(more), finish_reason_of(more))
+
+        accepted: Optional[Tuple[str, Optional[Dict[str, Any]]]] = None
+        for attempt in range(3):
+            try:
+                completion = await self._asend(messages, kwargs)
             except Exception as e:
-                last_exc = e
-                logger.exception(
-                    "%s: OpenAI call failed (attempt=%s)", self.name, attempt + 1
+                self._log_failure(e, attempt, kwargs)
+                raise to_llm_error(f"{self.name}: OpenAI call failed: {e}", e)
+
+            accepted = self._accept_completion(completion, kwargs, attempt)
+            if accepted is not None:
+                return attach_samples(
+                    *await acontinue_truncated(
+                        send_more, messages, *accepted, finish_reason_of(completion), label=self.name
+                    ),
+                    sample_texts(completion),
                 )
 
-        raise RuntimeError(
-            f"{self.name}: OpenAI call failed after retry: {last_exc}"
-        )
+        return accepted or ("", None)
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        if not len(self._keys):
+            raise RuntimeError(f"{self.name}: OpenAI API キーが設定されていません。")
+
+        kwargs = self._prepare_kwargs(kwargs)
+        kwargs.pop("stream", None)
+        # ストリームは 1 サンプルだけ
+        kwargs.pop("n", None)
+
+        try:
+            chunks = self._send(messages, kwargs, stream=True)
+            for chunk in chunks:
+                choices = getattr(chunk, "choices", None) or []
+                if not choices:
+                    continue
+                delta = getattr(choices[0], "delta", None)
+                text = getattr(delta, "content", None) if delta is not None else None
+                if text:
+                    yield text
+        except Exception as e:
+            logger.exception("%s: OpenAI stream failed", self.name)
+            raise to_llm_error(f"{self.name}: OpenAI stream failed: {e}", e)
@@ -1,16 +1,31 @@
 # llm/llm_ai/llm_adapters/openrouter_chat.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import os
 import logging
-import requests
+import httpx
 
-from llm.llm_ai.llm_adapters.base import BaseLLMAdapter
-from llm.llm_ai.llm_adapters.utils import split_text_and_usage_from_dict
+from llm.llm_ai.llm_adapters.base import DEFAULT_TIMEOUT_SEC, BaseLLMAdapter
+from llm.llm_ai.llm_adapters.http_pool import get_async_http_client, get_http_client
+from llm.llm_ai.llm_capabilities import MAX_LEARN_RETRIES, get_capability_cache
+from llm.llm_ai.llm_errors import LLMRateLimitError, to_llm_error
+from llm.llm_ai.llm_keys import KeyPool, get_key_pool
+from llm.llm_ai.llm_adapters.utils import (
+    acontinue_truncated,
+    continue_truncated,
+    delta_text_from_chat_chunk,
+    finish_reason_of,
+    iter_sse_json,
+    split_text_and_usage_from_dict,
+)
 
 logger = logging.getLogger(__name__)
 
+
+def _data_usage(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return split_text_and_usage_from_dict(data)[1]
+
 OPENROUTER_BASE_URL = os.getenv(
     "OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"
 )
@@ -20,9 +35,12 @@ class OpenRouterChatAdapter(BaseLLMAdapter):
     """
     OpenRouter ChatCompletion 系（Hermes / Llama Uncensored など）の共通アダプタ。
 
-    - requests で直接 OpenRouter API を叩く
+    - http_pool の共有 keep-alive クライアントで直接 OpenRouter API を叩く
     - max_tokens / TARGET_TOKENS の扱いを内部で統一
     - Persona由来/内部用の未知キーは送信前に除去（400事故防止）
+    - allowlist 内でもモデルが弾くパラメータは llm_capabilities に学習させ、以降は送らない
+    - length で打ち切られた返答は、全文を作り直さずに続きだけを取ってつなぐ（continuation）
+    - acall は同じリクエストを非同期クライアントで送る
     """
 
     # OpenRouter(OpenAI互換)で「まず安全に通る」トップレベルキー
@@ -49,6 +67,9 @@ class OpenRouterChatAdapter(BaseLLMAdapter):
         "response_format",
     }
 
+    # http_pool のプールキー（LLMAI の vendor と揃える）
+    VENDOR = "openrouter"
+
     def __init__(
         self,
         *,
@@ -60,7 +81,7 @@ class OpenRouterChatAdapter(BaseLLMAdapter):
         self.model_id = model_id
 
         self._endpoint = OPENROUTER_BASE_URL.rstrip("/") + "/chat/completions"
-        self._api_key = os.getenv(env_key, "")
+        self._env_keys = (env_key,)
 
     def _sanitize_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
         k = dict(kwargs or {})
@@ -72,20 +93,25 @@ class OpenRouterChatAdapter(BaseLLMAdapter):
         # allowlist で絞る（未知キーを送らない）
         k = {key: val for key, val in k.items() if key in self._ALLOW_PARAMS and val is not None}
 
+        # このモデルが 400 で弾いたことのあるパラメータは送らない
+        k = get_capability_cache().sanitize(self.model_id, k)
+
         return k
 
-    def call(
+    def _build_request(
         self,
         messages: List[Dict[str, str]],
-        **kwargs: Any,
-    ) -> Tuple[str, Optional[Dict[str, Any]]]:
-        if not self._api_key:
+        kwargs: Dict[str, Any],
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """
+        call / acall 共通：(headers, payload) を組み立てる。
+        """
+        if not len(self._keys):
             raise RuntimeError(
                 f"{self.name}: OPENROUTER_API_KEY が設定されていません。"
             )
 
         headers = {
-            "Authorization": f"Bearer {self._api_key}",
             "Content-Type": "application/json",
         }
 
@@ -101,26 +127,175 @@ class OpenRouterChatAdapter(BaseLLMAdapter):
         # 送信前に sanitize
         safe_kwargs = self._sanitize_kwargs(kwargs)
         payload.update(safe_kwargs)
+        return headers, payload
 
-        try:
-            resp = requests.post(
-                self._endpoint,
-                headers=headers,
-                json=payload,
-                timeout=60,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-        except Exception as e:
-            # 返ってきた本文があるならログに残すとデバッグが一気に楽
-            body = None
+    @property
+    def _keys(self) -> KeyPool:
+        return get_key_pool(*self._env_keys)
+
+    def _drop_rejected(self, resp: Any, payload: Dict[str, Any]) -> bool:
+        """
+        400 の本文から「受け付けないパラメータ」を学習し、payload から落とす。
+        落としたものがあれば True（再送する価値がある）。
+        """
+        dropped = get_capability_cache().learn_from_response(self.model_id, resp, payload)
+        for key in dropped:
+            payload.pop(key, None)
+        return bool(dropped)
+
+    def _send(
+        self,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        timeout: float = DEFAULT_TIMEOUT_SEC,
+    ) -> Dict[str, Any]:
+        """
+        1 リクエストを送って応答 JSON を返す（弾かれたパラメータの学習・再送込み）。
+        キーはプールから順に使い、429 を受けたキーは休ませて次のキーで再送する。
+        """
+        def once(key: str) -> Dict[str, Any]:
             try:
-                body = resp.text  # type: ignore[name-defined]
-            except Exception:
-                pass
+                for attempt in range(MAX_LEARN_RETRIES + 1):
+                    resp = get_http_client(self.VENDOR).post(
+                        self._endpoint,
+                        headers={**headers, "Authorization": f"Bearer {key}"},
+                        json=payload,
+                        timeout=timeout,
+                    )
+                    # 弾かれたパラメータがあれば学習して落とし、再送する
+                    if attempt < MAX_LEARN_RETRIES and self._drop_rejected(resp, payload):
+                        continue
+                    break
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                # 返ってきた本文があるならログに残すとデバッグが一気に楽
+                body = None
+                try:
+                    body = resp.text  # type: ignore[name-defined]
+                except Exception:
+                    pass
+
+                logger.exception("%s: OpenRouter call failed payload_keys=%s body=%s",
+                                 self.name, sorted(payload.keys()), body)
+                raise to_llm_error(f"{self.name}: OpenRouter call failed: {e}", e)
+
+            return data
+
+        return self._keys.run(once, usage_of=_data_usage)
 
-            logger.exception("%s: OpenRouter call failed payload_keys=%s body=%s",
-                             self.name, sorted(payload.keys()), body)
-            raise RuntimeError(f"{self.name}: OpenRouter call failed: {e}")
+    def call(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        timeout = self.pop_timeout(kwargs)
+        headers, payload = self._build_request(messages, kwargs)
+        data = self._send(headers, payload, timeout)
+        text, usage = split_text_and_usage_from_dict(data)
 
-        return split_text_and_usage_from_dict(data)
+        # length で途中まで返ってきたら、作り直さずに続きを頼んでつなぐ
+        def send_more(msgs: List[Dict[str, str]]) -> Tuple[str, Optional[Dict[str, Any]], str]:
+            more = self._send(headers, {**payload, "messages": msgs}, timeout)
+            return (*split_text_and_usage_from_dict(more), finish_reason_of(more))
+
+        return continue_truncated(
+            send_more, messages, text, usage, finish_reason_of(data), label=self.name
+        )
+
+    async def _asend(
+        self,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        timeout: float = DEFAULT_TIMEOUT_SEC,
+    ) -> Dict[str, Any]:
+        """
+        1 リクエストを送って応答 JSON を返す（弾かれたパラメータの学習・再送込み）。
+        キーはプールから順に使い、429 を受けたキーは休ませて次のキーで再送する。
+        """
+        async def once(key: str) -> Dict[str, Any]:
+            resp: Optional[httpx.Response] = None
+            try:
+                for attempt in range(MAX_LEARN_RETRIES + 1):
+                    resp = await get_async_http_client(self.VENDOR).post(
+                        self._endpoint,
+                        headers={**headers, "Authorization": f"Bearer {key}"},
+                        json=payload,
+                        timeout=timeout,
+                    )
+                    # 弾かれたパラメータがあれば学習して落とし、再送する
+                    if attempt < MAX_LEARN_RETRIES and self._drop_rejected(resp, payload):
+                        continue
+                    break
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception as e:
+                body = resp.text if resp is not None else None
+                logger.exception("%s: OpenRouter async call failed payload_keys=%s body=%s",
+                                 self.name, sorted(payload.keys()), body)
+                raise to_llm_error(f"{self.name}: OpenRouter call failed: {e}", e)
+
+            return data
+
+        return await self._keys.arun(once, usage_of=_data_usage)
+
+    async def acall(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        timeout = self.pop_timeout(kwargs)
+        headers, payload = self._build_request(messages, kwargs)
+        data = await self._asend(headers, payload, timeout)
+        text, usage = split_text_and_usage_from_dict(data)
+
+        # length で途中まで返ってきたら、作り直さずに続きを頼んでつなぐ
+        async def send_more(msgs: List[Dict[str, str]]) -> Tuple[str, Optional[Dict[str, Any]], str]:
+            more = await self._asend(headers, {**payload, "messages": msgs}, timeout)
+            return (*split_text_and_usage_from_dict(more), finish_reason_of(more))
+
+        return await acontinue_truncated(
+            send_more, messages, text, usage, finish_reason_of(data), label=self.name
+        )
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """
+        stream=True の SSE を読み、テキスト差分を yield する。
+        """
+        timeout = self.pop_timeout(kwargs)
+        headers, payload = self._build_request(messages, kwargs)
+        payload["stream"] = True
+
+        # ストリームは途中でキーを替えられないので 1 本に決める（429 ならそのキーを休ませる）
+        key = self._keys.acquire()
+        headers = {**headers, "Authorization": f"Bearer {key}"}
+
+        try:
+            for attempt in range(MAX_LEARN_RETRIES + 1):
+                with get_http_client(self.VENDOR).stream(
+                    "POST",
+                    self._endpoint,
+                    headers=headers,
+                    json=payload,
+                    timeout=timeout,
+                ) as resp:
+                    if attempt < MAX_LEARN_RETRIES and resp.status_code in (400, 422):
+                        resp.read()
+                        if self._drop_rejected(resp, payload):
+                            continue
+                    resp.raise_for_status()
+                    for chunk in iter_sse_json(resp.iter_lines()):
+                        text = delta_text_from_chat_chunk(chunk)
+                        if text:
+                            yield text
+                break
+        except Exception as e:
+            logger.exception("%s: OpenRouter stream failed", self.name)
+            err = to_llm_error(f"{self.name}: OpenRouter stream failed: {e}", e)
+            if isinstance(err, LLMRateLimitError):
+                self._keys.penalize(key, err.retry_after)
+            raise err
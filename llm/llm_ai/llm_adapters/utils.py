@@ -1,8 +1,12 @@
 # llm2/llm_ai/llm_adapters/utils.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -24,24 +28,7 @@ def split_text_and_usage_from_openai_completion(
     try:
         choices = getattr(completion, "choices", None) or []
         if choices:
-            msg = getattr(choices[0], "message", None)
-            if msg is not None:
-                content = getattr(msg, "content", "") or ""
-
-                if isinstance(content, str):
-                    text = content
-                elif isinstance(content, list):
-                    parts: List[str] = []
-                    for p in content:
-                        t = getattr(p, "text", None)
-                        if t is None and isinstance(p, dict):
-                            t = p.get("text")
-                        if t is None:
-                            t = str(p)
-                        parts.append(t)
-                    text = "".join(parts)
-                else:
-                    text = str(content)
+            text = _choice_text(choices[0])
     except Exception:
         logger.exception("OpenAI completion parse error")
         text = ""
@@ -53,6 +40,7 @@ def split_text_and_usage_from_openai_completion(
                 "prompt_tokens": getattr(usage, "prompt_tokens", 0),
                 "completion_tokens": getattr(usage, "completion_tokens", 0),
                 "total_tokens": getattr(usage, "total_tokens", 0),
+                "cached_tokens": cached_tokens_of(usage),
             }
         except Exception:
             usage_dict = None
@@ -60,6 +48,58 @@ def split_text_and_usage_from_openai_completion(
     return text, usage_dict
 
 
+def _choice_text(choice: Any) -> str:
+    """
+    choices[i].message.content をテキストにする（SDK オブジェクト / dict、content が list でも）。
+    """
+    msg = choice.get("message") if isinstance(choice, dict) else getattr(choice, "message", None)
+    if msg is None:
+        return ""
+    content = (msg.get("content") if isinstance(msg, dict) else getattr(msg, "content", "")) or ""
+
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts: List[str] = []
+        for p in content:
+            t = getattr(p, "text", None)
+            if t is None and isinstance(p, dict):
+                t = p.get("text")
+            if t is None:
+                t = str(p)
+            parts.append(t)
+        return "".join(parts)
+    return str(content)
+
+
+def cached_tokens_of(usage: Any) -> int:
+    """
+    usage からプレフィックスキャッシュに当たった prompt トークン数を取り出す（無ければ 0）。
+
+    - OpenAI / 互換 API : usage.prompt_tokens_details.cached_tokens
+    - 一部の互換 API   : usage.cached_tokens / usage.prompt_cache_hit_tokens
+    SDK オブジェクト / dict どちらでもよい。
+    """
+
+    def _get(obj: Any, key: str) -> Any:
+        if isinstance(obj, dict):
+            return obj.get(key)
+        return getattr(obj, key, None)
+
+    details = _get(usage, "prompt_tokens_details")
+    for value in (
+        _get(details, "cached_tokens") if details is not None else None,
+        _get(usage, "cached_tokens"),
+        _get(usage, "prompt_cache_hit_tokens"),
+    ):
+        if value is not None:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return 0
+    return 0
+
+
 # ============================================================
 # dict-based LLM parser (OpenRouter / Grok / others)
 # ============================================================
@@ -82,11 +122,302 @@ def split_text_and_usage_from_dict(
         text = ""
 
     if "usage" in data and isinstance(data.get("usage"), dict):
-        usage_dict = data.get("usage")
+        usage_dict = dict(data["usage"])
+        usage_dict["cached_tokens"] = cached_tokens_of(usage_dict)
 
     return text, usage_dict
 
 
+def finish_reason_of(response: Any) -> str:
+    """
+    choices[0].finish_reason を取り出す（SDK オブジェクト / dict どちらでも）。
+    """
+    try:
+        if isinstance(response, dict):
+            choices = response.get("choices") or []
+            return str((choices[0] or {}).get("finish_reason") or "") if choices else ""
+        choices = getattr(response, "choices", None) or []
+        return str(getattr(choices[0], "finish_reason", "") or "") if choices else ""
+    except Exception:
+        return ""
+
+
+# ============================================================
+# continuation（length 打ち切りの続きを生成してつなぐ）
+# ============================================================
+CONTINUE_INSTRUCTION = (
+    "直前のあなたの返答は長さ制限で途中で切れています。"
+    "切れたところから、前置き・繰り返し・要約なしで、続きの文章だけをそのまま書いてください。"
+)
+
+# send(messages) -> (text, usage, finish_reason)
+SendFn = Callable[[List[Dict[str, str]]], Tuple[str, Optional[Dict[str, Any]], str]]
+AsyncSendFn = Callable[
+    [List[Dict[str, str]]], Awaitable[Tuple[str, Optional[Dict[str, Any]], str]]
+]
+
+
+# 呼び出しごとの上書き（LLMAI が call(continuations=...) を受け取ったときだけ張る）
+_CONTINUATION_LIMIT: ContextVar[Optional[int]] = ContextVar("lyra_llm_continuations", default=None)
+
+
+@contextmanager
+def continuation_limit(limit: Optional[int]) -> Iterator[None]:
+    """
+    この中の Adapter 呼び出しだけ continuation の回数を limit にする（None なら環境変数のまま）。
+
+    ModelsAI2 が長さの予算（max_tokens）を付けた呼び出しは continuations=0 で来る：
+    予算で打ち切られた返答の続きを取りに行くと、予算を付けた意味（書きすぎを止める）が無くなり、
+    全文のプロンプトを送り直す往復の分だけターンも遅くなるため。
+    """
+    token = _CONTINUATION_LIMIT.set(None if limit is None else max(0, int(limit)))
+    try:
+        yield
+    finally:
+        _CONTINUATION_LIMIT.reset(token)
+
+
+def max_continuations() -> int:
+    """
+    打ち切られた返答の続きを何回まで取りに行くか（LYRA_LLM_CONTINUATIONS、既定 2。0 で無効）。
+    continuation_limit() の中ではその値。
+    """
+    limit = _CONTINUATION_LIMIT.get()
+    if limit is not None:
+        return limit
+    try:
+        return max(0, int(os.getenv("LYRA_LLM_CONTINUATIONS", "2") or 2))
+    except ValueError:
+        return 2
+
+
+def continuation_messages(
+    messages: List[Dict[str, str]],
+    partial: str,
+) -> List[Dict[str, str]]:
+    """
+    元の messages + ここまでの返答（assistant）+ 続きを促す指示（user）。
+    """
+    return [
+        *messages,
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": CONTINUE_INSTRUCTION},
+    ]
+
+
+def stitch_continuation(
+    prev: str,
+    more: str,
+    *,
+    min_overlap: int = 4,
+    max_overlap: int = 200,
+) -> str:
+    """
+    prev の末尾と more の先頭が重なっていたら（モデルが少し言い直した場合）重複を除いてつなぐ。
+    「の」「。」のような短い偶然の一致は重複とみなさない（min_overlap 文字以上）。
+    """
+    limit = min(len(prev), len(more), max_overlap)
+    for k in range(limit, max(1, min_overlap) - 1, -1):
+        if prev.endswith(more[:k]):
+            return prev + more[k:]
+    return prev + more
+
+
+def merge_usage(
+    a: Optional[Dict[str, Any]],
+    b: Optional[Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """
+    2 回分の usage を足し合わせる（数値のキーだけ。片方が None ならもう片方）。
+    """
+    if not a:
+        return dict(b) if b else a
+    if not b:
+        return a
+    out = dict(a)
+    for key, val in b.items():
+        if isinstance(val, (int, float)) and isinstance(out.get(key, 0), (int, float)):
+            out[key] = (out.get(key) or 0) + val
+        else:
+            out.setdefault(key, val)
+    return out
+
+
+def _continued(
+    text: str,
+    usage: Optional[Dict[str, Any]],
+    rounds: int,
+    finish: str,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    if rounds:
+        usage = dict(usage or {})
+        usage["continuations"] = rounds
+        usage["finish_reason"] = finish
+    return text, usage
+
+
+def continue_truncated(
+    send: SendFn,
+    messages: List[Dict[str, str]],
+    text: str,
+    usage: Optional[Dict[str, Any]],
+    finish_reason: str,
+    *,
+    label: str = "",
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    finish_reason == "length" で途中まで返ってきた text を、続きを頼んでつなぎ合わせる。
+
+    - 全文を作り直さない（既に出た部分は assistant メッセージとして渡す）
+    - usage は全ラウンドの合計。続きを取った回数を usage["continuations"] に入れる
+    - 続きの取得に失敗したら、そこまでの text を返す（元の 1 回目より悪くはしない）
+    """
+    rounds = 0
+    limit = max_continuations()
+    while finish_reason == "length" and text.strip() and rounds < limit:
+        try:
+            more, more_usage, finish_reason = send(continuation_messages(messages, text))
+        except Exception:
+            logger.warning("%s: continuation failed; returning truncated text", label, exc_info=True)
+            break
+        rounds += 1
+        usage = merge_usage(usage, more_usage)
+        if not more.strip():
+            break
+        text = stitch_continuation(text, more)
+    return _continued(text, usage, rounds, finish_reason)
+
+
+async def acontinue_truncated(
+    send: AsyncSendFn,
+    messages: List[Dict[str, str]],
+    text: str,
+    usage: Optional[Dict[str, Any]],
+    finish_reason: str,
+    *,
+    label: str = "",
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    continue_truncated の非同期版。
+    """
+    rounds = 0
+    limit = max_continuations()
+    while finish_reason == "length" and text.strip() and rounds < limit:
+        try:
+            more, more_usage, finish_reason = await send(continuation_messages(messages, text))
+        except Exception:
+            logger.warning("%s: continuation failed; returning truncated text", label, exc_info=True)
+            break
+        rounds += 1
+        usage = merge_usage(usage, more_usage)
+        if not more.strip():
+            break
+        text = stitch_continuation(text, more)
+    return _continued(text, usage, rounds, finish_reason)
+
+
+# ============================================================
+# n > 1（1 リクエストで複数サンプル）
+# ============================================================
+# 2 件目以降のサンプルは usage[SAMPLES_KEY] に入れて返す（戻り値の (text, usage) の形を変えない。
+# 応答キャッシュ / singleflight / failover はそのまま通る）
+SAMPLES_KEY = "samples"
+
+
+def sample_texts(response: Any) -> List[str]:
+    """
+    choices のテキストをすべて取り出す（SDK オブジェクト / dict どちらでも。n=1 なら 1 件）。
+    """
+    try:
+        if isinstance(response, dict):
+            choices = response.get("choices") or []
+        else:
+            choices = getattr(response, "choices", None) or []
+
+        def index_of(pos: int, choice: Any) -> int:
+            i = choice.get("index") if isinstance(choice, dict) else getattr(choice, "index", None)
+            return i if isinstance(i, int) else pos
+
+        # n>1 の choices は index 順とは限らない
+        ordered = sorted(enumerate(choices), key=lambda pc: index_of(*pc))
+        return [_choice_text(c) for _, c in ordered]
+    except Exception:
+        logger.exception("LLM samples parse error")
+        return []
+
+
+def attach_samples(
+    text: str,
+    usage: Optional[Dict[str, Any]],
+    samples: List[str],
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    n>1 で返ってきた全サンプルを usage["samples"] に入れる。先頭は text（continuation 後）に差し替える。
+    サンプルが 2 件未満なら何もしない。usage のトークン数は全サンプルの合計のまま。
+    """
+    if len(samples) < 2:
+        return text, usage
+    usage = dict(usage or {})
+    usage[SAMPLES_KEY] = [text, *samples[1:]]
+    return text, usage
+
+
+def without_samples(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    continuation 用：n を外した kwargs（続きは先頭のサンプルの分だけ取る）。
+    """
+    return {k: v for k, v in kwargs.items() if k != "n"}
+
+
+# ============================================================
+# SSE (Server-Sent Events) parser
+# ============================================================
+def iter_sse_json(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    SSE の行ストリームから `data: {...}` の JSON を順に取り出す。
+
+    - OpenAI / xAI / OpenRouter の chat.completions(stream=True)
+    - Gemini の streamGenerateContent?alt=sse
+    のどちらにも使える。`data: [DONE]` で終了する。
+    """
+    for line in lines:
+        if not line:
+            continue
+        line = line.strip()
+        if not line.startswith("data:"):
+            # ": OPENROUTER PROCESSING" のようなコメント行 / event 行は無視
+            continue
+
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        if not data:
+            continue
+
+        try:
+            obj = json.loads(data)
+        except Exception:
+            logger.warning("SSE chunk parse error: %s", data[:200])
+            continue
+
+        if isinstance(obj, dict):
+            yield obj
+
+
+def delta_text_from_chat_chunk(chunk: Dict[str, Any]) -> str:
+    """
+    OpenAI 互換 chat.completion.chunk（dict）から差分テキストを取り出す。
+    """
+    try:
+        choices = chunk.get("choices") or []
+        if choices:
+            delta = choices[0].get("delta") or {}
+            return delta.get("content") or ""
+    except Exception:
+        logger.exception("chat chunk parse error")
+    return ""
+
+
 # ============================================================
 # token parameter normalizer (OpenAI)
 # ============================================================
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import asdict, dataclass, field
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from types import MappingProxyType
+from typing import Any, Awaitable, Dict, Iterator, List, Mapping, Optional, Tuple
+import asyncio
+import json
+import logging
 import os
+import time
 
 try:
     import streamlit as st
@@ -11,13 +17,69 @@ except Exception:
     st = None  # type: ignore
     _HAS_ST = False
 
-from llm.llm_ai.llm_adapters.base import BaseLLMAdapter
+from llm.llm_ai.llm_adapters.base import DEFAULT_TIMEOUT_SEC, BaseLLMAdapter
+from llm.llm_ai.llm_adapters.utils import continuation_limit
+from llm.llm_ai.llm_capabilities import get_capabilities
+from llm.llm_ai.llm_deadline import Deadline, DeadlineExceeded, is_timeout_error, request_timeout
+from llm.llm_ai.llm_errors import HedgeFailedError, LLMRateLimitError
+from llm.llm_ai.llm_keys import get_key_pool_stats, has_api_key, load_keys, reset_key_pools
+from llm.llm_ai.llm_json import JSONOutputError, json_params, parse_and_validate, repair_messages
+from llm.llm_ai.llm_scheduler import (
+    estimate_tokens,
+    get_scheduler_stats,
+    get_vendor_scheduler,
+)
+from llm.llm_ai.llm_cache import (
+    CachePolicy,
+    cache_globally_enabled,
+    get_response_cache,
+    make_cache_key,
+)
+from llm.llm_ai.llm_latency import (
+    get_latency_stats,
+    get_latency_tracker,
+    hedge_delay,
+    record_latency,
+)
+from llm.llm_ai.llm_metrics import get_metrics_registry, track_call
+from llm.llm_ai.llm_resilience import (
+    CircuitOpenError,
+    RetryPolicy,
+    circuit_version,
+    get_breaker,
+    get_circuit_states,
+    is_outage,
+)
+from llm.llm_ai.llm_singleflight import get_singleflight, get_singleflight_stats, singleflight_enabled
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# API キーの参照元（env / st.secrets）が読み直されるたびに進む世代番号
+_SECRETS_VERSION = 0
+
+
+def _bump_secrets_version(*_args: Any, **_kwargs: Any) -> None:
+    global _SECRETS_VERSION
+    _SECRETS_VERSION += 1
+    # キープールも読み直す（次の呼び出しで新しいキーから作り直される）
+    reset_key_pools()
+
+
+if _HAS_ST:
+    # secrets.toml が書き換わったら has_key を取り直す
+    try:
+        st.secrets.file_change_listener.connect(_bump_secrets_version, weak=False)
+    except Exception:
+        pass
+
+
+@dataclass(frozen=True)
 class LLMModelConfig:
     """
     LLMAI 内で管理する1モデル分の設定。
+
+    登録後は変更しない（全セッションで共有するため）。
+    セッションごとの enabled / priority は LLMAI の overlay 側で持つ。
     """
     name: str
     adapter: BaseLLMAdapter
@@ -26,6 +88,21 @@ class LLMModelConfig:
     enabled: bool = True
     extra: Dict[str, Any] = field(default_factory=dict)
     params: Dict[str, Any] = field(default_factory=dict)  # デフォルト呼び出しパラメータ
+    cache_policy: CachePolicy = field(default_factory=CachePolicy)  # 応答キャッシュ方針
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """
+    get_model_props / get_models_sorted / get_available_models の結果を固めたもの。
+
+    version が同じなら中身も同じ（下流はこれをキーにメモ化してよい）。
+    dict は全呼び出し元で共有するので、書き換えずに読むだけにすること。
+    """
+    version: Tuple[int, int, int, int, int]
+    props: Dict[str, Dict[str, Any]]
+    sorted_props: Dict[str, Dict[str, Any]]
+    available: Dict[str, Dict[str, Any]]
 
 
 class LLMAI:
@@ -34,25 +111,92 @@ class LLMAI:
 
     - register_* で Adapter を登録
     - call() で呼び出し（Adapter.call に委譲）
+    - acall() / stream() は非同期版 / ストリーミング版
+    - 応答キャッシュ（opt-in）: register 時の cache_policy か、呼び出し時の cache=True
+    - 実際の Adapter 呼び出しは vendor ごとのスケジューラ（同時実行数 / RPM / TPM）を通る
+    - 一時的な失敗はバックオフ + jitter で再送、モデルごとのサーキットブレーカーで fail fast
+    - failover を有効にすると、落ちたモデルの代わりに priority 順の次のモデルへ回す
+    - call_hedged(): primary が直近 p90 までに返らなければ backup にも投げ、先着を採用
+    - singleflight: 同じ model / messages / params の呼び出しが実行中なら、後続は HTTP を出さずに相乗りする
+    - call_json(): schema に合う JSON を parse 済みで返す（vendor の JSON モード + ローカル検証 + 修復 1 回）
+    - deadline=Deadline を渡すと、各リクエストの timeout を min(ターンの残り, 学習済み p99) にし、
+      残りが無ければ呼ばずに DeadlineExceeded（バックオフ / 429 待ちも残りの範囲で）
+    - 呼び出しごとに latency / TTFB / tokens / retries / error class / payload size を llm_metrics に記録
     - get_model_props() で UI/ModelsAI2 互換の一覧を返す
+    - overlay(): 登録済みモデル（Adapter / 接続）を共有したまま、enabled / priority だけを
+      セッション（リクエスト）ごとに持つ軽量ビューを作る。overlay 側からは登録できない
+    - モデル一覧はバージョン付きスナップショット（snapshot()）。登録 / enabled / ブレーカー /
+      secrets のどれかが変わったときだけ作り直す
     """
 
-    def __init__(self, persona_id: str = "default") -> None:
+    # 429 の Retry-After がこれ以下なら、待ってから 1 回だけ再送する
+    MAX_RATE_LIMIT_WAIT_SEC: float = 30.0
+
+    def __init__(
+        self,
+        persona_id: str = "default",
+        *,
+        models: Optional[Mapping[str, LLMModelConfig]] = None,
+    ) -> None:
         self.persona_id = persona_id
-        self._models: Dict[str, LLMModelConfig] = {}
+        # models を渡された場合は共有レジストリへの読み取り専用ビュー（register 不可）
+        self._shared = models is not None
+        self._models: Mapping[str, LLMModelConfig] = (
+            MappingProxyType(models) if models is not None else {}
+        )
+
+        self.retry_policy: RetryPolicy = RetryPolicy.from_env()
+
+        # 登録の世代番号は登録元（共有レジストリ）が持つ。overlay は登録元を参照する
+        self._registry: LLMAI = self
+        self._registry_version = 0
+        # enabled overlay の世代番号と、最後に作ったスナップショット
+        self._overlay_version = 0
+        self._snapshot: Optional[ModelSnapshot] = None
+
+        # --- セッション単位の overlay（共有レジストリは書き換えない） ---
+        # 差し替えは常に新しい dict / list を代入する（読む側はロック不要）
+        self._enabled_overlay: Dict[str, bool] = {}
+        # failover の順序（AI Manager の priority。空なら cfg.priority の降順）
+        self._failover_order: List[str] = []
 
     # ===========================================================
-    # 内部：APIキー判定（env + streamlit.secrets）
+    # overlay（共有レジストリ + セッションごとの enabled / priority）
+    # ===========================================================
+    def overlay(
+        self,
+        *,
+        persona_id: Optional[str] = None,
+        enabled: Optional[Dict[str, bool]] = None,
+        priority: Optional[List[str]] = None,
+    ) -> "LLMAI":
+        """
+        同じモデル登録（Adapter / HTTP プール / スケジューラ / ブレーカー）を共有し、
+        enabled / priority だけを独立に持つ LLMAI を返す。
+
+        今の overlay を引き継いだうえで、enabled / priority を指定した分だけ上書きする。
+        """
+        view = LLMAI(persona_id or self.persona_id, models=self._models)
+        view._registry = self._registry
+        view.retry_policy = self.retry_policy
+        view._enabled_overlay = dict(self._enabled_overlay)
+        view._failover_order = list(self._failover_order)
+
+        if enabled is not None:
+            view.set_enabled_models(enabled)
+        if priority is not None:
+            view.set_failover_order(priority)
+        return view
+
+    def _is_enabled(self, name: str, cfg: LLMModelConfig) -> bool:
+        return bool(self._enabled_overlay.get(name, cfg.enabled))
+
+    # ===========================================================
+    # 内部：APIキー判定（env + streamlit.secrets。カンマ区切り / [keys] テーブルのキープールも可）
     # ===========================================================
     @staticmethod
     def _has_api_key(env_key: Optional[str]) -> bool:
-        if not env_key:
-            return True
-        if os.getenv(env_key):
-            return True
-        if _HAS_ST and isinstance(st.secrets, dict) and st.secrets.get(env_key):
-            return True
-        return False
+        return has_api_key(env_key)
 
     # ===========================================================
     # Adapter 登録
@@ -66,12 +210,19 @@ class LLMAI:
         enabled: bool = True,
         extra: Optional[Dict[str, Any]] = None,
         params: Optional[Dict[str, Any]] = None,
+        cache_policy: Any = None,
     ) -> None:
         """
         register_* から呼ばれる入口。
 
         adapter.name をキーとして登録する。
+        cache_policy は CachePolicy / dict / True（既定値で有効）を受け付ける。
         """
+        if self._shared:
+            raise RuntimeError(
+                "This LLMAI is an overlay of the shared registry; register adapters on the registry itself"
+            )
+
         name = getattr(adapter, "name", "") or ""
         if not name:
             raise ValueError("Adapter.name is empty")
@@ -91,8 +242,10 @@ class LLMAI:
             enabled=bool(enabled),
             extra={**auto_extra, **(extra or {})},
             params=dict(params or {}),
+            cache_policy=CachePolicy.from_any(cache_policy),
         )
-        self._models[name] = cfg
+        self._models[name] = cfg  # type: ignore[index]
+        self._registry_version += 1
 
     @staticmethod
     def _infer_vendor_extra(model_name: str) -> Tuple[str, Dict[str, Any]]:
@@ -111,18 +264,14 @@ class LLMAI:
     # ===========================================================
     # 呼び出し
     # ===========================================================
-    def call(
+    def _prepare_call(
         self,
-        *,
         model_name: str,
-        messages: List[Dict[str, str]],
-        **kwargs: Any,
-    ) -> Any:
+        kwargs: Dict[str, Any],
+    ) -> Tuple[LLMModelConfig, Dict[str, Any]]:
         """
-        互換のため、戻り値は Adapter 実装に合わせる：
-        - (text, usage) が基本
+        call / acall 共通の事前チェック。
 
-        追加の安全策：
         - enabled=False のモデルは呼ばない
         - env_key が必要でキーが無いモデルは呼ばない
         """
@@ -130,7 +279,7 @@ class LLMAI:
         if cfg is None:
             raise ValueError(f"Unknown model: {model_name}")
 
-        if not cfg.enabled:
+        if not self._is_enabled(model_name, cfg):
             raise RuntimeError(f"Model disabled: {model_name}")
 
         env_key = (cfg.extra or {}).get("env_key")
@@ -139,14 +288,922 @@ class LLMAI:
 
         call_params = dict(cfg.params)
         call_params.update(kwargs)
+        return cfg, call_params
+
+    # ===========================================================
+    # 内部：Adapter 呼び出し（vendor スケジューラ経由）
+    # ===========================================================
+    def _invoke(
+        self,
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        call_params: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+    ) -> Any:
+        sched = get_vendor_scheduler(cfg.vendor)
+        est = estimate_tokens(messages, call_params)
+
+        for attempt in range(2):
+            with sched.slot(est, deadline=deadline) as slot:
+                # 枠待ちは締切まで（尽きたら scheduler:<vendor> で DeadlineExceeded）。
+                # 枠を取れたあとで残り予算から今回の timeout を決める
+                params = self._with_timeout(cfg, call_params, deadline)
+                # continuations はキャッシュ / 相乗りのキーには含め、ベンダーへは送らない
+                limit = params.pop("continuations", None)
+                try:
+                    with continuation_limit(limit):
+                        result = cfg.adapter.call(messages=messages, **params)
+                except LLMRateLimitError as e:
+                    waited = sched.penalize(e.retry_after)
+                    if attempt == 0 and waited <= self._max_rate_limit_wait(deadline):
+                        continue
+                    raise
+                except Exception as e:
+                    self._note_timeout(cfg, e, params)
+                    raise
+                if isinstance(result, tuple) and len(result) >= 2:
+                    slot.report_usage(result[1])
+                return result
+
+        raise RuntimeError(f"unreachable: {cfg.name}")  # pragma: no cover
+
+    async def _ainvoke(
+        self,
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        call_params: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+    ) -> Any:
+        sched = get_vendor_scheduler(cfg.vendor)
+        est = estimate_tokens(messages, call_params)
+
+        for attempt in range(2):
+            async with sched.aslot(est, deadline=deadline) as slot:
+                # 枠待ちは締切まで（尽きたら scheduler:<vendor> で DeadlineExceeded）。
+                # 枠を取れたあとで残り予算から今回の timeout を決める
+                params = self._with_timeout(cfg, call_params, deadline)
+                # continuations はキャッシュ / 相乗りのキーには含め、ベンダーへは送らない
+                limit = params.pop("continuations", None)
+                try:
+                    with continuation_limit(limit):
+                        result = await cfg.adapter.acall(messages=messages, **params)
+                except LLMRateLimitError as e:
+                    waited = sched.penalize(e.retry_after)
+                    if attempt == 0 and waited <= self._max_rate_limit_wait(deadline):
+                        continue
+                    raise
+                except Exception as e:
+                    self._note_timeout(cfg, e, params)
+                    raise
+                if isinstance(result, tuple) and len(result) >= 2:
+                    slot.report_usage(result[1])
+                return result
+
+        raise RuntimeError(f"unreachable: {cfg.name}")  # pragma: no cover
+
+    @staticmethod
+    def _with_timeout(
+        cfg: LLMModelConfig,
+        call_params: Dict[str, Any],
+        deadline: Optional[Deadline],
+    ) -> Dict[str, Any]:
+        """
+        今回の 1 リクエストの timeout を足した call_params（元の dict は変えない）。
+
+        呼び出し側 / register 時の params に timeout があればそれを上限にする。
+        ターンの残りが無ければ DeadlineExceeded。
+        """
+        try:
+            default = float(call_params.get("timeout") or DEFAULT_TIMEOUT_SEC)
+        except (TypeError, ValueError):
+            default = DEFAULT_TIMEOUT_SEC
+        timeout = request_timeout(deadline, cfg.name, default)
+        if deadline is not None and timeout <= 0.0:
+            raise deadline.exceeded(f"llm:{cfg.name}")
+        return {**call_params, "timeout": timeout}
 
-        return cfg.adapter.call(messages=messages, **call_params)
+    def _max_rate_limit_wait(self, deadline: Optional[Deadline]) -> float:
+        if deadline is None:
+            return self.MAX_RATE_LIMIT_WAIT_SEC
+        return min(self.MAX_RATE_LIMIT_WAIT_SEC, deadline.remaining())
+
+    @staticmethod
+    def _note_timeout(cfg: LLMModelConfig, e: BaseException, params: Dict[str, Any]) -> None:
+        # タイムアウトした呼び出しは成功サンプルに残らないので、打ち切った秒数を下限として記録する
+        # （遅くなったモデルの学習済みタイムアウトが縮んだまま戻らなくなるのを防ぐ）
+        if is_timeout_error(e):
+            record_latency(cfg.name, float(params.get("timeout") or 0.0))
+
+    def _stream_invoke(
+        self,
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        call_params: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+    ) -> Iterator[str]:
+        sched = get_vendor_scheduler(cfg.vendor)
+        est = estimate_tokens(messages, call_params)
+        breaker = get_breaker(cfg.name)
+
+        # ストリーム中は枠を持ち続ける（429 はそのまま呼び出し側へ）。
+        # 途中まで表示済みのことがあるので、ストリームは再送 / failover しない。
+        # TTFB はストリームでは「最初の差分が届くまで」を記録する。
+        t0 = time.monotonic()
+        box: Dict[str, Any] = {}
+        parts: List[str] = []
+        with sched.slot(est, deadline=deadline):
+            try:
+                for delta in cfg.adapter.stream(messages=messages, **call_params):
+                    if not parts:
+                        box["ttfb_sec"] = time.monotonic() - t0
+                    parts.append(delta)
+                    yield delta
+            except LLMRateLimitError as e:
+                sched.penalize(e.retry_after)
+                breaker.release_trial()
+                self._record_metrics(cfg, messages, t0=t0, box=box, attempt=0, error=e)
+                raise
+            except GeneratorExit:
+                # 呼び出し側が途中で読むのをやめた（成否は判定しない）
+                breaker.release_trial()
+                raise
+            except Exception as e:
+                self._record_breaker_failure(breaker, e)
+                self._record_metrics(cfg, messages, t0=t0, box=box, attempt=0, error=e)
+                raise
+        breaker.record_success()
+        self._record_metrics(cfg, messages, t0=t0, box=box, attempt=0, result="".join(parts))
+
+    # ===========================================================
+    # 内部：リトライ + サーキットブレーカー
+    # ===========================================================
+    def _call_resilient(
+        self,
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        call_params: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+    ) -> Any:
+        if deadline is not None and deadline.expired():
+            e = deadline.exceeded(f"llm:{cfg.name}")
+            self._record_metrics(cfg, messages, t0=time.monotonic(), box={}, attempt=0, error=e)
+            raise e
+
+        breaker = get_breaker(cfg.name)
+        if not breaker.allow():
+            e = CircuitOpenError(f"Circuit open: {cfg.name}")
+            self._record_metrics(cfg, messages, t0=time.monotonic(), box={}, attempt=0, error=e)
+            raise e
+
+        t0 = time.monotonic()
+        attempt = 0
+        with track_call() as box:
+            while True:
+                try:
+                    result = self._invoke(cfg, messages, call_params, deadline)
+                except Exception as e:
+                    delay = self.retry_policy.delay_for(attempt)
+                    if self.retry_policy.should_retry(e, attempt) and self._fits(deadline, delay):
+                        logger.warning(
+                            "%s: transient failure (attempt=%s), retrying in %.2fs: %s",
+                            cfg.name, attempt + 1, delay, e,
+                        )
+                        time.sleep(delay)
+                        attempt += 1
+                        continue
+                    err = self._as_deadline_error(cfg, e, deadline)
+                    self._record_breaker_failure(breaker, err)
+                    self._record_metrics(cfg, messages, t0=t0, box=box, attempt=attempt, error=err)
+                    if err is e:
+                        raise
+                    raise err from e
+                breaker.record_success()
+                record_latency(cfg.name, time.monotonic() - t0)
+                self._record_metrics(cfg, messages, t0=t0, box=box, attempt=attempt, result=result)
+                return result
+
+    async def _acall_resilient(
+        self,
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        call_params: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+    ) -> Any:
+        if deadline is not None and deadline.expired():
+            e = deadline.exceeded(f"llm:{cfg.name}")
+            self._record_metrics(cfg, messages, t0=time.monotonic(), box={}, attempt=0, error=e)
+            raise e
+
+        breaker = get_breaker(cfg.name)
+        if not breaker.allow():
+            e = CircuitOpenError(f"Circuit open: {cfg.name}")
+            self._record_metrics(cfg, messages, t0=time.monotonic(), box={}, attempt=0, error=e)
+            raise e
+
+        t0 = time.monotonic()
+        attempt = 0
+        with track_call() as box:
+            while True:
+                try:
+                    result = await self._ainvoke(cfg, messages, call_params, deadline)
+                except Exception as e:
+                    delay = self.retry_policy.delay_for(attempt)
+                    if self.retry_policy.should_retry(e, attempt) and self._fits(deadline, delay):
+                        logger.warning(
+                            "%s: transient failure (attempt=%s), retrying in %.2fs: %s",
+                            cfg.name, attempt + 1, delay, e,
+                        )
+                        await asyncio.sleep(delay)
+                        attempt += 1
+                        continue
+                    err = self._as_deadline_error(cfg, e, deadline)
+                    self._record_breaker_failure(breaker, err)
+                    self._record_metrics(cfg, messages, t0=t0, box=box, attempt=attempt, error=err)
+                    if err is e:
+                        raise
+                    raise err from e
+                breaker.record_success()
+                record_latency(cfg.name, time.monotonic() - t0)
+                self._record_metrics(cfg, messages, t0=t0, box=box, attempt=attempt, result=result)
+                return result
+
+    @staticmethod
+    def _record_metrics(
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        *,
+        t0: float,
+        box: Dict[str, Any],
+        attempt: int,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        try:
+            request_bytes = len(json.dumps(messages, ensure_ascii=False, default=str).encode("utf-8"))
+        except Exception:
+            request_bytes = None
+
+        usage: Any = None
+        response_bytes: Optional[int] = None
+        if error is None:
+            if isinstance(result, tuple) and result:
+                response_bytes = len(str(result[0] or "").encode("utf-8"))
+                usage = result[1] if len(result) >= 2 else None
+            elif isinstance(result, str):
+                response_bytes = len(result.encode("utf-8"))
+
+        get_metrics_registry().record_call(
+            cfg.name,
+            status="ok" if error is None else "error",
+            latency_sec=time.monotonic() - t0,
+            ttfb_sec=box.get("ttfb_sec"),
+            retries=attempt,
+            error_class=type(error).__name__ if error is not None else None,
+            usage=usage,
+            request_bytes=request_bytes,
+            response_bytes=response_bytes,
+        )
+
+    @staticmethod
+    def _fits(deadline: Optional[Deadline], delay: float) -> bool:
+        """
+        delay 秒待ってから再送しても、まだターンの残りがあるか。
+        """
+        return deadline is None or delay < deadline.remaining()
+
+    @staticmethod
+    def _as_deadline_error(
+        cfg: LLMModelConfig,
+        e: BaseException,
+        deadline: Optional[Deadline],
+    ) -> BaseException:
+        """
+        ターンの予算切れで打ち切られた失敗なら DeadlineExceeded に読み替える
+        （モデルの障害ではないのでブレーカーの失敗には数えない）。
+        """
+        if deadline is None or isinstance(e, DeadlineExceeded) or not deadline.expired():
+            return e
+        return deadline.exceeded(f"llm:{cfg.name}")
+
+    @staticmethod
+    def _record_breaker_failure(breaker: Any, e: BaseException) -> None:
+        if is_outage(e):
+            breaker.record_failure(e)
+        else:
+            # リクエスト側の誤り / 429 はモデル障害として数えない
+            breaker.release_trial()
+
+    # ===========================================================
+    # 内部：failover（priority 順の次のモデルへ回す）
+    # ===========================================================
+    def set_failover_order(self, order: List[str]) -> None:
+        # 途中で読まれても壊れないよう、組み立ててから差し替える
+        self._failover_order = [str(m) for m in order if str(m).strip()]
+
+    @staticmethod
+    def _failover_enabled(failover: Any) -> bool:
+        if failover is None:
+            return os.getenv("LYRA_LLM_FAILOVER", "0") == "1"
+        return bool(failover)
+
+    def _failover_candidates(self, model_name: str, failover: Any) -> List[str]:
+        """
+        model_name が落ちたときに試す代替モデル（順番どおり）。
+
+        - failover がリストならそれを使う / True（または env）なら AI Manager の priority
+        - priority 上で model_name より後ろを先に、前のものを後に試す
+        - disabled / キー無し / ブレーカー open のモデルは除外
+        """
+        if not self._failover_enabled(failover):
+            return []
+
+        if isinstance(failover, (list, tuple)):
+            chain = [str(m) for m in failover]
+        elif self._failover_order:
+            chain = list(self._failover_order)
+        else:
+            chain = [
+                name
+                for name, _ in sorted(
+                    self._models.items(), key=lambda kv: kv[1].priority, reverse=True
+                )
+            ]
+
+        if model_name in chain:
+            i = chain.index(model_name)
+            chain = chain[i + 1:] + chain[:i]
+
+        out: List[str] = []
+        for name in chain:
+            cfg = self._models.get(name)
+            if cfg is None or name == model_name or name in out or not self._is_enabled(name, cfg):
+                continue
+            env_key = (cfg.extra or {}).get("env_key")
+            if env_key and not self._has_api_key(str(env_key)):
+                continue
+            if get_breaker(name).state == "open":
+                continue
+            out.append(name)
+        return out
+
+    @staticmethod
+    def _should_failover(e: BaseException) -> bool:
+        return isinstance(e, CircuitOpenError) or is_outage(e)
+
+    @staticmethod
+    def _mark_served_by(result: Any, model_name: str) -> Any:
+        """
+        failover で別モデルが応答したことを usage["served_by"] に残す。
+        """
+        if isinstance(result, tuple) and len(result) >= 2:
+            usage = dict(result[1]) if isinstance(result[1], dict) else {}
+            usage["served_by"] = model_name
+            return (result[0], usage, *result[2:])
+        return result
+
+    @staticmethod
+    def _mark_hedge_errors(result: Any, errors: Dict[str, BaseException]) -> Any:
+        """
+        ヘッジで先に失敗した側の理由を usage["hedge_errors"]（モデル名 -> str）に残す。
+        """
+        if not errors or not (isinstance(result, tuple) and len(result) >= 2):
+            return result
+        usage = dict(result[1]) if isinstance(result[1], dict) else {}
+        usage["hedge_errors"] = {name: str(e) for name, e in errors.items()}
+        return (result[0], usage, *result[2:])
+
+    @staticmethod
+    def _hedge_failed(errors: Dict[str, BaseException]) -> HedgeFailedError:
+        """
+        primary / backup の両方が失敗したときの例外（先に失敗した方を __cause__ に残す）。
+        """
+        first = next(iter(errors.values()))
+        err = HedgeFailedError(
+            "hedged call failed: " + " / ".join(f"{name}: {e}" for name, e in errors.items()),
+            errors={name: str(e) for name, e in errors.items()},
+            status_code=getattr(first, "status_code", None),
+        )
+        err.__cause__ = first
+        return err
+
+    def _log_failover(self, origin: str, alt: str, e: BaseException) -> None:
+        get_breaker(origin).note_failover()
+        logger.warning("%s failed (%s); failing over to %s", origin, e, alt)
+
+    @staticmethod
+    def _resolve_cache(
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        call_params: Dict[str, Any],
+        *,
+        cache: Optional[bool],
+        cache_ttl: Optional[float],
+    ) -> Optional[Tuple[str, CachePolicy]]:
+        """
+        この呼び出しをキャッシュするなら (key, policy) を返す。しないなら None。
+
+        - cache=False なら常に使わない / cache=True なら policy が無効でも使う
+        - max_temperature を超える呼び出しは使わない
+        """
+        if cache is False or not cache_globally_enabled():
+            return None
+
+        policy = cfg.cache_policy
+        if not (policy.enabled or cache is True):
+            return None
+
+        temp = call_params.get("temperature")
+        if policy.max_temperature is not None and temp is not None:
+            try:
+                if float(temp) > policy.max_temperature:
+                    return None
+            except (TypeError, ValueError):
+                return None
+
+        if cache_ttl is not None:
+            policy = CachePolicy(
+                enabled=True,
+                ttl_sec=float(cache_ttl),
+                max_temperature=policy.max_temperature,
+                disk=policy.disk,
+            )
+
+        return make_cache_key(cfg.name, messages, call_params), policy
+
+    @staticmethod
+    def _flight_key(
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        call_params: Dict[str, Any],
+        *,
+        failover: Any,
+        coalesce: Optional[bool],
+    ) -> Optional[str]:
+        """
+        singleflight のキー（相乗りしないなら None）。failover の指定が違えば別の呼び出し扱い。
+        """
+        if not singleflight_enabled(coalesce):
+            return None
+        return make_cache_key(cfg.name, messages, {**call_params, "_failover": failover})
+
+    @staticmethod
+    def _store_cache(
+        cfg: LLMModelConfig,
+        cached: Tuple[str, CachePolicy],
+        result: Any,
+    ) -> None:
+        # 空テキスト（失敗に近い応答）は保存しない
+        if isinstance(result, tuple) and result and str(result[0] or "").strip():
+            key, policy = cached
+            get_response_cache().put(
+                key,
+                list(result),
+                model_name=cfg.name,
+                ttl_sec=policy.ttl_sec,
+                disk=policy.disk,
+            )
+
+    def call(
+        self,
+        *,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        cache: Optional[bool] = None,
+        cache_ttl: Optional[float] = None,
+        failover: Any = None,
+        deadline: Optional[Deadline] = None,
+        coalesce: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        互換のため、戻り値は Adapter 実装に合わせる：
+        - (text, usage) が基本
+
+        cache / cache_ttl / failover / deadline / coalesce / continuations は LLMAI 側で消費し、Adapter には渡さない。
+        failover: None=環境変数 LYRA_LLM_FAILOVER に従う / True=priority 順 / list=その順 / False=しない
+        deadline: ターンの締切（llm_deadline.Deadline）。尽きていれば呼ばずに DeadlineExceeded
+        coalesce: 同じ model / messages / params の呼び出しが実行中なら HTTP を出さずにその結果を待つ
+                  （None=環境変数 LYRA_SINGLEFLIGHT に従う（既定 有効）/ False=必ず自分で呼ぶ）
+        continuations（kwargs）: length 打ち切りの続きを取りに行く回数の上書き
+                  （無ければ LYRA_LLM_CONTINUATIONS。ModelsAI2 は長さの予算を付けた呼び出しで 0 を渡す）
+        """
+        cfg, call_params = self._prepare_call(model_name, kwargs)
+
+        cached = self._resolve_cache(
+            cfg, messages, call_params, cache=cache, cache_ttl=cache_ttl
+        )
+        if cached is not None:
+            hit = get_response_cache().get(cached[0], model_name=cfg.name)
+            if hit is not None:
+                get_metrics_registry().record_cache_hit(cfg.name)
+                return tuple(hit)
+
+        def run() -> Any:
+            return self._call_failover(
+                cfg, messages, call_params, kwargs, failover=failover, deadline=deadline, cached=cached
+            )
+
+        flight = self._flight_key(cfg, messages, call_params, failover=failover, coalesce=coalesce)
+        if flight is None:
+            return run()
+        return get_singleflight().do(flight, cfg.name, run, deadline=deadline)
+
+    def _call_failover(
+        self,
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        call_params: Dict[str, Any],
+        kwargs: Dict[str, Any],
+        *,
+        failover: Any,
+        deadline: Optional[Deadline],
+        cached: Optional[Tuple[str, CachePolicy]],
+    ) -> Any:
+        """
+        call の本体（キャッシュ参照の後）：リトライ付きで呼び、落ちたら failover。
+        singleflight の leader だけが実行する（キャッシュへの保存もここで 1 回だけ）。
+        """
+        try:
+            result = self._call_resilient(cfg, messages, call_params, deadline)
+        except Exception as e:
+            if not self._should_failover(e):
+                raise
+            for alt in self._failover_candidates(cfg.name, failover):
+                alt_cfg, alt_params = self._prepare_call(alt, kwargs)
+                try:
+                    alt_result = self._call_resilient(alt_cfg, messages, alt_params, deadline)
+                except Exception as e2:
+                    if not self._should_failover(e2):
+                        raise
+                    continue
+                self._log_failover(cfg.name, alt, e)
+                return self._mark_served_by(alt_result, alt)
+            raise
+
+        if cached is not None:
+            self._store_cache(cfg, cached, result)
+        return result
+
+    async def acall(
+        self,
+        *,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        cache: Optional[bool] = None,
+        cache_ttl: Optional[float] = None,
+        failover: Any = None,
+        deadline: Optional[Deadline] = None,
+        coalesce: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        call の非同期版。Adapter.acall に委譲する。
+
+        1つのイベントループから多数のリクエストを並行に流せる
+        （in-flight の呼び出しごとにスレッドを占有しない）。
+        """
+        cfg, call_params = self._prepare_call(model_name, kwargs)
+
+        cached = self._resolve_cache(
+            cfg, messages, call_params, cache=cache, cache_ttl=cache_ttl
+        )
+        if cached is not None:
+            hit = get_response_cache().get(cached[0], model_name=cfg.name)
+            if hit is not None:
+                get_metrics_registry().record_cache_hit(cfg.name)
+                return tuple(hit)
+
+        def run() -> Awaitable[Any]:
+            return self._acall_failover(
+                cfg, messages, call_params, kwargs, failover=failover, deadline=deadline, cached=cached
+            )
+
+        flight = self._flight_key(cfg, messages, call_params, failover=failover, coalesce=coalesce)
+        if flight is None:
+            return await run()
+        return await get_singleflight().ado(flight, cfg.name, run, deadline=deadline)
+
+    async def _acall_failover(
+        self,
+        cfg: LLMModelConfig,
+        messages: List[Dict[str, str]],
+        call_params: Dict[str, Any],
+        kwargs: Dict[str, Any],
+        *,
+        failover: Any,
+        deadline: Optional[Deadline],
+        cached: Optional[Tuple[str, CachePolicy]],
+    ) -> Any:
+        try:
+            result = await self._acall_resilient(cfg, messages, call_params, deadline)
+        except Exception as e:
+            if not self._should_failover(e):
+                raise
+            for alt in self._failover_candidates(cfg.name, failover):
+                alt_cfg, alt_params = self._prepare_call(alt, kwargs)
+                try:
+                    alt_result = await self._acall_resilient(alt_cfg, messages, alt_params, deadline)
+                except Exception as e2:
+                    if not self._should_failover(e2):
+                        raise
+                    continue
+                self._log_failover(cfg.name, alt, e)
+                return self._mark_served_by(alt_result, alt)
+            raise
+
+        if cached is not None:
+            self._store_cache(cfg, cached, result)
+        return result
+
+    # ===========================================================
+    # 構造化 JSON 出力
+    # ===========================================================
+    def call_json(
+        self,
+        *,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        schema: Dict[str, Any],
+        name: str = "result",
+        cache: Optional[bool] = None,
+        cache_ttl: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        schema（JSON Schema のサブセット、llm_json 参照）に合う JSON を parse 済みで返す。
+
+        - vendor が対応していれば response_format / Gemini responseSchema で JSON を返させる
+          （vendor がスキーマまで強制するのは strict にできる schema だけ。llm_json.strict_schema_ok）
+        - ローカルで検証し、合わなければ誤りを添えて 1 回だけ直させる
+        - それでも合わなければ JSONOutputError（raw_text / errors 付き）
+        - キャッシュには検証を通ったテキストだけを入れる（壊れた応答を使い回さない）
+        - vendor ごとにパラメータが違うので failover はしない
+        """
+        known = self._models.get(model_name)
+        vendor = known.vendor if known is not None else "unknown"
+        # 別 vendor のプロトコルを話すモデル（模擬サーバなど）は extra["json_vendor"] でその形式にする
+        if known is not None:
+            vendor = str((known.extra or {}).get("json_vendor") or vendor)
+        params = {**kwargs, **json_params(vendor, schema, name=name, kwargs=kwargs)}
+        cfg, call_params = self._prepare_call(model_name, params)
+
+        cached = self._resolve_cache(
+            cfg, messages, call_params, cache=cache, cache_ttl=cache_ttl
+        )
+        if cached is not None:
+            hit = get_response_cache().get(cached[0], model_name=cfg.name)
+            if hit is not None:
+                data, errors = parse_and_validate(str(hit[0] or ""), schema)
+                if not errors:
+                    get_metrics_registry().record_cache_hit(cfg.name)
+                    return data
+
+        result = self.call(
+            model_name=model_name,
+            messages=messages,
+            cache=False,
+            failover=False,
+            deadline=deadline,
+            **params,
+        )
+        text = str(result[0] or "") if isinstance(result, tuple) and result else str(result or "")
+        data, errors = parse_and_validate(text, schema)
+
+        if errors:
+            logger.warning("call_json: model=%s invalid output, repairing: %s", model_name, errors[:3])
+            result = self.call(
+                model_name=model_name,
+                messages=repair_messages(messages, text, errors, schema),
+                cache=False,
+                failover=False,
+                deadline=deadline,
+                **params,
+            )
+            text = str(result[0] or "") if isinstance(result, tuple) and result else str(result or "")
+            data, errors = parse_and_validate(text, schema)
+            if errors:
+                raise JSONOutputError(
+                    f"{model_name}: output does not match schema: {'; '.join(errors[:3])}",
+                    raw_text=text,
+                    errors=errors,
+                )
+
+        if cached is not None:
+            usage = result[1] if isinstance(result, tuple) and len(result) >= 2 else None
+            self._store_cache(cfg, cached, (text, usage))
+        return data
+
+    # ===========================================================
+    # ヘッジ（primary が遅いときだけ backup にも投げる）
+    # ===========================================================
+    def _resolve_backup(self, model_name: str, backup_model: Optional[str]) -> Optional[str]:
+        if backup_model:
+            return backup_model if backup_model != model_name else None
+        candidates = self._failover_candidates(model_name, True)
+        return candidates[0] if candidates else None
+
+    def call_hedged(
+        self,
+        *,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        backup_model: Optional[str] = None,
+        hedge_after_sec: Optional[float] = None,
+        backup_kwargs: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        primary（model_name）を呼び、hedge_after_sec（既定: primary の直近 p90）までに
+        返らなければ backup_model にも同じ messages を投げて、先に成功した方を返す。
+
+        - backup_model 省略時は failover と同じ priority 順の次のモデル
+        - backup_kwargs 省略時は kwargs をそのまま使う（モデルごとに既定値が違う場合に渡す）
+        - backup が勝ったら usage["served_by"] に backup 名が入る
+        - 負けた方は結果を捨てる（実行中のスレッドは止められないので待たない）
+        - primary が発火前に失敗したら、その時点で backup を撃つ
+        - 勝った方より先に失敗した側があれば usage["hedge_errors"]（モデル名 -> 理由）に入る
+        - 両方失敗したら HedgeFailedError（errors にモデルごとの理由）
+        - deadline は primary / backup の両方に渡す（同じターンの予算を共有する）
+        """
+        kwargs.pop("failover", None)
+        backup = self._resolve_backup(model_name, backup_model)
+        if backup is None:
+            return self.call(
+                model_name=model_name, messages=messages, failover=False, deadline=deadline, **kwargs
+            )
+
+        delay = float(hedge_after_sec) if hedge_after_sec is not None else hedge_delay(model_name)
+        b_kwargs = dict(kwargs if backup_kwargs is None else backup_kwargs)
+
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm_hedge")
+        try:
+            primary: Future = executor.submit(
+                self.call,
+                model_name=model_name,
+                messages=messages,
+                failover=False,
+                deadline=deadline,
+                **kwargs,
+            )
+            done, _ = wait([primary], timeout=delay)
+            if done and primary.exception() is None:
+                get_latency_tracker().record_hedge(model_name, fired=False, backup_won=False)
+                return primary.result()
+
+            logger.info("%s: no reply within %.2fs, hedging to %s", model_name, delay, backup)
+            secondary: Future = executor.submit(
+                self.call,
+                model_name=backup,
+                messages=messages,
+                failover=False,
+                deadline=deadline,
+                **b_kwargs,
+            )
+
+            names = {primary: model_name, secondary: backup}
+            errors: Dict[str, BaseException] = {}
+            pending = {primary, secondary}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    exc = fut.exception()
+                    if exc is not None:
+                        errors[names[fut]] = exc
+                        continue
+                    backup_won = fut is secondary
+                    get_latency_tracker().record_hedge(model_name, fired=True, backup_won=backup_won)
+                    result = self._mark_hedge_errors(fut.result(), errors)
+                    return self._mark_served_by(result, backup) if backup_won else result
+
+            get_latency_tracker().record_hedge(model_name, fired=True, backup_won=False)
+            raise self._hedge_failed(errors)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def acall_hedged(
+        self,
+        *,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        backup_model: Optional[str] = None,
+        hedge_after_sec: Optional[float] = None,
+        backup_kwargs: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        call_hedged の非同期版。負けた方のタスクは cancel する。
+        """
+        kwargs.pop("failover", None)
+        backup = self._resolve_backup(model_name, backup_model)
+        if backup is None:
+            return await self.acall(
+                model_name=model_name, messages=messages, failover=False, deadline=deadline, **kwargs
+            )
+
+        delay = float(hedge_after_sec) if hedge_after_sec is not None else hedge_delay(model_name)
+        b_kwargs = dict(kwargs if backup_kwargs is None else backup_kwargs)
+
+        primary = asyncio.ensure_future(
+            self.acall(
+                model_name=model_name, messages=messages, failover=False, deadline=deadline, **kwargs
+            )
+        )
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done and primary.exception() is None:
+            get_latency_tracker().record_hedge(model_name, fired=False, backup_won=False)
+            return primary.result()
+
+        logger.info("%s: no reply within %.2fs, hedging to %s", model_name, delay, backup)
+        secondary = asyncio.ensure_future(
+            self.acall(
+                model_name=backup, messages=messages, failover=False, deadline=deadline, **b_kwargs
+            )
+        )
+
+        names = {primary: model_name, secondary: backup}
+        errors: Dict[str, BaseException] = {}
+        pending = {primary, secondary}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exc = task.exception()
+                    if exc is not None:
+                        errors[names[task]] = exc
+                        continue
+                    backup_won = task is secondary
+                    get_latency_tracker().record_hedge(model_name, fired=True, backup_won=backup_won)
+                    result = self._mark_hedge_errors(task.result(), errors)
+                    return self._mark_served_by(result, backup) if backup_won else result
+        finally:
+            for task in pending:
+                task.cancel()
+
+        get_latency_tracker().record_hedge(model_name, fired=True, backup_won=False)
+        raise self._hedge_failed(errors)
+
+    def stream(
+        self,
+        *,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        deadline: Optional[Deadline] = None,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """
+        テキスト差分を順に yield する（Adapter.stream に委譲）。
+
+        enabled / API キーのチェックは最初の next() より前に行う。
+        ストリームはキャッシュ / 相乗りしない（cache / cache_ttl / failover / coalesce は捨てる）。
+        ブレーカーが open / deadline が尽きていれば最初の next() より前に例外。
+        ストリームの timeout はチャンク間の待ち時間の上限として Adapter に渡る。
+        """
+        kwargs.pop("cache", None)
+        kwargs.pop("cache_ttl", None)
+        kwargs.pop("failover", None)
+        kwargs.pop("coalesce", None)
+        # ストリームは continuation しない
+        kwargs.pop("continuations", None)
+        cfg, call_params = self._prepare_call(model_name, kwargs)
+        call_params.pop("continuations", None)
+        call_params = self._with_timeout(cfg, call_params, deadline)
+        if not get_breaker(cfg.name).allow():
+            raise CircuitOpenError(f"Circuit open: {cfg.name}")
+        return self._stream_invoke(cfg, messages, call_params, deadline)
 
     # ===========================================================
     # 情報取得（互換）
     # ===========================================================
-    def get_model_props(self) -> Dict[str, Dict[str, Any]]:
-        out: Dict[str, Dict[str, Any]] = {}
+    def snapshot(self) -> ModelSnapshot:
+        """
+        モデル一覧のスナップショット。version が変わっていなければ前回の物をそのまま返す。
+
+        version = (登録, enabled overlay, ブレーカー状態, secrets, 自分の id)
+        """
+        version = (
+            self._registry._registry_version,
+            self._overlay_version,
+            circuit_version(),
+            _SECRETS_VERSION,
+            id(self),
+        )
+        snap = self._snapshot
+        if snap is not None and snap.version == version:
+            return snap
+
+        snap = self._build_snapshot(version)
+        self._snapshot = snap
+        return snap
+
+    @property
+    def snapshot_version(self) -> Tuple[int, int, int, int, int]:
+        return self.snapshot().version
+
+    def _build_snapshot(self, version: Tuple[int, int, int, int, int]) -> ModelSnapshot:
+        props: Dict[str, Dict[str, Any]] = {}
         for name, cfg in self._models.items():
             extra = dict(cfg.extra)
 
@@ -157,68 +1214,111 @@ class LLMAI:
             else:
                 supported_parameters = []
 
-            out[name] = {
+            props[name] = {
                 "vendor": cfg.vendor,
                 "priority": cfg.priority,
-                "enabled": cfg.enabled,
+                "enabled": self._is_enabled(name, cfg),
                 "extra": extra,
                 "params": dict(cfg.params),
                 "defaults": dict(cfg.params),
                 "supported_parameters": supported_parameters,
+                "cache_policy": asdict(cfg.cache_policy),
+                "circuit": get_breaker(name).state,
             }
-        return out
 
-    def get_models_sorted(self) -> Dict[str, Dict[str, Any]]:
-        items = sorted(self._models.items(), key=lambda kv: kv[1].priority, reverse=True)
-        out: Dict[str, Dict[str, Any]] = {}
-        for name, cfg in items:
-            extra = dict(cfg.extra)
-            supported = extra.get("supported_parameters")
-            if isinstance(supported, list):
-                supported_parameters = list(supported)
-            else:
-                supported_parameters = []
+        sorted_props = {
+            name: props[name]
+            for name, _ in sorted(self._models.items(), key=lambda kv: kv[1].priority, reverse=True)
+        }
 
-            out[name] = {
-                "vendor": cfg.vendor,
-                "priority": cfg.priority,
-                "enabled": cfg.enabled,
-                "extra": extra,
-                "params": dict(cfg.params),
-                "defaults": dict(cfg.params),
-                "supported_parameters": supported_parameters,
-            }
-        return out
+        # “呼び出してよいモデル” だけ（enabled=True かつ、env_key が必要ならキーがある）
+        available: Dict[str, Dict[str, Any]] = {}
+        for name, p in props.items():
+            env_key = (p.get("extra") or {}).get("env_key")
+            key_count = len(load_keys(str(env_key))) if env_key else 0
+            has_key = key_count > 0 if env_key else True
+            if p["enabled"] and has_key:
+                available[name] = {**p, "has_key": has_key, "key_count": key_count}
+
+        return ModelSnapshot(
+            version=version,
+            props=props,
+            sorted_props=sorted_props,
+            available=available,
+        )
+
+    def get_model_props(self) -> Dict[str, Dict[str, Any]]:
+        return self.snapshot().props
+
+    def get_models_sorted(self) -> Dict[str, Dict[str, Any]]:
+        return self.snapshot().sorted_props
 
     def get_available_models(self) -> Dict[str, Dict[str, Any]]:
         """
         “呼び出してよいモデル” だけを返す。
-    
+
         条件:
         - enabled=True
         - env_key が必要な場合は has_key=True（env + secrets）
         """
-        props = self.get_model_props()
-    
-        out: Dict[str, Dict[str, Any]] = {}
-        for name, p in props.items():
-            enabled = bool(p.get("enabled", True))
-    
-            extra = p.get("extra") or {}
-            env_key = extra.get("env_key")
-    
-            has_key = self._has_api_key(str(env_key)) if env_key else True
-    
-            p2 = dict(p)
-            p2["has_key"] = has_key
-    
-            if enabled and has_key:
-                out[name] = p2
-    
-        return out
-
+        return self.snapshot().available
 
     def set_enabled_models(self, enabled: Dict[str, bool]) -> None:
+        """
+        この LLMAI（セッション）から見た enabled を上書きする。共有レジストリは変えない。
+        """
+        overlay = dict(self._enabled_overlay)
+        changed = False
         for name, flag in enabled.items():
-            if name in self._models:
-                self._models[name].enabled = bool(flag)
+            cfg = self._models.get(name)
+            if cfg is None:
+                continue
+            changed = changed or self._is_enabled(name, cfg) != bool(flag)
+            overlay[name] = bool(flag)
+        self._enabled_overlay = overlay
+        if changed:
+            self._overlay_version += 1
+
+    @staticmethod
+    def reload_secrets() -> None:
+        """
+        環境変数などキーの参照元を差し替えたあとに呼ぶ（has_key を取り直させる）。
+        secrets.toml の変更は Streamlit の通知で自動的に反映される。
+        """
+        _bump_secrets_version()
+
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+        return get_response_cache().stats()
+
+    @staticmethod
+    def get_scheduler_stats() -> Dict[str, Dict[str, Any]]:
+        return get_scheduler_stats()
+
+    @staticmethod
+    def get_circuit_states() -> Dict[str, Dict[str, Any]]:
+        return get_circuit_states()
+
+    @staticmethod
+    def get_latency_stats() -> Dict[str, Dict[str, Any]]:
+        return get_latency_stats()
+
+    @staticmethod
+    def get_capabilities() -> Dict[str, Dict[str, Any]]:
+        return get_capabilities()
+
+    @staticmethod
+    def get_singleflight_stats() -> Dict[str, Dict[str, int]]:
+        return get_singleflight_stats()
+
+    @staticmethod
+    def get_key_pool_stats() -> Dict[str, Dict[str, Any]]:
+        return get_key_pool_stats()
+
+    @staticmethod
+    def get_metrics_dataframe() -> Any:
+        return get_metrics_registry().to_dataframe()
+
+    @staticmethod
+    def get_metrics_prometheus() -> str:
+        return get_metrics_registry().to_prometheus()
@@ -0,0 +1,289 @@
+# llm/llm_ai/llm_cache.py
+"""
+LLM 応答のコンテンツアドレス型キャッシュ（LLMAI.call から利用）。
+
+- キー = sha256(model_name + 正規化 messages + 呼び出しパラメータ)
+- 1段目: プロセス内 LRU（件数上限つき）
+- 2段目: SQLite（プロセス / セッションをまたいで再利用）
+- TTL 付き。期限切れは読み出し時に捨てる
+
+既定では何もキャッシュしない（opt-in）。
+モデルごとの CachePolicy を register_adapter(cache_policy=...) で渡すか、
+呼び出し時に cache=True を渡したときだけ使われる。
+
+設定（環境変数）:
+  LYRA_LLM_CACHE           : "0" でキャッシュを全体的に無効化
+  LYRA_LLM_CACHE_PATH      : SQLite ファイルパス（既定 .lyra_cache/llm_cache.sqlite3）
+  LYRA_LLM_CACHE_MAX_ITEMS : メモリ LRU の件数上限（既定 512）
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    1モデル分のキャッシュ方針。
+
+    - enabled        : True ならこのモデルの呼び出しは既定でキャッシュ対象
+    - ttl_sec        : 有効期限（秒）
+    - max_temperature: これより高い temperature の呼び出しはキャッシュしない（None なら制限なし）
+    - disk           : SQLite 段にも書くか
+    """
+    enabled: bool = False
+    ttl_sec: float = 3600.0
+    max_temperature: Optional[float] = None
+    disk: bool = True
+
+    @classmethod
+    def from_any(cls, value: Any) -> "CachePolicy":
+        if isinstance(value, CachePolicy):
+            return value
+        if isinstance(value, dict):
+            return cls(
+                enabled=bool(value.get("enabled", True)),
+                ttl_sec=float(value.get("ttl_sec", 3600.0)),
+                max_temperature=(
+                    float(value["max_temperature"])
+                    if value.get("max_temperature") is not None
+                    else None
+                ),
+                disk=bool(value.get("disk", True)),
+            )
+        if value is True:
+            return cls(enabled=True)
+        return cls()
+
+
+def _normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    role / content 以外のキーと前後の空白を落とし、同じ意味の messages を同じキーにする。
+    """
+    out: List[Dict[str, str]] = []
+    for m in messages or []:
+        if not isinstance(m, dict):
+            continue
+        out.append(
+            {
+                "role": str(m.get("role") or "user"),
+                "content": str(m.get("content") or "").strip(),
+            }
+        )
+    return out
+
+
+def make_cache_key(
+    model_name: str,
+    messages: List[Dict[str, Any]],
+    params: Dict[str, Any],
+) -> str:
+    payload = {
+        "model": model_name,
+        "messages": _normalize_messages(messages),
+        "params": {k: params[k] for k in sorted(params)},
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LRU（メモリ）+ SQLite（ディスク）の 2 段キャッシュ。スレッドセーフ。
+
+    値は (text, usage) をそのまま JSON で保存する。
+    """
+
+    def __init__(
+        self,
+        *,
+        path: Optional[str] = None,
+        max_items: int = 512,
+    ) -> None:
+        self.path = path
+        self.max_items = max(1, int(max_items))
+
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        if path:
+            try:
+                d = os.path.dirname(path)
+                if d:
+                    os.makedirs(d, exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    " key TEXT PRIMARY KEY,"
+                    " model TEXT,"
+                    " expires_at REAL,"
+                    " value TEXT)"
+                )
+                self._db.commit()
+            except Exception:
+                logger.exception("LLMResponseCache: SQLite init failed (memory only): %s", path)
+                self._db = None
+
+    # ------------------------------------------------------------
+    # 統計
+    # ------------------------------------------------------------
+    def _bump(self, model_name: str, key: str) -> None:
+        st = self._stats.setdefault(
+            model_name,
+            {"hits_memory": 0, "hits_disk": 0, "misses": 0, "stores": 0, "expired": 0},
+        )
+        st[key] = st.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        モデル別の hit/miss 集計（hit_ratio つき）。
+        """
+        with self._lock:
+            raw = {m: dict(s) for m, s in self._stats.items()}
+            mem_items = len(self._lru)
+
+        out: Dict[str, Dict[str, Any]] = {}
+        for model_name, s in raw.items():
+            hits = s.get("hits_memory", 0) + s.get("hits_disk", 0)
+            total = hits + s.get("misses", 0)
+            out[model_name] = {
+                **s,
+                "hit_ratio": round(hits / total, 3) if total else 0.0,
+            }
+        out["_total"] = {"memory_items": mem_items, "disk": bool(self._db)}
+        return out
+
+    # ------------------------------------------------------------
+    # get / put
+    # ------------------------------------------------------------
+    def get(self, key: str, *, model_name: str = "") -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                expires_at, value = hit
+                if expires_at >= now:
+                    self._lru.move_to_end(key)
+                    self._bump(model_name, "hits_memory")
+                    return value
+                self._lru.pop(key, None)
+                self._bump(model_name, "expired")
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT expires_at, value FROM llm_cache WHERE key = ?",
+                        (key,),
+                    ).fetchone()
+                except Exception:
+                    logger.exception("LLMResponseCache: SQLite read failed")
+                    row = None
+
+                if row is not None:
+                    expires_at, raw = float(row[0]), row[1]
+                    if expires_at >= now:
+                        value = self._decode(raw)
+                        self._remember(key, expires_at, value)
+                        self._bump(model_name, "hits_disk")
+                        return value
+                    try:
+                        self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                        self._db.commit()
+                    except Exception:
+                        pass
+                    self._bump(model_name, "expired")
+
+            self._bump(model_name, "misses")
+            return None
+
+    def put(
+        self,
+        key: str,
+        value: Any,
+        *,
+        model_name: str = "",
+        ttl_sec: float = 3600.0,
+        disk: bool = True,
+    ) -> None:
+        expires_at = time.time() + max(0.0, float(ttl_sec))
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._bump(model_name, "stores")
+
+            if disk and self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, model, expires_at, value)"
+                        " VALUES (?, ?, ?, ?)",
+                        (key, model_name, expires_at, json.dumps(value, ensure_ascii=False)),
+                    )
+                    self._db.commit()
+                except Exception:
+                    logger.exception("LLMResponseCache: SQLite write failed")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._stats.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM llm_cache")
+                    self._db.commit()
+                except Exception:
+                    logger.exception("LLMResponseCache: SQLite clear failed")
+
+    # ------------------------------------------------------------
+    # 内部
+    # ------------------------------------------------------------
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        self._lru[key] = (expires_at, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    @staticmethod
+    def _decode(raw: str) -> Any:
+        value = json.loads(raw)
+        # (text, usage) は JSON で list になるので tuple に戻す
+        if isinstance(value, list):
+            return tuple(value)
+        return value
+
+
+_SHARED: Optional[LLMResponseCache] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def cache_globally_enabled() -> bool:
+    return os.getenv("LYRA_LLM_CACHE", "1") != "0"
+
+
+def get_response_cache() -> LLMResponseCache:
+    """
+    プロセス共有の LLMResponseCache を返す（全 LLMAI インスタンスで共有）。
+    """
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            try:
+                max_items = int(os.getenv("LYRA_LLM_CACHE_MAX_ITEMS", "512") or 512)
+            except ValueError:
+                max_items = 512
+            _SHARED = LLMResponseCache(
+                path=os.getenv("LYRA_LLM_CACHE_PATH", os.path.join(".lyra_cache", "llm_cache.sqlite3")),
+                max_items=max_items,
+            )
+        return _SHARED
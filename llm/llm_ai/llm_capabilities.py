@@ -0,0 +1,268 @@
+# llm/llm_ai/llm_capabilities.py
+"""
+モデル別の「受け付けないパラメータ」を 400 エラーから学習するキャッシュ（Adapter から利用）。
+
+- ベンダーの 400 / 422 本文（error.param やメッセージ）から、弾かれたパラメータ名を取り出す
+- 学習結果は model_id 単位でプロセス共有し、JSON に保存する（再起動しても 400 を踏み直さない）
+- Adapter は送信前に sanitize() で学習済みのパラメータを落とす
+- 400 を受けたら learn_from_error() で学習し、そのパラメータを落として再送する
+  （OpenAI は 1 回の 400 で 1 パラメータしか返さないので、新しく学習できた間だけ最大 MAX_LEARN_RETRIES 回）
+
+設定（環境変数）:
+  LYRA_LLM_CAPABILITIES_PATH : 保存先 JSON（既定 .lyra_cache/llm_capabilities.json。空文字ならメモリのみ）
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from llm.llm_ai.llm_errors import LLMCallError
+from llm.llm_ai.llm_json_store import JsonStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(".lyra_cache", "llm_capabilities.json")
+
+# 1 呼び出しで「学習して再送」する上限（再送のたびに送るキーが必ず 1 つ以上減る）
+MAX_LEARN_RETRIES = 3
+
+# 400 でも「パラメータが原因」と読める言い回し（小文字で比較）
+_REJECT_HINTS = (
+    "unsupported",
+    "not supported",
+    "does not support",
+    "unrecognized",
+    "unknown parameter",
+    "unknown field",
+    "unknown name",
+    "extra inputs are not permitted",
+    "not allowed",
+    "not permitted",
+    "invalid parameter",
+)
+
+# 学習で落としてはいけないキー（これが原因なら呼び出し側のバグ）
+_NEVER_DROP = frozenset({"model", "messages", "stream", "contents", "timeout"})
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(p[:1].upper() + p[1:] for p in rest)
+
+
+def _error_param(body: Optional[str]) -> Optional[str]:
+    """
+    OpenAI 互換の {"error": {"param": "temperature", ...}} から param を取り出す。
+    """
+    if not body:
+        return None
+    try:
+        data = json.loads(body)
+    except (TypeError, ValueError):
+        return None
+    err = data.get("error") if isinstance(data, dict) else None
+    if isinstance(err, dict) and isinstance(err.get("param"), str):
+        return err["param"]
+    return None
+
+
+def rejected_params(exc: BaseException, sent: Iterable[str]) -> List[str]:
+    """
+    exc（400 / 422）で弾かれた、sent のうちのパラメータ名。読み取れなければ空。
+
+    送っていないキーは返さない（本文に出てくる別名・提案先を誤学習しない）。
+    """
+    if not isinstance(exc, LLMCallError) or exc.status_code not in (400, 422):
+        return []
+
+    candidates = [k for k in sent if k not in _NEVER_DROP]
+    if not candidates:
+        return []
+
+    param = _error_param(exc.body)
+    if param in candidates:
+        return [param]  # type: ignore[list-item]
+
+    text = f"{exc.body or ''} {exc}".lower()
+    if not any(h in text for h in _REJECT_HINTS):
+        return []
+
+    out: List[str] = []
+    for key in candidates:
+        for alias in {key.lower(), _camel(key).lower()}:
+            if re.search(rf"(?<![a-z0-9_]){re.escape(alias)}(?![a-z0-9_])", text):
+                out.append(key)
+                break
+    return out
+
+
+class CapabilityCache:
+    """
+    model_id -> 受け付けないパラメータ名の集合。スレッドセーフ。
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._unsupported: Dict[str, Set[str]] = {}
+        self._learned_at: Dict[str, float] = {}
+        self._seeded: Dict[str, Set[str]] = {}
+        self._loaded = False
+        self._stats: Dict[str, int] = {"learned": 0, "stripped": 0}
+        # 学習はまれなので、覚えるたびにすぐ保存する
+        self._store = JsonStore(path, lock=self._lock, dump=self._dump, label="CapabilityCache")
+
+    # ------------------------------------------------------------
+    # 永続化
+    # ------------------------------------------------------------
+    def _ensure_loaded(self) -> None:
+        # ロックを持った状態で呼ぶ
+        if self._loaded:
+            return
+        self._loaded = True
+        data = self._store.load()
+        try:
+            for model_id, entry in (data or {}).items():
+                params = entry.get("unsupported") if isinstance(entry, dict) else None
+                if isinstance(params, list):
+                    self._unsupported.setdefault(model_id, set()).update(str(p) for p in params)
+                    self._learned_at[model_id] = float(entry.get("learned_at") or 0.0)
+        except Exception:
+            logger.exception("CapabilityCache: load failed (ignored): %s", self.path)
+
+    def _dump(self) -> Dict[str, Dict[str, Any]]:
+        # ロックを持った状態で呼ぶ。seed は保存しない（コード側の既知情報なので）
+        return {
+            model_id: {
+                "unsupported": sorted(params),
+                "learned_at": self._learned_at.get(model_id, 0.0),
+            }
+            for model_id, params in sorted(self._unsupported.items())
+            if params
+        }
+
+    # ------------------------------------------------------------
+    # 公開 API
+    # ------------------------------------------------------------
+    def seed(self, model_id: str, params: Iterable[str]) -> None:
+        """
+        最初から分かっている非対応パラメータを登録する（保存はしない）。
+        """
+        with self._lock:
+            self._seeded.setdefault(model_id, set()).update(params)
+
+    def unsupported(self, model_id: str) -> Set[str]:
+        with self._lock:
+            self._ensure_loaded()
+            return set(self._unsupported.get(model_id, ())) | set(self._seeded.get(model_id, ()))
+
+    def sanitize(self, model_id: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        学習済みの非対応パラメータを除いた kwargs を返す（元の dict は変えない）。
+        """
+        drop = self.unsupported(model_id)
+        hit = [k for k in kwargs if k in drop]
+        if not hit:
+            return kwargs
+        with self._lock:
+            self._stats["stripped"] += 1
+        return {k: v for k, v in kwargs.items() if k not in drop}
+
+    def learn(self, model_id: str, params: Iterable[str]) -> List[str]:
+        """
+        非対応パラメータを記録して保存する。新しく覚えたものを返す。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            known = self._unsupported.setdefault(model_id, set())
+            new = [p for p in params if p not in known]
+            if not new:
+                return []
+            known.update(new)
+            self._learned_at[model_id] = time.time()
+            self._stats["learned"] += len(new)
+            snap = self._store.changed()
+        self._store.save(snap)
+        logger.warning("capability learned: model_id=%s unsupported=%s", model_id, new)
+        return new
+
+    def learn_from_error(
+        self,
+        model_id: str,
+        exc: BaseException,
+        sent: Dict[str, Any],
+    ) -> List[str]:
+        """
+        exc から弾かれたパラメータを読み取って学習する。
+        再送すべきなら（= sent に落とせるパラメータがあった）そのキーを返す。
+        """
+        params = rejected_params(exc, sent.keys())
+        if params:
+            self.learn(model_id, params)
+        return params
+
+    def learn_from_response(self, model_id: str, resp: Any, sent: Dict[str, Any]) -> List[str]:
+        """
+        httpx.Response（raise_for_status 前）版。本文は読み込み済みであること。
+        """
+        status = getattr(resp, "status_code", None)
+        if status not in (400, 422):
+            return []
+        try:
+            body = resp.text
+        except Exception:
+            body = None
+        err = LLMCallError(f"HTTP {status}", status_code=status, body=body)
+        return self.learn_from_error(model_id, err, sent)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._ensure_loaded()
+            model_ids = sorted(set(self._unsupported) | set(self._seeded))
+            return {
+                model_id: {
+                    "learned": sorted(self._unsupported.get(model_id, ())),
+                    "seeded": sorted(self._seeded.get(model_id, ())),
+                    "learned_at": self._learned_at.get(model_id),
+                }
+                for model_id in model_ids
+            }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def clear(self) -> None:
+        """
+        学習結果を捨てる（seed は残す）。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._unsupported.clear()
+            self._learned_at.clear()
+            snap = self._store.changed()
+        self._store.save(snap)
+
+
+# ============================================================
+# プロセス共有
+# ============================================================
+_LOCK = threading.Lock()
+_CACHE: Optional[CapabilityCache] = None
+
+
+def get_capability_cache() -> CapabilityCache:
+    global _CACHE
+    with _LOCK:
+        if _CACHE is None:
+            _CACHE = CapabilityCache(path=os.getenv("LYRA_LLM_CAPABILITIES_PATH", DEFAULT_PATH))
+        return _CACHE
+
+
+def get_capabilities() -> Dict[str, Dict[str, Any]]:
+    return get_capability_cache().snapshot()
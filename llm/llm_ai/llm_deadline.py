@@ -0,0 +1,184 @@
+# llm/llm_ai/llm_deadline.py
+"""
+1 ターン分の締切（Deadline）と、モデル別の学習済みタイムアウト（LLMAI / ModelsAI2 から利用）。
+
+- AnswerTalker.speak / NarratorManager.run_task がターンの最初に Deadline を作り、
+  ModelsAI2 → LLMManager → LLMAI → Adapter へ同じオブジェクトを渡していく
+- 各リクエストの timeout = min(ターンの残り秒数, そのモデルの学習済みタイムアウト)
+    学習済みタイムアウト = 直近 p99 × LYRA_TIMEOUT_P99_FACTOR（下限 LYRA_TIMEOUT_MIN_SEC、上限は既定 60 秒）
+    サンプルが少ないうちは既定 60 秒（従来の固定値）
+- 残りが無くなったら呼ばずに DeadlineExceeded。どの段階で尽きたか（stage）を Deadline に記録し、
+  呼び出し側が llm_meta["deadline"] に残す
+- 1 つの Deadline を並列収集の各スレッドから触るので、記録はスレッドセーフ
+
+設定（環境変数）:
+  LYRA_TURN_BUDGET_SEC      : 1 ターンの予算秒数（既定 60）
+  LYRA_TIMEOUT_P99_FACTOR   : p99 に掛ける余裕倍率（既定 1.5）
+  LYRA_TIMEOUT_MIN_SEC      : 学習済みタイムアウトの下限（既定 5）
+  LYRA_TIMEOUT_MIN_SAMPLES  : これ未満の件数しか無いときは既定秒数を使う（既定 5）
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import os
+import sys
+import threading
+import time
+
+from llm.llm_ai.llm_adapters.base import DEFAULT_TIMEOUT_SEC
+from llm.llm_ai.llm_errors import LLMCallError
+from llm.llm_ai.llm_latency import get_latency_tracker
+
+DEFAULT_TURN_BUDGET_SEC = 60.0
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, "") or default)
+    except ValueError:
+        return default
+
+
+class DeadlineExceeded(LLMCallError):
+    """
+    ターンの予算を使い切ったので呼び出さなかった / 打ち切った。
+
+    - stage : 予算が尽きた段階（"llm:gpt51", "models_collect:grok" など）
+    """
+
+    def __init__(self, message: str, *, stage: str = "") -> None:
+        super().__init__(message)
+        self.stage = stage
+
+
+# ============================================================
+# 学習済みタイムアウト
+# ============================================================
+def is_timeout_error(exc: BaseException) -> bool:
+    """
+    1 リクエストの timeout で打ち切られた失敗か（httpx / OpenAI SDK / 標準ライブラリ）。
+    """
+    seen = 0
+    cur: Optional[BaseException] = exc
+    while cur is not None and seen < 5:
+        if isinstance(cur, TimeoutError):
+            return True
+        httpx = sys.modules.get("httpx")
+        if httpx is not None and isinstance(cur, httpx.TimeoutException):
+            return True
+        openai = sys.modules.get("openai")
+        if openai is not None and isinstance(cur, getattr(openai, "APITimeoutError", ())):
+            return True
+        cur = cur.__cause__
+        seen += 1
+    return False
+
+
+def adaptive_timeout(model_name: str, default: float = DEFAULT_TIMEOUT_SEC) -> float:
+    """
+    model_name の 1 リクエストに許す秒数（直近 p99 × 倍率。default を超えない）。
+    """
+    min_samples = int(_env_float("LYRA_TIMEOUT_MIN_SAMPLES", 5))
+    tracker = get_latency_tracker()
+    if tracker.sample_count(model_name) < max(1, min_samples):
+        return float(default)
+
+    p99 = tracker.percentile(model_name, 0.99) or 0.0
+    factor = max(1.0, _env_float("LYRA_TIMEOUT_P99_FACTOR", 1.5))
+    floor = max(0.1, _env_float("LYRA_TIMEOUT_MIN_SEC", 5.0))
+    return min(float(default), max(floor, p99 * factor))
+
+
+# ============================================================
+# Deadline
+# ============================================================
+class Deadline:
+    """
+    1 ターン分の締切。作った時刻から budget_sec 秒。
+    """
+
+    def __init__(self, budget_sec: float, *, label: str = "") -> None:
+        self.budget_sec = max(0.0, float(budget_sec))
+        self.label = label
+        self._start = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._expired_stages: List[str] = []
+
+    @classmethod
+    def for_turn(cls, label: str = "") -> "Deadline":
+        return cls(_env_float("LYRA_TURN_BUDGET_SEC", DEFAULT_TURN_BUDGET_SEC), label=label)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def remaining(self) -> float:
+        return max(0.0, self.budget_sec - self.elapsed)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout_for(self, model_name: str, default: float = DEFAULT_TIMEOUT_SEC) -> float:
+        """
+        model_name への 1 リクエストの timeout（残り予算と学習済みタイムアウトの小さい方）。
+        """
+        return min(self.remaining(), adaptive_timeout(model_name, default))
+
+    # ------------------------------------------------------------
+    # 記録
+    # ------------------------------------------------------------
+    def note_expired(self, stage: str) -> None:
+        with self._lock:
+            if stage not in self._expired_stages:
+                self._expired_stages.append(stage)
+
+    def exceeded(self, stage: str) -> DeadlineExceeded:
+        """
+        stage を記録して、投げるための DeadlineExceeded を返す。
+        """
+        self.note_expired(stage)
+        return DeadlineExceeded(
+            f"deadline exceeded at {stage} ({self.label or 'turn'}: budget {self.budget_sec:.1f}s)",
+            stage=stage,
+        )
+
+    def check(self, stage: str) -> None:
+        """
+        もう残りが無ければ stage を記録して DeadlineExceeded。
+        """
+        if self.expired():
+            raise self.exceeded(stage)
+
+    @property
+    def expired_stage(self) -> Optional[str]:
+        """
+        最初に予算が尽きた段階（尽きていなければ None）。
+        """
+        with self._lock:
+            return self._expired_stages[0] if self._expired_stages else None
+
+    def to_meta(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = list(self._expired_stages)
+        return {
+            "label": self.label,
+            "budget_sec": round(self.budget_sec, 3),
+            "elapsed_sec": round(self.elapsed, 3),
+            "remaining_sec": round(self.remaining(), 3),
+            "expired_stage": stages[0] if stages else None,
+            "expired_stages": stages,
+        }
+
+
+def request_timeout(
+    deadline: Optional[Deadline],
+    model_name: str,
+    default: float = DEFAULT_TIMEOUT_SEC,
+) -> float:
+    """
+    deadline が無ければ学習済みタイムアウトだけで決める。
+    """
+    if deadline is None:
+        return adaptive_timeout(model_name, default)
+    return deadline.timeout_for(model_name, default)
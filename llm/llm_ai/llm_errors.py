@@ -0,0 +1,109 @@
+# llm/llm_ai/llm_errors.py
+"""
+LLM 呼び出しの例外型。
+
+互換のため RuntimeError のサブクラスにしてある（既存の except RuntimeError はそのまま効く）。
+HTTP ステータスや Retry-After を上位（LLMAI のスケジューラ等）が参照できるようにする。
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+
+class LLMCallError(RuntimeError):
+    """
+    Adapter からの呼び出し失敗。
+
+    - status_code : HTTP ステータス（分からなければ None）
+    - retry_after : Retry-After ヘッダ（秒）。無ければ None
+    - body        : エラーレスポンス本文（先頭のみ）
+    """
+
+    def __init__(
+        self,
+        message: str,
+        *,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        body: Optional[str] = None,
+    ) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.body = body
+
+
+class LLMRateLimitError(LLMCallError):
+    """
+    429（レート制限）。retry_after が取れていればその秒数だけ待ってから再送する。
+    """
+
+
+class HedgeFailedError(LLMCallError):
+    """
+    ヘッジ呼び出しで primary / backup の両方が失敗した。
+
+    - errors : モデル名 -> そのモデルの失敗理由（str）
+    最初に失敗した方の例外は __cause__ に残す。
+    """
+
+    def __init__(self, message: str, *, errors: Dict[str, str], status_code: Optional[int] = None) -> None:
+        super().__init__(message, status_code=status_code)
+        self.errors = errors
+
+
+def _parse_retry_after(headers: Any) -> Optional[float]:
+    if headers is None:
+        return None
+    try:
+        raw = headers.get("retry-after") or headers.get("Retry-After")
+    except Exception:
+        return None
+    if raw is None:
+        # OpenAI 系は retry-after-ms を返すことがある
+        try:
+            ms = headers.get("retry-after-ms")
+            return float(ms) / 1000.0 if ms is not None else None
+        except Exception:
+            return None
+    try:
+        return max(0.0, float(raw))
+    except (TypeError, ValueError):
+        # HTTP-date 形式は扱わない（既定の待ち時間に任せる）
+        return None
+
+
+def to_llm_error(message: str, exc: BaseException) -> LLMCallError:
+    """
+    httpx.HTTPStatusError / openai.APIStatusError などを LLMCallError に変換する。
+
+    どちらも `.response`（httpx.Response）を持つので duck typing で読む。
+    元の例外は __cause__ に残す（接続エラーかどうかの判定に使う）。
+    """
+    if isinstance(exc, LLMCallError):
+        return exc
+
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None)
+
+    body: Optional[str] = None
+    try:
+        body = (response.text or "")[:2000] if response is not None else None
+    except Exception:
+        body = None
+
+    try:
+        status_code = int(status) if status is not None else None
+    except (TypeError, ValueError):
+        status_code = None
+
+    cls = LLMRateLimitError if status_code == 429 else LLMCallError
+    err = cls(
+        message,
+        status_code=status_code,
+        retry_after=_parse_retry_after(headers),
+        body=body,
+    )
+    err.__cause__ = exc
+    return err
@@ -0,0 +1,296 @@
+# llm/llm_ai/llm_json.py
+"""
+構造化 JSON 出力（LLMAI.call_json から利用）。
+
+- schema（JSON Schema のサブセット）から vendor ごとの「JSON で返せ」パラメータを作る
+    openai / xai : response_format = {"type": "json_schema", "json_schema": {...}}
+                   schema が strict モードの条件を満たすときだけ "strict": True（vendor がスキーマを強制する）
+                   （すべての object が properties を持ち、全キーが required、additionalProperties: false、
+                     strict で使えないキーワード（minLength / maxLength）が無いこと）
+                   満たさない schema（自由なキーの dict など）は strict なし = vendor 側では参考扱いで、
+                   形の保証はローカル検証だけ
+    google       : generationConfig.responseMimeType = application/json + responseSchema
+                   （responseSchema で表せない schema は responseMimeType だけ。これもローカル検証が頼り）
+    それ以外     : 追加パラメータなし（プロンプトの指示 + ローカル検証のみ）
+  vendor が response_format を 400 で弾いた場合は llm_capabilities が学習して以後は送らない
+- 応答はまず json.loads をそのまま試す（JSON モードならここで終わり、再パースしない）
+  失敗したときだけ ```json フェンスや前後の地の文を剥がして読み直す
+- validate() でローカル検証し、だめなら誤りを添えて 1 回だけ直させる（repair_messages）
+
+対応する schema のキーワード:
+  type（文字列 or リスト）/ properties / required / additionalProperties（bool / schema）/ items /
+  enum / minimum / maximum / minItems / maxItems / minLength / maxLength
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import re
+
+# JSON モードのパラメータを送る vendor（response_format 系。Gemini は responseSchema）
+_RESPONSE_FORMAT_VENDORS = frozenset({"openai", "xai"})
+
+# response_format の strict モードで使えないキーワード
+_STRICT_UNSUPPORTED_KEYS = frozenset({"minLength", "maxLength"})
+
+# Gemini の responseSchema（OpenAPI サブセット）が受け付けるキー
+_GEMINI_SCHEMA_KEYS = frozenset(
+    {
+        "type",
+        "format",
+        "description",
+        "nullable",
+        "enum",
+        "properties",
+        "required",
+        "items",
+        "minItems",
+        "maxItems",
+        "minimum",
+        "maximum",
+    }
+)
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+class JSONOutputError(RuntimeError):
+    """
+    修復 1 回を含めても、schema に合う JSON が得られなかった。
+
+    - raw_text : 最後に受け取った応答テキスト
+    - errors   : validate() の誤り一覧（パースできなければ "invalid JSON: ..."）
+    """
+
+    def __init__(self, message: str, *, raw_text: str = "", errors: Optional[List[str]] = None) -> None:
+        super().__init__(message)
+        self.raw_text = raw_text
+        self.errors = list(errors or [])
+
+
+# ============================================================
+# vendor パラメータ
+# ============================================================
+def to_gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    JSON Schema を Gemini responseSchema 形式に寄せる（type は大文字、未対応キーは落とす）。
+    """
+    out: Dict[str, Any] = {}
+    for key, val in schema.items():
+        if key not in _GEMINI_SCHEMA_KEYS:
+            continue
+        if key == "type":
+            types = [val] if isinstance(val, str) else list(val or [])
+            if "null" in types:
+                out["nullable"] = True
+            types = [t for t in types if t != "null"]
+            if types:
+                out["type"] = str(types[0]).upper()
+        elif key == "properties" and isinstance(val, dict):
+            out["properties"] = {k: to_gemini_schema(v) for k, v in val.items() if isinstance(v, dict)}
+        elif key == "items" and isinstance(val, dict):
+            out["items"] = to_gemini_schema(val)
+        else:
+            out[key] = val
+    return out
+
+
+def json_params(
+    vendor: str,
+    schema: Dict[str, Any],
+    *,
+    name: str = "result",
+    kwargs: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    call_json が通常の呼び出しパラメータに足すもの（kwargs は変えない）。
+    """
+    if vendor in _RESPONSE_FORMAT_VENDORS:
+        json_schema: Dict[str, Any] = {"name": name, "schema": schema}
+        if strict_schema_ok(schema):
+            json_schema["strict"] = True
+        return {
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": json_schema,
+            }
+        }
+    if vendor == "google":
+        gen = dict((kwargs or {}).get("generationConfig") or {})
+        gen["responseMimeType"] = "application/json"
+        if _gemini_schema_ok(schema):
+            gen["responseSchema"] = to_gemini_schema(schema)
+        return {"generationConfig": gen}
+    return {}
+
+
+def strict_schema_ok(schema: Dict[str, Any]) -> bool:
+    """
+    OpenAI / xAI の strict モードに渡せる schema か。
+
+    object はすべて properties を持ち、全キーが required で additionalProperties: false であること
+    （自由なキーの dict は strict で表せない）。
+    """
+    if any(key in schema for key in _STRICT_UNSUPPORTED_KEYS):
+        return False
+    types = schema.get("type")
+    types = [types] if isinstance(types, str) else list(types or [])
+    props = schema.get("properties")
+    if "object" in types:
+        if not isinstance(props, dict) or not props:
+            return False
+        if schema.get("additionalProperties") is not False:
+            return False
+        if set(schema.get("required") or []) != set(props):
+            return False
+    subs = list((props or {}).values()) if isinstance(props, dict) else []
+    if isinstance(schema.get("items"), dict):
+        subs.append(schema["items"])
+    return all(isinstance(s, dict) and strict_schema_ok(s) for s in subs)
+
+
+def _gemini_schema_ok(schema: Dict[str, Any]) -> bool:
+    """
+    responseSchema は properties の無い OBJECT（自由なキーの dict）を受け付けないので、
+    そういう箇所があれば responseMimeType だけにする（検証はローカルで行う）。
+    """
+    types = schema.get("type")
+    types = [types] if isinstance(types, str) else list(types or [])
+    if "object" in types and not schema.get("properties"):
+        return False
+    subs = list((schema.get("properties") or {}).values())
+    if isinstance(schema.get("items"), dict):
+        subs.append(schema["items"])
+    return all(_gemini_schema_ok(s) for s in subs if isinstance(s, dict))
+
+
+# ============================================================
+# パース / 検証
+# ============================================================
+def parse_json_text(text: str) -> Any:
+    """
+    応答テキストを JSON として読む。読めなければ ValueError。
+    """
+    s = (text or "").strip()
+    try:
+        return json.loads(s)
+    except ValueError:
+        pass
+
+    # ここからは vendor がスキーマを強制していない場合の救済
+    m = _FENCE_RE.search(s)
+    if m:
+        s = m.group(1).strip()
+    for open_ch, close_ch in (("{", "}"), ("[", "]")):
+        start, end = s.find(open_ch), s.rfind(close_ch)
+        if start != -1 and end > start:
+            try:
+                return json.loads(s[start : end + 1])
+            except ValueError:
+                continue
+    return json.loads(s)
+
+
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def validate(data: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """
+    schema に合わない箇所を "$.tags[0]: expected string" の形で返す（合っていれば空）。
+    """
+    errors: List[str] = []
+
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else list(types)
+        if not any(_TYPE_CHECKS.get(t, lambda v: True)(data) for t in types):
+            return [f"{path}: expected {'|'.join(types)}, got {type(data).__name__}"]
+
+    if "enum" in schema and data not in schema["enum"]:
+        errors.append(f"{path}: must be one of {schema['enum']}")
+
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        if "minimum" in schema and data < schema["minimum"]:
+            errors.append(f"{path}: must be >= {schema['minimum']}")
+        if "maximum" in schema and data > schema["maximum"]:
+            errors.append(f"{path}: must be <= {schema['maximum']}")
+
+    if isinstance(data, str):
+        if "minLength" in schema and len(data) < schema["minLength"]:
+            errors.append(f"{path}: length must be >= {schema['minLength']}")
+        if "maxLength" in schema and len(data) > schema["maxLength"]:
+            errors.append(f"{path}: length must be <= {schema['maxLength']}")
+
+    if isinstance(data, list):
+        if "minItems" in schema and len(data) < schema["minItems"]:
+            errors.append(f"{path}: must have >= {schema['minItems']} items")
+        if "maxItems" in schema and len(data) > schema["maxItems"]:
+            errors.append(f"{path}: must have <= {schema['maxItems']} items")
+        items = schema.get("items")
+        if isinstance(items, dict):
+            for i, v in enumerate(data):
+                errors += validate(v, items, f"{path}[{i}]")
+
+    if isinstance(data, dict):
+        props = schema.get("properties") or {}
+        for key in schema.get("required") or []:
+            if key not in data:
+                errors.append(f"{path}: missing required key {key!r}")
+        extra = schema.get("additionalProperties")
+        for key in data:
+            if key in props:
+                continue
+            if extra is False:
+                errors.append(f"{path}: unexpected key {key!r}")
+            elif isinstance(extra, dict):
+                errors += validate(data[key], extra, f"{path}.{key}")
+        for key, sub in props.items():
+            if key in data and isinstance(sub, dict):
+                errors += validate(data[key], sub, f"{path}.{key}")
+
+    return errors
+
+
+def parse_and_validate(text: str, schema: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    """
+    (data, errors)。パースできなければ data=None で errors に理由が入る。
+    """
+    try:
+        data = parse_json_text(text)
+    except ValueError as e:
+        return None, [f"invalid JSON: {e}"]
+    return data, validate(data, schema)
+
+
+# ============================================================
+# 修復
+# ============================================================
+def repair_messages(
+    messages: List[Dict[str, str]],
+    raw_text: str,
+    errors: List[str],
+    schema: Dict[str, Any],
+) -> List[Dict[str, str]]:
+    """
+    「直前の出力のここが schema に合わない」と伝えて、JSON だけを出し直させる messages。
+    """
+    instruction = (
+        "直前の出力は次の JSON Schema に合っていません。\n"
+        "誤り:\n"
+        + "\n".join(f"- {e}" for e in errors[:10])
+        + "\n\nJSON Schema:\n"
+        + json.dumps(schema, ensure_ascii=False)
+        + "\n\n誤りを直した JSON オブジェクトだけを出力してください（説明文・コードフェンスは不要）。"
+    )
+    return list(messages) + [
+        {"role": "assistant", "content": raw_text or ""},
+        {"role": "user", "content": instruction},
+    ]
@@ -0,0 +1,165 @@
+# llm/llm_ai/llm_json_store.py
+"""
+学習結果 / 集計を JSON 1 ファイルに保存する小さなヘルパ
+（CapabilityCache / ModelWinStats / LengthBudget から利用）。
+
+- 保存先 path が空文字 / None ならメモリのみ（何も書かない）
+- 書き込みは tmp ファイル + os.replace（途中で落ちても壊れたファイルを残さない）
+- 保存はまとめて行える（save_every 回の変更ごと、または前回から save_interval_sec 秒が過ぎたら）
+    返答の経路で毎回ディスクに書かないため。まとめる設定なら終了時（atexit）にも未保存の分を書く
+- 持ち主のロックの中では JSON 文字列を作るだけで、ファイルへの書き込みはロックの外
+    古いスナップショットが新しいものを上書きしないよう、世代で比べてから書く
+
+使い方（持ち主側）:
+    with self._lock:
+        ...（self._rows を更新）
+        snap = self._store.changed()
+    self._store.save(snap)
+
+設定（環境変数。env_prefix を渡したときだけ）:
+  {env_prefix}_SAVE_EVERY : この回数の変更ごとに保存
+  {env_prefix}_SAVE_SEC   : 前回の保存からこの秒数が過ぎていたら回数に関係なく保存
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, ContextManager, Optional, Tuple
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# (世代, JSON 文字列)
+Snapshot = Tuple[int, str]
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, "") or default)
+    except ValueError:
+        return default
+
+
+class JsonStore:
+    """
+    持ち主（lock と dump）のデータを path に保存する。load 以外はスレッドセーフ。
+
+    lock: 持ち主のデータを守るロック（changed は持った状態、save / flush は持たずに呼ぶ）
+    dump: 保存する JSON 化できる値を返す（lock を持った状態で呼ばれる）
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        *,
+        lock: ContextManager[Any],
+        dump: Callable[[], Any],
+        label: str,
+        save_every: Optional[int] = None,
+        save_interval_sec: Optional[float] = None,
+        env_prefix: str = "",
+        default_every: int = 1,
+        default_interval_sec: float = 0.0,
+    ) -> None:
+        self.path = path
+        self._lock = lock
+        self._dump = dump
+        self._label = label
+
+        if save_every is None:
+            save_every = int(
+                _env_float(f"{env_prefix}_SAVE_EVERY", default_every) if env_prefix else default_every
+            )
+        if save_interval_sec is None:
+            save_interval_sec = (
+                _env_float(f"{env_prefix}_SAVE_SEC", default_interval_sec) if env_prefix else default_interval_sec
+            )
+        self.save_every: int = max(1, int(save_every))
+        self.save_interval_sec: float = float(save_interval_sec)
+
+        self._dirty = 0
+        self._last_save = time.monotonic()
+        self._write_lock = threading.Lock()
+        self._generation = 0
+        self._written_generation = 0
+
+        if self.path and self.save_every > 1:
+            # まとめて保存している分の取りこぼしを防ぐ
+            atexit.register(self.flush)
+
+    # ------------------------------------------------------------
+    # 読み込み
+    # ------------------------------------------------------------
+    def load(self) -> Any:
+        """
+        保存済みの JSON（無い / 読めなければ None）。持ち主の _ensure_loaded から呼ぶ。
+        """
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            logger.exception("%s: load failed (ignored): %s", self._label, self.path)
+            return None
+
+    # ------------------------------------------------------------
+    # 保存
+    # ------------------------------------------------------------
+    def _snapshot(self) -> Snapshot:
+        # lock を持った状態で呼ぶ
+        self._generation += 1
+        self._dirty = 0
+        self._last_save = time.monotonic()
+        return self._generation, json.dumps(self._dump(), ensure_ascii=False, indent=2)
+
+    def changed(self) -> Optional[Snapshot]:
+        """
+        変更を 1 回数える（lock を持った状態で呼ぶ）。保存する頃合いならスナップショットを返す。
+        """
+        if not self.path:
+            return None
+        self._dirty += 1
+        if (
+            self._dirty >= self.save_every
+            or time.monotonic() - self._last_save >= self.save_interval_sec
+        ):
+            return self._snapshot()
+        return None
+
+    def save(self, snap: Optional[Snapshot]) -> None:
+        """
+        changed() が返したスナップショットを書く（lock の外で呼ぶ。None なら何もしない）。
+        """
+        if snap is None or not self.path:
+            return
+        generation, payload = snap
+        with self._write_lock:
+            if generation <= self._written_generation:
+                return
+            try:
+                d = os.path.dirname(self.path)
+                if d:
+                    os.makedirs(d, exist_ok=True)
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp, self.path)
+                self._written_generation = generation
+            except Exception:
+                logger.exception("%s: save failed: %s", self._label, self.path)
+
+    def flush(self) -> None:
+        """
+        未保存の変更があれば保存する（lock の外で呼ぶ。終了時など）。
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snap = self._snapshot()
+        self.save(snap)
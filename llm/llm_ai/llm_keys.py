@@ -0,0 +1,258 @@
+# llm/llm_ai/llm_keys.py
+"""
+API キーのプール（1 ベンダーに複数アカウントのキーを持たせてスループットを上げる）。
+
+- キーの取り出し元（上から順に、重複は除く）:
+    1) 環境変数（カンマ / 改行区切りで複数可）   例) OPENAI_API_KEY="sk-a,sk-b"
+    2) st.secrets のトップレベル（文字列 or リスト）
+    3) st.secrets の [keys] テーブル                例) [keys]
+                                                        OPENAI_API_KEY = ["sk-a", "sk-b"]
+- リクエストごとにラウンドロビンで回す
+- 429 を受けたキーは Retry-After（無ければ既定秒数）まで使わず、次のキーで即再送する
+- 全キーが 429 待ちなら、一番早く空くまでの秒数つきで LLMRateLimitError を投げる
+  （その先は LLMAI / vendor スケジューラの 429 待機に任せる）
+- キーごとの requests / 429 / errors / tokens を記録する（表示は末尾 4 文字だけ）
+- プロセス共有。secrets の再読み込みで作り直す（reset_key_pools）
+"""
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+import os
+import threading
+import time
+
+try:
+    import streamlit as st
+    _HAS_ST = True
+except Exception:
+    st = None  # type: ignore
+    _HAS_ST = False
+
+from llm.llm_ai.llm_errors import LLMRateLimitError
+from llm.llm_ai.llm_scheduler import DEFAULT_RATE_LIMIT_PENALTY_SEC
+
+T = TypeVar("T")
+
+UsageFn = Callable[[Any], Optional[Dict[str, Any]]]
+
+
+# ============================================================
+# キーの読み出し
+# ============================================================
+def _split(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        items = [str(v) for v in value]
+    else:
+        items = str(value).replace("\n", ",").split(",")
+    return [k.strip() for k in items if k and k.strip()]
+
+
+def _secrets_lookup(env_key: str) -> List[str]:
+    if not _HAS_ST:
+        return []
+    out: List[str] = []
+    try:
+        secrets = st.secrets
+        out += _split(secrets.get(env_key))
+        table = secrets.get("keys")
+        if table is not None and hasattr(table, "get"):
+            out += _split(table.get(env_key))
+    except Exception:
+        # secrets.toml が無い環境では st.secrets へのアクセス自体が例外になる
+        return out
+    return out
+
+
+def load_keys(*env_keys: str) -> List[str]:
+    """
+    env_keys（例: "XAI_API_KEY", "GROK_API_KEY"）に設定されたキーを全部、重複なしで返す。
+    """
+    out: List[str] = []
+    for env_key in env_keys:
+        if not env_key:
+            continue
+        for key in _split(os.getenv(env_key, "")) + _secrets_lookup(env_key):
+            if key not in out:
+                out.append(key)
+    return out
+
+
+def has_api_key(env_key: Optional[str]) -> bool:
+    if not env_key:
+        return True
+    return bool(load_keys(env_key))
+
+
+def mask_key(key: str) -> str:
+    return f"…{key[-4:]}" if len(key) > 4 else "…"
+
+
+# ============================================================
+# プール
+# ============================================================
+class KeyPool:
+    """
+    1 つのキー設定（env_keys）分のプール。スレッドセーフ。
+    """
+
+    def __init__(self, name: str, keys: Iterable[str]) -> None:
+        self.name = name
+        self.keys: List[str] = list(keys)
+
+        self._lock = threading.Lock()
+        self._next = 0
+        self._blocked_until: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, int]] = {
+            k: {"requests": 0, "rate_limited": 0, "errors": 0, "tokens": 0} for k in self.keys
+        }
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, exclude: Iterable[str] = ()) -> str:
+        """
+        次に使うキー（ラウンドロビン、429 待ちと exclude は飛ばす）。
+
+        使えるキーが無ければ LLMRateLimitError（retry_after = 一番早く空くまでの秒数）。
+        """
+        if not self.keys:
+            raise RuntimeError(f"{self.name} が設定されていません。")
+
+        skip = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            n = len(self.keys)
+            for i in range(n):
+                key = self.keys[(self._next + i) % n]
+                if key in skip or self._blocked_until.get(key, 0.0) > now:
+                    continue
+                self._next = (self._next + i + 1) % n
+                self._stats[key]["requests"] += 1
+                return key
+
+            waits = [
+                self._blocked_until.get(k, 0.0) - now for k in self.keys if k not in skip
+            ]
+        retry_after = max(0.0, min(waits)) if waits else None
+        raise LLMRateLimitError(
+            f"{self.name}: all {len(self.keys)} API keys are rate limited",
+            status_code=429,
+            retry_after=retry_after,
+        )
+
+    def penalize(self, key: str, retry_after: Optional[float]) -> None:
+        sec = float(retry_after) if retry_after is not None else DEFAULT_RATE_LIMIT_PENALTY_SEC
+        with self._lock:
+            self._blocked_until[key] = max(
+                self._blocked_until.get(key, 0.0), time.monotonic() + sec
+            )
+            if key in self._stats:
+                self._stats[key]["rate_limited"] += 1
+
+    def record(self, key: str, *, ok: bool, usage: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            st_ = self._stats.get(key)
+            if st_ is None:
+                return
+            if not ok:
+                st_["errors"] += 1
+            if isinstance(usage, dict):
+                try:
+                    st_["tokens"] += int(usage.get("total_tokens") or 0)
+                except (TypeError, ValueError):
+                    pass
+
+    # ------------------------------------------------------------
+    # 実行（429 なら次のキーで再送）
+    # ------------------------------------------------------------
+    def _on_error(self, key: str, exc: BaseException, tried: List[str]) -> bool:
+        """
+        次のキーで再送するなら True。
+        """
+        if isinstance(exc, LLMRateLimitError):
+            self.penalize(key, exc.retry_after)
+            tried.append(key)
+            return len(tried) < len(self.keys)
+        self.record(key, ok=False)
+        return False
+
+    def run(self, fn: Callable[[str], T], *, usage_of: Optional[UsageFn] = None) -> T:
+        tried: List[str] = []
+        while True:
+            key = self.acquire(exclude=tried)
+            try:
+                result = fn(key)
+            except Exception as e:
+                if self._on_error(key, e, tried):
+                    continue
+                raise
+            self.record(key, ok=True, usage=usage_of(result) if usage_of else None)
+            return result
+
+    async def arun(
+        self,
+        fn: Callable[[str], Awaitable[T]],
+        *,
+        usage_of: Optional[UsageFn] = None,
+    ) -> T:
+        tried: List[str] = []
+        while True:
+            key = self.acquire(exclude=tried)
+            try:
+                result = await fn(key)
+            except Exception as e:
+                if self._on_error(key, e, tried):
+                    continue
+                raise
+            self.record(key, ok=True, usage=usage_of(result) if usage_of else None)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "keys": len(self.keys),
+                "per_key": [
+                    {
+                        "key": mask_key(k),
+                        **self._stats[k],
+                        "blocked_for_sec": round(max(0.0, self._blocked_until.get(k, 0.0) - now), 1),
+                    }
+                    for k in self.keys
+                ],
+            }
+
+
+# ============================================================
+# プロセス共有レジストリ
+# ============================================================
+_LOCK = threading.Lock()
+_POOLS: Dict[Tuple[str, ...], KeyPool] = {}
+
+
+def get_key_pool(*env_keys: str) -> KeyPool:
+    """
+    env_keys に対応するプール（初回だけキーを読み出す）。
+    """
+    with _LOCK:
+        pool = _POOLS.get(env_keys)
+        if pool is None:
+            pool = KeyPool(env_keys[0] if env_keys else "API key", load_keys(*env_keys))
+            _POOLS[env_keys] = pool
+        return pool
+
+
+def reset_key_pools() -> None:
+    """
+    キーの取り出し元が変わったとき（secrets 再読み込み・環境変数の変更）に呼ぶ。
+    """
+    with _LOCK:
+        _POOLS.clear()
+
+
+def get_key_pool_stats() -> Dict[str, Dict[str, Any]]:
+    with _LOCK:
+        pools = list(_POOLS.values())
+    return {p.name: p.stats() for p in sorted(pools, key=lambda p: p.name)}
@@ -0,0 +1,137 @@
+# llm/llm_ai/llm_latency.py
+"""
+モデル別のレイテンシ統計（直近 N 件のローリング窓）と、ヘッジ（hedged request）の発火タイミング。
+
+- LLMAI の成功した呼び出しごとに所要秒数を記録する（キャッシュヒットは含めない）
+- p50 / p90 / p99 を直近の窓から計算する
+- ヘッジ：primary が「自分の p90」までに返らなければ backup にも同じ prompt を投げ、
+  先に返った方を採用する。その発火秒数を hedge_delay() が返す
+- プロセス共有（全 LLMAI / 全セッションで共有）
+
+設定（環境変数）:
+  LYRA_LATENCY_WINDOW      : ローリング窓の件数（既定 50）
+  LYRA_HEDGE_QUANTILE      : 発火に使うパーセンタイル（既定 0.9）
+  LYRA_HEDGE_MIN_SAMPLES   : これ未満の件数しか無いときは既定秒数を使う（既定 5）
+  LYRA_HEDGE_DEFAULT_SEC   : 統計が足りないときの発火秒数（既定 10）
+  LYRA_HEDGE_MIN_SEC       : 発火秒数の下限（既定 0.5。速すぎる発火で無駄打ちしない）
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+import math
+import os
+import threading
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, "") or default)
+    except ValueError:
+        return default
+
+
+WINDOW_SIZE = max(1, int(_env_float("LYRA_LATENCY_WINDOW", 50)))
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """
+    nearest-rank 法のパーセンタイル（sorted_values は昇順）。
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LatencyTracker:
+    """
+    モデルごとの直近レイテンシとヘッジ回数。スレッドセーフ。
+    """
+
+    def __init__(self, window: int = WINDOW_SIZE) -> None:
+        self.window = max(1, int(window))
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._hedges: Dict[str, Dict[str, int]] = {}
+
+    def record(self, model_name: str, elapsed_sec: float) -> None:
+        with self._lock:
+            q = self._samples.get(model_name)
+            if q is None:
+                q = deque(maxlen=self.window)
+                self._samples[model_name] = q
+            q.append(max(0.0, float(elapsed_sec)))
+
+    def percentile(self, model_name: str, q: float) -> Optional[float]:
+        """
+        直近の窓での q パーセンタイル。サンプルが無ければ None。
+        """
+        with self._lock:
+            values = sorted(self._samples.get(model_name) or ())
+        if not values:
+            return None
+        return _percentile(values, q)
+
+    def sample_count(self, model_name: str) -> int:
+        with self._lock:
+            return len(self._samples.get(model_name) or ())
+
+    def record_hedge(self, model_name: str, *, fired: bool, backup_won: bool) -> None:
+        with self._lock:
+            st = self._hedges.setdefault(
+                model_name, {"hedged_calls": 0, "hedges_fired": 0, "backup_wins": 0}
+            )
+            st["hedged_calls"] += 1
+            if fired:
+                st["hedges_fired"] += 1
+            if backup_won:
+                st["backup_wins"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            samples = {m: sorted(q) for m, q in self._samples.items()}
+            hedges = {m: dict(h) for m, h in self._hedges.items()}
+
+        out: Dict[str, Dict[str, Any]] = {}
+        for model_name in sorted(set(samples) | set(hedges)):
+            values = samples.get(model_name) or []
+            out[model_name] = {
+                "samples": len(values),
+                "p50_sec": round(_percentile(values, 0.5), 3),
+                "p90_sec": round(_percentile(values, 0.9), 3),
+                "p99_sec": round(_percentile(values, 0.99), 3),
+                "hedge_after_sec": round(hedge_delay(model_name), 3),
+                **hedges.get(model_name, {"hedged_calls": 0, "hedges_fired": 0, "backup_wins": 0}),
+            }
+        return out
+
+
+_TRACKER = LatencyTracker()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    return _TRACKER
+
+
+def record_latency(model_name: str, elapsed_sec: float) -> None:
+    _TRACKER.record(model_name, elapsed_sec)
+
+
+def hedge_delay(model_name: str) -> float:
+    """
+    primary を何秒待ってから backup を撃つか（既定は直近 p90）。
+    """
+    quantile = min(0.999, max(0.5, _env_float("LYRA_HEDGE_QUANTILE", 0.9)))
+    min_samples = int(_env_float("LYRA_HEDGE_MIN_SAMPLES", 5))
+    floor = max(0.0, _env_float("LYRA_HEDGE_MIN_SEC", 0.5))
+
+    if _TRACKER.sample_count(model_name) < max(1, min_samples):
+        return max(floor, _env_float("LYRA_HEDGE_DEFAULT_SEC", 10.0))
+
+    p = _TRACKER.percentile(model_name, quantile)
+    return max(floor, float(p or 0.0))
+
+
+def get_latency_stats() -> Dict[str, Dict[str, Any]]:
+    return _TRACKER.stats()
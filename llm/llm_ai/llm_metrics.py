@@ -0,0 +1,389 @@
+# llm/llm_ai/llm_metrics.py
+"""
+LLM 呼び出しのメトリクス（LLMAI から記録）。
+
+モデルごとに以下を集計する:
+- 呼び出し回数（status 別: ok / error / cache_hit）
+- エラー回数（例外クラス別）
+- リトライ回数
+- prompt / completion トークン数
+- プレフィックスキャッシュ（usage の cached_tokens）のヒット率と、ヒット時 / 非ヒット時の latency
+- 固定バケットのヒストグラム（メモリは一定）:
+    wall latency / time-to-first-byte / request payload bytes / response bytes
+
+出力:
+- to_prometheus() : Prometheus text format（start_metrics_server() の /metrics でも返す）
+- to_dataframe()  : モデル別サマリ（pandas.DataFrame。llm_manager_view 用）
+
+TTFB は http_pool の Transport が「レスポンスヘッダ受信まで」の秒数を
+note_ttfb() で現在の呼び出しに書き込む（contextvars 経由）。
+
+設定（環境変数）:
+  LYRA_METRICS_PORT : 指定するとそのポートで /metrics を公開（127.0.0.1 のみ）
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import bisect
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34, 55, 90)
+BYTES_BUCKETS: Tuple[float, ...] = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_PREFIX = "lyra_llm"
+
+
+class Histogram:
+    """
+    固定バケットのヒストグラム（Prometheus の histogram と同じ累積形式で出力）。
+    ロックは呼び出し側（MetricsRegistry）が持つ。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後は +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        v = float(value)
+        self.counts[bisect.bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        バケット内を線形補間した推定値（Prometheus の histogram_quantile と同じ考え方）。
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, c in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else lower
+            if seen + c >= rank and c > 0:
+                if i >= len(self.buckets):
+                    return lower  # +Inf バケット：最後の境界で頭打ち
+                return lower + (upper - lower) * ((rank - seen) / c)
+            seen += c
+            lower = upper
+        return lower
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out: List[Tuple[str, int]] = []
+        acc = 0
+        for i, b in enumerate(self.buckets):
+            acc += self.counts[i]
+            out.append((_fmt(b), acc))
+        out.append(("+Inf", self.count))
+        return out
+
+
+def _fmt(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def _label(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _ModelMetrics:
+    def __init__(self) -> None:
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        # usage が返った呼び出しだけを、プレフィックスキャッシュに当たったかどうかで分ける
+        self.latency_prefix_hit = Histogram(LATENCY_BUCKETS)
+        self.latency_prefix_miss = Histogram(LATENCY_BUCKETS)
+        self.ttfb = Histogram(LATENCY_BUCKETS)
+        self.request_bytes = Histogram(BYTES_BUCKETS)
+        self.response_bytes = Histogram(BYTES_BUCKETS)
+
+
+class MetricsRegistry:
+    """
+    プロセス共有のメトリクス置き場。スレッドセーフ。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._models: Dict[str, _ModelMetrics] = {}
+
+    def _get(self, model_name: str) -> _ModelMetrics:
+        m = self._models.get(model_name)
+        if m is None:
+            m = _ModelMetrics()
+            self._models[model_name] = m
+        return m
+
+    # ------------------------------------------------------------
+    # 記録
+    # ------------------------------------------------------------
+    def record_call(
+        self,
+        model_name: str,
+        *,
+        status: str,
+        latency_sec: float,
+        ttfb_sec: Optional[float] = None,
+        retries: int = 0,
+        error_class: Optional[str] = None,
+        usage: Any = None,
+        request_bytes: Optional[int] = None,
+        response_bytes: Optional[int] = None,
+    ) -> None:
+        prompt, completion, cached = _usage_tokens(usage)
+        with self._lock:
+            m = self._get(model_name)
+            m.calls[status] = m.calls.get(status, 0) + 1
+            if error_class:
+                m.errors[error_class] = m.errors.get(error_class, 0) + 1
+            m.retries += max(0, int(retries))
+            m.prompt_tokens += prompt
+            m.completion_tokens += completion
+            m.cached_tokens += cached
+            m.latency.observe(latency_sec)
+            if prompt:
+                (m.latency_prefix_hit if cached else m.latency_prefix_miss).observe(latency_sec)
+            if ttfb_sec is not None:
+                m.ttfb.observe(ttfb_sec)
+            if request_bytes is not None:
+                m.request_bytes.observe(request_bytes)
+            if response_bytes is not None:
+                m.response_bytes.observe(response_bytes)
+
+    def record_cache_hit(self, model_name: str) -> None:
+        with self._lock:
+            m = self._get(model_name)
+            m.calls["cache_hit"] = m.calls.get("cache_hit", 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    # ------------------------------------------------------------
+    # 出力
+    # ------------------------------------------------------------
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        モデル別サマリ（1 モデル 1 行）。
+        """
+        rows: List[Dict[str, Any]] = []
+        with self._lock:
+            for name in sorted(self._models):
+                m = self._models[name]
+                calls = sum(v for k, v in m.calls.items() if k != "cache_hit")
+                errors = m.calls.get("error", 0)
+                hit_p50 = m.latency_prefix_hit.quantile(0.5)
+                miss_p50 = m.latency_prefix_miss.quantile(0.5)
+                rows.append(
+                    {
+                        "model": name,
+                        "calls": calls,
+                        "cache_hits": m.calls.get("cache_hit", 0),
+                        "errors": errors,
+                        "error_rate": round(errors / calls, 3) if calls else 0.0,
+                        "retries": m.retries,
+                        "p50_sec": round(m.latency.quantile(0.5), 3),
+                        "p95_sec": round(m.latency.quantile(0.95), 3),
+                        "ttfb_p50_sec": round(m.ttfb.quantile(0.5), 3),
+                        "ttfb_p95_sec": round(m.ttfb.quantile(0.95), 3),
+                        "prompt_tokens": m.prompt_tokens,
+                        "completion_tokens": m.completion_tokens,
+                        "cached_tokens": m.cached_tokens,
+                        "prefix_cache_hit_rate": round(m.cached_tokens / m.prompt_tokens, 3) if m.prompt_tokens else 0.0,
+                        "prefix_hit_p50_sec": round(hit_p50, 3),
+                        "prefix_miss_p50_sec": round(miss_p50, 3),
+                        # 両方そろっているときだけ（片方だけでは比べられない）
+                        "prefix_saving_sec": (
+                            round(miss_p50 - hit_p50, 3)
+                            if m.latency_prefix_hit.count and m.latency_prefix_miss.count
+                            else 0.0
+                        ),
+                        "avg_request_bytes": int(m.request_bytes.sum / m.request_bytes.count) if m.request_bytes.count else 0,
+                        "avg_response_bytes": int(m.response_bytes.sum / m.response_bytes.count) if m.response_bytes.count else 0,
+                        "error_classes": dict(m.errors),
+                    }
+                )
+        return rows
+
+    def to_dataframe(self) -> Any:
+        import pandas as pd
+
+        rows = self.summary()
+        for r in rows:
+            r["error_classes"] = ", ".join(f"{k}={v}" for k, v in r["error_classes"].items())
+        return pd.DataFrame(rows)
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+
+        def head(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {_PREFIX}_{name} {kind}")
+
+        with self._lock:
+            models = sorted(self._models.items())
+
+            head("calls_total", "counter", "LLM calls by model and status.")
+            for name, m in models:
+                for status, v in sorted(m.calls.items()):
+                    lines.append(f'{_PREFIX}_calls_total{{model="{_label(name)}",status="{_label(status)}"}} {v}')
+
+            head("errors_total", "counter", "LLM call errors by model and exception class.")
+            for name, m in models:
+                for cls, v in sorted(m.errors.items()):
+                    lines.append(f'{_PREFIX}_errors_total{{model="{_label(name)}",error_class="{_label(cls)}"}} {v}')
+
+            head("retries_total", "counter", "Retries performed by the LLMAI retry policy.")
+            for name, m in models:
+                lines.append(f'{_PREFIX}_retries_total{{model="{_label(name)}"}} {m.retries}')
+
+            head("tokens_total", "counter", "Tokens reported in usage.")
+            for name, m in models:
+                lines.append(f'{_PREFIX}_tokens_total{{model="{_label(name)}",kind="prompt"}} {m.prompt_tokens}')
+                lines.append(f'{_PREFIX}_tokens_total{{model="{_label(name)}",kind="completion"}} {m.completion_tokens}')
+                lines.append(f'{_PREFIX}_tokens_total{{model="{_label(name)}",kind="cached"}} {m.cached_tokens}')
+
+            for metric, attr, help_text in (
+                ("latency_seconds", "latency", "Wall latency of LLMAI calls (including retries)."),
+                ("ttfb_seconds", "ttfb", "Time to first response byte (response headers)."),
+                ("prefix_hit_latency_seconds", "latency_prefix_hit", "Wall latency of calls whose prompt hit the vendor prefix cache."),
+                ("prefix_miss_latency_seconds", "latency_prefix_miss", "Wall latency of calls whose prompt missed the vendor prefix cache."),
+                ("request_bytes", "request_bytes", "Request payload size (messages JSON)."),
+                ("response_bytes", "response_bytes", "Response text size."),
+            ):
+                head(metric, "histogram", help_text)
+                for name, m in models:
+                    h: Histogram = getattr(m, attr)
+                    lbl = f'model="{_label(name)}"'
+                    for le, c in h.cumulative():
+                        lines.append(f'{_PREFIX}_{metric}_bucket{{{lbl},le="{le}"}} {c}')
+                    lines.append(f"{_PREFIX}_{metric}_sum{{{lbl}}} {round(h.sum, 6)}")
+                    lines.append(f"{_PREFIX}_{metric}_count{{{lbl}}} {h.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _usage_tokens(usage: Any) -> Tuple[int, int, int]:
+    """
+    (prompt, completion, cached) トークン数。cached は adapter が usage に入れた cached_tokens。
+    """
+    if not isinstance(usage, dict):
+        return 0, 0, 0
+
+    def _int(*keys: str) -> int:
+        for k in keys:
+            v = usage.get(k)
+            if v is not None:
+                try:
+                    return int(v)
+                except (TypeError, ValueError):
+                    return 0
+        return 0
+
+    return (
+        _int("prompt_tokens", "input_tokens"),
+        _int("completion_tokens", "output_tokens"),
+        _int("cached_tokens"),
+    )
+
+
+_REGISTRY = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _REGISTRY
+
+
+# ============================================================
+# 呼び出し中のコンテキスト（TTFB を Transport から受け取る）
+# ============================================================
+_CURRENT_CALL: ContextVar[Optional[Dict[str, Any]]] = ContextVar("lyra_llm_call", default=None)
+
+
+@contextmanager
+def track_call() -> Iterator[Dict[str, Any]]:
+    """
+    LLMAI が 1 呼び出しの間だけ張る箱。Transport が ttfb_sec を書き込む。
+    """
+    box: Dict[str, Any] = {}
+    token = _CURRENT_CALL.set(box)
+    try:
+        yield box
+    finally:
+        _CURRENT_CALL.reset(token)
+
+
+def note_ttfb(seconds: float) -> None:
+    box = _CURRENT_CALL.get()
+    if box is not None:
+        box["ttfb_sec"] = float(seconds)
+
+
+# ============================================================
+# /metrics エンドポイント
+# ============================================================
+_SERVER: Optional[ThreadingHTTPServer] = None
+_SERVER_LOCK = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = _REGISTRY.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        return
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[int]:
+    """
+    /metrics を返す小さな HTTP サーバをデーモンスレッドで起動する（多重起動しない）。
+
+    port 省略時は LYRA_METRICS_PORT。どちらも無ければ起動せず None を返す。
+    起動した（または起動済みの）ポート番号を返す。
+    """
+    global _SERVER
+    if port is None:
+        raw = os.getenv("LYRA_METRICS_PORT", "").strip()
+        if not raw:
+            return None
+        try:
+            port = int(raw)
+        except ValueError:
+            logger.warning("LYRA_METRICS_PORT is not an int: %r", raw)
+            return None
+
+    with _SERVER_LOCK:
+        if _SERVER is not None:
+            return int(_SERVER.server_address[1])
+        try:
+            server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        except OSError:
+            logger.exception("metrics server failed to bind %s:%s", host, port)
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="lyra_metrics", daemon=True).start()
+        _SERVER = server
+        logger.info("metrics server listening on http://%s:%s/metrics", host, server.server_address[1])
+        return int(server.server_address[1])
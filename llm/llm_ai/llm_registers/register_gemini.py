@@ -1,12 +1,15 @@
 # llm2/llm_ai/llm_registers/register_gemini.py
 from __future__ import annotations
 
-from llm.llm_ai.llm_adapters.gemini import GeminiAdapter
+from typing import Any
+
+from llm.llm_ai.llm_adapters.lazy import LazyAdapter
 
 
 def register_gemini(llm_ai: Any) -> None:
     """
     Gemini を LLMAI に登録する。
     """
-    adapter = GeminiAdapter()
+    # 実体（と SDK / クライアント）は最初の呼び出しまで作らない
+    adapter = LazyAdapter(name="gemini", target="llm.llm_ai.llm_adapters.gemini:GeminiAdapter")
     llm_ai.register_adapter(adapter)
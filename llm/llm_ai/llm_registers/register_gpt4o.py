@@ -1,12 +1,15 @@
 # llm/llm_ai/llm_registers/register_gpt4o.py
 from __future__ import annotations
 
-from llm.llm_ai.llm_adapters.gpt4o import GPT4oAdapter
+from typing import Any
+
+from llm.llm_ai.llm_adapters.lazy import LazyAdapter
 
 
 def register_gpt4o(llm_ai: Any) -> None:
     """
     GPT-4o-mini を LLMAI に登録する。
     """
-    adapter = GPT4oAdapter()
+    # 実体（と SDK / クライアント）は最初の呼び出しまで作らない
+    adapter = LazyAdapter(name="gpt4o", target="llm.llm_ai.llm_adapters.gpt4o:GPT4oAdapter")
     llm_ai.register_adapter(adapter)
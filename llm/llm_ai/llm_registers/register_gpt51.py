@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
-from llm.llm_ai.llm_adapters.gpt51 import GPT51Adapter
+from llm.llm_ai.llm_adapters.lazy import LazyAdapter
 
 
 def register_gpt51(llm_ai: Any) -> None:
@@ -13,7 +13,8 @@ def register_gpt51(llm_ai: Any) -> None:
     - 古い OpenAI SDK / 呼び口では `reasoning=` が受け付けられず死ぬことがある。
       なので「デフォルト params」に reasoning を絶対に入れない。
     """
-    adapter = GPT51Adapter()
+    # 実体（と SDK / クライアント）は最初の呼び出しまで作らない
+    adapter = LazyAdapter(name="gpt51", target="llm.llm_ai.llm_adapters.gpt51:GPT51Adapter")
 
     # ✅ reasoning は入れない（ここが肝）
     default_params = {
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
-from llm.llm_ai.llm_adapters.openai_chat import OpenAIChatAdapter
+from llm.llm_ai.llm_adapters.lazy import LazyAdapter
 
 
 def register_gpt52(llm_ai: Any) -> None:
@@ -13,9 +13,11 @@ def register_gpt52(llm_ai: Any) -> None:
     - ModelsAI2 側の安全フィルタのため、supported_parameters を extra に明示する
     - ここに無いキーは Persona から来ても自動で弾ける（ignored_params に回る）
     """
-    adapter = OpenAIChatAdapter(
+    # 実体（と SDK / クライアント）は最初の呼び出しまで作らない
+    adapter = LazyAdapter(
         name="gpt52",
-        model_id="gpt-5.2-chat-latest",
+        target="llm.llm_ai.llm_adapters.openai_chat:OpenAIChatAdapter",
+        init_kwargs={"name": "gpt52", "model_id": "gpt-5.2-chat-latest"},
     )
 
     # ★Persona → LLM に渡して良いトップレベルキーだけ許可
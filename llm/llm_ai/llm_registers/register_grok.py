@@ -2,12 +2,13 @@ from __future__ import annotations
 
 from typing import Any
 
-from llm.llm_ai.llm_adapters.grok import GrokAdapter
+from llm.llm_ai.llm_adapters.lazy import LazyAdapter
 
 
 def register_grok(llm_ai: Any) -> None:
     """
     Grok を LLMAI に登録する。
     """
-    adapter = GrokAdapter()
+    # 実体（と SDK / クライアント）は最初の呼び出しまで作らない
+    adapter = LazyAdapter(name="grok", target="llm.llm_ai.llm_adapters.grok:GrokAdapter")
     llm_ai.register_adapter(adapter)
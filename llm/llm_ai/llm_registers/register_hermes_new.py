@@ -1,12 +1,15 @@
 # llm2/llm_ai/llm_registers/register_hermes_new.py
 from __future__ import annotations
 
-from llm.llm_ai.llm_adapters.hermes_new import HermesNewAdapter
+from typing import Any
+
+from llm.llm_ai.llm_adapters.lazy import LazyAdapter
 
 
 def register_hermes_new(llm_ai: Any) -> None:
     """
     新 Hermes（hermes-4 系）を LLMAI に登録する。
     """
-    adapter = HermesNewAdapter()
+    # 実体（と SDK / クライアント）は最初の呼び出しまで作らない
+    adapter = LazyAdapter(name="hermes_new", target="llm.llm_ai.llm_adapters.hermes_new:HermesNewAdapter")
     llm_ai.register_adapter(adapter)
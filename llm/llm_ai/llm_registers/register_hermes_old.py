@@ -1,12 +1,15 @@
 # llm2/llm_ai/llm_registers/register_hermes_old.py
 from __future__ import annotations
 
-from llm.llm_ai.llm_adapters.hermes_old import HermesOldAdapter
+from typing import Any
+
+from llm.llm_ai.llm_adapters.lazy import LazyAdapter
 
 
 def register_hermes_old(llm_ai: Any) -> None:
     """
     旧 Hermes（hermes-2-pro 系）を LLMAI に登録する。
     """
-    adapter = HermesOldAdapter()
+    # 実体（と SDK / クライアント）は最初の呼び出しまで作らない
+    adapter = LazyAdapter(name="hermes", target="llm.llm_ai.llm_adapters.hermes_old:HermesOldAdapter")
     llm_ai.register_adapter(adapter)
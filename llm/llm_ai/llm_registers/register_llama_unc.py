@@ -1,12 +1,15 @@
 # llm2/llm_ai/llm_registers/register_llama_unc.py
 from __future__ import annotations
 
-from llm.llm_ai.llm_adapters.llama_unc import LlamaUncensoredAdapter
+from typing import Any
+
+from llm.llm_ai.llm_adapters.lazy import LazyAdapter
 
 
 def register_llama_unc(llm_ai: Any) -> None:
     """
     Llama 3.1 70B Uncensored を LLMAI に登録する。
     """
-    adapter = LlamaUncensoredAdapter()
+    # 実体（と SDK / クライアント）は最初の呼び出しまで作らない
+    adapter = LazyAdapter(name="llama_unc", target="llm.llm_ai.llm_adapters.llama_unc:LlamaUncensoredAdapter")
     llm_ai.register_adapter(adapter)
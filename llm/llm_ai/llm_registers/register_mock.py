@@ -0,0 +1,36 @@
+# llm/llm_ai/llm_registers/register_mock.py
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from llm.llm_ai.llm_adapters.lazy import LazyAdapter
+
+# (LLMAI 上の名前, 模擬サーバの model_id, Adapter クラス, call_json のパラメータ形式)
+MOCK_MODELS = (
+    ("mock_fast", "mock-fast", "MockAdapter", "openai"),
+    ("mock_slow", "mock-slow", "MockAdapter", "openai"),
+    ("mock_flaky", "mock-flaky", "MockAdapter", "openai"),
+    ("mock_gemini", "mock-gemini", "MockGeminiAdapter", "google"),
+)
+
+
+def register_mock(llm_ai: Any, *, base_url: Optional[str] = None) -> None:
+    """
+    模擬モデル（mock_server）を LLMAI に登録する。オフライン計測用で、既定では登録されない。
+
+    base_url を渡さなければ LYRA_MOCK_LLM_URL、それも無ければ最初の呼び出しでサーバを立てる。
+    """
+    for name, model_id, cls_name, json_vendor in MOCK_MODELS:
+        init_kwargs = {"name": name, "model_id": model_id}
+        if base_url:
+            init_kwargs["base_url"] = base_url
+        # 実体（とサーバ）は最初の呼び出しまで作らない
+        adapter = LazyAdapter(
+            name=name,
+            target=f"llm.llm_ai.llm_adapters.mock:{cls_name}",
+            init_kwargs=init_kwargs,
+        )
+        # vendor は "mock"（スケジューラ / 接続プールを分ける）。JSON モードは話すプロトコルに合わせる
+        llm_ai.register_adapter(
+            adapter, vendor="mock", extra={"model_family": "mock", "json_vendor": json_vendor}
+        )
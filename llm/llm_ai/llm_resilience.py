@@ -0,0 +1,310 @@
+# llm/llm_ai/llm_resilience.py
+"""
+LLM 呼び出しの耐障害レイヤ（LLMAI から利用）。
+
+- RetryPolicy    : 一時的な失敗（接続エラー / タイムアウト / 5xx）を指数バックオフ + full jitter で再送
+- CircuitBreaker : モデルごとのサーキットブレーカー。連続失敗で open → 一定時間は即失敗（fail fast）
+                   → 時間が経ったら half_open で 1 回だけ試す → 成功で closed に戻る
+- ブレーカーはプロセス共有（同じモデルを呼ぶ全 LLMAI / 全セッションで状態を共有）
+- 状態が変わるたびに circuit_version() が進む（モデル一覧スナップショットの作り直し判定用）
+
+429 は vendor スケジューラ（llm_scheduler）が Retry-After に従って扱うので、ここでは再送しない。
+ターンの予算切れ（DeadlineExceeded）も再送しない / ブレーカーの失敗に数えない。
+
+設定（環境変数）:
+  LYRA_LLM_RETRY_ATTEMPTS  : 1 呼び出しあたりの最大試行回数（既定 3）
+  LYRA_LLM_RETRY_BASE_SEC  : バックオフの基準秒（既定 0.5）
+  LYRA_LLM_RETRY_MAX_SEC   : バックオフの上限秒（既定 8）
+  LYRA_BREAKER_THRESHOLD   : open にする連続失敗回数（既定 5）
+  LYRA_BREAKER_RESET_SEC   : open から half_open に移るまでの秒数（既定 30）
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+from llm.llm_ai.llm_deadline import DeadlineExceeded
+from llm.llm_ai.llm_errors import LLMCallError, LLMRateLimitError
+
+logger = logging.getLogger(__name__)
+
+# 再送してよい HTTP ステータス（一時的な障害）
+RETRYABLE_STATUS = frozenset({408, 409, 425, 500, 502, 503, 504, 529})
+
+# ブレーカーの失敗として数えるが再送はしないステータス（キー失効など「呼んでも無駄」）
+OUTAGE_STATUS = frozenset({401, 403})
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, "") or default)
+    except ValueError:
+        return default
+
+
+# ============================================================
+# エラー分類
+# ============================================================
+def _is_transport_error(exc: BaseException) -> bool:
+    """
+    接続失敗 / タイムアウト系か（httpx / OpenAI SDK / 標準ライブラリ）。
+
+    SDK は import 済みのときだけ見る（未 import ならその SDK の例外ではあり得ない）。
+    """
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+
+    openai = sys.modules.get("openai")
+    # APITimeoutError は APIConnectionError のサブクラス
+    if openai is not None and isinstance(exc, getattr(openai, "APIConnectionError", ())):
+        return True
+    return False
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    再送で直る見込みがある失敗か。
+    """
+    if isinstance(exc, (LLMRateLimitError, CircuitOpenError, DeadlineExceeded)):
+        return False
+    if isinstance(exc, LLMCallError):
+        if exc.status_code is not None:
+            return exc.status_code in RETRYABLE_STATUS
+        cause = exc.__cause__
+        return cause is not None and _is_transport_error(cause)
+    return _is_transport_error(exc)
+
+
+def is_outage(exc: BaseException) -> bool:
+    """
+    ブレーカーの失敗として数えるか（モデル側が落ちている / 使えない）。
+
+    リクエスト側の誤り（400 / 404 / 422 など）や 429 は数えない。
+    """
+    if isinstance(exc, LLMCallError) and exc.status_code in OUTAGE_STATUS:
+        return True
+    return is_retryable(exc)
+
+
+class CircuitOpenError(LLMCallError):
+    """
+    ブレーカーが open のため呼び出しを行わなかった。
+    """
+
+
+# ============================================================
+# リトライ
+# ============================================================
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    指数バックオフ + full jitter。
+
+    delay = uniform(0, min(max_delay_sec, base_delay_sec * 2 ** attempt))
+    """
+    max_attempts: int = 3
+    base_delay_sec: float = 0.5
+    max_delay_sec: float = 8.0
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=max(1, int(_env_float("LYRA_LLM_RETRY_ATTEMPTS", 3))),
+            base_delay_sec=max(0.0, _env_float("LYRA_LLM_RETRY_BASE_SEC", 0.5)),
+            max_delay_sec=max(0.0, _env_float("LYRA_LLM_RETRY_MAX_SEC", 8.0)),
+        )
+
+    def delay_for(self, attempt: int) -> float:
+        """
+        attempt 回目（0 始まり）の失敗のあとに待つ秒数。
+        """
+        cap = min(self.max_delay_sec, self.base_delay_sec * (2 ** max(0, attempt)))
+        return random.uniform(0.0, cap)
+
+    def should_retry(self, exc: BaseException, attempt: int) -> bool:
+        return attempt + 1 < self.max_attempts and is_retryable(exc)
+
+
+# ============================================================
+# サーキットブレーカー
+# ============================================================
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# どれかのブレーカーの状態が変わるたびに進む世代番号
+_VERSION_LOCK = threading.Lock()
+_VERSION = 0
+
+
+def _bump_version() -> None:
+    global _VERSION
+    with _VERSION_LOCK:
+        _VERSION += 1
+
+
+class CircuitBreaker:
+    """
+    1 モデル分のブレーカー。スレッドセーフ。
+
+    - closed    : 通常。連続失敗が failure_threshold に達したら open
+    - open      : reset_timeout_sec の間は allow() が False（即 CircuitOpenError）
+    - half_open : 試験呼び出しを 1 件だけ通す。成功で closed、失敗で再び open
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout_sec: float = 30.0,
+    ) -> None:
+        self.model_name = model_name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout_sec = max(0.0, float(reset_timeout_sec))
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._last_error: Optional[str] = None
+        self._stats: Dict[str, int] = {"opened": 0, "rejected": 0, "failovers": 0}
+
+    def _current_state(self, now: float) -> str:
+        # ロックを持った状態で呼ぶ
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout_sec:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+            _bump_version()
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def allow(self) -> bool:
+        """
+        呼び出してよいか。half_open では最初の 1 件だけ True を返す。
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("circuit closed: model=%s", self.model_name)
+                _bump_version()
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(exc)[:300] if exc is not None else None
+            state = self._current_state(time.monotonic())
+            if state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != OPEN:
+                    self._stats["opened"] += 1
+                    logger.warning(
+                        "circuit opened: model=%s failures=%s", self.model_name, self._failures
+                    )
+                    _bump_version()
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """
+        half_open の試験呼び出しが成否の判定前に終わった（リクエスト側の誤りなど）ときに呼ぶ。
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def note_failover(self) -> None:
+        with self._lock:
+            self._stats["failovers"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            retry_in = (
+                max(0.0, self.reset_timeout_sec - (now - self._opened_at))
+                if state == OPEN
+                else 0.0
+            )
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in_sec": round(retry_in, 1),
+                "last_error": self._last_error,
+                **self._stats,
+            }
+
+
+# ============================================================
+# プロセス共有レジストリ
+# ============================================================
+_LOCK = threading.Lock()
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(model_name: str) -> CircuitBreaker:
+    with _LOCK:
+        br = _BREAKERS.get(model_name)
+        if br is None:
+            br = CircuitBreaker(
+                model_name,
+                failure_threshold=int(_env_float("LYRA_BREAKER_THRESHOLD", 5)),
+                reset_timeout_sec=_env_float("LYRA_BREAKER_RESET_SEC", 30.0),
+            )
+            _BREAKERS[model_name] = br
+        return br
+
+
+def get_circuit_states() -> Dict[str, Dict[str, Any]]:
+    with _LOCK:
+        brs = dict(_BREAKERS)
+    return {name: br.snapshot() for name, br in sorted(brs.items())}
+
+
+def is_circuit_open(model_name: str) -> bool:
+    """
+    呼ぶ前に除外すべきか（open のみ True。half_open は試験呼び出しを通すので False）。
+    """
+    with _LOCK:
+        br = _BREAKERS.get(model_name)
+    return br is not None and br.state == OPEN
+
+
+def circuit_version() -> int:
+    """
+    ブレーカー状態の世代番号。open のまま reset 時間を過ぎたもの（half_open への遷移待ち）も
+    ここで遷移させるので、値が同じなら各モデルの state は前回と同じ。
+    """
+    with _LOCK:
+        brs = [br for br in _BREAKERS.values() if br._state == OPEN]
+    for br in brs:
+        br.state  # noqa: B018  経過時間による open → half_open を反映
+    with _VERSION_LOCK:
+        return _VERSION
@@ -0,0 +1,403 @@
+# llm/llm_ai/llm_scheduler.py
+"""
+ベンダー単位の同時実行制限 + トークンバケット型レートスケジューラ。
+
+- LLMModelConfig.vendor（"openai" / "xai" / "google" / "openrouter" ...）ごとに 1 つ、プロセス共有
+- 同時実行数の上限（max_concurrency）
+- requests-per-minute / tokens-per-minute のバケット（空なら呼び出し側が待つ）
+- 429 の Retry-After を受けたらそのベンダー全体を一時停止（penalize）
+- 待ち行列は FIFO（複数の Streamlit セッションが互いを飢えさせない）
+- 枠待ちはターンの締切（Deadline）までしか待たない。間に合わなければ
+  deadline.exceeded("scheduler:<vendor>") を投げる（429 で止まったベンダーにスレッドが張り付かない）
+- キュー長・待ち時間などを stats() で返す
+
+設定（環境変数）:
+  LYRA_VENDOR_LIMITS : JSON でベンダーごとの上限を指定
+      例) {"openai": {"max_concurrency": 8, "rpm": 500, "tpm": 200000},
+           "xai": {"max_concurrency": 4, "rpm": 60}}
+  LYRA_VENDOR_MAX_CONCURRENCY : 指定の無いベンダーの同時実行上限（既定 8）
+"""
+from __future__ import annotations
+
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+if TYPE_CHECKING:
+    from llm.llm_ai.llm_deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Retry-After が取れなかった 429 のときに止める秒数
+DEFAULT_RATE_LIMIT_PENALTY_SEC = 5.0
+
+# 空きを待つときのポーリング上限（release で起こされるので通常はもっと早い）
+_POLL_SEC = 0.05
+
+
+@dataclass(frozen=True)
+class VendorLimits:
+    max_concurrency: int = 8
+    rpm: Optional[float] = None
+    tpm: Optional[float] = None
+
+
+class TokenBucket:
+    """
+    容量 = 1 分あたりの量、毎秒 capacity/60 ずつ補充されるバケット。
+    ロックは呼び出し側（VendorScheduler）が持つ。
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # 容量より大きい要求は「満タンになったら通す」
+        need = min(float(amount), self.capacity)
+        if self.tokens >= need:
+            return 0.0
+        return (need - self.tokens) / self.rate if self.rate > 0 else _POLL_SEC
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= float(amount)
+
+    def refund(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + float(amount))
+
+
+class SchedulerSlot:
+    """
+    acquire で得られる実行枠。実際の使用トークン数を報告すると TPM バケットを補正する。
+    """
+
+    def __init__(self, scheduler: "VendorScheduler", est_tokens: int, waited_sec: float) -> None:
+        self._scheduler = scheduler
+        self.est_tokens = est_tokens
+        self.waited_sec = waited_sec
+
+    def report_usage(self, usage: Any) -> None:
+        if not isinstance(usage, dict):
+            return
+        try:
+            actual = int(usage.get("total_tokens") or 0)
+        except (TypeError, ValueError):
+            return
+        if actual > 0:
+            self._scheduler._adjust_tokens(self.est_tokens, actual)
+
+
+class VendorScheduler:
+    """
+    1 ベンダー分のスケジューラ。sync（threading）と async（asyncio）の両方から使える。
+    """
+
+    def __init__(self, vendor: str, limits: VendorLimits) -> None:
+        self.vendor = vendor
+        self.limits = limits
+
+        self._cond = threading.Condition()
+        self._queue: Deque[int] = deque()
+        self._tickets = itertools.count()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+
+        self._rpm = TokenBucket(limits.rpm) if limits.rpm else None
+        self._tpm = TokenBucket(limits.tpm) if limits.tpm else None
+
+        self._stats: Dict[str, float] = {
+            "admitted": 0,
+            "rate_limited": 0,
+            "total_wait_sec": 0.0,
+            "max_wait_sec": 0.0,
+            "max_queue_depth": 0,
+            "deadline_exceeded": 0,
+        }
+
+    # ------------------------------------------------------------
+    # 入場判定（_cond を持った状態で呼ぶ）
+    # ------------------------------------------------------------
+    def _try_admit(self, ticket: int, est_tokens: int) -> Optional[float]:
+        """
+        入れたら 0.0、時間待ちなら待つべき秒数、枠/順番待ちなら None を返す。
+        """
+        if not self._queue or self._queue[0] != ticket:
+            return None
+
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        if self._in_flight >= max(1, self.limits.max_concurrency):
+            return None
+
+        wait = 0.0
+        if self._rpm is not None:
+            wait = max(wait, self._rpm.wait_time(1, now))
+        if self._tpm is not None:
+            wait = max(wait, self._tpm.wait_time(est_tokens, now))
+        if wait > 0:
+            return wait
+
+        if self._rpm is not None:
+            self._rpm.consume(1)
+        if self._tpm is not None:
+            self._tpm.consume(est_tokens)
+
+        self._queue.popleft()
+        self._in_flight += 1
+        self._cond.notify_all()
+        return 0.0
+
+    def _enqueue(self) -> int:
+        ticket = next(self._tickets)
+        self._queue.append(ticket)
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._queue))
+        return ticket
+
+    def _abandon(self, ticket: int) -> None:
+        try:
+            self._queue.remove(ticket)
+        except ValueError:
+            pass
+        self._cond.notify_all()
+
+    def _wait_budget(self, w: Optional[float], deadline: Optional["Deadline"]) -> float:
+        """
+        次に待つ秒数（_cond を持った状態で呼ぶ）。締切までに入れる見込みが無ければ DeadlineExceeded。
+
+        w は _try_admit の戻り値（時間待ちの秒数 / 枠・順番待ちなら None）。
+        """
+        wait = w if w is not None else _POLL_SEC
+        if deadline is None:
+            return wait
+        remaining = deadline.remaining()
+        # 時間待ち（429 の停止 / バケット）が残りより長いなら、待たずにすぐ諦める
+        if remaining <= 0.0 or (w is not None and w >= remaining):
+            self._stats["deadline_exceeded"] += 1
+            raise deadline.exceeded(f"scheduler:{self.vendor}")
+        return min(wait, remaining)
+
+    def _record_admit(self, waited: float) -> None:
+        self._stats["admitted"] += 1
+        self._stats["total_wait_sec"] += waited
+        self._stats["max_wait_sec"] = max(self._stats["max_wait_sec"], waited)
+
+    def _release(self) -> None:
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._cond.notify_all()
+
+    def _adjust_tokens(self, est_tokens: int, actual_tokens: int) -> None:
+        if self._tpm is None:
+            return
+        with self._cond:
+            diff = est_tokens - actual_tokens
+            if diff > 0:
+                self._tpm.refund(diff)
+            else:
+                self._tpm.consume(-diff)
+
+    # ------------------------------------------------------------
+    # 公開 API
+    # ------------------------------------------------------------
+    @contextmanager
+    def slot(
+        self,
+        est_tokens: int = 0,
+        *,
+        deadline: Optional["Deadline"] = None,
+    ) -> Iterator[SchedulerSlot]:
+        """
+        同期版：実行枠を取るまでブロックする（deadline があればその締切まで）。
+        """
+        t0 = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue()
+            try:
+                while True:
+                    w = self._try_admit(ticket, est_tokens)
+                    if w == 0.0:
+                        break
+                    self._cond.wait(timeout=self._wait_budget(w, deadline))
+            except BaseException:
+                self._abandon(ticket)
+                raise
+            waited = time.monotonic() - t0
+            self._record_admit(waited)
+
+        try:
+            yield SchedulerSlot(self, est_tokens, waited)
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(
+        self,
+        est_tokens: int = 0,
+        *,
+        deadline: Optional["Deadline"] = None,
+    ) -> AsyncIterator[SchedulerSlot]:
+        """
+        非同期版：イベントループを塞がないよう asyncio.sleep で待つ（deadline があればその締切まで）。
+        """
+        t0 = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue()
+        try:
+            while True:
+                with self._cond:
+                    w = self._try_admit(ticket, est_tokens)
+                    if w != 0.0:
+                        wait = self._wait_budget(w, deadline)
+                if w == 0.0:
+                    break
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            with self._cond:
+                self._abandon(ticket)
+            raise
+
+        waited = time.monotonic() - t0
+        with self._cond:
+            self._record_admit(waited)
+
+        try:
+            yield SchedulerSlot(self, est_tokens, waited)
+        finally:
+            self._release()
+
+    def penalize(self, retry_after: Optional[float]) -> float:
+        """
+        429 を受けたとき：ベンダー全体を retry_after 秒止める。止めた秒数を返す。
+        """
+        sec = float(retry_after) if retry_after is not None else DEFAULT_RATE_LIMIT_PENALTY_SEC
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + sec)
+            self._stats["rate_limited"] += 1
+            self._cond.notify_all()
+        logger.warning("vendor=%s rate limited; pausing %.1fs", self.vendor, sec)
+        return sec
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            admitted = int(self._stats["admitted"])
+            now = time.monotonic()
+            return {
+                "max_concurrency": self.limits.max_concurrency,
+                "rpm": self.limits.rpm,
+                "tpm": self.limits.tpm,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": int(self._stats["max_queue_depth"]),
+                "admitted": admitted,
+                "rate_limited": int(self._stats["rate_limited"]),
+                "deadline_exceeded": int(self._stats["deadline_exceeded"]),
+                "avg_wait_sec": round(self._stats["total_wait_sec"] / admitted, 3) if admitted else 0.0,
+                "max_wait_sec": round(self._stats["max_wait_sec"], 3),
+                "blocked_for_sec": round(max(0.0, self._blocked_until - now), 1),
+                "rpm_tokens": round(self._rpm.tokens, 1) if self._rpm is not None else None,
+                "tpm_tokens": round(self._tpm.tokens, 1) if self._tpm is not None else None,
+            }
+
+
+# ============================================================
+# トークン見積もり
+# ============================================================
+def estimate_tokens(messages: List[Dict[str, Any]], params: Dict[str, Any]) -> int:
+    """
+    TPM バケット用のざっくり見積もり（日本語混じりなので 1 token ≒ 2 文字で多めに見る）。
+    実際の usage が返ったら SchedulerSlot.report_usage で補正される。
+    """
+    chars = 0
+    for m in messages or []:
+        if isinstance(m, dict):
+            chars += len(str(m.get("content") or ""))
+
+    out = 0
+    for k in ("max_completion_tokens", "max_tokens"):
+        v = params.get(k)
+        if v is not None:
+            try:
+                out = int(v)
+                break
+            except (TypeError, ValueError):
+                pass
+
+    return max(1, chars // 2 + (out or 512))
+
+
+# ============================================================
+# プロセス共有レジストリ
+# ============================================================
+_LOCK = threading.Lock()
+_SCHEDULERS: Dict[str, VendorScheduler] = {}
+
+
+def _load_limits(vendor: str) -> VendorLimits:
+    try:
+        default_conc = int(os.getenv("LYRA_VENDOR_MAX_CONCURRENCY", "8") or 8)
+    except ValueError:
+        default_conc = 8
+
+    raw = os.getenv("LYRA_VENDOR_LIMITS", "").strip()
+    conf: Dict[str, Any] = {}
+    if raw:
+        try:
+            parsed = json.loads(raw)
+            if isinstance(parsed, dict) and isinstance(parsed.get(vendor), dict):
+                conf = parsed[vendor]
+        except Exception:
+            logger.warning("LYRA_VENDOR_LIMITS is not valid JSON; ignored")
+
+    def _num(key: str) -> Optional[float]:
+        v = conf.get(key)
+        try:
+            return float(v) if v is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    return VendorLimits(
+        max_concurrency=int(conf.get("max_concurrency") or default_conc),
+        rpm=_num("rpm"),
+        tpm=_num("tpm"),
+    )
+
+
+def get_vendor_scheduler(vendor: str) -> VendorScheduler:
+    key = vendor or "unknown"
+    with _LOCK:
+        sched = _SCHEDULERS.get(key)
+        if sched is None:
+            sched = VendorScheduler(key, _load_limits(key))
+            _SCHEDULERS[key] = sched
+        return sched
+
+
+def configure_vendor_limits(vendor: str, limits: VendorLimits) -> None:
+    """
+    実行時に上限を差し替える（進行中の呼び出しはそのまま、以降の呼び出しから適用）。
+    """
+    with _LOCK:
+        _SCHEDULERS[vendor] = VendorScheduler(vendor, limits)
+
+
+def get_scheduler_stats() -> Dict[str, Dict[str, Any]]:
+    with _LOCK:
+        scheds = dict(_SCHEDULERS)
+    return {vendor: s.stats() for vendor, s in sorted(scheds.items())}
@@ -0,0 +1,192 @@
+# llm/llm_ai/llm_singleflight.py
+"""
+実行中の同一リクエストへの相乗り（singleflight。LLMAI.call / acall から利用）。
+
+- model / messages / params が同じ呼び出し（キーは応答キャッシュと同じ作り方）が実行中なら、
+  後から来た呼び出し（follower）は HTTP を出さずに先行呼び出し（leader）の結果を待って受け取る
+  （Streamlit の再実行 / 二度押し / Council と Narrator Round0 の同時実行 / 複数セッション）
+- leader が失敗したら follower にも同じ例外を投げる（再送は leader 側の RetryPolicy で済んでいる）
+  ただし leader 自身の deadline 切れ / キャンセルで終わった場合は、follower が自分で呼び直す
+- 終わった呼び出しはすぐ外す（結果を取っておくのは応答キャッシュの役目）
+- follower は自分の deadline の範囲でだけ待つ（尽きたら DeadlineExceeded。leader は止めない）
+- follower が受け取る usage には coalesced=True が入る
+- プロセス共有
+
+設定（環境変数）:
+  LYRA_SINGLEFLIGHT : "0" で無効（既定 有効）
+"""
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import asyncio
+import os
+import threading
+
+from llm.llm_ai.llm_deadline import Deadline, DeadlineExceeded
+
+T = TypeVar("T")
+
+
+def singleflight_enabled(coalesce: Optional[bool] = None) -> bool:
+    if coalesce is not None:
+        return bool(coalesce)
+    return os.getenv("LYRA_SINGLEFLIGHT", "1").strip().lower() not in ("0", "false", "off")
+
+
+class _Flight:
+    """
+    実行中の 1 呼び出し。leader が結果を入れて event を立てる。
+    """
+
+    __slots__ = ("model_name", "event", "result", "error")
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    キー -> 実行中の呼び出し。スレッドセーフ（同期 / 非同期の呼び出しをまたいで相乗りする）。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    # ------------------------------------------------------------
+    # 内部
+    # ------------------------------------------------------------
+    def _join(self, key: str, model_name: str) -> Tuple[_Flight, bool]:
+        """
+        (flight, leader か)。
+        """
+        with self._lock:
+            st = self._stats.setdefault(model_name, {"leaders": 0, "coalesced": 0, "rerun": 0})
+            flight = self._flights.get(key)
+            if flight is not None:
+                st["coalesced"] += 1
+                return flight, False
+            flight = _Flight(model_name)
+            self._flights[key] = flight
+            st["leaders"] += 1
+            return flight, True
+
+    def _finish(self, key: str, flight: _Flight, result: Any, error: Optional[BaseException]) -> None:
+        flight.result = result
+        flight.error = error
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.event.set()
+
+    def _should_rerun(self, flight: _Flight) -> bool:
+        """
+        leader の失敗が follower には当てはまらない（leader の deadline / キャンセル）なら True。
+        """
+        err = flight.error
+        if err is None or (isinstance(err, Exception) and not isinstance(err, DeadlineExceeded)):
+            return False
+        with self._lock:
+            self._stats[flight.model_name]["rerun"] += 1
+        return True
+
+    @staticmethod
+    def _shared(flight: _Flight) -> Any:
+        if flight.error is not None:
+            raise flight.error
+        result = flight.result
+        # usage は呼び出し元ごとに別の dict にする（書き換えが他の follower に漏れない）
+        if isinstance(result, tuple) and len(result) >= 2:
+            usage = dict(result[1]) if isinstance(result[1], dict) else {}
+            usage["coalesced"] = True
+            return (result[0], usage, *result[2:])
+        return result
+
+    @staticmethod
+    def _wait_timeout(deadline: Optional[Deadline]) -> Optional[float]:
+        return deadline.remaining() if deadline is not None else None
+
+    # ------------------------------------------------------------
+    # 公開 API
+    # ------------------------------------------------------------
+    def do(
+        self,
+        key: str,
+        model_name: str,
+        fn: Callable[[], T],
+        *,
+        deadline: Optional[Deadline] = None,
+    ) -> T:
+        """
+        key の呼び出しが実行中ならその結果を待って返す。無ければ自分で fn() を実行する。
+        """
+        flight, leader = self._join(key, model_name)
+        if leader:
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, flight, None, e)
+                raise
+            self._finish(key, flight, result, None)
+            return result
+
+        if not flight.event.wait(self._wait_timeout(deadline)):
+            raise deadline.exceeded(f"singleflight:{model_name}")  # type: ignore[union-attr]
+        if self._should_rerun(flight):
+            return fn()
+        return self._shared(flight)
+
+    async def ado(
+        self,
+        key: str,
+        model_name: str,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        deadline: Optional[Deadline] = None,
+    ) -> T:
+        """
+        do の非同期版。leader は別スレッド / 別イベントループの呼び出しでもよい。
+        """
+        flight, leader = self._join(key, model_name)
+        if leader:
+            try:
+                result = await fn()
+            except BaseException as e:
+                self._finish(key, flight, None, e)
+                raise
+            self._finish(key, flight, result, None)
+            return result
+
+        if not await asyncio.to_thread(flight.event.wait, self._wait_timeout(deadline)):
+            raise deadline.exceeded(f"singleflight:{model_name}")  # type: ignore[union-attr]
+        if self._should_rerun(flight):
+            return await fn()
+        return self._shared(flight)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            in_flight: Dict[str, int] = {}
+            for flight in self._flights.values():
+                in_flight[flight.model_name] = in_flight.get(flight.model_name, 0) + 1
+            return {
+                model_name: {**st, "in_flight": in_flight.get(model_name, 0)}
+                for model_name, st in sorted(self._stats.items())
+            }
+
+
+# ============================================================
+# プロセス共有
+# ============================================================
+_SINGLEFLIGHT = SingleFlight()
+
+
+def get_singleflight() -> SingleFlight:
+    return _SINGLEFLIGHT
+
+
+def get_singleflight_stats() -> Dict[str, Dict[str, int]]:
+    return _SINGLEFLIGHT.stats()
@@ -1,11 +1,14 @@
 # llm/llm_manager.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import os
+import sys
+import threading
 
 # 新LLM中枢
 from llm.llm_ai import LLMAI
+from llm.llm_ai.llm_metrics import start_metrics_server
 
 # register 群
 from llm.llm_ai.llm_registers.register_gpt51 import register_gpt51
@@ -15,6 +18,7 @@ from llm.llm_ai.llm_registers.register_gemini import register_gemini
 from llm.llm_ai.llm_registers.register_hermes_old import register_hermes_old
 from llm.llm_ai.llm_registers.register_hermes_new import register_hermes_new
 from llm.llm_ai.llm_registers.register_llama_unc import register_llama_unc
+from llm.llm_ai.llm_registers.register_mock import register_mock
 
 # ※ gpt52 を起こす場合：この register が存在する前提
 #   まだ無いなら作ってね（register_gpt51 と同様の構造でOK）
@@ -35,31 +39,109 @@ class LLMManager:
 
     モデルの「登録」を環境変数で制御する。
     → 登録されないモデルは UI に出ない / 呼び出せない（ゾンビ封印）
+
+    モデル登録（Adapter / 接続）はプロセスで 1 つだけ作って全インスタンスで共有し、
+    enabled / priority はインスタンスごとの overlay として持つ。
+    get_or_create() は Streamlit のセッション内ならセッション専用のインスタンスを返すので、
+    あるユーザーの AI Manager の操作が他のユーザーの呼び出しに影響しない。
     """
 
     _POOL: Dict[str, "LLMManager"] = {}
+    _POOL_LOCK = threading.Lock()
+
+    # プロセス共有のモデル登録（最初の LLMManager 生成時に 1 回だけ作る）
+    _REGISTRY: Optional[LLMAI] = None
+    _REGISTRY_LOCK = threading.Lock()
+
+    # セッションごとのインスタンスを置く st.session_state のキー
+    _SESSION_KEY = "_llm_managers"
 
     # ===========================================================
-    # singleton
+    # singleton（Streamlit セッション内ではセッション単位）
     # ===========================================================
     @classmethod
     def get_or_create(cls, persona_id: str = "default") -> "LLMManager":
-        if persona_id in cls._POOL:
-            return cls._POOL[persona_id]
+        session = cls._session_state()
+        if session is not None:
+            pool = session.get(cls._SESSION_KEY)
+            if not isinstance(pool, dict):
+                pool = {}
+                session[cls._SESSION_KEY] = pool
+            mgr = pool.get(persona_id)
+            if mgr is None:
+                mgr = cls(persona_id=persona_id)
+                pool[persona_id] = mgr
+            return mgr
+
+        with cls._POOL_LOCK:
+            mgr = cls._POOL.get(persona_id)
+            if mgr is None:
+                mgr = cls(persona_id=persona_id)
+                cls._POOL[persona_id] = mgr
+            return mgr
+
+    @staticmethod
+    def _session_state() -> Any:
+        """
+        Streamlit のスクリプト実行スレッドなら st.session_state、それ以外（CLI / ワーカースレッド）は None。
+
+        streamlit が未 import なら import しない。
+        """
+        if "streamlit" not in sys.modules:
+            return None
+        try:
+            import streamlit as st
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+            if get_script_run_ctx(suppress_warning=True) is None:
+                return None
+            return st.session_state
+        except Exception:
+            return None
 
-        mgr = cls(persona_id=persona_id)
-        cls._POOL[persona_id] = mgr
-        return mgr
+    @classmethod
+    def shared_registry(cls) -> LLMAI:
+        """
+        プロセス共有のモデル登録（読み取り専用で使う）。
+        """
+        reg = cls._REGISTRY
+        if reg is not None:
+            return reg
+        with cls._REGISTRY_LOCK:
+            if cls._REGISTRY is None:
+                reg = LLMAI(persona_id="shared")
+                cls._register_models(reg)
+                cls._REGISTRY = reg
+                # LYRA_METRICS_PORT があれば /metrics（Prometheus）を公開（プロセスで 1 回だけ）
+                start_metrics_server()
+            return cls._REGISTRY
 
     # ===========================================================
     # init
     # ===========================================================
-    def __init__(self, persona_id: str = "default") -> None:
+    def __init__(self, persona_id: str = "default", *, llm_ai: Optional[LLMAI] = None) -> None:
         self.persona_id = persona_id
 
-        # 新中枢
-        self._llm_ai = LLMAI(persona_id=persona_id)
+        # 新中枢（共有レジストリの overlay。enabled / priority はこのインスタンス専用）
+        self._llm_ai = llm_ai or self.shared_registry().overlay(persona_id=persona_id)
 
+    def with_overlay(
+        self,
+        *,
+        enabled: Optional[Dict[str, bool]] = None,
+        priority: Optional[List[str]] = None,
+    ) -> "LLMManager":
+        """
+        モデル登録を共有したまま、enabled / priority だけを差し替えた LLMManager を返す。
+        リクエスト単位で設定を変えたいとき用（self は変更しない）。
+        """
+        return LLMManager(
+            self.persona_id,
+            llm_ai=self._llm_ai.overlay(enabled=enabled, priority=priority),
+        )
+
+    @staticmethod
+    def _register_models(llm_ai: LLMAI) -> None:
         # --- 登録制御（ここが肝） ---------------------------------
         # 例:
         #   LYRA_ENABLE_MODELS="gpt51,gpt52,grok,gemini"
@@ -91,32 +173,36 @@ class LLMManager:
 
         # --- 標準モデル登録（必要なものだけ登録） --------------------
         if want("gpt51"):
-            register_gpt51(self._llm_ai)
+            register_gpt51(llm_ai)
 
         # gpt52 を起こす（register が存在するときのみ）
         if want("gpt52") and _HAS_GPT52 and register_gpt52 is not None:
-            register_gpt52(self._llm_ai)
+            register_gpt52(llm_ai)
 
         # gpt4o は「眠らせたい」ことが多いのでデフォルトでは登録しない
         if want("gpt4o"):
-            register_gpt4o(self._llm_ai)
+            register_gpt4o(llm_ai)
 
         if want("grok"):
-            register_grok(self._llm_ai)
+            register_grok(llm_ai)
 
         if want("gemini"):
-            register_gemini(self._llm_ai)
+            register_gemini(llm_ai)
 
         # --- OpenRouter 系（Hermes / llama_unc）はデフォルト封印 ----
         # ここを登録しない限り UI にも出ない＝復活しない
         if want("hermes") or want("hermes_old"):
-            register_hermes_old(self._llm_ai)
+            register_hermes_old(llm_ai)
 
         if want("hermes_new"):
-            register_hermes_new(self._llm_ai)
+            register_hermes_new(llm_ai)
 
         if want("llama_unc"):
-            register_llama_unc(self._llm_ai)
+            register_llama_unc(llm_ai)
+
+        # --- 模擬モデル（mock_server）はオフライン計測用。明示したときだけ ----
+        if want("mock"):
+            register_mock(llm_ai)
 
     # ===========================================================
     # 互換API
@@ -133,14 +219,37 @@ class LLMManager:
             **kwargs,
         )
 
-    def chat_completion(
+    async def acall_model(
         self,
-        model: str,
+        model_name: str,
         messages: List[Dict[str, str]],
         **kwargs: Any,
-    ) -> Tuple[str, Dict[str, Any]]:
-        result = self.call_model(model, messages, **kwargs)
+    ) -> Any:
+        return await self._llm_ai.acall(
+            model_name=model_name,
+            messages=messages,
+            **kwargs,
+        )
+
+    def call_json(
+        self,
+        model_name: str,
+        messages: List[Dict[str, str]],
+        schema: Dict[str, Any],
+        **kwargs: Any,
+    ) -> Any:
+        """
+        schema に合う JSON を parse 済みで返す（LLMAI.call_json）。合わなければ JSONOutputError。
+        """
+        return self._llm_ai.call_json(
+            model_name=model_name,
+            messages=messages,
+            schema=schema,
+            **kwargs,
+        )
 
+    @staticmethod
+    def _normalize_result(result: Any) -> Tuple[str, Dict[str, Any]]:
         # tuple (text, usage)
         if isinstance(result, tuple) and len(result) >= 1:
             text = str(result[0] or "")
@@ -161,7 +270,65 @@ class LLMManager:
         # fallback
         return str(result or ""), {}
 
+    def chat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Dict[str, Any]]:
+        result = self.call_model(model, messages, **kwargs)
+        return self._normalize_result(result)
+
+    async def achat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Tuple[str, Dict[str, Any]]:
+        result = await self.acall_model(model, messages, **kwargs)
+        return self._normalize_result(result)
+
+    def chat_hedged(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        *,
+        backup: Optional[str] = None,
+        hedge_after_sec: Optional[float] = None,
+        backup_kwargs: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        ヘッジ付き chat。model が直近 p90 までに返らなければ backup にも投げる。
+        backup が勝ったときは usage["served_by"] に backup 名が入る。
+        """
+        result = self._llm_ai.call_hedged(
+            model_name=model,
+            messages=messages,
+            backup_model=backup,
+            hedge_after_sec=hedge_after_sec,
+            backup_kwargs=backup_kwargs,
+            **kwargs,
+        )
+        return self._normalize_result(result)
+
+    def stream_chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """
+        返答をテキスト差分で受け取る（st.write_stream にそのまま渡せる）。
+        """
+        return self._llm_ai.stream(
+            model_name=model,
+            messages=messages,
+            **kwargs,
+        )
+
     chat = chat_completion
+    achat = achat_completion
 
     # ===========================================================
     # 情報取得系（ModelsAI2 用）
@@ -177,3 +344,99 @@ class LLMManager:
 
     def set_enabled_models(self, enabled: Dict[str, bool]) -> None:
         self._llm_ai.set_enabled_models(enabled)
+
+    def get_models_version(self) -> Tuple[int, ...]:
+        """
+        モデル一覧（props / available）の版。同じ値の間は get_*_models の結果も同じ。
+        """
+        return self._llm_ai.snapshot_version
+
+    @staticmethod
+    def reload_secrets() -> None:
+        """
+        API キーの参照元（環境変数など）を変えたあとに呼ぶ。
+        """
+        LLMAI.reload_secrets()
+
+    # ===========================================================
+    # デバッグ用
+    # ===========================================================
+    def set_failover_order(self, priority: List[str]) -> None:
+        """
+        failover で代替モデルを選ぶ順番（AI Manager の priority）を設定する。
+        """
+        self._llm_ai.set_failover_order(priority)
+
+    def get_circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        モデル別サーキットブレーカーの状態（closed / open / half_open）。
+        """
+        return self._llm_ai.get_circuit_states()
+
+    def get_latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        モデル別レイテンシ（p50 / p90 / p99）とヘッジの発火・勝ち回数。
+        """
+        return self._llm_ai.get_latency_stats()
+
+    def get_capabilities(self) -> Dict[str, Dict[str, Any]]:
+        """
+        model_id 別の「受け付けないパラメータ」（400 から学習したもの / 既知のもの）。
+        """
+        return self._llm_ai.get_capabilities()
+
+    def get_singleflight_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        同一リクエストの相乗り（singleflight）の統計（leaders / coalesced / rerun / in_flight）。
+        """
+        return self._llm_ai.get_singleflight_stats()
+
+    def get_key_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        API キープールの使用状況（キーごとの requests / 429 / errors / tokens。キーは末尾 4 文字のみ）。
+        """
+        return self._llm_ai.get_key_pool_stats()
+
+    def get_metrics_dataframe(self) -> Any:
+        """
+        モデル別の呼び出しメトリクス（calls / errors / retries / p50・p95 / TTFB / tokens / bytes）。
+        """
+        return self._llm_ai.get_metrics_dataframe()
+
+    def get_metrics_prometheus(self) -> str:
+        """
+        同じメトリクスを Prometheus text format で返す。
+        """
+        return self._llm_ai.get_metrics_prometheus()
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        応答キャッシュの hit/miss 統計（モデル単位・プロセス共有）。
+        """
+        return self._llm_ai.get_cache_stats()
+
+    def get_scheduler_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        vendor スケジューラの状態（同時実行数・キュー長・待ち時間・429 回数）。
+        """
+        return self._llm_ai.get_scheduler_stats()
+
+    @staticmethod
+    def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+        """
+        HTTP 接続プールの統計（ベンダー単位・プロセス共有）。
+        """
+        # httpx の import を起動時に払わない（デバッグビューを開いたときだけ）
+        from llm.llm_ai.llm_adapters.http_pool import get_pool_stats
+
+        return get_pool_stats()
+
+    @staticmethod
+    def get_gemini_cache_stats() -> Dict[str, Any]:
+        """
+        Gemini cachedContents（persona の system prefix のキャッシュ）のハンドルと作成 / ヒット数。
+        """
+        # httpx の import を起動時に払わない（デバッグビューを開いたときだけ）
+        from llm.llm_ai.llm_adapters.gemini_cache import get_gemini_cache_stats
+
+        return get_gemini_cache_stats()
@@ -2,7 +2,9 @@
 
 import os
 from typing import Any, Dict, List, Tuple
-from openai import OpenAI, BadRequestError
+from openai import BadRequestError
+
+from llm.llm_ai.llm_adapters.http_pool import get_openai_client
 
 # ===== GPT-4o =====
 OPENAI_API_KEY_INITIAL = os.getenv("OPENAI_API_KEY")
@@ -19,7 +21,7 @@ def _call_gpt(messages: List[Dict[str, str]], temperature: float, max_tokens: in
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY が設定されていません。")
 
-    client_openai = OpenAI(api_key=api_key)
+    client_openai = get_openai_client("openai", api_key)
     resp = client_openai.chat.completions.create(
         model=MAIN_MODEL,
         messages=messages,
@@ -43,7 +45,7 @@ def _call_hermes(messages: List[Dict[str, str]], temperature: float, max_tokens:
     if not api_key:
         return "[Hermes: OPENROUTER_API_KEY 未設定]", {"error": "OPENROUTER_API_KEY not set"}
 
-    client_or = OpenAI(base_url=OPENROUTER_BASE_URL, api_key=api_key)
+    client_or = get_openai_client("openrouter", api_key, base_url=OPENROUTER_BASE_URL)
     try:
         resp = client_or.chat.completions.create(
             model=HERMES_MODEL,
@@ -1,9 +1,11 @@
 # preflight.py — Lyra Engine / Preflight Diagnostics
 
-import os, requests
+import os
 from dataclasses import dataclass
 from typing import Dict
 
+from llm.llm_ai.llm_adapters.http_pool import get_http_client
+
 @dataclass
 class CheckResult:
     ok: bool
@@ -22,7 +24,7 @@ class PreflightChecker:
         url = "https://api.openai.com/v1/models"
         headers = {"Authorization": f"Bearer {self.openai_key}"}
         try:
-            r = requests.get(url, headers=headers, timeout=10)
+            r = get_http_client("openai").get(url, headers=headers, timeout=10)
             if r.status_code == 200:
                 return CheckResult(True, "OpenAI API キーは有効です。")
             if r.status_code == 401:
@@ -43,7 +45,7 @@ class PreflightChecker:
         url = "https://openrouter.ai/api/v1/models"
         headers = {"Authorization": f"Bearer {self.openrouter_key}"}
         try:
-            r = requests.get(url, headers=headers, timeout=10)
+            r = get_http_client("openrouter").get(url, headers=headers, timeout=10)
             if r.status_code == 200:
                 data = r.json()
                 has_hermes = any(
@@ -0,0 +1,8 @@
+# tests/conftest.py
+from __future__ import annotations
+
+import os
+import sys
+
+# リポジトリ直下（actors / llm）を import できるようにする
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+# tests/test_llm_adapters_utils.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm.llm_ai.llm_adapters.utils import continuation_limit, continue_truncated, max_continuations
+
+
+def _send_truncated(calls: List[Any]):
+    def send(msgs: List[Dict[str, str]]) -> Tuple[str, Optional[Dict[str, Any]], str]:
+        calls.append(msgs)
+        return " more words", {"completion_tokens": 50}, "length"
+
+    return send
+
+
+def test_continue_truncated_follows_env_limit(monkeypatch) -> None:
+    monkeypatch.setenv("LYRA_LLM_CONTINUATIONS", "2")
+    calls: List[Any] = []
+    text, usage = continue_truncated(
+        _send_truncated(calls), [], "first part", {"completion_tokens": 50}, "length"
+    )
+    assert len(calls) == 2
+    assert usage["continuations"] == 2
+    assert usage["completion_tokens"] == 150
+
+
+def test_continuation_limit_zero_keeps_truncated_text(monkeypatch) -> None:
+    monkeypatch.setenv("LYRA_LLM_CONTINUATIONS", "2")
+    calls: List[Any] = []
+    with continuation_limit(0):
+        assert max_continuations() == 0
+        text, usage = continue_truncated(
+            _send_truncated(calls), [], "first part", {"completion_tokens": 50}, "length"
+        )
+    assert calls == []
+    assert text == "first part"
+    assert usage == {"completion_tokens": 50}
+    assert max_continuations() == 2
@@ -0,0 +1,61 @@
+# tests/test_llm_cache.py
+from __future__ import annotations
+
+from llm.llm_ai import llm_cache
+from llm.llm_ai.llm_cache import LLMResponseCache, make_cache_key
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entry_expires_after_ttl(monkeypatch) -> None:
+    clock = _Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = LLMResponseCache(max_items=4)
+
+    cache.put("k", ("text", {"total_tokens": 3}), model_name="m", ttl_sec=10)
+    clock.now += 9
+    assert cache.get("k", model_name="m") == ("text", {"total_tokens": 3})
+    clock.now += 2
+    assert cache.get("k", model_name="m") is None
+
+    stats = cache.stats()["m"]
+    assert stats["hits_memory"] == 1
+    assert stats["expired"] == 1
+    assert stats["misses"] == 1
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    cache = LLMResponseCache(max_items=2)
+    cache.put("a", ("A", None))
+    cache.put("b", ("B", None))
+    assert cache.get("a") == ("A", None)  # a を最近使った側へ
+
+    cache.put("c", ("C", None))
+    assert cache.get("b") is None
+    assert cache.get("a") == ("A", None)
+    assert cache.get("c") == ("C", None)
+
+
+def test_disk_tier_serves_after_memory_eviction(tmp_path) -> None:
+    cache = LLMResponseCache(path=str(tmp_path / "cache.sqlite3"), max_items=1)
+    cache.put("a", ("A", {"total_tokens": 1}), model_name="m")
+    cache.put("b", ("B", None), model_name="m")
+
+    assert cache.get("a", model_name="m") == ("A", {"total_tokens": 1})
+    assert cache.stats()["m"]["hits_disk"] == 1
+
+    fresh = LLMResponseCache(path=str(tmp_path / "cache.sqlite3"))
+    assert fresh.get("b") == ("B", None)
+
+
+def test_cache_key_ignores_whitespace_and_extra_message_keys() -> None:
+    a = make_cache_key("m", [{"role": "user", "content": " hi ", "name": "x"}], {"t": 1, "s": 2})
+    b = make_cache_key("m", [{"role": "user", "content": "hi"}], {"s": 2, "t": 1})
+    assert a == b
+    assert a != make_cache_key("m", [{"role": "user", "content": "hi"}], {"s": 2, "t": 0})
@@ -0,0 +1,56 @@
+# tests/test_llm_capabilities.py
+from __future__ import annotations
+
+import json
+
+from llm.llm_ai.llm_capabilities import CapabilityCache, rejected_params
+from llm.llm_ai.llm_errors import LLMCallError, LLMRateLimitError
+
+
+def _bad_request(message: str, *, body: str = "", status_code: int = 400) -> LLMCallError:
+    return LLMCallError(message, status_code=status_code, body=body or None)
+
+
+def test_openai_error_param_is_used() -> None:
+    body = json.dumps({"error": {"message": "Unsupported value", "param": "temperature"}})
+    exc = _bad_request("HTTP 400", body=body)
+    assert rejected_params(exc, ["model", "messages", "temperature", "top_p"]) == ["temperature"]
+
+
+def test_message_hint_matches_snake_and_camel_names() -> None:
+    exc = _bad_request(
+        "HTTP 400",
+        body='Invalid JSON payload received. Unknown name "topK" at generation_config',
+        status_code=422,
+    )
+    assert rejected_params(exc, ["top_k", "temperature"]) == ["top_k"]
+
+    exc = _bad_request("'max_tokens' is not supported with this model.")
+    assert rejected_params(exc, ["max_tokens", "max_completion_tokens"]) == ["max_tokens"]
+
+
+def test_unsent_or_protected_keys_are_not_learned() -> None:
+    # 本文に出てくる提案先（max_completion_tokens）は送っていないので返さない
+    exc = _bad_request("Unsupported parameter: use 'max_completion_tokens' instead.")
+    assert rejected_params(exc, ["temperature"]) == []
+
+    body = json.dumps({"error": {"param": "messages"}})
+    exc = _bad_request("messages not supported", body=body)
+    assert rejected_params(exc, ["model", "messages", "stream"]) == []
+
+
+def test_other_failures_are_ignored() -> None:
+    assert rejected_params(_bad_request("context length exceeded for temperature"), ["temperature"]) == []
+    assert rejected_params(LLMCallError("temperature unsupported", status_code=500), ["temperature"]) == []
+    assert rejected_params(LLMRateLimitError("temperature unsupported", status_code=429), ["temperature"]) == []
+    assert rejected_params(ValueError("temperature unsupported"), ["temperature"]) == []
+
+
+def test_learn_from_error_strips_param_on_next_call() -> None:
+    cache = CapabilityCache(path=None)
+    sent = {"model": "o3", "messages": [], "temperature": 0.7}
+    exc = _bad_request("HTTP 400", body=json.dumps({"error": {"param": "temperature"}}))
+
+    assert cache.learn_from_error("o3", exc, sent) == ["temperature"]
+    assert cache.sanitize("o3", sent) == {"model": "o3", "messages": []}
+    assert cache.sanitize("gpt-4o", sent) is sent
@@ -0,0 +1,100 @@
+# tests/test_llm_json.py
+from __future__ import annotations
+
+import pytest
+
+from llm.llm_ai.llm_json import (
+    json_params,
+    parse_and_validate,
+    parse_json_text,
+    strict_schema_ok,
+    validate,
+)
+
+_STRICT = {
+    "type": "object",
+    "properties": {
+        "reason": {"type": "string", "enum": ["a", "b"]},
+        "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 3},
+    },
+    "required": ["reason", "tags"],
+    "additionalProperties": False,
+}
+
+_FREE_FORM = {
+    "type": "object",
+    "properties": {"mood": {"type": "object", "additionalProperties": {"type": "number"}}},
+    "required": ["mood"],
+}
+
+
+def test_json_params_sends_strict_only_for_strict_compatible_schema() -> None:
+    fmt = json_params("openai", _STRICT)["response_format"]["json_schema"]
+    assert fmt["strict"] is True
+    assert "strict" not in json_params("xai", _FREE_FORM)["response_format"]["json_schema"]
+
+
+def test_strict_schema_ok_requires_all_keys_and_closed_objects() -> None:
+    assert strict_schema_ok(_STRICT)
+    assert not strict_schema_ok(_FREE_FORM)
+    assert not strict_schema_ok({**_STRICT, "required": ["reason"]})
+    with_max_length = {
+        **_STRICT,
+        "properties": {**_STRICT["properties"], "s": {"type": "string", "maxLength": 5}},
+        "required": ["reason", "tags", "s"],
+    }
+    assert not strict_schema_ok(with_max_length)
+
+
+# ============================================================
+# parse_json_text
+# ============================================================
+def test_parse_json_text_reads_plain_fenced_and_wrapped_json() -> None:
+    assert parse_json_text('{"reason": "a"}') == {"reason": "a"}
+    assert parse_json_text('```json\n{"reason": "b"}\n```') == {"reason": "b"}
+    assert parse_json_text('Sure! Here it is: {"tags": ["x"]} Hope this helps.') == {"tags": ["x"]}
+    assert parse_json_text("result:\n[1, 2]\n") == [1, 2]
+
+
+def test_parse_json_text_raises_when_no_json() -> None:
+    with pytest.raises(ValueError):
+        parse_json_text("no json here")
+    with pytest.raises(ValueError):
+        parse_json_text("")
+
+
+# ============================================================
+# validate
+# ============================================================
+def test_validate_accepts_matching_data() -> None:
+    assert validate({"reason": "a", "tags": ["x", "y"]}, _STRICT) == []
+    assert validate({"mood": {"joy": 0.5}}, _FREE_FORM) == []
+
+
+def test_validate_reports_paths() -> None:
+    errors = validate({"reason": "c", "tags": ["x", 1, "z", "w"], "extra": True}, _STRICT)
+    assert "$.tags[1]: expected string, got int" in errors
+    assert "$.tags: must have <= 3 items" in errors
+    assert "$: unexpected key 'extra'" in errors
+    assert any(e.startswith("$.reason: must be one of") for e in errors)
+
+    assert validate({}, _STRICT) == [
+        "$: missing required key 'reason'",
+        "$: missing required key 'tags'",
+    ]
+    assert validate({"mood": {"joy": "high"}}, _FREE_FORM) == ["$.mood.joy: expected number, got str"]
+
+
+def test_validate_numbers_strings_and_bools() -> None:
+    schema = {"type": "integer", "minimum": 0, "maximum": 10}
+    assert validate(5, schema) == []
+    assert validate(11, schema) == ["$: must be <= 10"]
+    assert validate(True, schema) == ["$: expected integer, got bool"]
+    assert validate("ab", {"type": "string", "minLength": 3}) == ["$: length must be >= 3"]
+    assert validate(None, {"type": ["string", "null"]}) == []
+
+
+def test_parse_and_validate_returns_parse_error() -> None:
+    data, errors = parse_and_validate("oops", _STRICT)
+    assert data is None
+    assert errors[0].startswith("invalid JSON:")
@@ -0,0 +1,51 @@
+# tests/test_llm_json_store.py
+from __future__ import annotations
+
+import json
+import threading
+
+from llm.llm_ai.llm_json_store import JsonStore
+
+
+def _store(path: str, data: dict, **kw) -> JsonStore:
+    return JsonStore(path, lock=threading.Lock(), dump=lambda: data, label="test", **kw)
+
+
+def test_changed_returns_snapshot_every_n_changes(tmp_path) -> None:
+    data = {"n": 0}
+    store = _store(str(tmp_path / "s.json"), data, save_every=2, save_interval_sec=3600)
+
+    data["n"] = 1
+    assert store.changed() is None
+    data["n"] = 2
+    snap = store.changed()
+    assert snap is not None
+    store.save(snap)
+    assert json.loads((tmp_path / "s.json").read_text(encoding="utf-8")) == {"n": 2}
+
+
+def test_older_snapshot_does_not_overwrite_newer(tmp_path) -> None:
+    data = {"n": 1}
+    store = _store(str(tmp_path / "s.json"), data)
+    old = store.changed()
+    data["n"] = 2
+    new = store.changed()
+
+    store.save(new)
+    store.save(old)
+    assert json.loads((tmp_path / "s.json").read_text(encoding="utf-8")) == {"n": 2}
+
+
+def test_flush_writes_pending_changes_and_memory_only_writes_nothing(tmp_path) -> None:
+    data = {"n": 1}
+    path = tmp_path / "s.json"
+    store = _store(str(path), data, save_every=10, save_interval_sec=3600)
+    assert store.changed() is None
+    assert not path.exists()
+    store.flush()
+    assert json.loads(path.read_text(encoding="utf-8")) == {"n": 1}
+
+    memory = _store("", data)
+    assert memory.changed() is None
+    memory.flush()
+    assert memory.load() is None
@@ -0,0 +1,142 @@
+# tests/test_llm_resilience.py
+from __future__ import annotations
+
+from llm.llm_ai import llm_resilience
+from llm.llm_ai.llm_deadline import DeadlineExceeded
+from llm.llm_ai.llm_errors import LLMCallError, LLMRateLimitError
+from llm.llm_ai.llm_resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    is_outage,
+    is_retryable,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# ============================================================
+# is_retryable / is_outage
+# ============================================================
+def test_transient_failures_are_retryable() -> None:
+    assert is_retryable(LLMCallError("busy", status_code=503))
+    assert is_retryable(TimeoutError("read timeout"))
+    assert is_retryable(ConnectionError("reset"))
+
+    wrapped = LLMCallError("transport")
+    wrapped.__cause__ = ConnectionError("reset")
+    assert is_retryable(wrapped)
+
+
+def test_request_errors_and_throttles_are_not_retryable() -> None:
+    assert not is_retryable(LLMCallError("bad request", status_code=400))
+    assert not is_retryable(LLMCallError("no status"))
+    assert not is_retryable(LLMRateLimitError("slow down", status_code=429))
+    assert not is_retryable(CircuitOpenError("open"))
+    assert not is_retryable(DeadlineExceeded("budget", stage="llm:a"))
+    assert not is_retryable(ValueError("bug"))
+
+
+def test_auth_failures_count_as_outage_only() -> None:
+    exc = LLMCallError("unauthorized", status_code=401)
+    assert not is_retryable(exc)
+    assert is_outage(exc)
+    assert not is_outage(LLMCallError("bad request", status_code=400))
+    assert not is_outage(LLMRateLimitError("slow down", status_code=429))
+
+
+# ============================================================
+# RetryPolicy
+# ============================================================
+def test_retry_policy_stops_at_max_attempts() -> None:
+    policy = RetryPolicy(max_attempts=3)
+    exc = LLMCallError("busy", status_code=502)
+    assert policy.should_retry(exc, 0)
+    assert policy.should_retry(exc, 1)
+    assert not policy.should_retry(exc, 2)
+    assert not policy.should_retry(LLMCallError("bad", status_code=400), 0)
+
+
+def test_retry_delay_is_capped(monkeypatch) -> None:
+    # full jitter の上限側を返させて cap を確かめる
+    monkeypatch.setattr(llm_resilience.random, "uniform", lambda lo, hi: hi)
+    policy = RetryPolicy(base_delay_sec=0.5, max_delay_sec=3.0)
+    assert policy.delay_for(0) == 0.5
+    assert policy.delay_for(1) == 1.0
+    assert policy.delay_for(2) == 2.0
+    assert policy.delay_for(5) == 3.0
+
+
+def test_retry_policy_from_env(monkeypatch) -> None:
+    monkeypatch.setenv("LYRA_LLM_RETRY_ATTEMPTS", "0")
+    monkeypatch.setenv("LYRA_LLM_RETRY_BASE_SEC", "0.25")
+    policy = RetryPolicy.from_env()
+    assert policy.max_attempts == 1
+    assert policy.base_delay_sec == 0.25
+
+
+# ============================================================
+# CircuitBreaker
+# ============================================================
+def test_breaker_opens_after_threshold_and_half_opens(monkeypatch) -> None:
+    clock = _Clock()
+    monkeypatch.setattr(llm_resilience.time, "monotonic", clock)
+    br = CircuitBreaker("m", failure_threshold=2, reset_timeout_sec=10)
+
+    br.record_failure(LLMCallError("busy", status_code=503))
+    assert br.state == CLOSED
+    br.record_failure(LLMCallError("busy", status_code=503))
+    assert br.state == OPEN
+    assert not br.allow()
+
+    clock.now += 10
+    assert br.state == HALF_OPEN
+    assert br.allow()
+    assert not br.allow()  # 試験呼び出しは 1 件だけ
+
+    br.record_success()
+    assert br.state == CLOSED
+    assert br.allow()
+
+    snap = br.snapshot()
+    assert snap["opened"] == 1
+    assert snap["rejected"] == 2
+    assert snap["consecutive_failures"] == 0
+
+
+def test_failed_trial_reopens_breaker(monkeypatch) -> None:
+    clock = _Clock()
+    monkeypatch.setattr(llm_resilience.time, "monotonic", clock)
+    br = CircuitBreaker("m", failure_threshold=3, reset_timeout_sec=5)
+
+    for _ in range(3):
+        br.record_failure()
+    clock.now += 5
+    assert br.allow()
+
+    br.record_failure(TimeoutError("again"))
+    assert br.state == OPEN
+    assert br.snapshot()["retry_in_sec"] == 5.0
+    assert br.snapshot()["last_error"] == "again"
+
+
+def test_released_trial_lets_next_call_through(monkeypatch) -> None:
+    clock = _Clock()
+    monkeypatch.setattr(llm_resilience.time, "monotonic", clock)
+    br = CircuitBreaker("m", failure_threshold=1, reset_timeout_sec=1)
+
+    br.record_failure()
+    clock.now += 1
+    assert br.allow()
+    br.release_trial()
+    assert br.state == HALF_OPEN
+    assert br.allow()
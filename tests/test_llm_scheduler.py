@@ -0,0 +1,125 @@
+# tests/test_llm_scheduler.py
+from __future__ import annotations
+
+from typing import List
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm.llm_ai.llm_deadline import Deadline, DeadlineExceeded
+from llm.llm_ai.llm_scheduler import TokenBucket, VendorLimits, VendorScheduler, estimate_tokens
+
+
+def test_token_bucket_refills_at_capacity_per_minute() -> None:
+    bucket = TokenBucket(60)  # 1 / 秒
+    now = bucket._last
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1.0) == 0.0
+    # 容量より大きい要求は満タンになったら通す
+    assert bucket.wait_time(600, now + 1.0) == pytest.approx(59.0)
+    bucket.refund(1000)
+    assert bucket.tokens == 60
+
+
+def test_slots_are_admitted_in_fifo_order() -> None:
+    sched = VendorScheduler("v", VendorLimits(max_concurrency=1))
+    order: List[int] = []
+    threads = []
+
+    with sched.slot():
+        for i in range(4):
+            t = threading.Thread(target=lambda i=i: _take_slot(sched, order, i))
+            t.start()
+            threads.append(t)
+            # キューに入る順番を固定する
+            while sched.stats()["queue_depth"] < i + 1:
+                time.sleep(0.005)
+    for t in threads:
+        t.join(timeout=5)
+
+    assert order == [0, 1, 2, 3]
+    stats = sched.stats()
+    assert stats["admitted"] == 5
+    assert stats["max_queue_depth"] == 4
+    assert stats["in_flight"] == 0
+
+
+def _take_slot(sched: VendorScheduler, order: List[int], i: int) -> None:
+    with sched.slot():
+        order.append(i)
+        time.sleep(0.01)
+
+
+def test_rpm_bucket_delays_admission() -> None:
+    sched = VendorScheduler("v", VendorLimits(max_concurrency=4, rpm=600))  # 10 / 秒
+    sched._rpm.consume(600)
+    with sched.slot() as slot:
+        assert 0.05 < slot.waited_sec < 0.5
+
+
+def test_penalize_pauses_the_whole_vendor() -> None:
+    sched = VendorScheduler("v", VendorLimits(max_concurrency=4))
+    assert sched.penalize(0.2) == 0.2
+    t0 = time.monotonic()
+    with sched.slot():
+        pass
+    assert time.monotonic() - t0 >= 0.15
+    assert sched.stats()["rate_limited"] == 1
+
+
+def test_report_usage_corrects_the_token_bucket() -> None:
+    sched = VendorScheduler("v", VendorLimits(max_concurrency=4, tpm=10_000))
+    est = estimate_tokens([{"role": "user", "content": "x" * 200}], {"max_tokens": 100})
+    assert est == 200
+    with sched.slot(est) as slot:
+        assert sched._tpm.tokens == pytest.approx(10_000 - est, abs=5)
+        slot.report_usage({"total_tokens": 50})
+    assert sched._tpm.tokens == pytest.approx(10_000 - 50, abs=5)
+
+
+def test_slot_gives_up_at_deadline_while_vendor_is_paused() -> None:
+    sched = VendorScheduler("v", VendorLimits(max_concurrency=2))
+    sched.penalize(30.0)
+    deadline = Deadline(1.0, label="turn")
+
+    t0 = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as info:
+        with sched.slot(deadline=deadline):
+            pass
+    assert time.monotonic() - t0 < 0.5
+    assert info.value.stage == "scheduler:v"
+    assert deadline.expired_stage == "scheduler:v"
+    assert sched.stats()["queue_depth"] == 0
+    assert sched.stats()["deadline_exceeded"] == 1
+
+
+def test_slot_waits_for_a_free_slot_only_until_deadline() -> None:
+    sched = VendorScheduler("v", VendorLimits(max_concurrency=1))
+    deadline = Deadline(0.2)
+
+    with sched.slot():
+        t0 = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            with sched.slot(deadline=deadline):
+                pass
+        assert 0.15 < time.monotonic() - t0 < 1.0
+
+    with sched.slot(deadline=Deadline(1.0)) as slot:
+        assert slot.waited_sec < 0.1
+
+
+def test_aslot_gives_up_at_deadline() -> None:
+    sched = VendorScheduler("v", VendorLimits(max_concurrency=2))
+    sched.penalize(30.0)
+
+    async def run() -> None:
+        async with sched.aslot(deadline=Deadline(1.0)):
+            pass
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert sched.stats()["queue_depth"] == 0
@@ -0,0 +1,136 @@
+# tests/test_llm_singleflight.py
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List
+import threading
+import time
+
+import pytest
+
+from llm.llm_ai.llm_deadline import Deadline, DeadlineExceeded
+from llm.llm_ai.llm_errors import LLMCallError
+from llm.llm_ai.llm_singleflight import SingleFlight
+
+
+def _run(sf: SingleFlight, fn: Callable[[], Any], **kwargs: Any) -> Dict[str, Any]:
+    """
+    別スレッドで sf.do を呼ぶ。結果 / 例外は返した dict に入る。
+    """
+    out: Dict[str, Any] = {}
+
+    def run() -> None:
+        try:
+            out["result"] = sf.do("k", "m", fn, **kwargs)
+        except BaseException as e:
+            out["error"] = e
+
+    out["thread"] = threading.Thread(target=run)
+    out["thread"].start()
+    return out
+
+
+def _wait_for_follower(sf: SingleFlight, count: int = 1) -> None:
+    t0 = time.monotonic()
+    while sf.stats().get("m", {}).get("coalesced", 0) < count:
+        assert time.monotonic() - t0 < 2.0, "follower did not join"
+        time.sleep(0.005)
+
+
+def test_follower_shares_result_with_own_usage_copy() -> None:
+    sf = SingleFlight()
+    release = threading.Event()
+    calls: List[str] = []
+
+    def leader_fn() -> Any:
+        calls.append("leader")
+        release.wait(2.0)
+        return "text", {"total_tokens": 7}
+
+    leader = _run(sf, leader_fn)
+    while not calls:
+        time.sleep(0.005)
+    followers = [_run(sf, lambda: calls.append("follower")) for _ in range(2)]
+    _wait_for_follower(sf, 2)
+    release.set()
+    for t in [leader, *followers]:
+        t["thread"].join(2.0)
+
+    assert calls == ["leader"]
+    leader_text, leader_usage = leader["result"]
+    assert (leader_text, leader_usage) == ("text", {"total_tokens": 7})
+
+    a, b = (f["result"] for f in followers)
+    assert a == ("text", {"total_tokens": 7, "coalesced": True})
+    assert a[1] is not b[1] and a[1] is not leader_usage
+    a[1]["total_tokens"] = 0
+    assert b[1]["total_tokens"] == 7
+
+    stats = sf.stats()["m"]
+    assert stats == {"leaders": 1, "coalesced": 2, "rerun": 0, "in_flight": 0}
+
+
+def test_leader_error_is_raised_to_followers() -> None:
+    sf = SingleFlight()
+    release = threading.Event()
+    started = threading.Event()
+
+    def leader_fn() -> Any:
+        started.set()
+        release.wait(2.0)
+        raise LLMCallError("boom", status_code=500)
+
+    leader = _run(sf, leader_fn)
+    started.wait(2.0)
+    follower = _run(sf, lambda: pytest.fail("follower must not call"))
+    _wait_for_follower(sf)
+    release.set()
+    leader["thread"].join(2.0)
+    follower["thread"].join(2.0)
+
+    assert isinstance(leader["error"], LLMCallError)
+    assert follower["error"] is leader["error"]
+    assert sf.stats()["m"]["in_flight"] == 0
+
+
+def test_follower_reruns_when_leader_ran_out_of_deadline() -> None:
+    sf = SingleFlight()
+    release = threading.Event()
+    started = threading.Event()
+
+    def leader_fn() -> Any:
+        started.set()
+        release.wait(2.0)
+        raise DeadlineExceeded("leader budget", stage="llm:m")
+
+    leader = _run(sf, leader_fn)
+    started.wait(2.0)
+    follower = _run(sf, lambda: ("own", {"total_tokens": 1}))
+    _wait_for_follower(sf)
+    release.set()
+    leader["thread"].join(2.0)
+    follower["thread"].join(2.0)
+
+    assert isinstance(leader["error"], DeadlineExceeded)
+    assert follower["result"] == ("own", {"total_tokens": 1})
+    assert sf.stats()["m"]["rerun"] == 1
+
+
+def test_follower_gives_up_at_its_own_deadline() -> None:
+    sf = SingleFlight()
+    release = threading.Event()
+    started = threading.Event()
+
+    def leader_fn() -> Any:
+        started.set()
+        release.wait(2.0)
+        return "late", {}
+
+    leader = _run(sf, leader_fn)
+    started.wait(2.0)
+    with pytest.raises(DeadlineExceeded) as ei:
+        sf.do("k", "m", lambda: None, deadline=Deadline(0.05))
+    assert ei.value.stage == "singleflight:m"
+
+    release.set()
+    leader["thread"].join(2.0)
+    assert leader["result"] == ("late", {})
@@ -0,0 +1,40 @@
+# tests/test_mock_server.py
+from __future__ import annotations
+
+import pytest
+
+from actors.emotion_ai import LONG_TERM_SCHEMA, SHORT_TERM_SCHEMA
+from actors.memory.memory_importance_classifier import IMPORTANCE_SCHEMA
+from llm.llm_ai.llm_adapters.mock_server import MockLLMServer, MockModelSpec, _schema_sample
+from llm.llm_ai.llm_ai import LLMAI
+from llm.llm_ai.llm_json import to_gemini_schema, validate
+from llm.llm_ai.llm_registers.register_mock import register_mock
+
+_SCHEMAS = [SHORT_TERM_SCHEMA, LONG_TERM_SCHEMA, IMPORTANCE_SCHEMA]
+
+
+@pytest.mark.parametrize("schema", _SCHEMAS)
+def test_schema_sample_matches_schema(schema) -> None:
+    words = ["quiet", "river", "lantern", "rain"]
+    assert validate(_schema_sample(schema, words), schema) == []
+    # Gemini の responseSchema（type が大文字）でも同じ形になる
+    assert validate(_schema_sample(to_gemini_schema(schema), words), schema) == []
+
+
+@pytest.mark.parametrize("model_name", ["mock_fast", "mock_gemini"])
+@pytest.mark.parametrize("schema", _SCHEMAS)
+def test_call_json_against_mock_returns_schema_shaped_json(model_name, schema) -> None:
+    specs = [
+        MockModelSpec(name="mock-fast", seed=1, ttfb_ms=1, ttfb_sigma=0.0),
+        MockModelSpec(name="mock-gemini", seed=4, ttfb_ms=1, ttfb_sigma=0.0),
+    ]
+    with MockLLMServer(specs, time_scale=0.0) as server:
+        ai = LLMAI()
+        register_mock(ai, base_url=server.url)
+        data = ai.call_json(
+            model_name=model_name,
+            messages=[{"role": "user", "content": "hello"}],
+            schema=schema,
+            cache=False,
+        )
+    assert validate(data, schema) == []
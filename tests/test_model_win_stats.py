@@ -0,0 +1,49 @@
+# tests/test_model_win_stats.py
+from __future__ import annotations
+
+import json
+import os
+
+from actors.model_win_stats import ModelWinStats
+
+
+_RESULTS = {
+    "a": {"status": "ok", "text": "x", "usage": {"completion_tokens": 4}},
+    "b": {"status": "ok", "text": "y"},
+}
+
+
+def test_record_turn_saves_every_n_turns_and_flush_writes_rest(tmp_path):
+    path = str(tmp_path / "win_stats.json")
+    stats = ModelWinStats(path=path, save_every=3, save_interval_sec=3600)
+
+    for _ in range(2):
+        stats.record_turn("p", "short", _RESULTS, "a")
+    assert not os.path.exists(path)
+
+    stats.record_turn("p", "short", _RESULTS, "a")
+    stats.record_turn("p", "short", _RESULTS, "a")
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["p"]["short"]["a"]["called"] == 3
+
+    stats.flush()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["p"]["short"]["a"]["called"] == 4
+
+
+def test_pending_and_hedged_out_do_not_count_as_losses() -> None:
+    stats = ModelWinStats(path="")
+    results = {
+        "a": {"status": "ok", "text": "x", "elapsed_sec": 0.1},
+        "b": {"status": "pending"},
+        "c": {"status": "hedged_out", "usage": {"completion_tokens": 7}},
+    }
+    for _ in range(5):
+        stats.record_turn("p", "short", results, "a")
+
+    rows = {r["model"]: r for r in stats.snapshot()}
+    assert rows["a"]["called"] == 5 and rows["a"]["chosen"] == 5
+    assert rows["b"]["called"] == 0 and rows["b"]["unjudged"] == 5
+    assert rows["c"]["called"] == 0 and rows["c"]["unjudged"] == 5
+    assert rows["c"]["completion_tokens"] == 35
+    assert stats.win_rate("p", "short", "b") == 0.5
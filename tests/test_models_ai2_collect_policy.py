@@ -0,0 +1,166 @@
+# tests/test_models_ai2_collect_policy.py
+from __future__ import annotations
+
+from typing import Any, Dict, List
+import threading
+import time
+
+from actors.models_ai2 import ModelsAI2
+from llm.llm_ai.llm_errors import HedgeFailedError
+
+
+class _FakeManager:
+    """
+    LLMManager の代わり。モデルごとに決まった秒数だけ待って返す。
+    """
+
+    def __init__(self, delays: Dict[str, float], available: List[str]) -> None:
+        self.delays = delays
+        self.available = available
+
+    def get_available_models(self) -> Dict[str, Dict[str, Any]]:
+        return {m: {"enabled": m in self.available, "has_key": True} for m in self.delays}
+
+    def chat(self, *, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> Any:
+        time.sleep(self.delays[model])
+        return f"answer from {model}", {"completion_tokens": 4}
+
+
+def _collect(priority: List[str]) -> Dict[str, Any]:
+    manager = _FakeManager(
+        {"gpt52": 0.0, "a": 0.05, "b": 1.0, "c": 1.0},
+        available=["a", "b", "c"],  # gpt52 は無効（呼ばれない）
+    )
+    ai = ModelsAI2(manager, policy="priority_first")
+    return ai.collect([{"role": "user", "content": "hi"}], priority=priority)
+
+
+def test_priority_first_ignores_untargeted_top_priority() -> None:
+    t0 = time.monotonic()
+    results = _collect(["gpt52", "a", "b", "c"])
+    elapsed = time.monotonic() - t0
+
+    assert results["_meta"]["collect_policy"] == "priority_first"
+    assert results["_meta"]["waited_models"] == ["a"]
+    assert results["a"]["status"] == "ok"
+    assert results["b"]["status"] == "pending"
+    assert "gpt52" not in results
+    assert elapsed < 0.8
+
+
+def test_priority_first_same_as_without_untargeted_model() -> None:
+    with_missing = _collect(["gpt52", "a", "b", "c"])
+    without = _collect(["a", "b", "c"])
+    assert with_missing["_meta"]["waited_models"] == without["_meta"]["waited_models"]
+
+
+def test_late_results_do_not_replace_pending_entries() -> None:
+    manager = _FakeManager({"a": 0.0, "b": 0.2}, available=["a", "b"])
+    ai = ModelsAI2(manager, policy="priority_first")
+    results = ai.collect([{"role": "user", "content": "hi"}], priority=["a", "b"])
+
+    time.sleep(0.5)
+    assert results["b"]["status"] == "pending"
+    assert results["_late"]["b"]["status"] == "ok"
+    assert results["_late"]["b"]["background"] is True
+
+
+def test_collect_iter_yields_snapshots() -> None:
+    manager = _FakeManager({"a": 0.0, "b": 0.2}, available=["a", "b"])
+    ai = ModelsAI2(manager, policy="priority_first")
+    it = ai.collect_iter([{"role": "user", "content": "hi"}], priority=["a", "b"])
+
+    model_name, _, partial = next(it)
+    assert model_name == "a"
+    keys_before = set(partial)
+    time.sleep(0.5)
+    assert set(partial) == keys_before
+    assert partial["b"]["status"] == "pending"
+
+
+def test_single_model_respects_model_timeout() -> None:
+    manager = _FakeManager({"a": 1.0}, available=["a"])
+    ai = ModelsAI2(manager, model_timeouts={"a": 0.1})
+
+    t0 = time.monotonic()
+    results = ai.collect([{"role": "user", "content": "hi"}])
+    assert time.monotonic() - t0 < 0.6
+    assert results["_meta"]["collect_mode"] == "sequential"
+    assert results["a"]["status"] == "timeout"
+
+
+def test_sequential_mode_respects_model_timeout() -> None:
+    manager = _FakeManager({"a": 1.0, "b": 0.0}, available=["a", "b"])
+    ai = ModelsAI2(manager, parallel=False, model_timeouts={"a": 0.1})
+
+    t0 = time.monotonic()
+    results = ai.collect([{"role": "user", "content": "hi"}])
+    assert time.monotonic() - t0 < 0.6
+    assert results["a"]["status"] == "timeout"
+    assert results["b"]["status"] == "ok"
+
+
+def test_budgeted_calls_turn_off_continuation() -> None:
+    ai = ModelsAI2(_FakeManager({"a": 0.0}, available=["a"]))
+    kwargs = ai._build_call_kwargs("a", None, {"a": 256})
+    assert kwargs["max_tokens"] == 256
+    assert kwargs["continuations"] == 0
+    assert "continuations" not in ai._build_call_kwargs("a", None, None)
+
+
+class _HedgeManager(_FakeManager):
+    """
+    chat_hedged の結果を固定で返す / 投げる。
+    """
+
+    def __init__(self, outcome: Any) -> None:
+        super().__init__({"a": 0.0, "b": 0.0}, available=["a", "b"])
+        self.outcome = outcome
+
+    def chat_hedged(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> Any:
+        if isinstance(self.outcome, BaseException):
+            raise self.outcome
+        return self.outcome
+
+
+def _collect_hedged(outcome: Any) -> Dict[str, Any]:
+    ai = ModelsAI2(_HedgeManager(outcome), hedge=True)
+    return ai.collect([{"role": "user", "content": "hi"}], priority=["a", "b"])
+
+
+def test_hedge_loser_that_lost_the_race_is_hedged_out() -> None:
+    results = _collect_hedged(("from a", {"completion_tokens": 2}))
+    assert results["a"]["status"] == "ok"
+    assert results["b"]["status"] == "hedged_out"
+    assert results["_meta"]["hedge"]["winner"] == "a"
+
+
+def test_hedge_loser_that_failed_keeps_its_error() -> None:
+    results = _collect_hedged(("from b", {"served_by": "b", "hedge_errors": {"a": "HTTP 503"}}))
+    assert results["b"]["status"] == "ok"
+    assert results["a"]["status"] == "error"
+    assert results["a"]["error"] == "HTTP 503"
+
+
+def test_hedge_both_failed_keeps_each_error() -> None:
+    exc = HedgeFailedError("hedged call failed", errors={"a": "HTTP 503", "b": "read timeout"})
+    results = _collect_hedged(exc)
+    assert results["_meta"]["hedge"]["winner"] is None
+    assert (results["a"]["status"], results["a"]["error"]) == ("error", "HTTP 503")
+    assert (results["b"]["status"], results["b"]["error"]) == ("error", "read timeout")
+    assert "hedge_errors" not in results["a"]
+
+
+def test_sequential_mode_reuses_one_worker_thread() -> None:
+    threads: List[str] = []
+
+    class _ThreadRecorder(_FakeManager):
+        def chat(self, *, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> Any:
+            threads.append(threading.current_thread().name)
+            return super().chat(model=model, messages=messages, **kwargs)
+
+    manager = _ThreadRecorder({"a": 0.0, "b": 0.0, "c": 0.0}, available=["a", "b", "c"])
+    results = ModelsAI2(manager, parallel=False).collect([{"role": "user", "content": "hi"}])
+
+    assert [results[m]["status"] for m in ("a", "b", "c")] == ["ok", "ok", "ok"]
+    assert len(threads) == 3 and len(set(threads)) == 1
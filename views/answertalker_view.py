@@ -163,12 +163,41 @@ class AnswerTalkerView:
         else:
             st.json(emo_override)
 
+        st.subheader("ターンの締切（llm_meta['deadline']）")
+        deadline = llm_meta.get("deadline") or {}
+        if not deadline:
+            st.info("deadline 情報はまだありません。")
+        else:
+            if deadline.get("expired_stage"):
+                st.warning(f"予算切れ: {deadline['expired_stage']}")
+            st.json(deadline)
+
         st.subheader("llm_meta に登録された AI 回答一覧（models）")
         models = llm_meta.get("models", {})
         if not models:
             st.info("models 情報はまだありません。")
         else:
+            st.write(f"- collect_policy: `{llm_meta.get('collect_policy', 'all')}`")
+            length_budget = llm_meta.get("length_budget") or {}
+            if length_budget:
+                st.write(f"- target_length: `{length_budget.get('target_length')}`")
+                if length_budget.get("max_tokens"):
+                    with st.expander("max_tokens の予算（目標の長さ × 学習した文字数/トークン）", expanded=False):
+                        st.json(length_budget["max_tokens"])
+            progress = llm_meta.get("collect_progress") or []
+            if progress:
+                with st.expander("届いた順（レイテンシと、その時点の暫定採用）", expanded=False):
+                    st.dataframe(progress, use_container_width=True)
+            late = dict(models.get("_late") or {})
+            if late:
+                with st.expander("ターンの採用が決まった後に裏で返ってきた回答（Judge の候補外）", expanded=False):
+                    for name, info in late.items():
+                        st.write(f"- {name}: status={info.get('status')}, latency={info.get('elapsed_sec')}s")
+                        if info.get("text"):
+                            st.code((info.get("text") or "")[:1000])
             for name, info in models.items():
+                if name == "_late":
+                    continue
                 with st.expander(f"モデル: {name}", expanded=True):
                     status = info.get("status", "unknown")
                     text = info.get("text", "") or ""
@@ -177,6 +206,8 @@ class AnswerTalkerView:
 
                     st.write("- status:", status)
                     st.write("- len(text):", len(text))
+                    if info.get("sample_of"):
+                        st.caption(f"{info['sample_of']} の同じリクエストで届いた別サンプル（n>1）")
 
                     if usage is not None:
                         st.write("- usage:", usage)
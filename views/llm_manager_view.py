@@ -52,6 +52,180 @@ class LLMManagerView:
                     for k, v in extra.items():
                         st.markdown(f"  - `{k}`: `{v}`")
 
+        self._render_call_metrics()
+        self._render_circuit_states()
+        self._render_latency_stats()
+        self._render_cache_stats()
+        self._render_singleflight()
+        self._render_scheduler_stats()
+        self._render_key_pools()
+        self._render_capabilities()
+        self._render_gemini_cache()
+        self._render_pool_stats()
+
+    # ------------------------------------------------------------------
+    def _render_call_metrics(self) -> None:
+        st.subheader("📈 呼び出しメトリクス")
+        st.caption(
+            "モデル別の latency / TTFB / tokens / retries / エラー種別。"
+            "LYRA_METRICS_PORT を設定すると /metrics（Prometheus 形式）でも取得できます。"
+        )
+
+        df = self.manager.get_metrics_dataframe()
+        if df is None or len(df) == 0:
+            st.info("まだ LLM 呼び出しは発生していません。")
+            return
+
+        st.dataframe(df.sort_values("p95_sec", ascending=False), use_container_width=True)
+
+        with st.expander("Prometheus text format", expanded=False):
+            st.code(self.manager.get_metrics_prometheus(), language="text")
+
+    # ------------------------------------------------------------------
+    def _render_latency_stats(self) -> None:
+        st.subheader("⏱️ レイテンシ / ヘッジ")
+        st.caption(
+            "直近の呼び出しから求めたモデル別パーセンタイル。"
+            "hedge_after_sec を過ぎても返らないと backup にも投げます（LYRA_HEDGE=1）。"
+        )
+
+        stats = self.manager.get_latency_stats()
+        if not stats:
+            st.info("まだ LLM 呼び出しは発生していません。")
+            return
+
+        rows = [{"model": name, **s} for name, s in stats.items()]
+        st.table(rows)
+
+    # ------------------------------------------------------------------
+    def _render_circuit_states(self) -> None:
+        st.subheader("🛡️ サーキットブレーカー")
+        st.caption("連続失敗したモデルは一定時間 open になり、呼ばずに即失敗（または failover）します。")
+
+        states = self.manager.get_circuit_states()
+        if not states:
+            st.info("まだ LLM 呼び出しは発生していません。")
+            return
+
+        rows = [{"model": name, **s} for name, s in states.items()]
+        st.table(rows)
+
+    # ------------------------------------------------------------------
+    def _render_scheduler_stats(self) -> None:
+        st.subheader("🚦 ベンダー別スケジューラ")
+        st.caption("同時実行数 / RPM / TPM 制限と、待ち行列・429 の状況。")
+
+        stats = self.manager.get_scheduler_stats()
+        if not stats:
+            st.info("まだ LLM 呼び出しは発生していません。")
+            return
+
+        rows = [{"vendor": vendor, **s} for vendor, s in stats.items()]
+        st.table(rows)
+
+    # ------------------------------------------------------------------
+    def _render_key_pools(self) -> None:
+        st.subheader("🔑 API キープール")
+        st.caption(
+            "環境変数のカンマ区切り、または secrets の [keys] テーブルで複数キーを登録できます。"
+            "429 を受けたキーはリセットまで飛ばします。"
+        )
+
+        stats = self.manager.get_key_pool_stats()
+        if not stats:
+            st.info("まだ LLM 呼び出しは発生していません。")
+            return
+
+        rows = [
+            {"pool": name, **per_key}
+            for name, pool in stats.items()
+            for per_key in pool.get("per_key") or []
+        ]
+        st.table(rows)
+
+    # ------------------------------------------------------------------
+    def _render_capabilities(self) -> None:
+        st.subheader("🧩 パラメータ対応状況")
+        st.caption(
+            "400 で弾かれたパラメータ（learned）と既知の非対応（seeded）。"
+            "ここに載ったパラメータは送信前に落とされます。"
+        )
+
+        caps = self.manager.get_capabilities()
+        if not caps:
+            st.info("非対応として記録されたパラメータはありません。")
+            return
+
+        rows = [
+            {
+                "model_id": model_id,
+                "learned": ", ".join(c.get("learned") or []),
+                "seeded": ", ".join(c.get("seeded") or []),
+            }
+            for model_id, c in caps.items()
+        ]
+        st.table(rows)
+
+    # ------------------------------------------------------------------
+    def _render_cache_stats(self) -> None:
+        st.subheader("🗃️ 応答キャッシュ")
+        st.caption("LLMAI.call の応答キャッシュ（メモリ LRU + SQLite）の hit/miss。")
+
+        stats = self.manager.get_cache_stats()
+        total = stats.pop("_total", {})
+        st.markdown(
+            f"- メモリ件数: `{total.get('memory_items', 0)}` / SQLite: `{total.get('disk', False)}`"
+        )
+        if not stats:
+            st.info("まだキャッシュ対象の呼び出しはありません。")
+            return
+
+        rows = [{"model": name, **s} for name, s in stats.items()]
+        st.table(rows)
+
+    # ------------------------------------------------------------------
+    def _render_singleflight(self) -> None:
+        st.subheader("🔗 同一リクエストの相乗り")
+        st.caption(
+            "同じモデル・messages・パラメータの呼び出しが実行中なら、後続は HTTP を出さずにその結果を受け取ります"
+            "（coalesced）。rerun は先行呼び出しが deadline 切れだったため自分で呼び直した回数。"
+        )
+
+        stats = self.manager.get_singleflight_stats()
+        if not stats:
+            st.info("まだ LLM 呼び出しは発生していません。")
+            return
+
+        rows = [{"model": name, **s} for name, s in stats.items()]
+        st.table(rows)
+
+    # ------------------------------------------------------------------
+    def _render_gemini_cache(self) -> None:
+        st.subheader("🗂️ Gemini コンテキストキャッシュ")
+        st.caption(
+            "persona の人格（先頭の system）を cachedContents に載せ、毎ターンの送信から外します。"
+            "OpenAI 側のプレフィックスキャッシュのヒット率は呼び出しメトリクスの cached_tokens を参照。"
+        )
+
+        stats = self.manager.get_gemini_cache_stats()
+        handles = stats.pop("handles", [])
+        st.table([stats])
+        if handles:
+            st.table(handles)
+
+    # ------------------------------------------------------------------
+    def _render_pool_stats(self) -> None:
+        st.subheader("🔌 HTTP 接続プール")
+        st.caption("ベンダーごとの keep-alive 接続の再利用状況（プロセス共有）。")
+
+        stats = self.manager.get_pool_stats()
+        if not stats:
+            st.info("まだ HTTP リクエストは発生していません。")
+            return
+
+        rows = [{"vendor": vendor, **s} for vendor, s in stats.items()]
+        st.table(rows)
+
 
 def create_llm_manager_view() -> LLMManagerView:
     """